@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Migration: Tabelle background_jobs
+Legt die persistente Auftrags-Queue des BackgroundTaskManagers an
+(Status, Versuche, Ergebnis je Auftrag).
+Funktioniert für SQLite und PostgreSQL.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import engine
+from app.models.background_job import BackgroundJob
+
+
+async def run_migration():
+    """Führt die Migration aus"""
+    try:
+        async with engine.begin() as conn:
+            print("Erstelle Tabelle background_jobs...")
+            await conn.run_sync(
+                lambda sync_conn: BackgroundJob.__table__.create(sync_conn, checkfirst=True)
+            )
+
+        print("Tabelle background_jobs erstellt")
+        return True
+
+    except Exception as e:
+        print(f"Fehler bei der Migration: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    print("Starte Migration: Background Jobs")
+    print("=" * 60)
+
+    success = asyncio.run(run_migration())
+
+    print("=" * 60)
+    if success:
+        print("Migration erfolgreich!")
+        sys.exit(0)
+    else:
+        print("Migration fehlgeschlagen!")
+        sys.exit(1)
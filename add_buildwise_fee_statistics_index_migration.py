@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Migration: Index ix_buildwise_fees_provider_status_due
+Zusammengesetzter Index (service_provider_id, status, due_date) für die
+Gebühren-Statistiken je Dienstleister und die Überfälligkeitsprüfung.
+Funktioniert für SQLite und PostgreSQL.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import engine
+from app.models.buildwise_fee import BuildWiseFee
+
+
+async def run_migration():
+    """Führt die Migration aus"""
+    try:
+        index = next(
+            index for index in BuildWiseFee.__table__.indexes
+            if index.name == "ix_buildwise_fees_provider_status_due"
+        )
+        async with engine.begin() as conn:
+            print(f"Erstelle Index {index.name}...")
+            await conn.run_sync(lambda sync_conn: index.create(sync_conn, checkfirst=True))
+
+        print("Index ix_buildwise_fees_provider_status_due erstellt")
+        return True
+
+    except Exception as e:
+        print(f"Fehler bei der Migration: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    print("Starte Migration: Index für BuildWise-Gebühren-Statistiken")
+    print("=" * 60)
+
+    success = asyncio.run(run_migration())
+
+    print("=" * 60)
+    if success:
+        print("Migration erfolgreich!")
+        sys.exit(0)
+    else:
+        print("Migration fehlgeschlagen!")
+        sys.exit(1)
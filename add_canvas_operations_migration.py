@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Migration: Operations-Log für Canvas
+- Spalten canvases.seq und canvases.compacted_seq (Sequenznummern des Logs)
+- Spalte version in canvas_objects und collaboration_areas (Konflikterkennung)
+- Tabelle canvas_operations
+Funktioniert für SQLite und PostgreSQL.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import inspect, text
+from app.core.database import engine
+from app.models.canvas import CanvasOperation
+
+NEW_COLUMNS = [
+    ("canvases", "seq", "INTEGER NOT NULL DEFAULT 0"),
+    ("canvases", "compacted_seq", "INTEGER NOT NULL DEFAULT 0"),
+    ("canvas_objects", "version", "INTEGER NOT NULL DEFAULT 1"),
+    ("collaboration_areas", "version", "INTEGER NOT NULL DEFAULT 1"),
+]
+
+
+async def run_migration():
+    """Führt die Migration aus"""
+    try:
+        async with engine.begin() as conn:
+            tables = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names())
+            if "canvases" not in tables:
+                print("Tabelle canvases existiert nicht, keine Migration notwendig")
+                return True
+
+            for table, column, definition in NEW_COLUMNS:
+                columns = await conn.run_sync(
+                    lambda sync_conn: [c["name"] for c in inspect(sync_conn).get_columns(table)]
+                )
+                if column in columns:
+                    print(f"Spalte {table}.{column} existiert bereits")
+                else:
+                    print(f"Füge Spalte {table}.{column} hinzu...")
+                    await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+
+            print("Erstelle Tabelle canvas_operations...")
+            await conn.run_sync(
+                lambda sync_conn: CanvasOperation.__table__.create(sync_conn, checkfirst=True)
+            )
+
+        print("Operations-Log für Canvas erstellt")
+        return True
+
+    except Exception as e:
+        print(f"Fehler bei der Migration: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    print("Starte Migration: Canvas-Operations-Log")
+    print("=" * 60)
+
+    success = asyncio.run(run_migration())
+
+    print("=" * 60)
+    if success:
+        print("Migration erfolgreich!")
+        sys.exit(0)
+    else:
+        print("Migration fehlgeschlagen!")
+        sys.exit(1)
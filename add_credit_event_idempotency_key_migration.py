@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Migration: Spalte credit_events.idempotency_key
+Eindeutiger Schlüssel pro Buchung (z.B. ein täglicher Abzug pro User und Tag),
+damit nachgelagert ausgeführte Abzüge nicht doppelt gebucht werden.
+Funktioniert für SQLite und PostgreSQL.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import inspect, text
+from app.core.database import engine
+
+
+async def run_migration():
+    """Führt die Migration aus"""
+    try:
+        async with engine.begin() as conn:
+            columns = await conn.run_sync(
+                lambda sync_conn: [c["name"] for c in inspect(sync_conn).get_columns("credit_events")]
+            )
+            if "idempotency_key" in columns:
+                print("Spalte idempotency_key existiert bereits")
+            else:
+                print("Füge Spalte idempotency_key hinzu...")
+                await conn.execute(text("ALTER TABLE credit_events ADD COLUMN idempotency_key VARCHAR(100)"))
+
+            print("Erstelle Unique-Index uq_credit_events_idempotency_key...")
+            await conn.execute(text("""
+                CREATE UNIQUE INDEX IF NOT EXISTS uq_credit_events_idempotency_key
+                ON credit_events (idempotency_key)
+            """))
+
+        print("Spalte und Index erstellt")
+        return True
+
+    except Exception as e:
+        print(f"Fehler bei der Migration: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    print("Starte Migration: Credit Event Idempotency Key")
+    print("=" * 60)
+
+    success = asyncio.run(run_migration())
+
+    print("=" * 60)
+    if success:
+        print("Migration erfolgreich!")
+        sys.exit(0)
+    else:
+        print("Migration fehlgeschlagen!")
+        sys.exit(1)
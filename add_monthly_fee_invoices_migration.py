@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Migration: Tabellen monthly_invoice_runs und monthly_fee_invoices
+Monatliche Sammelrechnungen der BuildWise-Gebühren mit Checkpoint je Lauf.
+Funktioniert für SQLite und PostgreSQL.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import engine
+from app.models.monthly_fee_invoice import MonthlyFeeInvoice, MonthlyInvoiceRun
+
+
+async def run_migration():
+    """Führt die Migration aus"""
+    try:
+        async with engine.begin() as conn:
+            # Reihenfolge wegen Fremdschlüssel monthly_fee_invoices.run_id
+            for table in (MonthlyInvoiceRun.__table__, MonthlyFeeInvoice.__table__):
+                print(f"Erstelle Tabelle {table.name}...")
+                await conn.run_sync(
+                    lambda sync_conn, table=table: table.create(sync_conn, checkfirst=True)
+                )
+
+        print("Tabellen monthly_invoice_runs und monthly_fee_invoices erstellt")
+        return True
+
+    except Exception as e:
+        print(f"Fehler bei der Migration: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    print("Starte Migration: Monatliche Sammelrechnungen")
+    print("=" * 60)
+
+    success = asyncio.run(run_migration())
+
+    print("=" * 60)
+    if success:
+        print("Migration erfolgreich!")
+        sys.exit(0)
+    else:
+        print("Migration fehlgeschlagen!")
+        sys.exit(1)
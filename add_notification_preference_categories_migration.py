@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Migration: Normalisierte Kategorien für Benachrichtigungspräferenzen
+Erstellt die Tabelle notification_preference_categories und befüllt sie aus dem
+JSON-Feld notification_preferences.categories. Damit findet der Ausschreibungs-
+Fan-out passende Dienstleister mit einer indizierten Abfrage.
+Funktioniert für SQLite und PostgreSQL.
+"""
+import asyncio
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app.core.database import engine
+from app.models.notification_preference import NotificationPreferenceCategory
+
+
+async def run_migration():
+    """Führt die Migration aus"""
+    try:
+        async with engine.begin() as conn:
+            print("Erstelle Tabelle notification_preference_categories...")
+            await conn.run_sync(
+                lambda sync_conn: NotificationPreferenceCategory.__table__.create(sync_conn, checkfirst=True)
+            )
+
+            print("Lese bestehende Präferenzen...")
+            result = await conn.execute(text("SELECT id, categories FROM notification_preferences"))
+            preferences = result.fetchall()
+
+            rows = []
+            for preference_id, categories_json in preferences:
+                try:
+                    categories = json.loads(categories_json) if categories_json else []
+                except (json.JSONDecodeError, TypeError):
+                    print(f"  [WARNUNG] Ungültige Kategorien bei Präferenz {preference_id} übersprungen")
+                    continue
+                for category in dict.fromkeys(c for c in categories if c):
+                    rows.append({"preference_id": preference_id, "category": category})
+
+            await conn.execute(text("DELETE FROM notification_preference_categories"))
+            if rows:
+                await conn.execute(
+                    text("""
+                        INSERT INTO notification_preference_categories (preference_id, category)
+                        VALUES (:preference_id, :category)
+                    """),
+                    rows
+                )
+
+        print(f"{len(preferences)} Präferenzen verarbeitet, {len(rows)} Kategorie-Zuordnungen angelegt")
+        return True
+
+    except Exception as e:
+        print(f"Fehler bei der Migration: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    print("Starte Migration: Notification Preference Categories")
+    print("=" * 60)
+
+    success = asyncio.run(run_migration())
+
+    print("=" * 60)
+    if success:
+        print("Migration erfolgreich!")
+        sys.exit(0)
+    else:
+        print("Migration fehlgeschlagen!")
+        sys.exit(1)
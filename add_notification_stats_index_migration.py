@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Migration: Composite-Index für Benachrichtigungsstatistiken
+Erstellt ix_notifications_recipient_status (recipient_id, is_read, is_acknowledged, priority),
+damit die Badge-Statistik mit einer einzigen indizierten Abfrage auskommt.
+Funktioniert für SQLite und PostgreSQL.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app.core.database import engine, IS_POSTGRESQL
+
+
+async def run_migration():
+    """Führt die Migration aus"""
+    try:
+        async with engine.begin() as conn:
+            print("Erstelle Index ix_notifications_recipient_status...")
+            await conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_notifications_recipient_status
+                ON notifications (recipient_id, is_read, is_acknowledged, priority)
+            """))
+
+            if IS_POSTGRESQL:
+                await conn.execute(text("ANALYZE notifications"))
+            else:
+                await conn.execute(text("ANALYZE"))
+
+        print("Index erstellt")
+        return True
+
+    except Exception as e:
+        print(f"Fehler bei der Migration: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    print("Starte Migration: Notification Stats Index")
+    print("=" * 60)
+
+    success = asyncio.run(run_migration())
+
+    print("=" * 60)
+    if success:
+        print("Migration erfolgreich!")
+        sys.exit(0)
+    else:
+        print("Migration fehlgeschlagen!")
+        sys.exit(1)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Migration: Tabelle project_finance_rollup
+Vorberechnete Finanzsummen je Projekt, Quelle, Bauphase, Kategorie und Monat;
+wird einmalig aus den bestehenden Ausgaben, Kostenpositionen, Rechnungen und
+BuildWise-Gebühren befüllt.
+Funktioniert für SQLite und PostgreSQL.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import engine
+from app.models.project_finance_rollup import ProjectFinanceRollup
+from app.services.finance_rollup_service import _rebuild_statements
+
+
+async def run_migration():
+    """Führt die Migration aus"""
+    try:
+        async with engine.begin() as conn:
+            print("Erstelle Tabelle project_finance_rollup...")
+            await conn.run_sync(
+                lambda sync_conn: ProjectFinanceRollup.__table__.create(sync_conn, checkfirst=True)
+            )
+
+            print("Berechne Rollup für alle Projekte...")
+            for statement in _rebuild_statements():
+                await conn.execute(statement)
+
+        print("Tabelle project_finance_rollup erstellt und befüllt")
+        return True
+
+    except Exception as e:
+        print(f"Fehler bei der Migration: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    print("Starte Migration: Finanz-Rollup je Projekt")
+    print("=" * 60)
+
+    success = asyncio.run(run_migration())
+
+    print("=" * 60)
+    if success:
+        print("Migration erfolgreich!")
+        sys.exit(0)
+    else:
+        print("Migration fehlgeschlagen!")
+        sys.exit(1)
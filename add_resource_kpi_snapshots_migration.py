@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Migration: Tabelle resource_kpi_snapshots
+Tägliche KPI-Momentaufnahmen je Dienstleister; die Aktivität vergangener Tage
+wird aus Ressourcen und Zuweisungen nachträglich befüllt, der Bestand nur für
+den Vortag (frühere Stände sind nicht rekonstruierbar).
+Funktioniert für SQLite und PostgreSQL.
+"""
+import asyncio
+import os
+import sys
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import func, select
+
+from app.core.database import engine, AsyncSessionLocal
+from app.models.resource import Resource, ResourceKPISnapshot
+from app.services.resource_kpi_service import materialize_snapshots
+
+
+async def run_migration():
+    """Führt die Migration aus"""
+    try:
+        async with engine.begin() as conn:
+            print("Erstelle Tabelle resource_kpi_snapshots...")
+            await conn.run_sync(
+                lambda sync_conn: ResourceKPISnapshot.__table__.create(sync_conn, checkfirst=True)
+            )
+
+        async with AsyncSessionLocal() as db:
+            first_created = (await db.execute(select(func.min(Resource.created_at)))).scalar()
+            yesterday = date.today() - timedelta(days=1)
+            if first_created is not None and first_created.date() <= yesterday:
+                print(f"Befülle Momentaufnahmen {first_created.date()} bis {yesterday}...")
+                rows = await materialize_snapshots(db, first_created.date(), yesterday, with_state=True)
+                await db.commit()
+                print(f"{rows} Momentaufnahmen geschrieben")
+
+        print("Tabelle resource_kpi_snapshots erstellt")
+        return True
+
+    except Exception as e:
+        print(f"Fehler bei der Migration: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    print("Starte Migration: Ressourcen-KPI-Momentaufnahmen")
+    print("=" * 60)
+
+    success = asyncio.run(run_migration())
+
+    print("=" * 60)
+    if success:
+        print("Migration erfolgreich!")
+        sys.exit(0)
+    else:
+        print("Migration fehlgeschlagen!")
+        sys.exit(1)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Migration: Zeit-Indizes für Aufbewahrungsfristen (Retention)
+Erstellt Indizes auf audit_logs.created_at, credit_events.created_at und
+document_access_log.accessed_at, damit der Retention-Lauf abgelaufene Zeilen
+ohne Full-Table-Scan findet.
+Funktioniert für SQLite und PostgreSQL.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app.core.database import engine, IS_POSTGRESQL
+
+INDEXES = [
+    ("ix_audit_logs_created_at", "audit_logs", "created_at"),
+    ("ix_credit_events_created_at", "credit_events", "created_at"),
+    ("ix_document_access_log_accessed_at", "document_access_log", "accessed_at"),
+]
+
+
+async def run_migration():
+    """Führt die Migration aus"""
+    try:
+        async with engine.begin() as conn:
+            for index_name, table, column in INDEXES:
+                print(f"Erstelle Index {index_name}...")
+                await conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({column})"
+                ))
+
+            if IS_POSTGRESQL:
+                for _, table, _ in INDEXES:
+                    await conn.execute(text(f"ANALYZE {table}"))
+            else:
+                await conn.execute(text("ANALYZE"))
+
+        print(f"{len(INDEXES)} Indizes erstellt")
+        return True
+
+    except Exception as e:
+        print(f"Fehler bei der Migration: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    print("Starte Migration: Retention Indexes")
+    print("=" * 60)
+
+    success = asyncio.run(run_migration())
+
+    print("=" * 60)
+    if success:
+        print("Migration erfolgreich!")
+        sys.exit(0)
+    else:
+        print("Migration fehlgeschlagen!")
+        sys.exit(1)
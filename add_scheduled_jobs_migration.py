@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Migration: Tabelle scheduled_jobs
+Legt die Zustandstabelle des Job-Schedulers an (letzter/nächster Lauf,
+Status und Laufzeit je Job).
+Funktioniert für SQLite und PostgreSQL.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import engine
+from app.models.scheduled_job import ScheduledJob
+
+
+async def run_migration():
+    """Führt die Migration aus"""
+    try:
+        async with engine.begin() as conn:
+            print("Erstelle Tabelle scheduled_jobs...")
+            await conn.run_sync(
+                lambda sync_conn: ScheduledJob.__table__.create(sync_conn, checkfirst=True)
+            )
+
+        print("Tabelle scheduled_jobs erstellt")
+        return True
+
+    except Exception as e:
+        print(f"Fehler bei der Migration: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    print("Starte Migration: Scheduled Jobs")
+    print("=" * 60)
+
+    success = asyncio.run(run_migration())
+
+    print("=" * 60)
+    if success:
+        print("Migration erfolgreich!")
+        sys.exit(0)
+    else:
+        print("Migration fehlgeschlagen!")
+        sys.exit(1)
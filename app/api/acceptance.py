@@ -644,22 +644,9 @@ async def complete_final_acceptance(
                     milestone.completion_status = 'completed'
                     print(f"[SUCCESS] Milestone {milestone_id} Status auf 'completed' gesetzt (finale Abnahme durch Bauträger)")
                     
-                    # Sende Benachrichtigung an den Dienstleister über die finale Abnahme
-                    try:
-                        from ..services.notification_service import NotificationService
-                        await NotificationService.create_milestone_completed_notification(db, milestone_id)
-                    except Exception as e:
-                        print(f"[WARNING] Fehler beim Erstellen der Abnahme-Benachrichtigung: {e}")
-                        # Fehler bei Benachrichtigung sollte nicht die Abnahme blockieren
-                    
-                    # Inkrementiere completed_offers_count für alle betroffenen Dienstleister
-                    try:
-                        from ..services.milestone_completion_service import MilestoneCompletionService
-                        await MilestoneCompletionService.increment_completed_offers_count(db, milestone_id)
-                        print(f"[SUCCESS] completed_offers_count für betroffene Dienstleister von Milestone {milestone_id} inkrementiert")
-                    except Exception as e:
-                        print(f"[WARNING] Fehler beim Inkrementieren der completed_offers_count: {e}")
-                        # Fehler nicht kritisch, da Hauptfunktion (Abnahme) bereits erfolgreich
+                    # Benachrichtigung und completed_offers_count folgen über das MilestoneCompleted-Event
+                    from ..services.domain_events import record_milestone_completed
+                    record_milestone_completed(db, milestone)
         
         # Erstelle ServiceProviderRating - nur für Bauträger
         if acceptance.service_provider_id and milestone and is_bautraeger:
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Request, Response, UploadFile, File
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
@@ -13,11 +13,13 @@ logger = logging.getLogger(__name__)
 
 from ..core.database import get_db
 from ..core.security import create_access_token
+from ..core.rate_limiter import RateLimit
 from ..api.deps import get_current_user
 from ..schemas.user import UserCreate, UserRead, UserLogin, PasswordReset, PasswordChange
 from ..services.user_service import authenticate_user, create_user, get_user_by_email, change_password
 from ..services.security_service import SecurityService
 from ..services.oauth_service import OAuthService
+from ..services.credit_service import CreditService
 from ..models.audit_log import AuditAction
 from ..models.user import AuthProvider, UserRole, User
 
@@ -30,7 +32,10 @@ class OAuthCallbackRequest(BaseModel):
     error: str | None = None
 
 
-@router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/register", response_model=UserRead, status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(RateLimit(5, 60, scope="ip"))]
+)
 async def register(
     user_in: UserCreate, 
     db: AsyncSession = Depends(get_db),
@@ -66,8 +71,9 @@ async def register(
         )
 
 
-@router.post("/login")
+@router.post("/login", dependencies=[Depends(RateLimit(10, 60, scope="ip"))])
 async def login(
+    background_tasks: BackgroundTasks,
     form_data: OAuth2PasswordRequestForm = Depends(), 
     db: AsyncSession = Depends(get_db),
     request: Request = None
@@ -97,6 +103,10 @@ async def login(
         )
     
     token = create_access_token({"sub": user.email})
+    
+    # Täglicher Credit-Abzug für Bauträger läuft nach der Antwort
+    CreditService.schedule_daily_login_deduction(background_tasks, user)
+    
     return {
         "access_token": token, 
         "token_type": "bearer",
@@ -162,7 +172,7 @@ async def oauth_callback_options(provider: str):
     response.headers["Access-Control-Max-Age"] = "86400"
     return response
 
-@router.post("/oauth/{provider}/callback")
+@router.post("/oauth/{provider}/callback", dependencies=[Depends(RateLimit(10, 60, scope="ip"))])
 async def oauth_callback(
     provider: str,
     body: OAuthCallbackRequest,
@@ -384,7 +394,7 @@ async def link_social_account(
         )
 
 
-@router.post("/password-reset")
+@router.post("/password-reset", dependencies=[Depends(RateLimit(5, 900, scope="ip"))])
 async def request_password_reset(
     password_reset: PasswordReset, 
     db: AsyncSession = Depends(get_db),
@@ -410,7 +420,7 @@ async def request_password_reset(
     return {"message": "Wenn die E-Mail-Adresse existiert, wurde eine Reset-E-Mail gesendet"}
 
 
-@router.post("/password-change")
+@router.post("/password-change", dependencies=[Depends(RateLimit(5, 900, scope="user"))])
 async def change_user_password(
     password_change: PasswordChange,
     current_user = Depends(get_current_user),
@@ -0,0 +1,64 @@
+"""
+Admin-Endpunkte für Hintergrund-Aufträge, Scheduler und Outbox
+Queue-Tiefe, Latenzen und Status einzelner Aufträge (nur für Admins)
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from ..api.deps import get_current_user
+from ..core.background_tasks import background_task_manager
+from ..core.outbox import outbox_dispatcher
+from ..core.scheduler import job_scheduler
+from ..models.user import User, UserRole
+
+router = APIRouter(prefix="/admin/background-jobs", tags=["admin"])
+
+
+def _require_admin(current_user: User = Depends(get_current_user)) -> User:
+    if current_user.user_role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Nur Administratoren haben Zugriff"
+        )
+    return current_user
+
+
+@router.get("/stats")
+async def get_background_job_stats(current_user: User = Depends(_require_admin)):
+    """Queue-Tiefe, Auftragszahlen je Status und Latenzen dieses Workers"""
+    return await background_task_manager.get_stats()
+
+
+@router.get("/scheduler")
+async def get_scheduler_status(current_user: User = Depends(_require_admin)):
+    """Zustand der periodischen Scheduler-Jobs"""
+    return {
+        "worker": job_scheduler.worker_id,
+        "is_leader": job_scheduler.is_leader,
+        "jobs": await job_scheduler.get_status()
+    }
+
+
+@router.get("/outbox")
+async def get_outbox_stats(current_user: User = Depends(_require_admin)):
+    """Domain-Events je Status und Alter des ältesten offenen Events"""
+    return await outbox_dispatcher.get_stats()
+
+
+@router.get("/{task_id}")
+async def get_background_job(task_id: str, current_user: User = Depends(_require_admin)):
+    """Status und Ergebnis eines Auftrags"""
+    job = await background_task_manager.get_task_status(task_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Auftrag nicht gefunden")
+    return job
+
+
+@router.post("/{task_id}/cancel")
+async def cancel_background_job(task_id: str, current_user: User = Depends(_require_admin)):
+    """Bricht einen wartenden oder laufenden Auftrag ab"""
+    if not await background_task_manager.cancel_task(task_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Auftrag nicht gefunden oder bereits abgeschlossen"
+        )
+    return {"task_id": task_id, "status": "cancelled"}
@@ -472,6 +472,54 @@ async def get_monthly_fees(
     )
     return fees
 
+@router.post("/monthly/{month}/{year}/invoices")
+async def create_monthly_invoices(
+    month: int,
+    year: int,
+    retry_failed: bool = Query(False, description="Dienstleister ohne Rechnung eines abgeschlossenen Laufs erneut verarbeiten"),
+    current_user = Depends(get_current_user)
+):
+    """
+    Startet (oder setzt fort) den Lauf der monatlichen Sammelrechnungen als Hintergrund-Auftrag (nur Admins)
+    """
+    from uuid import uuid4
+    from app.core.background_tasks import background_task_manager
+    from app.models.user import UserRole
+    from app.services.monthly_invoice_service import MonthlyInvoiceService
+    
+    if current_user.user_role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Nur Administratoren können Monatsrechnungen erstellen")
+    if not 1 <= month <= 12:
+        raise HTTPException(status_code=400, detail="Ungültiger Monat")
+    
+    task_id = await background_task_manager.enqueue(
+        MonthlyInvoiceService.create_monthly_invoices,
+        (month, year),
+        {"retry_failed": retry_failed},
+        task_id=f"monthly_invoices:{year}-{month:02d}:{uuid4().hex[:8]}",
+        timeout_seconds=3600
+    )
+    return {"task_id": task_id, "run": await MonthlyInvoiceService.get_run(month, year)}
+
+@router.get("/monthly/{month}/{year}/invoices/run")
+async def get_monthly_invoice_run(
+    month: int,
+    year: int,
+    current_user = Depends(get_current_user)
+):
+    """
+    Fortschritt, Batch-Zeiten und Fehler des Monatslaufs (nur Admins)
+    """
+    from app.models.user import UserRole
+    from app.services.monthly_invoice_service import MonthlyInvoiceService
+    
+    if current_user.user_role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Nur Administratoren haben Zugriff")
+    run = await MonthlyInvoiceService.get_run(month, year)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Kein Lauf für diesen Monat")
+    return run
+
 @router.delete("/{fee_id}")
 async def delete_buildwise_fee(
     fee_id: int,
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import logging
@@ -414,43 +414,22 @@ async def reset_credit_config(
 
 @router.post("/daily-login-deduction")
 async def process_daily_login_deduction(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user)
 ):
-    """Verarbeitet täglichen Credit-Abzug beim Login (nur einmal pro Tag)"""
+    """
+    Vermerkt den täglichen Credit-Abzug beim Login (nur einmal pro Tag)
     
-    try:
-        logger.info(f"Verarbeitung des täglichen Login-Credit-Abzugs für User {current_user.id}")
-        
-        # Prüfe ob User Bauträger ist
-        if current_user.user_role != UserRole.BAUTRAEGER:
-            logger.info(f"User {current_user.id} ist kein Bauträger, kein Credit-Abzug nötig")
-            return CreditSystemStatus(
-                status="skipped",
-                message="Nur Bauträger haben tägliche Credit-Abzüge"
-            )
-        
-        # Verarbeite täglichen Credit-Abzug
-        success = await CreditService.process_daily_credit_deduction(db, current_user.id)
-        
-        if success:
-            logger.info(f"Täglicher Credit-Abzug erfolgreich verarbeitet für User {current_user.id}")
-            return CreditSystemStatus(
-                status="success",
-                message="Täglicher Credit-Abzug verarbeitet"
-            )
-        else:
-            logger.info(f"Kein Credit-Abzug nötig für User {current_user.id}")
-            return CreditSystemStatus(
-                status="skipped",
-                message="Kein Credit-Abzug nötig (nicht im Pro-Status oder bereits heute abgezogen)"
-            )
-            
-    except Exception as e:
-        logger.error(f"Fehler bei täglichem Login-Credit-Abzug für User {current_user.id}: {e}")
-        import traceback
-        logger.error(f"Traceback: {traceback.format_exc()}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Fehler bei täglichem Credit-Abzug: {str(e)}"
-        ) 
\ No newline at end of file
+    Der Abzug selbst läuft nach der Antwort und ist pro User und Tag idempotent.
+    """
+    if current_user.user_role != UserRole.BAUTRAEGER:
+        return {
+            "status": "skipped",
+            "message": "Nur Bauträger haben tägliche Credit-Abzüge"
+        }
+    
+    CreditService.schedule_daily_login_deduction(background_tasks, current_user)
+    return {
+        "status": "scheduled",
+        "message": "Täglicher Credit-Abzug wird verarbeitet"
+    } 
\ No newline at end of file
@@ -7,7 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from ..core.database import get_db
 from ..core.security import decode_access_token, oauth2_scheme_name
 from ..models import User
-from ..services.user_service import get_user_by_email
+from ..services.identity_cache import get_cached_user_by_email
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -33,8 +33,8 @@ async def get_current_user(
     # User-Email aus Token holen
     email: str = payload["sub"]
     
-    # User aus Datenbank laden
-    user = await get_user_by_email(db, email=email)
+    # User aus Identitäts-Cache bzw. Datenbank laden
+    user = await get_cached_user_by_email(db, email=email)
     if not user:
         raise credentials_exception
     
@@ -57,8 +57,8 @@ async def get_current_user_optional(
         # User-Email aus Token holen
         email: str = payload["sub"]
         
-        # User aus Datenbank laden
-        user = await get_user_by_email(db, email=email)
+        # User aus Identitäts-Cache bzw. Datenbank laden
+        user = await get_cached_user_by_email(db, email=email)
         return user
     except Exception:
         return None
@@ -9,6 +9,7 @@ from ..api.deps import get_current_user
 from ..models.user import User
 from ..models.audit_log import AuditAction
 from ..services.gdpr_service import GDPRService
+from ..services.retention_service import RetentionService
 from ..services.security_service import SecurityService
 from ..schemas.user import UserRead
 
@@ -405,4 +406,19 @@ async def get_data_processing_register():
         ]
     }
     
-    return register 
\ No newline at end of file
+    return register
+
+
+@router.get("/retention-metrics")
+async def get_retention_metrics(
+    current_user: User = Depends(get_current_user)
+):
+    """Aufbewahrungsfristen und gelöschte/archivierte Zeilen pro Tabelle (nur für Administratoren)"""
+    
+    if current_user.user_type not in ["admin", "superuser"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Keine Berechtigung"
+        )
+    
+    return RetentionService.get_metrics()
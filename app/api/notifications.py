@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
-from ..core.database import get_db
+from ..core.database import get_db, AsyncSessionLocal
+from ..core.security import decode_access_token
 from ..api.deps import get_current_user
 from ..models.user import User
 from ..models.notification import Notification
@@ -11,6 +13,8 @@ from ..schemas.notification import (
     NotificationStats, NotificationBulkAction
 )
 from ..services.notification_service import NotificationService
+from ..services.notification_stream_service import NotificationStreamService
+from ..services.user_service import get_user_by_email
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
@@ -34,6 +38,48 @@ async def get_notifications(
     )
     return notifications
 
+@router.get("/stream")
+async def stream_notifications(
+    request: Request,
+    token: Optional[str] = Query(None, description="JWT Token (EventSource kann keine Header setzen)"),
+    last_event_id: Optional[int] = Query(None, ge=0, description="Fortsetzen ab dieser Benachrichtigungs-ID")
+):
+    """
+    Server-Sent-Events-Stream mit neuen Benachrichtigungen des aktuellen Benutzers
+
+    Ersetzt das Polling von /notifications und /notifications/stats.
+    Bei Reconnects sendet der Browser automatisch den Last-Event-ID Header.
+    """
+    if not token:
+        auth_header = request.headers.get("authorization", "")
+        if auth_header.lower().startswith("bearer "):
+            token = auth_header[7:]
+
+    payload = decode_access_token(token) if token else None
+    if not payload or "sub" not in payload:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+
+    # Kurzlebige Session: der Stream soll keine DB-Verbindung dauerhaft belegen
+    async with AsyncSessionLocal() as db:
+        user = await get_user_by_email(db, email=payload["sub"])
+    if not user:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+
+    header_event_id = request.headers.get("last-event-id")
+    if header_event_id and header_event_id.isdigit():
+        last_event_id = int(header_event_id)
+
+    return StreamingResponse(
+        NotificationStreamService.stream(user.id, last_event_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",  # Kein Buffering durch Reverse-Proxies
+            "Content-Encoding": "identity"  # Verhindert Buffering durch GZipMiddleware
+        }
+    )
+
 @router.get("/stats", response_model=NotificationStats)
 async def get_notification_stats(
     current_user: User = Depends(get_current_user),
@@ -362,7 +362,7 @@ async def accept_quote_endpoint(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Akzeptiert ein Angebot und erstellt automatisch eine Kostenposition"""
+    """Akzeptiert ein Angebot; die Kostenposition wird im Hintergrund erstellt"""
     quote = await get_quote_by_id(db, quote_id)
     if not quote:
         raise HTTPException(
@@ -377,31 +377,10 @@ async def accept_quote_endpoint(
             detail="Nur Projekt-Owner, Admin oder Superuser dürfen Angebote annehmen."
         )
     
-    # Akzeptiere das Angebot
+    # Akzeptiere das Angebot (Kostenposition, Gebühr, Credits, Benachrichtigung und
+    # Kommunikationszugriff folgen über das QuoteAccepted-Event)
     accepted_quote = await accept_quote(db, quote_id)
     
-    # Kostenposition erzeugen, falls nicht vorhanden
-    try:
-        # Verwende die robuste Service-Funktion direkt
-        from ..services.quote_service import create_cost_position_from_quote
-        success = await create_cost_position_from_quote(db, quote)
-        if not success:
-            print(f"[WARNING] Warnung: Kostenposition für Angebot {quote.id} konnte nicht erstellt werden")
-    except Exception as e:
-        print(f"[WARNING] Fehler beim Erstellen der Kostenposition: {e}")
-    
-    # Aktualisiere Kommunikationszugriff nach Angebotsannahme
-    try:
-        from ..services.milestone_progress_service import milestone_progress_service
-        await milestone_progress_service.update_communication_access_after_award(
-            db=db,
-            milestone_id=quote.milestone_id,
-            accepted_service_provider_id=quote.service_provider_id
-        )
-        print(f"[SUCCESS] Kommunikationszugriff für Milestone {quote.milestone_id} aktualisiert")
-    except Exception as e:
-        print(f"[WARNING] Fehler beim Aktualisieren des Kommunikationszugriffs: {e}")
-    
     return accepted_quote
 
 
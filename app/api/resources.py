@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func
+from sqlalchemy import select, and_, or_
 from sqlalchemy.orm import selectinload
 from typing import List, Optional
 from datetime import datetime, date, timedelta
@@ -14,6 +14,7 @@ from ..models import (
     ResourceCalendarEntry, CalendarEntryStatus, ResourceKPIs,
     Milestone, Quote, QuoteStatus, ServiceProviderRatingAggregate
 )
+from ..services.resource_kpi_service import ResourceKPIService
 from pydantic import BaseModel, Field, field_validator
 from decimal import Decimal
 
@@ -882,67 +883,8 @@ async def get_resource_kpis(
     if not period_end:
         period_end = datetime.now()
     
-    # Berechne KPIs
-    resource_query = select(Resource).where(
-        and_(
-            Resource.service_provider_id == target_provider_id,
-            Resource.created_at >= period_start,
-            Resource.created_at <= period_end
-        )
-    )
-    
-    resource_result = await db.execute(resource_query)
-    resources = resource_result.scalars().all()
-    
-    total_resources_available = len([r for r in resources if r.status == ResourceStatus.AVAILABLE])
-    total_resources_allocated = len([r for r in resources if r.status == ResourceStatus.ALLOCATED])
-    total_resources_completed = len([r for r in resources if r.status == ResourceStatus.COMPLETED])
-    
-    total_person_days_available = sum(
-        ((r.end_date - r.start_date).days + 1) * r.person_count 
-        for r in resources if r.status == ResourceStatus.AVAILABLE
-    )
-    
-    total_person_days_allocated = sum(
-        ((r.end_date - r.start_date).days + 1) * r.person_count 
-        for r in resources if r.status == ResourceStatus.ALLOCATED
-    )
-    
-    total_person_days_completed = sum(
-        ((r.end_date - r.start_date).days + 1) * r.person_count 
-        for r in resources if r.status == ResourceStatus.COMPLETED
-    )
-    
-    utilization_rate = (
-        (total_person_days_allocated + total_person_days_completed) / 
-        max(total_person_days_available + total_person_days_allocated + total_person_days_completed, 1)
-    ) * 100 if (total_person_days_available + total_person_days_allocated + total_person_days_completed) > 0 else 0
-    
-    # Durchschnittlicher Stundensatz
-    hourly_rates = [r.hourly_rate for r in resources if r.hourly_rate]
-    average_hourly_rate = sum(hourly_rates) / len(hourly_rates) if hourly_rates else None
-    
-    # Geschätzter Umsatz (vereinfacht)
-    total_revenue = sum(
-        (r.hourly_rate or 0) * (r.total_hours or 0) 
-        for r in resources if r.status in [ResourceStatus.ALLOCATED, ResourceStatus.COMPLETED] and r.hourly_rate
-    )
-    
-    return ResourceKPIsResponse(
-        service_provider_id=target_provider_id,
-        calculation_date=datetime.now(),
-        total_resources_available=total_resources_available,
-        total_resources_allocated=total_resources_allocated,
-        total_resources_completed=total_resources_completed,
-        total_person_days_available=total_person_days_available,
-        total_person_days_allocated=total_person_days_allocated,
-        total_person_days_completed=total_person_days_completed,
-        utilization_rate=utilization_rate,
-        average_hourly_rate=average_hourly_rate,
-        total_revenue=total_revenue,
-        period_start=period_start,
-        period_end=period_end
-    )
+    kpis = await ResourceKPIService.get_kpis(db, target_provider_id, period_start, period_end)
+    return ResourceKPIsResponse(**kpis)
 
 
 @router.get("/statistics", response_model=dict)
@@ -961,42 +903,7 @@ async def get_resource_statistics(
             detail="Keine Berechtigung für diese Statistiken"
         )
     
-    # Basis-Statistiken
-    total_resources_query = select(func.count(Resource.id)).where(
-        Resource.service_provider_id == target_provider_id
-    )
-    total_resources_result = await db.execute(total_resources_query)
-    total_resources = total_resources_result.scalar()
-    
-    # Nach Status gruppiert
-    status_stats = {}
-    for status in ResourceStatus:
-        status_query = select(func.count(Resource.id)).where(
-            and_(
-                Resource.service_provider_id == target_provider_id,
-                Resource.status == status
-            )
-        )
-        status_result = await db.execute(status_query)
-        status_stats[status.value] = status_result.scalar()
-    
-    # Nach Kategorie gruppiert
-    category_query = select(
-        Resource.category, 
-        func.count(Resource.id).label('count')
-    ).where(
-        Resource.service_provider_id == target_provider_id
-    ).group_by(Resource.category)
-    
-    category_result = await db.execute(category_query)
-    category_stats = {row.category: row.count for row in category_result.all()}
-    
-    return {
-        "total_resources": total_resources,
-        "by_status": status_stats,
-        "by_category": category_stats,
-        "provider_id": target_provider_id
-    }
+    return await ResourceKPIService.get_statistics(db, target_provider_id)
 
 
 @router.get("/kpis/detailed", response_model=dict)
@@ -1023,137 +930,28 @@ async def get_detailed_resource_kpis(
     if not period_end:
         period_end = datetime.now()
     
-    # Hole alle Ressourcen des Service Providers
-    resources_query = select(Resource).where(
-        Resource.service_provider_id == target_provider_id
-    )
-    resources_result = await db.execute(resources_query)
-    resources = resources_result.scalars().all()
-    
-    # Hole alle Allokationen für diese Ressourcen
-    resource_ids = [r.id for r in resources]
-    allocations_query = select(ResourceAllocation).where(
-        ResourceAllocation.resource_id.in_(resource_ids)
-    )
-    allocations_result = await db.execute(allocations_query)
-    allocations = allocations_result.scalars().all()
-    
-    # Basis-KPIs berechnen
-    total_resources = len(resources)
-    available_resources = len([r for r in resources if r.status == ResourceStatus.AVAILABLE])
-    allocated_resources = len([r for r in resources if r.status == ResourceStatus.ALLOCATED])
-    completed_resources = len([r for r in resources if r.status == ResourceStatus.COMPLETED])
-    
-    # Personentage berechnen
-    total_person_days = sum(
-        ((r.end_date - r.start_date).days + 1) * r.person_count 
-        for r in resources if r.start_date and r.end_date
-    )
-    
-    allocated_person_days = sum(
-        ((r.end_date - r.start_date).days + 1) * r.person_count 
-        for r in resources if r.status in [ResourceStatus.ALLOCATED, ResourceStatus.COMPLETED] and r.start_date and r.end_date
-    )
-    
-    # Auslastungsgrad
-    utilization_rate = (allocated_person_days / total_person_days * 100) if total_person_days > 0 else 0
-    
-    # Durchschnittlicher Stundensatz
-    hourly_rates = [r.hourly_rate for r in resources if r.hourly_rate]
-    average_hourly_rate = sum(hourly_rates) / len(hourly_rates) if hourly_rates else 0
-    
-    # Geschätzter Umsatz
-    total_revenue = sum(
-        (r.hourly_rate or 0) * (r.total_hours or 0) 
-        for r in resources if r.status in [ResourceStatus.ALLOCATED, ResourceStatus.COMPLETED] and r.hourly_rate
-    )
-    
-    # Angebotsquote berechnen
-    total_allocations = len(allocations)
-    submitted_offers = len([a for a in allocations if a.allocation_status == AllocationStatus.OFFER_SUBMITTED])
-    offer_rate = (submitted_offers / total_allocations * 100) if total_allocations > 0 else 0
-    
-    # Durchschnittliche Antwortzeit (in Stunden)
-    response_times = []
-    for allocation in allocations:
-        if allocation.invitation_sent_at and allocation.offer_submitted_at:
-            response_time = (allocation.offer_submitted_at - allocation.invitation_sent_at).total_seconds() / 3600
-            response_times.append(response_time)
+    return await ResourceKPIService.get_detailed_kpis(db, target_provider_id, period_start, period_end)
+
+
+@router.get("/kpis/history", response_model=list)
+async def get_resource_kpi_history(
+    service_provider_id: Optional[int] = None,
+    days: int = Query(90, ge=1, le=730),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Hole tägliche KPI-Momentaufnahmen (Verlauf, aus resource_kpi_snapshots)"""
     
-    average_response_time = sum(response_times) / len(response_times) if response_times else 0
+    target_provider_id = service_provider_id or current_user.id
     
-    # Kategorie-Performance
-    category_performance = {}
-    for resource in resources:
-        category = resource.category
-        if category not in category_performance:
-            category_performance[category] = {
-                'total': 0,
-                'allocated': 0,
-                'revenue': 0,
-                'person_days': 0
-            }
-        
-        category_performance[category]['total'] += 1
-        if resource.status in [ResourceStatus.ALLOCATED, ResourceStatus.COMPLETED]:
-            category_performance[category]['allocated'] += 1
-            category_performance[category]['revenue'] += (resource.hourly_rate or 0) * (resource.total_hours or 0)
-        
-        if resource.start_date and resource.end_date:
-            days = (resource.end_date - resource.start_date).days + 1
-            category_performance[category]['person_days'] += days * resource.person_count
+    if target_provider_id != current_user.id and current_user.user_role != "ADMIN":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Keine Berechtigung für diese KPIs"
+        )
     
-    # Geografische Verteilung
-    geographic_distribution = {}
-    for resource in resources:
-        city = resource.address_city or 'Unbekannt'
-        if city not in geographic_distribution:
-            geographic_distribution[city] = 0
-        geographic_distribution[city] += 1
-    
-    # Zeitliche Entwicklung (letzte 6 Monate)
-    monthly_stats = {}
-    current_date = period_start
-    while current_date <= period_end:
-        month_key = current_date.strftime('%Y-%m')
-        monthly_resources = [r for r in resources if r.created_at.strftime('%Y-%m') == month_key]
-        monthly_allocations = [a for a in allocations if a.created_at.strftime('%Y-%m') == month_key]
-        
-        monthly_stats[month_key] = {
-            'resources_created': len(monthly_resources),
-            'allocations_created': len(monthly_allocations),
-            'revenue': sum((r.hourly_rate or 0) * (r.total_hours or 0) for r in monthly_resources if r.status in [ResourceStatus.ALLOCATED, ResourceStatus.COMPLETED])
-        }
-        
-        # Nächster Monat
-        if current_date.month == 12:
-            current_date = current_date.replace(year=current_date.year + 1, month=1)
-        else:
-            current_date = current_date.replace(month=current_date.month + 1)
-    
-    return {
-        "overview": {
-            "total_resources": total_resources,
-            "available_resources": available_resources,
-            "allocated_resources": allocated_resources,
-            "completed_resources": completed_resources,
-            "total_person_days": total_person_days,
-            "allocated_person_days": allocated_person_days,
-            "utilization_rate": round(utilization_rate, 2),
-            "average_hourly_rate": round(average_hourly_rate, 2),
-            "total_revenue": round(total_revenue, 2),
-            "offer_rate": round(offer_rate, 2),
-            "average_response_time": round(average_response_time, 2)
-        },
-        "category_performance": category_performance,
-        "geographic_distribution": geographic_distribution,
-        "monthly_trends": monthly_stats,
-        "period": {
-            "start": period_start.isoformat(),
-            "end": period_end.isoformat()
-        },
-        "provider_id": target_provider_id
-    }
+    end = date.today()
+    return await ResourceKPIService.get_history(db, target_provider_id, end - timedelta(days=days), end)
 
 
 # ============================================
@@ -1,11 +1,49 @@
+"""
+Persistent background job runner.
+
+- Jobs are rows in `background_jobs`; the function is stored by import path and
+  its arguments as JSON, so queued work survives restarts and any worker can
+  pick it up (claims are atomic, FOR UPDATE SKIP LOCKED on PostgreSQL).
+- Dispatch is bounded by a semaphore: a slot is taken before a job is claimed,
+  and an idle dispatcher sleeps until a submit (local or via the broker from
+  another worker) or the poll interval wakes it - no re-queueing or spinning.
+- Lanes: "async" (coroutine functions, on the event loop), "thread" (blocking
+  sync functions) and "process" (CPU-heavy sync functions, ProcessPoolExecutor).
+- Failed jobs are retried with exponential backoff; finished jobs are evicted
+  after the result TTL; jobs of a dead worker are re-queued.
+"""
+
 import asyncio
+import functools
+import importlib
+import json
+import logging
+import os
+import random
+import socket
 import time
-from typing import Any, Callable, Dict, Optional
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from enum import Enum
-import structlog
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from .config import settings
+from . import database
+from .pubsub import broker
+from ..models.background_job import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+# Broker channel used to wake idle dispatchers on other workers
+JOBS_CHANNEL = "jobs:submitted"
+
+LANES = ("async", "thread", "process")
 
-logger = structlog.get_logger()
 
 class TaskStatus(Enum):
     PENDING = "pending"
@@ -14,232 +52,508 @@ class TaskStatus(Enum):
     FAILED = "failed"
     CANCELLED = "cancelled"
 
-class BackgroundTask:
-    """Represents a background task."""
-    
-    def __init__(self, task_id: str, func: Callable, args: tuple = (), kwargs: dict = None):
-        self.task_id = task_id
-        self.func = func
-        self.args = args or ()
-        self.kwargs = kwargs or {}
-        self.status = TaskStatus.PENDING
-        self.created_at = datetime.utcnow()
-        self.started_at: Optional[datetime] = None
-        self.completed_at: Optional[datetime] = None
-        self.result: Any = None
-        self.error: Optional[str] = None
-        self.progress: float = 0.0
-        self.task: Optional[asyncio.Task] = None
+
+_FINISHED = (TaskStatus.COMPLETED.value, TaskStatus.FAILED.value, TaskStatus.CANCELLED.value)
+
+
+def _func_path(func: Callable) -> str:
+    """Import path of a module-level function ("module:qualname")."""
+    original = getattr(func, "_background_func", func)
+    qualname = getattr(original, "__qualname__", "")
+    if not qualname or "<" in qualname:
+        raise ValueError(f"Background jobs need a module-level function, got {original!r}")
+    return f"{original.__module__}:{qualname}"
+
+
+def _resolve(path: str) -> Callable:
+    module_name, _, qualname = path.partition(":")
+    target: Any = importlib.import_module(module_name)
+    for part in qualname.split("."):
+        target = getattr(target, part)
+    # Functions decorated with @background_task are stored under their own name
+    return getattr(target, "_background_func", target)
+
+
+def _call_by_path(path: str, args: tuple, kwargs: dict) -> Any:
+    """Entry point in the process pool (resolves the function in the child)."""
+    return _resolve(path)(*args, **kwargs)
+
+
+def _percentile(values, p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))], 3)
+
 
 class BackgroundTaskManager:
-    """Manages background tasks for the application."""
-    
-    def __init__(self, max_concurrent_tasks: int = 10):
+    """Dispatches persisted background jobs with bounded concurrency."""
+
+    def __init__(self, max_concurrent_tasks: int = 10, thread_workers: int = 4, process_workers: int = 2,
+                 poll_interval: float = 2.0):
         self.max_concurrent_tasks = max_concurrent_tasks
-        self.tasks: Dict[str, BackgroundTask] = {}
-        self.running_tasks: set = set()
-        self.task_queue: asyncio.Queue = asyncio.Queue()
-        self.worker_task: Optional[asyncio.Task] = None
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
         self.running = False
-    
+        self.running_tasks: Dict[str, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._maintenance: Optional[asyncio.Task] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._cancelled: set = set()
+        # Recent timings of this worker (seconds)
+        self._queue_latency = deque(maxlen=1000)
+        self._run_time = deque(maxlen=1000)
+        self.stats = {"completed": 0, "failed": 0, "retried": 0, "requeued": 0}
+
     async def start(self):
-        """Start the background task manager."""
-        if not self.running:
-            self.running = True
-            self.worker_task = asyncio.create_task(self._worker_loop())
-            logger.info("Background task manager started", max_concurrent_tasks=self.max_concurrent_tasks)
-    
-    async def stop(self):
-        """Stop the background task manager."""
+        """Start the dispatcher."""
         if self.running:
-            self.running = False
-            
-            # Cancel all running tasks
-            for task_id in list(self.running_tasks):
-                await self.cancel_task(task_id)
-            
-            # Cancel worker task
-            if self.worker_task:
-                self.worker_task.cancel()
-                try:
-                    await self.worker_task
-                except asyncio.CancelledError:
-                    pass
-            
-            logger.info("Background task manager stopped")
-    
+            return
+        self.running = True
+        self._semaphore = asyncio.Semaphore(self.max_concurrent_tasks)
+        self._wakeup = asyncio.Event()
+        self._thread_pool = ThreadPoolExecutor(self.thread_workers, thread_name_prefix="jobs")
+        await self._requeue_stale_jobs()
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+        self._maintenance = asyncio.create_task(self._maintenance_loop())
+        self._listener = asyncio.create_task(self._listen_for_submits())
+        logger.info(f"Background task manager started (max {self.max_concurrent_tasks} concurrent jobs)")
+
+    async def stop(self, timeout: float = 5.0):
+        """Stop dispatching; running jobs get `timeout` seconds, then return to the queue."""
+        if not self.running:
+            return
+        self.running = False
+        for task in (self._dispatcher, self._maintenance, self._listener):
+            if task:
+                task.cancel()
+
+        if self.running_tasks:
+            _, pending = await asyncio.wait(list(self.running_tasks.values()), timeout=timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending, timeout=1.0)
+
+        if self._thread_pool:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+        if self._process_pool:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+        self._thread_pool = self._process_pool = None
+        logger.info("Background task manager stopped")
+
+    async def enqueue(self, func: Callable, args: tuple = (), kwargs: Optional[dict] = None, *,
+                      task_id: Optional[str] = None, lane: Optional[str] = None,
+                      max_attempts: Optional[int] = None, timeout_seconds: Optional[float] = None,
+                      delay_seconds: float = 0) -> str:
+        """
+        Persist a job and wake a dispatcher.
+
+        Arguments must be JSON-serializable. The lane defaults to "async" for
+        coroutine functions and "thread" otherwise; use "process" for CPU-bound work.
+        """
+        original = getattr(func, "_background_func", func)
+        options = getattr(func, "_background_options", {})
+        lane = lane or options.get("lane") or ("async" if asyncio.iscoroutinefunction(original) else "thread")
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane: {lane}")
+        if lane == "async" and not asyncio.iscoroutinefunction(original):
+            raise ValueError("The async lane needs a coroutine function")
+        if lane != "async" and asyncio.iscoroutinefunction(original):
+            raise ValueError(f"The {lane} lane needs a sync function")
+        try:
+            args_json = json.dumps(list(args))
+            kwargs_json = json.dumps(kwargs or {})
+        except TypeError as e:
+            raise ValueError(f"Background job arguments must be JSON-serializable: {e}")
+
+        task_id = task_id or f"{original.__name__}:{uuid.uuid4().hex}"
+        now = datetime.utcnow()
+        async with database.AsyncSessionLocal() as db:
+            db.add(BackgroundJob(
+                task_id=task_id,
+                func_path=_func_path(func),
+                lane=lane,
+                args=args_json,
+                kwargs=kwargs_json,
+                status=TaskStatus.PENDING.value,
+                attempts=0,
+                max_attempts=max_attempts or options.get("max_attempts") or 3,
+                timeout_seconds=timeout_seconds or options.get("timeout_seconds"),
+                run_after=now + timedelta(seconds=delay_seconds),
+                created_at=now,
+            ))
+            try:
+                await db.commit()
+            except IntegrityError:
+                raise ValueError(f"Task with ID {task_id} already exists")
+
+        logger.info(f"Task submitted: {task_id} ({lane})")
+        if self._wakeup is not None:
+            self._wakeup.set()
+        try:
+            await broker.publish(JOBS_CHANNEL, task_id)
+        except Exception as e:
+            logger.warning(f"Could not notify other workers about {task_id}: {e}")
+        return task_id
+
     async def submit_task(self, task_id: str, func: Callable, *args, **kwargs) -> str:
         """Submit a new background task."""
-        if task_id in self.tasks:
-            raise ValueError(f"Task with ID {task_id} already exists")
-        
-        task = BackgroundTask(task_id, func, args, kwargs)
-        self.tasks[task_id] = task
-        
-        await self.task_queue.put(task_id)
-        logger.info("Task submitted", task_id=task_id, func_name=func.__name__)
-        
-        return task_id
-    
+        return await self.enqueue(func, args, kwargs, task_id=task_id)
+
     async def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Get the status of a task."""
-        task = self.tasks.get(task_id)
-        if not task:
+        async with database.AsyncSessionLocal() as db:
+            job = (await db.execute(
+                select(BackgroundJob).where(BackgroundJob.task_id == task_id)
+            )).scalar_one_or_none()
+        if job is None:
             return None
-        
+
         return {
-            "task_id": task.task_id,
-            "status": task.status.value,
-            "created_at": task.created_at.isoformat(),
-            "started_at": task.started_at.isoformat() if task.started_at else None,
-            "completed_at": task.completed_at.isoformat() if task.completed_at else None,
-            "progress": task.progress,
-            "result": task.result,
-            "error": task.error
+            "task_id": job.task_id,
+            "status": job.status,
+            "lane": job.lane,
+            "attempts": job.attempts,
+            "max_attempts": job.max_attempts,
+            "created_at": job.created_at.isoformat(),
+            "run_after": job.run_after.isoformat() if job.run_after else None,
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "completed_at": job.completed_at.isoformat() if job.completed_at else None,
+            "result": json.loads(job.result) if job.result else None,
+            "error": job.error
         }
-    
+
     async def cancel_task(self, task_id: str) -> bool:
-        """Cancel a running task."""
-        task = self.tasks.get(task_id)
-        if not task:
+        """Cancel a pending or running task (thread/process jobs finish, their result is dropped)."""
+        now = datetime.utcnow()
+        async with database.AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(BackgroundJob)
+                .where(BackgroundJob.task_id == task_id,
+                       BackgroundJob.status.in_((TaskStatus.PENDING.value, TaskStatus.RUNNING.value)))
+                .values(status=TaskStatus.CANCELLED.value, completed_at=now, expires_at=self._expiry(now))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        if result.rowcount != 1:
             return False
-        
-        if task.status == TaskStatus.RUNNING and task.task:
-            task.task.cancel()
-            task.status = TaskStatus.CANCELLED
-            task.completed_at = datetime.utcnow()
-            self.running_tasks.discard(task_id)
-            logger.info("Task cancelled", task_id=task_id)
-            return True
-        
-        return False
-    
-    async def _worker_loop(self):
-        """Main worker loop for processing background tasks."""
+
+        task = self.running_tasks.get(task_id)
+        if task is not None:
+            self._cancelled.add(task_id)
+            task.cancel()
+        logger.info(f"Task cancelled: {task_id}")
+        return True
+
+    async def _dispatch_loop(self):
+        """Claim due jobs while a concurrency slot is free; sleep when the queue is empty."""
         while self.running:
+            await self._semaphore.acquire()
+            self._wakeup.clear()
             try:
-                # Wait for a task to be available
-                task_id = await asyncio.wait_for(self.task_queue.get(), timeout=1.0)
-                
-                # Check if we can run more tasks
-                if len(self.running_tasks) >= self.max_concurrent_tasks:
-                    # Put the task back in the queue
-                    await self.task_queue.put(task_id)
-                    await asyncio.sleep(0.1)
-                    continue
-                
-                # Get the task
-                task = self.tasks.get(task_id)
-                if not task or task.status != TaskStatus.PENDING:
-                    continue
-                
-                # Start the task
-                self.running_tasks.add(task_id)
-                task.status = TaskStatus.RUNNING
-                task.started_at = datetime.utcnow()
-                
-                # Create and run the task
-                task.task = asyncio.create_task(self._execute_task(task))
-                
-            except asyncio.TimeoutError:
-                continue
+                job = await self._claim_next()
+            except asyncio.CancelledError:
+                self._semaphore.release()
+                raise
             except Exception as e:
-                logger.error("Error in worker loop", error=str(e))
-    
-    async def _execute_task(self, task: BackgroundTask):
-        """Execute a background task."""
+                self._semaphore.release()
+                logger.error(f"Error claiming background job: {e}")
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            if job is None:
+                self._semaphore.release()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self.running_tasks[job["task_id"]] = asyncio.create_task(self._execute(job))
+
+    async def _claim_next(self) -> Optional[Dict[str, Any]]:
+        """Atomically move the next due job to running; None if nothing is due."""
+        now = datetime.utcnow()
+        async with database.AsyncSessionLocal() as db:
+            job_id = (await db.execute(
+                select(BackgroundJob.id)
+                .where(BackgroundJob.status == TaskStatus.PENDING.value, BackgroundJob.run_after <= now)
+                .order_by(BackgroundJob.run_after, BackgroundJob.id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )).scalar_one_or_none()
+            if job_id is None:
+                return None
+
+            row = (await db.execute(
+                update(BackgroundJob)
+                .where(BackgroundJob.id == job_id, BackgroundJob.status == TaskStatus.PENDING.value)
+                .values(status=TaskStatus.RUNNING.value, started_at=now, locked_by=self.worker_id,
+                        attempts=BackgroundJob.attempts + 1)
+                .returning(BackgroundJob.task_id, BackgroundJob.func_path, BackgroundJob.lane,
+                           BackgroundJob.args, BackgroundJob.kwargs, BackgroundJob.attempts,
+                           BackgroundJob.max_attempts, BackgroundJob.timeout_seconds, BackgroundJob.run_after)
+                .execution_options(synchronize_session=False)
+            )).mappings().first()
+            await db.commit()
+        if row is None:
+            return None
+        job = dict(row)
+        self._queue_latency.append(max(0.0, (now - job["run_after"]).total_seconds()))
+        return job
+
+    async def _execute(self, job: Dict[str, Any]):
+        """Run a claimed job and record its outcome."""
+        task_id = job["task_id"]
+        started = time.monotonic()
         try:
-            logger.info("Starting task execution", task_id=task.task_id)
-            
-            # Execute the function
-            if asyncio.iscoroutinefunction(task.func):
-                result = await task.func(*task.args, **task.kwargs)
+            logger.info(f"Starting task execution: {task_id} (attempt {job['attempts']})")
+            args = json.loads(job["args"] or "[]")
+            kwargs = json.loads(job["kwargs"] or "{}")
+            call = self._invoke(job["func_path"], job["lane"], args, kwargs)
+            if job["timeout_seconds"]:
+                result = await asyncio.wait_for(call, timeout=job["timeout_seconds"])
             else:
-                # Run sync function in thread pool
-                loop = asyncio.get_event_loop()
-                result = await loop.run_in_executor(None, task.func, *task.args, **task.kwargs)
-            
-            # Task completed successfully
-            task.status = TaskStatus.COMPLETED
-            task.result = result
-            task.progress = 100.0
-            
-            logger.info("Task completed successfully", task_id=task.task_id)
-            
+                result = await call
+            await self._finish(job, TaskStatus.COMPLETED, result=json.dumps(result, default=str))
+            self.stats["completed"] += 1
+            logger.info(f"Task completed successfully: {task_id}")
+
         except asyncio.CancelledError:
-            task.status = TaskStatus.CANCELLED
-            logger.info("Task cancelled", task_id=task.task_id)
+            if task_id in self._cancelled:
+                self._cancelled.discard(task_id)
+            else:
+                # Shutdown: hand the job back to the queue without counting the attempt
+                await asyncio.shield(self._requeue(job))
+            raise
+        except Exception as e:
+            error = "Timeout" if isinstance(e, asyncio.TimeoutError) else f"{type(e).__name__}: {e}"
+            if job["attempts"] < job["max_attempts"]:
+                delay = min(
+                    settings.background_jobs_retry_max_seconds,
+                    settings.background_jobs_retry_base_seconds * 2 ** (job["attempts"] - 1)
+                ) * random.uniform(0.8, 1.2)
+                await self._finish(job, TaskStatus.PENDING, error=error, retry_in=delay)
+                self.stats["retried"] += 1
+                logger.warning(f"Task failed, retry in {delay:.1f}s: {task_id}: {error}")
+            else:
+                await self._finish(job, TaskStatus.FAILED, error=error)
+                self.stats["failed"] += 1
+                logger.error(f"Task failed: {task_id}: {error}")
+        finally:
+            self._run_time.append(time.monotonic() - started)
+            self.running_tasks.pop(task_id, None)
+            self._semaphore.release()
+
+    async def _invoke(self, func_path: str, lane: str, args: list, kwargs: dict) -> Any:
+        if lane == "async":
+            return await _resolve(func_path)(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        if lane == "process":
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(self.process_workers)
+            return await loop.run_in_executor(self._process_pool, _call_by_path, func_path, tuple(args), kwargs)
+        return await loop.run_in_executor(
+            self._thread_pool, functools.partial(_resolve(func_path), *args, **kwargs)
+        )
+
+    def _expiry(self, now: datetime) -> datetime:
+        return now + timedelta(hours=settings.background_jobs_result_ttl_hours)
+
+    async def _finish(self, job: Dict[str, Any], status: TaskStatus, result: Optional[str] = None,
+                      error: Optional[str] = None, retry_in: float = 0):
+        now = datetime.utcnow()
+        values = {"status": status.value, "locked_by": None, "error": error}
+        if status == TaskStatus.PENDING:
+            values["run_after"] = now + timedelta(seconds=retry_in)
+        else:
+            values.update(result=result, completed_at=now, expires_at=self._expiry(now))
+        async with database.AsyncSessionLocal() as db:
+            # Only the current claim may finish the job (not after a cancel or re-queue)
+            await db.execute(
+                update(BackgroundJob)
+                .where(BackgroundJob.task_id == job["task_id"],
+                       BackgroundJob.status == TaskStatus.RUNNING.value,
+                       BackgroundJob.locked_by == self.worker_id)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+    async def _requeue(self, job: Dict[str, Any]):
+        try:
+            async with database.AsyncSessionLocal() as db:
+                await db.execute(
+                    update(BackgroundJob)
+                    .where(BackgroundJob.task_id == job["task_id"],
+                           BackgroundJob.status == TaskStatus.RUNNING.value)
+                    .values(status=TaskStatus.PENDING.value, locked_by=None,
+                            attempts=BackgroundJob.attempts - 1)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
         except Exception as e:
-            task.status = TaskStatus.FAILED
-            task.error = str(e)
-            logger.error("Task failed", task_id=task.task_id, error=str(e))
+            logger.warning(f"Could not re-queue {job['task_id']}: {e}")
+
+    async def _requeue_stale_jobs(self) -> int:
+        """Return running jobs whose worker is gone (exceeded timeout/stale limit) to the queue."""
+        now = datetime.utcnow()
+        requeued = 0
+        async with database.AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(BackgroundJob.id, BackgroundJob.task_id, BackgroundJob.started_at,
+                       BackgroundJob.timeout_seconds, BackgroundJob.locked_by)
+                .where(BackgroundJob.status == TaskStatus.RUNNING.value)
+            )).all()
+            for row in rows:
+                if row.locked_by == self.worker_id:
+                    # Own claim without a local task (e.g. left over from a crashed run)
+                    if row.task_id in self.running_tasks:
+                        continue
+                else:
+                    limit = (row.timeout_seconds or settings.background_jobs_stale_seconds) + 60
+                    if row.started_at and row.started_at > now - timedelta(seconds=limit):
+                        continue
+                result = await db.execute(
+                    update(BackgroundJob)
+                    .where(BackgroundJob.id == row.id, BackgroundJob.status == TaskStatus.RUNNING.value,
+                           BackgroundJob.started_at == row.started_at)
+                    .values(status=TaskStatus.PENDING.value, locked_by=None, run_after=now)
+                    .execution_options(synchronize_session=False)
+                )
+                requeued += result.rowcount
+            await db.commit()
+        if requeued:
+            self.stats["requeued"] += requeued
+            logger.warning(f"Re-queued {requeued} orphaned background jobs")
+        return requeued
+
+    async def _maintenance_loop(self):
+        """Periodically re-queue orphaned jobs and evict expired results."""
+        while self.running:
+            await asyncio.sleep(60)
+            try:
+                await self._requeue_stale_jobs()
+                await self.cleanup_old_tasks()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in background job maintenance: {e}")
+
+    async def _listen_for_submits(self):
+        """Wake the dispatcher when another worker submits a job."""
+        queue = broker.subscribe(JOBS_CHANNEL)
+        try:
+            while True:
+                await queue.get()
+                self._wakeup.set()
         finally:
-            task.completed_at = datetime.utcnow()
-            self.running_tasks.discard(task.task_id)
-    
-    def get_stats(self) -> Dict[str, Any]:
-        """Get background task manager statistics."""
-        status_counts = {}
-        for task in self.tasks.values():
-            status = task.status.value
-            status_counts[status] = status_counts.get(status, 0) + 1
-        
+            broker.unsubscribe(JOBS_CHANNEL, queue)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, job counts and latencies (latencies/counters for this worker)."""
+        now = datetime.utcnow()
+        async with database.AsyncSessionLocal() as db:
+            status_counts = dict((await db.execute(
+                select(BackgroundJob.status, func.count()).group_by(BackgroundJob.status)
+            )).all())
+            due, oldest = (await db.execute(
+                select(func.count(), func.min(BackgroundJob.run_after))
+                .where(BackgroundJob.status == TaskStatus.PENDING.value, BackgroundJob.run_after <= now)
+            )).one()
+
         return {
-            "total_tasks": len(self.tasks),
+            "queue_depth": due,
+            "oldest_due_seconds": round((now - oldest).total_seconds(), 3) if oldest else 0,
+            "status_counts": status_counts,
             "running_tasks": len(self.running_tasks),
-            "queued_tasks": self.task_queue.qsize(),
             "max_concurrent_tasks": self.max_concurrent_tasks,
-            "status_counts": status_counts,
-            "manager_running": self.running
+            "queue_latency_p50": _percentile(self._queue_latency, 0.5),
+            "queue_latency_p95": _percentile(self._queue_latency, 0.95),
+            "run_time_p50": _percentile(self._run_time, 0.5),
+            "run_time_p95": _percentile(self._run_time, 0.95),
+            "worker": self.worker_id,
+            "manager_running": self.running,
+            **self.stats
         }
-    
-    async def cleanup_old_tasks(self, max_age_hours: int = 24):
-        """Clean up old completed/failed tasks."""
-        cutoff_time = datetime.utcnow() - timedelta(hours=max_age_hours)
-        tasks_to_remove = []
-        
-        for task_id, task in self.tasks.items():
-            if (task.status in [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED] and
-                task.completed_at and task.completed_at < cutoff_time):
-                tasks_to_remove.append(task_id)
-        
-        for task_id in tasks_to_remove:
-            del self.tasks[task_id]
-        
-        if tasks_to_remove:
-            logger.info("Cleaned up old tasks", count=len(tasks_to_remove))
+
+    async def cleanup_old_tasks(self) -> int:
+        """Delete finished jobs whose result TTL has expired."""
+        async with database.AsyncSessionLocal() as db:
+            result = await db.execute(
+                delete(BackgroundJob)
+                .where(BackgroundJob.status.in_(_FINISHED), BackgroundJob.expires_at < datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        if result.rowcount:
+            logger.info(f"Cleaned up {result.rowcount} old background jobs")
+        return result.rowcount
+
 
 # Global background task manager instance
-background_task_manager = BackgroundTaskManager()
+background_task_manager = BackgroundTaskManager(
+    max_concurrent_tasks=settings.background_jobs_max_concurrency,
+    thread_workers=settings.background_jobs_thread_workers,
+    process_workers=settings.background_jobs_process_workers,
+    poll_interval=settings.background_jobs_poll_seconds
+)
+
+
+async def start_background_task_manager():
+    """Start the job runner (FastAPI startup event)."""
+    if settings.background_jobs_enabled:
+        await background_task_manager.start()
+
+
+async def stop_background_task_manager():
+    """Stop the job runner (FastAPI shutdown event)."""
+    await background_task_manager.stop()
+
 
 # Utility functions for common background tasks
 async def send_email_async(to_email: str, subject: str, body: str):
     """Send email asynchronously."""
     # Simulate email sending
     await asyncio.sleep(2)
-    logger.info("Email sent", to=to_email, subject=subject)
+    logger.info(f"Email sent to {to_email}: {subject}")
     return {"status": "sent", "to": to_email}
 
 async def process_document_async(document_id: int, operation: str):
     """Process document asynchronously."""
     # Simulate document processing
     await asyncio.sleep(5)
-    logger.info("Document processed", document_id=document_id, operation=operation)
+    logger.info(f"Document {document_id} processed ({operation})")
     return {"status": "processed", "document_id": document_id, "operation": operation}
 
 async def generate_report_async(report_type: str, filters: dict):
     """Generate report asynchronously."""
     # Simulate report generation
     await asyncio.sleep(10)
-    logger.info("Report generated", report_type=report_type, filters=filters)
+    logger.info(f"Report generated: {report_type}")
     return {"status": "generated", "report_type": report_type, "filters": filters}
 
 # Decorator for background task execution
-def background_task(task_id_prefix: str = ""):
-    """Decorator to run a function as a background task."""
+def background_task(task_id_prefix: str = "", lane: Optional[str] = None, max_attempts: Optional[int] = None,
+                    timeout_seconds: Optional[float] = None):
+    """
+    Decorator: calling the function enqueues it as a background job and returns the task ID.
+
+    The function must be defined at module level so workers can import it.
+    """
     def decorator(func):
+        @functools.wraps(func)
         async def wrapper(*args, **kwargs):
-            task_id = f"{task_id_prefix}:{func.__name__}:{int(time.time())}"
-            return await background_task_manager.submit_task(task_id, func, args, kwargs)
+            task_id = f"{task_id_prefix or func.__module__}:{func.__name__}:{uuid.uuid4().hex}"
+            return await background_task_manager.enqueue(wrapper, args, kwargs, task_id=task_id)
+        wrapper._background_func = func
+        wrapper._background_options = {"lane": lane, "max_attempts": max_attempts, "timeout_seconds": timeout_seconds}
         return wrapper
-    return decorator 
\ No newline at end of file
+    return decorator
@@ -1,178 +1,689 @@
+import asyncio
+import enum
+import fnmatch
+import hashlib
+import inspect
+import itertools
 import json
-from typing import Any, Optional
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
 from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+import orjson
+from fastapi import BackgroundTasks, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .pubsub import RESYNC_MESSAGE, broker
 
-# Type annotations for Redis
 try:
-    import aioredis
-    from aioredis import Redis, ConnectionPool
+    from redis import asyncio as redis_asyncio
     REDIS_AVAILABLE = True
 except ImportError:
+    redis_asyncio = None
     REDIS_AVAILABLE = False
-    Redis = None
-    ConnectionPool = None
 
-from .config import settings
+logger = logging.getLogger(__name__)
+
+# Arguments that never take part in a cache key (per-request objects)
+_IGNORED_ARG_TYPES = (AsyncSession, Session, Request, BackgroundTasks)
+_IGNORED_ARG_NAMES = ("self", "cls")
+
+# Seconds Redis is skipped after an error before it is tried again
+_REDIS_RETRY_SECONDS = 5.0
+
+# Broker channel for tag invalidations (drops L1 entries on the other workers)
+TAG_CHANNEL = "cache:tags"
+_TAGS_PER_MESSAGE = 100
+_ORIGIN = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Minimum lifetime of a Redis tag set; it must outlive every entry it lists
+_TAG_SET_TTL = 86400
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Type is not cacheable: {type(value).__name__}")
+
+
+def serialize(value: Any) -> bytes:
+    """Encode a value for the cache (orjson; datetimes become ISO strings)."""
+    return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def deserialize(payload: bytes) -> Any:
+    return orjson.loads(payload)
+
+
+@dataclass
+class _Entry:
+    payload: bytes
+    fresh_until: float   # wall clock; afterwards the value is stale
+    stale_until: float   # wall clock; afterwards the value is gone
+    local_until: float   # wall clock; afterwards L1 must re-read L2
+    tags: Tuple[str, ...] = ()
+
+
+class LocalCache:
+    """
+    In-process L1: TTL + LRU, bounded by entry count and payload bytes.
+
+    Values are stored serialized, so callers never share mutable objects.
+    A tag -> keys index allows dropping all entries of a tag at once.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+
+    def get(self, key: str, now: float) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now >= entry.local_until or now >= entry.stale_until:
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: _Entry):
+        self.delete(key)
+        size = len(entry.payload)
+        if size > self.max_bytes // 4:
+            # A single oversized value would flush the whole L1
+            return
+        self._entries[key] = entry
+        self.bytes += size
+        for tag in entry.tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+            self.delete(next(iter(self._entries)))
+
+    def delete(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self.bytes -= len(entry.payload)
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return True
+
+    def delete_tags(self, tags: Iterable[str]) -> int:
+        deleted = 0
+        for tag in tags:
+            for key in list(self._tags.get(tag, ())):
+                deleted += self.delete(key)
+        return deleted
+
+    def delete_matching(self, pattern: str) -> int:
+        keys = [key for key in self._entries if fnmatch.fnmatchcase(key, pattern)]
+        for key in keys:
+            self.delete(key)
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+        self._tags.clear()
+        self.bytes = 0
+
+    @property
+    def tag_count(self) -> int:
+        return len(self._tags)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
 
 class CacheService:
-    """Redis-based cache service for high performance."""
-    
+    """
+    Two-tier cache: in-process LRU (L1) in front of an optional Redis (L2).
+
+    - Works without Redis; L2 errors degrade to L1 only.
+    - get_or_set() loads each key at most once per process at a time
+      (single-flight) and serves stale values for `stale_ttl` seconds while
+      a background task refreshes them (stale-while-revalidate).
+    - With Redis, L1 entries live at most `cache_local_ttl_seconds` so that
+      invalidations from other workers become visible quickly.
+    - Entries can carry tags (e.g. "project:42"); invalidate_tags() drops
+      every entry of a tag in L1 (all workers, via the broker) and in Redis
+      (via one set per tag), without scanning the keyspace.
+    """
+
     def __init__(self):
+        self.enabled = settings.cache_enabled
+        self.default_ttl = settings.cache_ttl
+        self.stale_ttl = settings.cache_stale_ttl
+        self.key_prefix = settings.cache_key_prefix
+        self.local = LocalCache(settings.cache_max_entries, settings.cache_max_memory_mb * 1024 * 1024)
         self.redis: Optional[Any] = None
-        self._connection_pool: Optional[Any] = None
-    
+        self._redis_down_until = 0.0
+        self._last_warning = 0.0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._inflight_tags: Dict[str, Tuple[str, ...]] = {}
+        # Invalidation stamp per tag; a load that overlaps an invalidation of
+        # one of its tags must not store its (possibly outdated) result
+        self._clock = itertools.count(1)
+        self._stamp = 0
+        self._tag_stamps: "OrderedDict[str, int]" = OrderedDict()
+        self._stamp_floor = 0
+        self.stats = {
+            "local_hits": 0, "redis_hits": 0, "misses": 0, "stale_hits": 0, "loads": 0,
+            "tag_invalidations": 0, "errors": 0
+        }
+
+    @property
+    def local_ttl(self) -> float:
+        return settings.cache_local_ttl_seconds if self.redis is not None else float("inf")
+
     async def connect(self):
-        """Initialize Redis connection."""
-        if not REDIS_AVAILABLE or not settings.cache_enabled:
+        """Create the Redis client (called on startup; idempotent)."""
+        if self.redis is not None or not self.enabled or not settings.redis_url or not settings.cache_use_redis:
             return
-            
-        if not self.redis and ConnectionPool and Redis:
-            self._connection_pool = ConnectionPool.from_url(
-                settings.redis_url,
-                password=settings.redis_password,
-                db=settings.redis_db,
-                max_connections=settings.redis_max_connections,
-                decode_responses=True
-            )
-            self.redis = Redis(connection_pool=self._connection_pool)
-    
+        if not REDIS_AVAILABLE:
+            logger.warning("REDIS_URL configured but redis package missing - cache is per process")
+            return
+        self.redis = redis_asyncio.from_url(settings.redis_url, decode_responses=False)
+
     async def disconnect(self):
-        """Close Redis connection."""
-        if self.redis:
+        """Close the Redis client."""
+        if self.redis is not None:
             await self.redis.close()
-        if self._connection_pool:
-            await self._connection_pool.disconnect()
-    
+            self.redis = None
+
+    def _redis_usable(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, operation: str, error: Exception):
+        self.stats["errors"] += 1
+        self._redis_down_until = time.monotonic() + _REDIS_RETRY_SECONDS
+        if time.monotonic() - self._last_warning > 60:
+            self._last_warning = time.monotonic()
+            logger.warning(f"Redis cache {operation} failed, using local cache only: {error}")
+
+    # --- Entries -----------------------------------------------------------
+
+    async def _get_entry(self, key: str) -> Optional[_Entry]:
+        now = time.time()
+        entry = self.local.get(key, now)
+        if entry is not None:
+            self.stats["local_hits"] += 1
+            return entry
+
+        if self._redis_usable():
+            try:
+                raw = await self.redis.get(self.key_prefix + key)
+            except Exception as e:
+                self._redis_failed("get", e)
+                raw = None
+            if raw:
+                fresh_until, stale_until, tags, payload = raw.split(b"|", 3)
+                entry = _Entry(
+                    payload, float(fresh_until), float(stale_until), now + self.local_ttl,
+                    tuple(tag for tag in tags.decode().split(",") if tag)
+                )
+                if now < entry.stale_until:
+                    self.local.set(key, entry)
+                    self.stats["redis_hits"] += 1
+                    return entry
+
+        self.stats["misses"] += 1
+        return None
+
+    async def _set_payload(self, key: str, payload: bytes, ttl: Optional[int], stale_ttl: Optional[int],
+                           tags: Tuple[str, ...] = ()):
+        ttl = self.default_ttl if ttl is None else ttl
+        stale_ttl = self.stale_ttl if stale_ttl is None else stale_ttl
+        now = time.time()
+        entry = _Entry(payload, now + ttl, now + ttl + stale_ttl, now + min(ttl + stale_ttl, self.local_ttl), tags)
+        self.local.set(key, entry)
+
+        if self._redis_usable() and ttl + stale_ttl > 0:
+            redis_key = self.key_prefix + key
+            header = f"{entry.fresh_until:.3f}|{entry.stale_until:.3f}|{','.join(tags)}|".encode()
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    pipe.set(redis_key, header + payload, px=int((ttl + stale_ttl) * 1000))
+                    for tag in tags:
+                        tag_key = self._tag_key(tag)
+                        pipe.sadd(tag_key, redis_key)
+                        pipe.expire(tag_key, max(_TAG_SET_TTL, ttl + stale_ttl))
+                    await pipe.execute()
+            except Exception as e:
+                self._redis_failed("set", e)
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.key_prefix}tag:{tag}"
+
+    # --- Public API --------------------------------------------------------
+
     async def get(self, key: str) -> Optional[Any]:
-        """Get value from cache."""
-        if not settings.cache_enabled or not REDIS_AVAILABLE:
-            return None
-        
-        try:
-            await self.connect()
-            if self.redis:
-                value = await self.redis.get(key)
-                if value:
-                    return json.loads(value)
+        """Get a value (stale values included) or None."""
+        if not self.enabled:
             return None
-        except Exception as e:
-            print(f"Cache get error: {e}")
-            return None
-    
-    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
-        """Set value in cache with optional TTL."""
-        if not settings.cache_enabled or not REDIS_AVAILABLE:
+        entry = await self._get_entry(key)
+        return deserialize(entry.payload) if entry is not None else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None, stale_ttl: Optional[int] = 0,
+                  tags: Iterable[str] = ()) -> bool:
+        """Set a value with optional TTL (seconds) and tags."""
+        if not self.enabled:
             return False
-        
         try:
-            await self.connect()
-            if self.redis:
-                ttl = ttl or settings.cache_ttl
-                serialized_value = json.dumps(value, default=str)
-                return await self.redis.setex(key, ttl, serialized_value)
-            return False
-        except Exception as e:
-            print(f"Cache set error: {e}")
-            return False
-    
-    async def delete(self, key: str) -> bool:
-        """Delete value from cache."""
-        if not settings.cache_enabled or not REDIS_AVAILABLE:
+            payload = serialize(value)
+        except TypeError as e:
+            logger.warning(f"Cache set skipped for {key}: {e}")
             return False
-        
+        await self._set_payload(key, payload, ttl, stale_ttl, tuple(tags))
+        return True
+
+    async def get_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None,
+        stale_ttl: Optional[int] = None,
+        tags: Iterable[str] = ()
+    ) -> Any:
+        """
+        Return the cached value for `key`, calling `loader` on a miss.
+
+        Concurrent misses share one loader call; a stale hit is returned
+        immediately and refreshed in the background.
+        """
+        if not self.enabled:
+            return await loader()
+
+        tags = tuple(tags)
+        entry = await self._get_entry(key)
+        if entry is not None:
+            if time.time() >= entry.fresh_until:
+                self.stats["stale_hits"] += 1
+                self._start_load(key, loader, ttl, stale_ttl, tags)
+            return deserialize(entry.payload)
+
+        # Shield: a cancelled caller must not abort the load others wait for
+        payload, value = await asyncio.shield(self._start_load(key, loader, ttl, stale_ttl, tags))
+        # Every caller gets its own copy, identical to what later hits return
+        return deserialize(payload) if payload is not None else value
+
+    def _start_load(self, key: str, loader, ttl: Optional[int], stale_ttl: Optional[int],
+                    tags: Tuple[str, ...]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader, ttl, stale_ttl, tags))
+            self._inflight[key] = task
+            if tags:
+                self._inflight_tags[key] = tags
+            task.add_done_callback(lambda t: self._load_done(key, t))
+        return task
+
+    def _load_done(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            self._inflight_tags.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Cache load for {key} failed: {task.exception()}")
+
+    async def _load(self, key: str, loader, ttl: Optional[int], stale_ttl: Optional[int],
+                    tags: Tuple[str, ...]) -> Tuple[Optional[bytes], Any]:
+        self.stats["loads"] += 1
+        started = self._stamp
+        value = await loader()
         try:
-            await self.connect()
-            if self.redis:
-                return bool(await self.redis.delete(key))
-            return False
+            payload = serialize(value)
+        except TypeError as e:
+            logger.warning(f"Cache result for {key} not stored: {e}")
+            return None, value
+        if any(self._tag_stamps.get(tag, self._stamp_floor) > started for tag in tags):
+            # A tag was invalidated while loading: return, but do not store
+            return payload, value
+        await self._set_payload(key, payload, ttl, stale_ttl, tags)
+        return payload, value
+
+    # --- Tags --------------------------------------------------------------
+
+    def _drop_local_tags(self, tags: Set[str]) -> int:
+        self._stamp = next(self._clock)
+        for tag in tags:
+            self._tag_stamps[tag] = self._stamp
+            self._tag_stamps.move_to_end(tag)
+        while len(self._tag_stamps) > self.local.max_entries:
+            _, evicted = self._tag_stamps.popitem(last=False)
+            self._stamp_floor = max(self._stamp_floor, evicted)
+        # Loads that started before the change must not be joined by new callers
+        for key, key_tags in list(self._inflight_tags.items()):
+            if tags.intersection(key_tags):
+                self._inflight.pop(key, None)
+                del self._inflight_tags[key]
+        return self.local.delete_tags(tags)
+
+    async def invalidate_tags(self, tags: Iterable[str], publish: bool = True) -> int:
+        """Drop all entries carrying one of `tags` (L1 of all workers and Redis)."""
+        tags = set(tags)
+        if not self.enabled or not tags:
+            return 0
+        self.stats["tag_invalidations"] += len(tags)
+        deleted = self._drop_local_tags(tags)
+
+        if self._redis_usable():
+            tag_keys = [self._tag_key(tag) for tag in tags]
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for tag_key in tag_keys:
+                        pipe.smembers(tag_key)
+                    members = await pipe.execute()
+                keys = set().union(*members)
+                keys.update(tag_keys)
+                keys = list(keys)
+                for start in range(0, len(keys), 500):
+                    await self.redis.unlink(*keys[start:start + 500])
+            except Exception as e:
+                self._redis_failed("invalidate", e)
+
+        if publish:
+            tags = sorted(tags)
+            for start in range(0, len(tags), _TAGS_PER_MESSAGE):
+                message = json.dumps({"origin": _ORIGIN, "tags": tags[start:start + _TAGS_PER_MESSAGE]})
+                try:
+                    await broker.publish(TAG_CHANNEL, message)
+                except Exception as e:
+                    logger.warning(f"Cache tag invalidation not published: {e}")
+        return deleted
+
+    def invalidate_tags_nowait(self, tags: Iterable[str]):
+        """
+        Drop tagged entries from L1 immediately and schedule Redis/broker
+        invalidation (for synchronous callers like SQLAlchemy events).
+        """
+        tags = set(tags)
+        if not self.enabled or not tags:
+            return
+        self._drop_local_tags(tags)
+        _schedule(self.invalidate_tags(tags))
+
+    def _drop_local_all(self):
+        # Every tag counts as invalidated now (see _load)
+        self._stamp = self._stamp_floor = next(self._clock)
+        self._tag_stamps.clear()
+        self._inflight.clear()
+        self._inflight_tags.clear()
+        self.local.clear()
+
+    async def invalidate_all(self):
+        """Drop every entry (L1 of all workers and Redis)."""
+        if not self.enabled:
+            return
+        self._drop_local_all()
+        await self.clear_pattern("*")
+        try:
+            await broker.publish(TAG_CHANNEL, RESYNC_MESSAGE)
         except Exception as e:
-            print(f"Cache delete error: {e}")
+            logger.warning(f"Cache invalidation not published: {e}")
+
+    def invalidate_all_nowait(self):
+        """Synchronous variant of invalidate_all()."""
+        if not self.enabled:
+            return
+        self._drop_local_all()
+        _schedule(self.invalidate_all())
+
+    async def delete(self, key: str) -> bool:
+        """Delete a value from both tiers."""
+        if not self.enabled:
             return False
-    
+        deleted = self.local.delete(key)
+        if self._redis_usable():
+            try:
+                deleted = bool(await self.redis.delete(self.key_prefix + key)) or deleted
+            except Exception as e:
+                self._redis_failed("delete", e)
+        return deleted
+
     async def exists(self, key: str) -> bool:
-        """Check if key exists in cache."""
-        if not settings.cache_enabled or not REDIS_AVAILABLE:
-            return False
-        
-        try:
-            await self.connect()
-            if self.redis:
-                return bool(await self.redis.exists(key))
-            return False
-        except Exception as e:
-            print(f"Cache exists error: {e}")
+        """Check if a (fresh or stale) value exists."""
+        if not self.enabled:
             return False
-    
+        if self.local.get(key, time.time()) is not None:
+            return True
+        if self._redis_usable():
+            try:
+                return bool(await self.redis.exists(self.key_prefix + key))
+            except Exception as e:
+                self._redis_failed("exists", e)
+        return False
+
     async def clear_pattern(self, pattern: str) -> int:
-        """Clear all keys matching pattern."""
-        if not settings.cache_enabled or not REDIS_AVAILABLE:
+        """Clear all keys matching a glob pattern."""
+        if not self.enabled:
             return 0
-        
-        try:
-            await self.connect()
-            if self.redis:
-                keys = await self.redis.keys(pattern)
-                if keys:
-                    return await self.redis.delete(*keys)
-            return 0
-        except Exception as e:
-            print(f"Cache clear pattern error: {e}")
-            return 0
-    
+        cleared = self.local.delete_matching(pattern)
+        if self._redis_usable():
+            try:
+                keys = [key async for key in self.redis.scan_iter(match=self.key_prefix + pattern, count=500)]
+                for start in range(0, len(keys), 500):
+                    cleared += await self.redis.unlink(*keys[start:start + 500])
+            except Exception as e:
+                self._redis_failed("clear", e)
+        return cleared
+
+    async def clear(self):
+        """Drop the local tier (e.g. in tests)."""
+        self._drop_local_all()
+
     async def get_stats(self) -> dict:
         """Get cache statistics."""
-        if not settings.cache_enabled:
+        if not self.enabled:
             return {"enabled": False}
-        
-        if not REDIS_AVAILABLE:
-            return {"enabled": False, "error": "Redis not available"}
-        
-        try:
-            await self.connect()
-            if self.redis:
+
+        stats = {
+            "enabled": True,
+            "backend": "memory+redis" if self.redis is not None else "memory",
+            "local_entries": len(self.local),
+            "local_bytes": self.local.bytes,
+            "local_tags": self.local.tag_count,
+            "keyspace_hits": self.stats["local_hits"] + self.stats["redis_hits"],
+            "keyspace_misses": self.stats["misses"],
+            "inflight_loads": len(self._inflight),
+            **self.stats
+        }
+        if self.redis is not None:
+            try:
                 info = await self.redis.info()
-                return {
-                    "enabled": True,
+                stats["redis"] = {
                     "connected_clients": info.get("connected_clients", 0),
                     "used_memory_human": info.get("used_memory_human", "0B"),
                     "keyspace_hits": info.get("keyspace_hits", 0),
-                    "keyspace_misses": info.get("keyspace_misses", 0),
-                    "total_commands_processed": info.get("total_commands_processed", 0)
+                    "keyspace_misses": info.get("keyspace_misses", 0)
                 }
-            return {"enabled": True, "error": "Redis not connected"}
-        except Exception as e:
-            return {"enabled": True, "error": str(e)}
+            except Exception as e:
+                stats["redis_error"] = str(e)
+        return stats
+
+
+def _schedule(coro):
+    try:
+        asyncio.get_running_loop().create_task(coro)
+    except RuntimeError:
+        # No event loop (sync script): L1 is already updated
+        coro.close()
+
 
 # Global cache instance
 cache_service = CacheService()
 
-def cache_result(ttl: Optional[int] = None, key_prefix: str = ""):
-    """Decorator to cache function results."""
+
+async def run_tag_invalidation_listener():
+    """Drops L1 entries whose tags were invalidated on other workers (runs forever)."""
+    queue = broker.subscribe(TAG_CHANNEL)
+    try:
+        while True:
+            message = await queue.get()
+            if message == RESYNC_MESSAGE:
+                # Full invalidation or lost messages; L1 entries are cheap to rebuild
+                cache_service._drop_local_all()
+                continue
+            try:
+                data = json.loads(message)
+            except ValueError:
+                continue
+            if data.get("origin") == _ORIGIN:
+                continue
+            cache_service._drop_local_tags(set(data.get("tags") or ()))
+    finally:
+        broker.unsubscribe(TAG_CHANNEL, queue)
+
+
+def _key_part(value: Any) -> Any:
+    """Stable, JSON-compatible representation of an argument."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        return [_key_part(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((_key_part(v) for v in value), key=repr)
+    if isinstance(value, dict):
+        return {str(k): _key_part(v) for k, v in value.items()}
+    if hasattr(value, "__table__") and getattr(value, "id", None) is not None:
+        # ORM instances (e.g. current_user) are identified by their primary key
+        return f"{type(value).__name__}:{value.id}"
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    raise TypeError(f"No stable cache key for {type(value).__name__}")
+
+
+def _bind_arguments(func: Callable, args: Tuple, kwargs: Dict) -> Dict[str, Any]:
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    return bound.arguments
+
+
+def build_cache_key(func: Callable, args: Tuple, kwargs: Dict, key_prefix: str = "",
+                    exclude: Iterable[str] = (), arguments: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Cache key from the function name and its bound arguments.
+
+    Sessions, requests, `self`/`cls` and names in `exclude` are skipped, so
+    the key is identical across requests and workers.
+    """
+    if arguments is None:
+        arguments = _bind_arguments(func, args, kwargs)
+    parts = {
+        name: _key_part(value)
+        for name, value in arguments.items()
+        if name not in _IGNORED_ARG_NAMES and name not in exclude and not isinstance(value, _IGNORED_ARG_TYPES)
+    }
+    digest = hashlib.blake2b(orjson.dumps(parts, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
+    return f"{key_prefix or func.__module__}:{func.__qualname__}:{digest}"
+
+
+def _loader(func: Callable, args: Tuple, kwargs: Dict) -> Callable[[], Awaitable[Any]]:
+    """
+    Loader for get_or_set. A load may outlive the request (background refresh,
+    shielded miss), so it never uses the caller's AsyncSession but opens its own.
+    """
+    if not any(isinstance(value, AsyncSession) for value in itertools.chain(args, kwargs.values())):
+        return lambda: func(*args, **kwargs)
+
+    async def load():
+        from .database import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as session:
+            own_args = tuple(session if isinstance(value, AsyncSession) else value for value in args)
+            own_kwargs = {
+                name: session if isinstance(value, AsyncSession) else value
+                for name, value in kwargs.items()
+            }
+            return await func(*own_args, **own_kwargs)
+    return load
+
+
+def cache_result(ttl: Optional[int] = None, key_prefix: str = "", stale_ttl: Optional[int] = None,
+                 exclude: Iterable[str] = (), tags: Iterable[str] = ()):
+    """
+    Decorator to cache function results.
+
+    Results must be JSON-compatible and always come back deserialized
+    (datetimes as ISO strings). The wrapper gets an `invalidate(*args, **kwargs)`
+    coroutine that drops the entry for the given arguments.
+
+    `tags` are format templates filled from the arguments, e.g.
+    `tags=("project:{project_id}",)`; see app.services.cache_invalidation for
+    the tags emitted on model changes.
+
+    Uncached calls use the caller's AsyncSession; cached loads run on a
+    session of their own (see `_loader`).
+    """
+    exclude = tuple(exclude)
+    tags = tuple(tags)
+
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            # Generate cache key
-            cache_key = f"{key_prefix}:{func.__name__}:{hash(str(args) + str(sorted(kwargs.items())))}"
-            
-            # Try to get from cache
-            cached_result = await cache_service.get(cache_key)
-            if cached_result is not None:
-                return cached_result
-            
-            # Execute function and cache result
-            result = await func(*args, **kwargs)
-            await cache_service.set(cache_key, result, ttl)
-            return result
+            if not cache_service.enabled:
+                return await func(*args, **kwargs)
+            try:
+                arguments = _bind_arguments(func, args, kwargs)
+                cache_key = build_cache_key(func, args, kwargs, key_prefix, exclude, arguments)
+                entry_tags = tuple(tag.format(**arguments) for tag in tags)
+            except (TypeError, KeyError, AttributeError) as e:
+                logger.warning(f"Not caching {func.__qualname__}: {e}")
+                return await func(*args, **kwargs)
+            return await cache_service.get_or_set(
+                cache_key, _loader(func, args, kwargs), ttl, stale_ttl, entry_tags
+            )
+
+        async def invalidate(*args, **kwargs) -> bool:
+            return await cache_service.delete(build_cache_key(func, args, kwargs, key_prefix, exclude))
+
+        wrapper.invalidate = invalidate
         return wrapper
     return decorator
 
-def invalidate_cache(pattern: str):
-    """Decorator to invalidate cache after function execution."""
+
+def invalidate_cache(pattern: Optional[str] = None, tags: Iterable[str] = ()):
+    """
+    Decorator to invalidate cache after function execution.
+
+    Prefer `tags` (templates like in cache_result); a `pattern` has to scan
+    the Redis keyspace.
+    """
+    tags = tuple(tags)
+
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
             result = await func(*args, **kwargs)
-            await cache_service.clear_pattern(pattern)
+            if tags:
+                arguments = _bind_arguments(func, args, kwargs)
+                await cache_service.invalidate_tags(tag.format(**arguments) for tag in tags)
+            if pattern:
+                await cache_service.clear_pattern(pattern)
             return result
         return wrapper
-    return decorator 
\ No newline at end of file
+    return decorator
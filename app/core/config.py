@@ -1,7 +1,9 @@
 from pydantic_settings import BaseSettings
-from typing import Optional, Literal
+from typing import Any, Dict, Optional, Literal, Tuple
 import os
 import json
+import threading
+import time
 from pathlib import Path
 
 
@@ -41,6 +43,7 @@ class Settings(BaseSettings):
     
     # Environment Mode
     environment_mode: Literal["beta", "production"] = "beta"
+    environment_config_check_seconds: float = 2.0  # Prüfintervall für Änderungen an environment_config.json
     
     # Stripe Configuration
     stripe_secret_key: str = "sk_test_51RmqhBD1cfnpqPDcNBjCVI3uNYCuvpqU2bdrTF2sugjOi5BiGtMF1kaiiHVpxR8dzkgXO634carUE57oyEDdmiQV00XaE5SZfO"
@@ -75,44 +78,124 @@ class Settings(BaseSettings):
     bcrypt_rounds: int = 12
     max_login_attempts: int = 5
     account_lockout_duration_minutes: int = 30
+    max_login_attempts_per_ip: int = 20  # Fehlversuche pro IP im Zählerfenster
+    security_counter_window_minutes: int = 15
+    security_counter_bucket_seconds: int = 60
+    security_counter_block_cache_seconds: int = 30  # lokale Merkdauer aktiver Sperren
+    crypto_max_workers: int = 4  # Threads für bcrypt & Co. (pro Worker-Prozess)
+    crypto_max_concurrency: int = 64  # laufende + wartende Krypto-Operationen
     
+    # Redis (optional; ohne Redis arbeiten Rate-Limiter und Cache rein im Prozess)
+    redis_url: Optional[str] = None
+
+    # Rate-Limiting (Token-Bucket/GCRA)
+    rate_limit_enabled: bool = True
+    rate_limit_use_redis: bool = True  # Redis-Backend nutzen, sofern redis_url gesetzt ist
+    rate_limit_requests_per_minute: int = 600  # globales Limit pro IP (RateLimitMiddleware)
+
+    # Cache (lokaler LRU-Cache, optional Redis als zweite Ebene)
+    cache_enabled: bool = True
+    cache_use_redis: bool = True  # Redis als L2 nutzen, sofern redis_url gesetzt ist
+    cache_ttl: int = 300
+    cache_stale_ttl: int = 60  # so lange wird ein abgelaufener Wert noch ausgeliefert und im Hintergrund erneuert
+    cache_local_ttl_seconds: int = 30  # maximale Lebensdauer im lokalen Cache, wenn Redis aktiv ist
+    cache_max_entries: int = 10000
+    cache_max_memory_mb: int = 64
+    cache_key_prefix: str = "buildwise:cache:"
+
     # DSGVO
     data_retention_days: int = 730  # 2 Jahre
     consent_required: bool = True
-    
+
+    # Benachrichtigungs-Stream (Server-Sent Events)
+    notification_stream_heartbeat_seconds: int = 15
+    notification_stream_replay_limit: int = 100
+    notification_stream_retry_ms: int = 3000  # Reconnect-Verzögerung für EventSource
+
+    # Canvas-Kollaboration (WebSocket-Hub)
+    canvas_cursor_tick_ms: int = 50  # Cursor-Updates werden je Canvas zu einem Frame pro Tick zusammengefasst
+    canvas_presence_flush_seconds: float = 30.0  # so oft werden Cursor-Positionen in canvas_sessions geschrieben
+    canvas_send_queue_size: int = 256  # ausstehende Frames pro Verbindung
+    canvas_send_timeout_seconds: float = 5.0  # hängt ein Send länger, wird die Verbindung geschlossen
+
+    # Identitäts-Cache für get_current_user (0 = deaktiviert)
+    identity_cache_ttl_seconds: int = 30
+    identity_cache_max_entries: int = 10000
+
+    # Zähler-Cache für Benachrichtigungsstatistiken (Badge)
+    notification_stats_cache_ttl_seconds: int = 300  # Abgleich mit der Datenbank spätestens nach 5 Minuten
+    notification_stats_cache_max_entries: int = 10000
+
+    # Aufbewahrungsfristen (Retention)
+    retention_enabled: bool = True
+    retention_batch_size: int = 1000  # Zeilen pro Lösch-Transaktion
+    retention_batch_sleep_seconds: float = 0.2  # Pause zwischen Batches
+    retention_archive_enabled: bool = True  # Archivierung für Richtlinien mit archive=True
+    retention_archive_dir: str = "storage/archive"
+    notification_retention_days: int = 30  # nur quittierte Benachrichtigungen
+    audit_log_retention_days: int = 365
+    credit_event_retention_days: int = 730
+    document_access_log_retention_days: int = 180
+    security_counter_retention_days: int = 1  # Zähler werden nur im Fenster benötigt
+
+    # Audit-Log-Writer (gepufferte Bulk-Inserts)
+    audit_log_queue_size: int = 10000
+    audit_log_batch_size: int = 200
+    audit_log_flush_interval_seconds: float = 1.0
+
+    # Job-Scheduler (läuft nur auf dem Leader-Worker)
+    scheduler_enabled: bool = True
+    scheduler_poll_seconds: float = 60.0  # spätestens so oft Fälligkeit und Leader-Lock prüfen
+    scheduler_leader_retry_seconds: float = 30.0  # Abstand der Versuche, Leader zu werden
+    scheduler_lock_file: str = "storage/scheduler.lock"  # Leader-Lock bei SQLite
+    scheduler_advisory_lock_id: int = 804211  # pg_advisory_lock-Schlüssel bei PostgreSQL
+
+    # Hintergrund-Aufträge (persistente Queue in background_jobs)
+    background_jobs_enabled: bool = True
+    background_jobs_max_concurrency: int = 10  # gleichzeitig laufende Aufträge pro Worker
+    background_jobs_thread_workers: int = 4  # Lane "thread" (blockierende I/O)
+    background_jobs_process_workers: int = 2  # Lane "process" (CPU-lastig)
+    background_jobs_poll_seconds: float = 2.0  # Rückfall-Intervall, falls keine Broker-Nachricht kommt
+    background_jobs_retry_base_seconds: float = 5.0  # Backoff: base * 2^(Versuch-1)
+    background_jobs_retry_max_seconds: float = 3600.0
+    background_jobs_stale_seconds: float = 3600.0  # laufende Aufträge ohne Timeout gelten danach als verwaist
+    background_jobs_result_ttl_hours: int = 24
+
+    # Transactional Outbox (Domain-Events in outbox_events)
+    outbox_enabled: bool = True
+    outbox_batch_size: int = 20  # gleichzeitig ausgelieferte Events (je ein Aggregat) pro Worker
+    outbox_poll_seconds: float = 2.0  # Rückfall-Intervall, falls keine Broker-Nachricht kommt
+    outbox_max_attempts: int = 8
+    outbox_retry_base_seconds: float = 5.0  # Backoff: base * 2^(Versuch-1)
+    outbox_retry_max_seconds: float = 3600.0
+    outbox_stale_seconds: float = 600.0  # Events in Auslieferung gelten danach als verwaist
+    outbox_retention_days: int = 7  # ausgelieferte Events werden danach gelöscht
+
+    # PDF-Rendering (Prozess-Pool, Cache nach Inhalts-Hash in storage/cache/pdf)
+    pdf_render_workers: int = 0  # 0 = Anzahl CPU-Kerne
+    pdf_render_timeout_seconds: float = 120.0  # Hintergrund-Aufträge (submit_render)
+    pdf_cache_ttl_days: int = 30  # ungenutzte Cache-Einträge werden danach gelöscht
+
+    # Monatliche Sammelrechnungen (Batch-Lauf mit Checkpoint)
+    monthly_invoice_batch_size: int = 200  # Dienstleister pro Batch (eine Transaktion)
+    monthly_invoice_stale_seconds: float = 900.0  # Lauf ohne Heartbeat gilt danach als verwaist
+
     class Config:
         env_file = ".env"
         extra = "ignore"  # Ignoriere unbekannte Felder
 
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self._load_environment_config()
-    
-    def _load_environment_config(self):
-        """Lädt die Environment-Konfiguration aus der JSON-Datei."""
-        config_file = Path("environment_config.json")
-        if config_file.exists():
-            try:
-                with open(config_file, "r", encoding="utf-8") as f:
-                    config = json.load(f)
-                
-                # Aktualisiere BuildWise Fee Einstellungen
-                if "buildwise_fee_percentage" in config:
-                    self.buildwise_fee_percentage = config["buildwise_fee_percentage"]
-                if "buildwise_fee_phase" in config:
-                    self.buildwise_fee_phase = config["buildwise_fee_phase"]
-                if "buildwise_fee_enabled" in config:
-                    self.buildwise_fee_enabled = config["buildwise_fee_enabled"]
-                if "environment_mode" in config:
-                    self.environment_mode = config["environment_mode"]
-                    
-            except Exception as e:
-                print(f"[WARNING] Konnte environment_config.json nicht laden: {e}")
+    def _load_environment_config(self, config: Optional[Dict[str, Any]] = None):
+        """Übernimmt die Werte aus environment_config.json (bereits gelesen oder von Platte)."""
+        if config is None:
+            config = _read_environment_config()
+        for key, value in (config or {}).items():
+            setattr(self, key, value)
     
     def get_fee_percentage(self) -> float:
         """Gibt den aktuellen Gebühren-Prozentsatz basierend auf der Phase zurück."""
-        # Lade die aktuelle Konfiguration dynamisch
-        self._load_environment_config()
+        # Änderungen an environment_config.json übernehmen (prüft nur die mtime)
+        if self is settings:
+            reload_settings()
         
         if self.environment_mode == "beta":
             return 0.0
@@ -129,12 +212,87 @@ class Settings(BaseSettings):
         return self.environment_mode == "production"
 
 
+ENVIRONMENT_CONFIG_FILE = Path("environment_config.json")
+
+# Felder, die zur Laufzeit über environment_config.json umgeschaltet werden
+ENVIRONMENT_CONFIG_KEYS = (
+    "buildwise_fee_percentage",
+    "buildwise_fee_phase",
+    "buildwise_fee_enabled",
+    "environment_mode",
+)
+
+
+def _read_environment_config() -> Optional[Dict[str, Any]]:
+    """Liest die umschaltbaren Felder aus environment_config.json (None bei Fehler)."""
+    if not ENVIRONMENT_CONFIG_FILE.exists():
+        return {}
+    try:
+        with open(ENVIRONMENT_CONFIG_FILE, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except Exception as e:
+        print(f"[WARNING] Konnte environment_config.json nicht laden: {e}")
+        return None
+    return {key: config[key] for key in ENVIRONMENT_CONFIG_KEYS if key in config}
+
+
 # Erstelle eine globale Settings-Instanz
 settings = Settings()
 
+# Basis aus Umgebung/.env (einmalig geparst); Snapshots entstehen daraus per Kopie
+_base_settings = settings.model_copy()
+_snapshot: Settings = settings
+_config_signature: Optional[Tuple[int, int]] = None
+_next_check = 0.0
+_reload_lock = threading.Lock()
+
+
+def _config_file_signature() -> Optional[Tuple[int, int]]:
+    try:
+        stat = ENVIRONMENT_CONFIG_FILE.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def reload_settings(force: bool = False) -> Settings:
+    """
+    Übernimmt Änderungen an environment_config.json
+
+    Die Datei wird höchstens alle `environment_config_check_seconds` per mtime
+    geprüft und nur bei Änderung neu gelesen. Der neue Snapshot ersetzt den
+    alten in einem Schritt; die globale `settings`-Instanz wird nachgezogen.
+    """
+    global _snapshot, _config_signature, _next_check
+
+    now = time.monotonic()
+    if not force and now < _next_check:
+        return _snapshot
+
+    with _reload_lock:
+        _next_check = now + settings.environment_config_check_seconds
+        signature = _config_file_signature()
+        if not force and signature == _config_signature:
+            return _snapshot
+
+        config = _read_environment_config()
+        if config is None:
+            # Halb geschriebene/ungültige Datei: alten Stand behalten, später erneut prüfen
+            return _snapshot
+
+        snapshot = _base_settings.model_copy(update=config)
+        settings._load_environment_config(config)
+        _snapshot = snapshot
+        _config_signature = signature
+        return snapshot
+
+
+reload_settings(force=True)
+
+
 def get_settings() -> Settings:
-    """Gibt eine frische Settings-Instanz zurück, die die aktuelle Konfiguration lädt."""
-    return Settings()
+    """Gibt den aktuellen Settings-Snapshot zurück (nicht verändern)."""
+    return reload_settings()
 
 def get_fee_percentage() -> float:
     """Gibt den aktuellen Gebühren-Prozentsatz dynamisch zurück."""
@@ -0,0 +1,436 @@
+"""
+Transactional Outbox und Domain-Event-Bus
+
+- Produzenten schreiben das Event mit `record_event` in dieselbe Session wie die
+  Zustandsänderung; beides wird gemeinsam committet (oder gar nicht)
+- Nach dem Commit wird der Dispatcher lokal und über den Broker auf allen
+  Workern geweckt; ohne Nachricht greift das Poll-Intervall
+- Reihenfolge je Aggregat: ausgeliefert wird nur das älteste offene Event eines
+  Aggregats, Events verschiedener Aggregate laufen parallel
+- Handler werden mit `@event_handler("QuoteAccepted")` registriert und laufen
+  nacheinander in eigenen Sessions; erfolgreiche Handler werden am Event vermerkt
+  (in derselben Transaktion) und bei einem erneuten Versuch übersprungen
+- Fehlgeschlagene Events werden mit exponentiellem Backoff wiederholt, nach
+  `max_attempts` als "dead" markiert
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from .config import settings
+from . import database
+from .pubsub import broker
+from ..models.outbox_event import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# Broker-Kanal zum Wecken der Dispatcher auf anderen Workern
+OUTBOX_CHANNEL = "outbox:events"
+
+# Schlüssel in Session.info: Session hat Events geschrieben, die noch nicht committet sind
+_PENDING_KEY = "outbox_pending"
+
+PENDING = "pending"
+PROCESSING = "processing"
+DELIVERED = "delivered"
+DEAD = "dead"
+
+
+@dataclass(frozen=True)
+class DomainEvent:
+    """Ausgeliefertes Event, wie es die Handler erhalten"""
+    event_id: str
+    event_type: str
+    aggregate_type: str
+    aggregate_id: int
+    payload: Dict[str, Any]
+    created_at: datetime
+    attempt: int
+
+
+Handler = Callable[[AsyncSession, DomainEvent], Awaitable[Any]]
+
+# Event-Typ -> [(Handler-Name, Funktion)] in Registrierungsreihenfolge
+_handlers: Dict[str, List[Tuple[str, Handler]]] = defaultdict(list)
+
+
+def event_handler(event_type: str, name: Optional[str] = None):
+    """
+    Registriert einen Handler für einen Event-Typ
+
+    Der Name identifiziert den Handler im Outbox (bereits erledigte Handler
+    werden bei Wiederholungen übersprungen) und muss daher stabil bleiben.
+    """
+    def decorator(func: Handler) -> Handler:
+        handler_name = name or func.__name__
+        if any(existing == handler_name for existing, _ in _handlers[event_type]):
+            raise ValueError(f"Handler {handler_name} für {event_type} bereits registriert")
+        _handlers[event_type].append((handler_name, func))
+        return func
+    return decorator
+
+
+def get_handlers(event_type: str) -> List[Tuple[str, Handler]]:
+    return list(_handlers.get(event_type, ()))
+
+
+def record_event(db: AsyncSession, event_type: str, aggregate_type: str, aggregate_id: int,
+                 payload: Optional[Dict[str, Any]] = None) -> OutboxEvent:
+    """
+    Schreibt ein Domain-Event in den Outbox (ohne Commit)
+
+    Das Event wird mit der Transaktion des Aufrufers committet und erst danach
+    ausgeliefert.
+    """
+    now = datetime.utcnow()
+    outbox_event = OutboxEvent(
+        event_id=str(uuid.uuid4()),
+        event_type=event_type,
+        aggregate_type=aggregate_type,
+        aggregate_id=aggregate_id,
+        payload=json.dumps(payload or {}, default=str),
+        status=PENDING,
+        attempts=0,
+        max_attempts=settings.outbox_max_attempts,
+        available_at=now,
+        created_at=now
+    )
+    db.add(outbox_event)
+    db.info[_PENDING_KEY] = True
+    return outbox_event
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_after_commit(session):
+    """Weckt die Dispatcher, sobald neue Events committet sind"""
+    if session.info.pop(_PENDING_KEY, None):
+        outbox_dispatcher.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+class OutboxDispatcher:
+    """Liefert Outbox-Events an die registrierten Handler aus"""
+
+    def __init__(self, batch_size: int = 20, poll_interval: float = 2.0):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.running = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._maintenance: Optional[asyncio.Task] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._in_flight: Dict[int, asyncio.Task] = {}
+        self.stats = {"delivered": 0, "retried": 0, "dead": 0, "requeued": 0}
+
+    def notify(self):
+        """Weckt den lokalen Dispatcher und die der anderen Worker"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.create_task(broker.publish(OUTBOX_CHANNEL, self.worker_id))
+
+    async def start(self):
+        """Startet den Dispatcher"""
+        if self.running:
+            return
+        self.running = True
+        self._wakeup = asyncio.Event()
+        await self._requeue_stale_events()
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+        self._maintenance = asyncio.create_task(self._maintenance_loop())
+        self._listener = asyncio.create_task(self._listen_for_events())
+        logger.info(f"Outbox-Dispatcher gestartet (bis zu {self.batch_size} Events parallel)")
+
+    async def stop(self, timeout: float = 5.0):
+        """Stoppt den Dispatcher; laufende Auslieferungen erhalten `timeout` Sekunden"""
+        if not self.running:
+            return
+        self.running = False
+        for task in (self._dispatcher, self._maintenance, self._listener):
+            if task:
+                task.cancel()
+        if self._in_flight:
+            _, pending = await asyncio.wait(list(self._in_flight.values()), timeout=timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending, timeout=1.0)
+        logger.info("Outbox-Dispatcher gestoppt")
+
+    async def _dispatch_loop(self):
+        """Holt auslieferbare Events ab, solange Plätze frei sind; wartet sonst auf eine Nachricht"""
+        while self.running:
+            self._wakeup.clear()
+            free = self.batch_size - len(self._in_flight)
+            events = []
+            if free > 0:
+                try:
+                    events = await self._claim_batch(free)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Fehler beim Abholen von Outbox-Events: {e}")
+
+            if events:
+                for row in events:
+                    self._in_flight[row["id"]] = asyncio.create_task(self._deliver(row))
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim_batch(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Übernimmt je Aggregat das älteste offene Event, sofern es fällig ist
+
+        Ein früheres Event desselben Aggregats im Status pending/processing
+        blockiert (auch während es auf einen erneuten Versuch wartet).
+        """
+        now = datetime.utcnow()
+        earlier = aliased(OutboxEvent)
+        blocked = (
+            select(earlier.id)
+            .where(
+                earlier.aggregate_type == OutboxEvent.aggregate_type,
+                earlier.aggregate_id == OutboxEvent.aggregate_id,
+                earlier.id < OutboxEvent.id,
+                earlier.status.in_((PENDING, PROCESSING))
+            )
+            .exists()
+        )
+        async with database.AsyncSessionLocal() as db:
+            ids = (await db.execute(
+                select(OutboxEvent.id)
+                .where(OutboxEvent.status == PENDING, OutboxEvent.available_at <= now, ~blocked)
+                .order_by(OutboxEvent.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True, of=OutboxEvent)
+            )).scalars().all()
+            if not ids:
+                return []
+
+            rows = (await db.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_(ids), OutboxEvent.status == PENDING)
+                .values(status=PROCESSING, started_at=now, locked_by=self.worker_id,
+                        attempts=OutboxEvent.attempts + 1)
+                .returning(OutboxEvent.id, OutboxEvent.event_id, OutboxEvent.event_type,
+                           OutboxEvent.aggregate_type, OutboxEvent.aggregate_id, OutboxEvent.payload,
+                           OutboxEvent.attempts, OutboxEvent.max_attempts, OutboxEvent.handled,
+                           OutboxEvent.created_at)
+                .execution_options(synchronize_session=False)
+            )).mappings().all()
+            await db.commit()
+        return [dict(row) for row in rows]
+
+    async def _deliver(self, row: Dict[str, Any]):
+        """Ruft die noch offenen Handler eines Events nacheinander auf"""
+        domain_event = DomainEvent(
+            event_id=row["event_id"],
+            event_type=row["event_type"],
+            aggregate_type=row["aggregate_type"],
+            aggregate_id=row["aggregate_id"],
+            payload=json.loads(row["payload"] or "{}"),
+            created_at=row["created_at"],
+            attempt=row["attempts"]
+        )
+        handled = json.loads(row["handled"] or "[]")
+        try:
+            for name, handler in get_handlers(domain_event.event_type):
+                if name in handled:
+                    continue
+                async with database.AsyncSessionLocal() as db:
+                    await handler(db, domain_event)
+                    handled.append(name)
+                    # Vermerk in derselben Transaktion wie die Änderungen des Handlers
+                    result = await db.execute(
+                        update(OutboxEvent)
+                        .where(OutboxEvent.id == row["id"], OutboxEvent.locked_by == self.worker_id)
+                        .values(handled=json.dumps(handled))
+                        .execution_options(synchronize_session=False)
+                    )
+                    if not result.rowcount:
+                        # Übernahme verloren (als verwaist zurückgegeben): die Auslieferung
+                        # gehört jetzt einem anderen Versuch, Änderungen verwerfen
+                        await db.rollback()
+                        logger.warning(
+                            f"Outbox-Event {domain_event.event_type} {domain_event.event_id} nicht mehr "
+                            f"übernommen, Handler {name} verworfen"
+                        )
+                        return
+                    await db.commit()
+            await self._finish(row, DELIVERED)
+            self.stats["delivered"] += 1
+            logger.debug(f"Outbox-Event {domain_event.event_type} {domain_event.event_id} ausgeliefert")
+
+        except asyncio.CancelledError:
+            # Shutdown: Event ohne Anrechnung des Versuchs zurückgeben
+            await asyncio.shield(self._finish(row, PENDING, attempts=row["attempts"] - 1))
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if row["attempts"] < row["max_attempts"]:
+                delay = min(
+                    settings.outbox_retry_max_seconds,
+                    settings.outbox_retry_base_seconds * 2 ** (row["attempts"] - 1)
+                ) * random.uniform(0.8, 1.2)
+                await self._finish(row, PENDING, error=error, retry_in=delay)
+                self.stats["retried"] += 1
+                logger.warning(
+                    f"Outbox-Event {domain_event.event_type} {domain_event.event_id} fehlgeschlagen, "
+                    f"neuer Versuch in {delay:.1f}s: {error}"
+                )
+            else:
+                await self._finish(row, DEAD, error=error)
+                self.stats["dead"] += 1
+                logger.error(
+                    f"Outbox-Event {domain_event.event_type} {domain_event.event_id} nach "
+                    f"{row['attempts']} Versuchen aufgegeben: {error}"
+                )
+        finally:
+            self._in_flight.pop(row["id"], None)
+            # Platz frei, ggf. wartet das nächste Event desselben Aggregats
+            self._wakeup.set()
+
+    async def _finish(self, row: Dict[str, Any], status: str, error: Optional[str] = None,
+                      retry_in: float = 0, attempts: Optional[int] = None):
+        now = datetime.utcnow()
+        values: Dict[str, Any] = {"status": status, "locked_by": None, "last_error": error}
+        if status == PENDING:
+            values["available_at"] = now + timedelta(seconds=retry_in)
+        else:
+            values["processed_at"] = now
+        if attempts is not None:
+            values["attempts"] = attempts
+        try:
+            async with database.AsyncSessionLocal() as db:
+                # Nur die aktuelle Übernahme darf das Event abschließen
+                await db.execute(
+                    update(OutboxEvent)
+                    .where(OutboxEvent.id == row["id"], OutboxEvent.status == PROCESSING,
+                           OutboxEvent.locked_by == self.worker_id)
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Status von Outbox-Event {row['event_id']} konnte nicht gespeichert werden: {e}")
+
+    async def _requeue_stale_events(self) -> int:
+        """Gibt Events zurück, deren Auslieferung verwaist ist (Worker abgestürzt)"""
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=settings.outbox_stale_seconds)
+        conditions = [
+            OutboxEvent.status == PROCESSING,
+            (OutboxEvent.locked_by == self.worker_id) | (OutboxEvent.started_at < stale_before)
+        ]
+        if self._in_flight:
+            conditions.append(OutboxEvent.id.notin_(list(self._in_flight)))
+        async with database.AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(OutboxEvent)
+                .where(*conditions)
+                .values(status=PENDING, locked_by=None, available_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        requeued = result.rowcount or 0
+        if requeued:
+            self.stats["requeued"] += requeued
+            logger.warning(f"{requeued} verwaiste Outbox-Events zurückgegeben")
+        return requeued
+
+    async def cleanup_delivered_events(self) -> int:
+        """Löscht ausgelieferte Events nach der Aufbewahrungsfrist"""
+        cutoff = datetime.utcnow() - timedelta(days=settings.outbox_retention_days)
+        async with database.AsyncSessionLocal() as db:
+            result = await db.execute(
+                delete(OutboxEvent)
+                .where(OutboxEvent.status == DELIVERED, OutboxEvent.processed_at < cutoff)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        return result.rowcount or 0
+
+    async def _maintenance_loop(self):
+        """Gibt verwaiste Events zurück und räumt ausgelieferte auf"""
+        while self.running:
+            await asyncio.sleep(60)
+            try:
+                await self._requeue_stale_events()
+                await self.cleanup_delivered_events()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Fehler bei der Outbox-Wartung: {e}")
+
+    async def _listen_for_events(self):
+        """Weckt den Dispatcher, wenn ein anderer Worker Events committet hat"""
+        queue = broker.subscribe(OUTBOX_CHANNEL)
+        try:
+            while True:
+                await queue.get()
+                self._wakeup.set()
+        finally:
+            broker.unsubscribe(OUTBOX_CHANNEL, queue)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Events je Status, Alter des ältesten offenen Events und Zähler dieses Workers"""
+        async with database.AsyncSessionLocal() as db:
+            counts = dict((await db.execute(
+                select(OutboxEvent.status, func.count(OutboxEvent.id)).group_by(OutboxEvent.status)
+            )).all())
+            oldest = (await db.execute(
+                select(func.min(OutboxEvent.created_at)).where(OutboxEvent.status.in_((PENDING, PROCESSING)))
+            )).scalar()
+        return {
+            "worker": self.worker_id,
+            "running": self.running,
+            "in_flight": len(self._in_flight),
+            "status_counts": counts,
+            "oldest_open_seconds": (datetime.utcnow() - oldest).total_seconds() if oldest else None,
+            "handlers": {event_type: [name for name, _ in handlers] for event_type, handlers in _handlers.items()},
+            "worker_stats": dict(self.stats)
+        }
+
+
+outbox_dispatcher = OutboxDispatcher(
+    batch_size=settings.outbox_batch_size,
+    poll_interval=settings.outbox_poll_seconds
+)
+
+
+async def start_outbox_dispatcher():
+    """Startet den Outbox-Dispatcher (FastAPI startup event)"""
+    # Registriert die Handler der Domain-Events
+    from ..services import domain_events  # noqa: F401
+    if settings.outbox_enabled:
+        await outbox_dispatcher.start()
+
+
+async def stop_outbox_dispatcher():
+    """Stoppt den Outbox-Dispatcher (FastAPI shutdown event)"""
+    await outbox_dispatcher.stop()
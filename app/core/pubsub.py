@@ -0,0 +1,206 @@
+"""
+Leichtgewichtiger Publish/Subscribe-Broker für Push-Kanäle (SSE, WebSocket)
+
+- InProcessBroker: verteilt Nachrichten an Subscriber innerhalb eines Prozesses
+  (SQLite/Entwicklung, ein einzelner Worker)
+- PostgresBroker: verteilt zusätzlich über PostgreSQL LISTEN/NOTIFY an alle
+  Gunicorn-Worker, jeder Worker liefert dann lokal an seine Subscriber aus
+
+Nachrichten sind kurze Strings (i.d.R. JSON). Die Datenbank bleibt die Quelle
+der Wahrheit - verlorene Nachrichten werden von den Konsumenten über
+Resume-Mechanismen (z.B. Last-Event-ID) nachgeholt.
+"""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Dict, Optional, Set
+
+from .database import DATABASE_URL, IS_POSTGRESQL
+
+logger = logging.getLogger(__name__)
+
+# Sondernachricht: wird nach einem Reconnect an alle Subscriber verteilt,
+# damit diese verpasste Ereignisse aus der Datenbank nachladen
+RESYNC_MESSAGE = "__resync__"
+
+
+class InProcessBroker:
+    """Broker für einen einzelnen Prozess (Fallback ohne PostgreSQL)"""
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+
+    async def start(self):
+        """Startet den Broker (keine Verbindung nötig)"""
+        logger.info("In-Process-Broker gestartet")
+
+    async def stop(self):
+        """Stoppt den Broker"""
+        self._subscribers.clear()
+
+    def subscribe(self, channel: str) -> asyncio.Queue:
+        """Registriert einen neuen Subscriber und gibt dessen Queue zurück"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[channel].add(queue)
+        return queue
+
+    def unsubscribe(self, channel: str, queue: asyncio.Queue):
+        """Entfernt einen Subscriber"""
+        subscribers = self._subscribers.get(channel)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[channel]
+
+    def subscriber_count(self, channel: Optional[str] = None) -> int:
+        """Anzahl der Subscriber (gesamt oder für einen Kanal)"""
+        if channel is not None:
+            return len(self._subscribers.get(channel, ()))
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    async def publish(self, channel: str, message: str):
+        """Veröffentlicht eine Nachricht an alle Subscriber des Kanals"""
+        self._deliver(channel, message)
+
+    def _deliver(self, channel: str, message: str):
+        """Liefert eine Nachricht lokal aus, ohne zu blockieren"""
+        for queue in list(self._subscribers.get(channel, ())):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Langsamer Konsument: älteste Nachricht verwerfen und
+                # Resync signalisieren, der Konsument lädt aus der DB nach
+                try:
+                    queue.get_nowait()
+                    queue.put_nowait(RESYNC_MESSAGE)
+                except (asyncio.QueueEmpty, asyncio.QueueFull):
+                    pass
+
+    def _deliver_all(self, message: str):
+        """Liefert eine Nachricht an alle lokalen Subscriber aus"""
+        for channel in list(self._subscribers.keys()):
+            self._deliver(channel, message)
+
+
+class PostgresBroker(InProcessBroker):
+    """Broker mit Cross-Worker-Verteilung über PostgreSQL LISTEN/NOTIFY"""
+
+    PG_CHANNEL = "buildwise_events"
+    # PostgreSQL begrenzt NOTIFY-Payloads auf 8000 Bytes
+    MAX_PAYLOAD_BYTES = 7900
+
+    def __init__(self, dsn: str, queue_size: int = 100, reconnect_delay: float = 5.0):
+        super().__init__(queue_size=queue_size)
+        self.dsn = dsn
+        self.reconnect_delay = reconnect_delay
+        self._connection = None
+        self._lock = asyncio.Lock()
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._running = False
+
+    async def start(self):
+        """Baut die LISTEN-Verbindung auf"""
+        self._running = True
+        try:
+            await self._connect()
+            logger.info("PostgreSQL-Broker gestartet (LISTEN/NOTIFY)")
+        except Exception as e:
+            logger.warning(f"PostgreSQL-Broker konnte nicht verbinden, nur lokale Verteilung: {e}")
+            self._schedule_reconnect()
+
+    async def stop(self):
+        """Schliesst die LISTEN-Verbindung"""
+        self._running = False
+        if self._reconnect_task and not self._reconnect_task.done():
+            self._reconnect_task.cancel()
+        if self._connection is not None:
+            try:
+                await self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+        await super().stop()
+
+    async def publish(self, channel: str, message: str):
+        """Veröffentlicht über NOTIFY; fällt bei Fehlern auf lokale Auslieferung zurück"""
+        payload = json.dumps({"c": channel, "m": message}, separators=(",", ":"))
+        if len(payload.encode("utf-8")) > self.MAX_PAYLOAD_BYTES:
+            # Zu gross für NOTIFY: Konsumenten laden die Daten selbst nach
+            payload = json.dumps({"c": channel, "m": RESYNC_MESSAGE}, separators=(",", ":"))
+
+        if self._connection is None or self._connection.is_closed():
+            self._deliver(channel, message)
+            return
+
+        try:
+            async with self._lock:
+                await self._connection.execute("SELECT pg_notify($1, $2)", self.PG_CHANNEL, payload)
+        except Exception as e:
+            logger.warning(f"NOTIFY fehlgeschlagen, liefere nur lokal aus: {e}")
+            self._deliver(channel, message)
+            self._schedule_reconnect()
+
+    async def _connect(self):
+        import asyncpg
+
+        connection = await asyncpg.connect(self.dsn, ssl="require", timeout=10)
+        await connection.add_listener(self.PG_CHANNEL, self._on_notify)
+        connection.add_termination_listener(self._on_terminated)
+        self._connection = connection
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            data = json.loads(payload)
+            self._deliver(data["c"], data["m"])
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ungültige NOTIFY-Nachricht ignoriert: {e}")
+
+    def _on_terminated(self, connection):
+        if self._running:
+            logger.warning("LISTEN-Verbindung verloren, verbinde neu...")
+            self._connection = None
+            self._schedule_reconnect()
+
+    def _schedule_reconnect(self):
+        if not self._running:
+            return
+        if self._reconnect_task and not self._reconnect_task.done():
+            return
+        self._reconnect_task = asyncio.create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self):
+        while self._running:
+            await asyncio.sleep(self.reconnect_delay)
+            try:
+                await self._connect()
+                logger.info("LISTEN-Verbindung wiederhergestellt")
+                # Während der Unterbrechung könnten Ereignisse verpasst worden sein
+                self._deliver_all(RESYNC_MESSAGE)
+                return
+            except Exception as e:
+                logger.warning(f"Reconnect fehlgeschlagen: {e}")
+
+
+def _create_broker() -> InProcessBroker:
+    if IS_POSTGRESQL:
+        dsn = DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+        return PostgresBroker(dsn)
+    return InProcessBroker()
+
+
+# Globaler Broker (PostgreSQL in Production, In-Process bei SQLite)
+broker = _create_broker()
+
+
+async def start_broker():
+    """Startet den Broker (für FastAPI Startup Event)"""
+    await broker.start()
+
+
+async def stop_broker():
+    """Stoppt den Broker (für FastAPI Shutdown Event)"""
+    await broker.stop()
@@ -1,144 +1,362 @@
+import json
+import logging
+import math
+import threading
 import time
-import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import wraps
 from typing import Dict, Optional, Tuple
-from collections import defaultdict
+
+from fastapi import HTTPException, Request
+
 from .config import settings
+from .security import decode_access_token
+
+try:
+    from redis import asyncio as redis_asyncio
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis_asyncio = None
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RateLimitResult:
+    """Outcome of a single rate limit check."""
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # seconds until the next request would be allowed (0 if allowed)
+    reset_after: float  # seconds until the bucket is completely full again
+
+    def as_dict(self) -> Dict:
+        now = time.time()
+        return {
+            "limit_exceeded": not self.allowed,
+            "remaining": self.remaining,
+            "reset_time": now + self.reset_after,
+            "retry_after": self.retry_after,
+        }
+
+
+def _gcra_params(limit: int, window_seconds: float, burst: Optional[int]) -> Tuple[float, float]:
+    """Emission interval and delay tolerance for a limit of `limit` per `window_seconds`."""
+    emission_interval = window_seconds / limit
+    return emission_interval, emission_interval * (burst or limit)
+
+
+def _gcra_result(allowed: bool, limit: int, emission_interval: float, tolerance: float,
+                 tat_offset: float, retry_after: float) -> RateLimitResult:
+    # tat_offset: theoretical arrival time relative to now after this request
+    remaining = max(0, int((tolerance - tat_offset) / emission_interval)) if allowed else 0
+    return RateLimitResult(
+        allowed=allowed,
+        limit=limit,
+        remaining=min(limit, remaining),
+        retry_after=retry_after,
+        reset_after=max(0.0, tat_offset),
+    )
+
+
+class MemoryRateLimitBackend:
+    """
+    In-process GCRA (generic cell rate algorithm) backend.
+
+    Every key stores a single float (the theoretical arrival time), so a check
+    is O(1) regardless of the number of requests in the window. Keys are spread
+    over sharded dicts, each guarded by its own lock and kept in update order,
+    which lets idle keys be evicted from the head in amortized O(1).
+    """
+
+    def __init__(self, shards: int = 64, max_keys_per_shard: int = 10000):
+        self.max_keys_per_shard = max_keys_per_shard
+        self._shards = [OrderedDict() for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+
+    def _shard(self, key: str) -> int:
+        return hash(key) % len(self._shards)
+
+    def hit(self, key: str, limit: int, window_seconds: float, burst: Optional[int] = None,
+            now: Optional[float] = None) -> RateLimitResult:
+        emission_interval, tolerance = _gcra_params(limit, window_seconds, burst)
+        now = time.monotonic() if now is None else now
+        index = self._shard(key)
+        shard = self._shards[index]
+
+        with self._locks[index]:
+            tat = max(shard.get(key, now), now)
+            new_tat = tat + emission_interval
+            allow_at = new_tat - tolerance
+            if now < allow_at:
+                return _gcra_result(False, limit, emission_interval, tolerance, tat - now, allow_at - now)
+
+            shard[key] = new_tat
+            shard.move_to_end(key)
+            # Keys whose bucket is full again carry no state and can be dropped
+            while shard:
+                oldest_key, oldest_tat = next(iter(shard.items()))
+                if oldest_tat > now and len(shard) <= self.max_keys_per_shard:
+                    break
+                del shard[oldest_key]
+
+        return _gcra_result(True, limit, emission_interval, tolerance, new_tat - now, 0.0)
+
+    def peek(self, key: str, limit: int, window_seconds: float, burst: Optional[int] = None) -> RateLimitResult:
+        emission_interval, tolerance = _gcra_params(limit, window_seconds, burst)
+        now = time.monotonic()
+        index = self._shard(key)
+        with self._locks[index]:
+            tat = max(self._shards[index].get(key, now), now)
+        return _gcra_result(True, limit, emission_interval, tolerance, tat - now, 0.0)
+
+    def reset(self, key: str):
+        index = self._shard(key)
+        with self._locks[index]:
+            self._shards[index].pop(key, None)
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+
+# GCRA as a single atomic step on the Redis server (clock: Redis TIME, shared by all workers)
+_GCRA_LUA = """
+local emission_interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+local new_tat = tat + emission_interval
+local allow_at = new_tat - tolerance
+if now < allow_at then
+    return {0, tostring(tat - now), tostring(allow_at - now)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, tostring(new_tat - now), '0'}
+"""
+
+
+class RedisRateLimitBackend:
+    """
+    Redis GCRA backend shared by all workers.
+
+    Falls back to the in-memory backend while Redis is unreachable, so an
+    outage degrades to per-process limits instead of failing requests.
+    """
+
+    def __init__(self, url: str, fallback: MemoryRateLimitBackend, key_prefix: str = "ratelimit:"):
+        self.key_prefix = key_prefix
+        self.fallback = fallback
+        self._redis = redis_asyncio.from_url(url, decode_responses=True)
+        self._script = self._redis.register_script(_GCRA_LUA)
+        self._last_warning = 0.0
+
+    async def hit(self, key: str, limit: int, window_seconds: float, burst: Optional[int] = None) -> RateLimitResult:
+        emission_interval, tolerance = _gcra_params(limit, window_seconds, burst)
+        try:
+            allowed, tat_offset, retry_after = await self._script(
+                keys=[self.key_prefix + key], args=[emission_interval, tolerance]
+            )
+        except Exception as e:
+            if time.monotonic() - self._last_warning > 60:
+                self._last_warning = time.monotonic()
+                logger.warning(f"Redis rate limit backend unavailable, using in-memory fallback: {e}")
+            return self.fallback.hit(key, limit, window_seconds, burst)
+        return _gcra_result(
+            bool(allowed), limit, emission_interval, tolerance, float(tat_offset), float(retry_after)
+        )
+
+    async def reset(self, key: str):
+        try:
+            await self._redis.delete(self.key_prefix + key)
+        except Exception as e:
+            logger.warning(f"Redis rate limit reset failed: {e}")
+        self.fallback.reset(key)
+
+    async def close(self):
+        await self._redis.close()
+
 
 class RateLimiter:
-    """In-memory rate limiter for API protection."""
-    
-    def __init__(self):
-        self.requests: Dict[str, list] = defaultdict(list)
-        self.lock = asyncio.Lock()
-    
+    """Token bucket (GCRA) rate limiter with in-memory or Redis backend."""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.memory = MemoryRateLimitBackend()
+        self.redis: Optional[RedisRateLimitBackend] = None
+        if redis_url and REDIS_AVAILABLE:
+            self.redis = RedisRateLimitBackend(redis_url, fallback=self.memory)
+        elif redis_url:
+            logger.warning("REDIS_URL configured but redis package missing - rate limits are per process")
+
+    async def hit(self, key: str, limit: int, window_seconds: float, burst: Optional[int] = None) -> RateLimitResult:
+        """Consume one token for `key`."""
+        if self.redis is not None:
+            return await self.redis.hit(key, limit, window_seconds, burst)
+        return self.memory.hit(key, limit, window_seconds, burst)
+
     async def is_allowed(self, key: str, max_requests: int, window_seconds: int) -> Tuple[bool, Dict]:
         """Check if request is allowed based on rate limit."""
-        async with self.lock:
-            now = time.time()
-            window_start = now - window_seconds
-            
-            # Clean old requests
-            self.requests[key] = [req_time for req_time in self.requests[key] if req_time > window_start]
-            
-            # Check if limit exceeded
-            if len(self.requests[key]) >= max_requests:
-                return False, {
-                    "limit_exceeded": True,
-                    "remaining": 0,
-                    "reset_time": window_start + window_seconds,
-                    "current_requests": len(self.requests[key])
-                }
-            
-            # Add current request
-            self.requests[key].append(now)
-            
-            return True, {
-                "limit_exceeded": False,
-                "remaining": max_requests - len(self.requests[key]),
-                "reset_time": window_start + window_seconds,
-                "current_requests": len(self.requests[key])
-            }
-    
+        result = await self.hit(key, max_requests, window_seconds)
+        return result.allowed, result.as_dict()
+
     async def get_remaining(self, key: str, max_requests: int, window_seconds: int) -> Dict:
-        """Get remaining requests for a key."""
-        async with self.lock:
-            now = time.time()
-            window_start = now - window_seconds
-            
-            # Clean old requests
-            self.requests[key] = [req_time for req_time in self.requests[key] if req_time > window_start]
-            
-            return {
-                "remaining": max(0, max_requests - len(self.requests[key])),
-                "reset_time": window_start + window_seconds,
-                "current_requests": len(self.requests[key])
-            }
+        """Get remaining requests for a key (local view)."""
+        return self.memory.peek(key, max_requests, window_seconds).as_dict()
+
+    async def reset(self, key: str):
+        """Forget all state for a key."""
+        if self.redis is not None:
+            await self.redis.reset(key)
+        else:
+            self.memory.reset(key)
+
 
 # Global rate limiter instance
-rate_limiter = RateLimiter()
+rate_limiter = RateLimiter(settings.redis_url if settings.rate_limit_use_redis else None)
+
+
+def _client_ip(request: Request) -> str:
+    # Behind the proxy uvicorn already resolves X-Forwarded-For (forwarded_allow_ips)
+    return request.client.host if request.client else "unknown"
+
+
+def _request_user(request: Request) -> Optional[str]:
+    """User subject from the bearer token (signature-checked, no database lookup)."""
+    authorization = request.headers.get("authorization", "")
+    if not authorization.lower().startswith("bearer "):
+        return None
+    payload = decode_access_token(authorization[7:].strip())
+    if not payload:
+        return None
+    subject = payload.get("sub")
+    return str(subject) if subject else None
+
+
+def _rate_limit_headers(result: RateLimitResult) -> Dict[str, str]:
+    headers = {
+        "X-RateLimit-Limit": str(result.limit),
+        "X-RateLimit-Remaining": str(result.remaining),
+        "X-RateLimit-Reset": str(math.ceil(result.reset_after)),
+    }
+    if not result.allowed:
+        headers["Retry-After"] = str(max(1, math.ceil(result.retry_after)))
+    return headers
+
+
+class RateLimit:
+    """
+    FastAPI dependency enforcing a per-route policy.
+
+    Usage:
+        @router.post("/login", dependencies=[Depends(RateLimit(10, 60, scope="ip"))])
+
+    scope:
+        "ip"   - one bucket per client IP
+        "user" - one bucket per authenticated user (falls back to IP)
+    """
+
+    def __init__(self, limit: int, window_seconds: int = 60, burst: Optional[int] = None,
+                 scope: str = "user", name: Optional[str] = None):
+        if scope not in ("ip", "user"):
+            raise ValueError(f"Unknown rate limit scope: {scope}")
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.burst = burst
+        self.scope = scope
+        self.name = name
+
+    async def __call__(self, request: Request):
+        if not settings.rate_limit_enabled:
+            return
+
+        route = request.scope.get("route")
+        name = self.name or (getattr(route, "path", None) or request.url.path)
+        identity = None
+        if self.scope == "user":
+            user = _request_user(request)
+            identity = f"user:{user}" if user else None
+        if identity is None:
+            identity = f"ip:{_client_ip(request)}"
+
+        result = await rate_limiter.hit(f"{name}:{identity}", self.limit, self.window_seconds, self.burst)
+        if not result.allowed:
+            raise HTTPException(
+                status_code=429,
+                detail={
+                    "error": "Rate limit exceeded",
+                    "retry_after": max(1, math.ceil(result.retry_after))
+                },
+                headers=_rate_limit_headers(result)
+            )
+
 
 class RateLimitMiddleware:
-    """FastAPI middleware for rate limiting."""
-    
+    """FastAPI middleware for a global per-IP rate limit."""
+
     def __init__(self, app):
         self.app = app
-    
+
     async def __call__(self, scope, receive, send):
-        if scope["type"] != "http":
+        if scope["type"] != "http" or not settings.rate_limit_enabled:
             await self.app(scope, receive, send)
             return
-        
+
         # Get client IP
-        client_ip = scope.get("client", ("unknown", 0))[0]
-        
+        client_ip = (scope.get("client") or ("unknown", 0))[0]
+
         # Check rate limit
-        allowed, limit_info = await rate_limiter.is_allowed(
-            client_ip,
+        result = await rate_limiter.hit(
+            f"global:ip:{client_ip}",
             settings.rate_limit_requests_per_minute,
             60
         )
-        
-        if not allowed:
-            # Return rate limit exceeded response
-            response = {
+        headers = [(k.lower().encode(), v.encode()) for k, v in _rate_limit_headers(result).items()]
+
+        if not result.allowed:
+            await send({
                 "type": "http.response.start",
                 "status": 429,
-                "headers": [
-                    (b"content-type", b"application/json"),
-                    (b"x-ratelimit-remaining", str(limit_info["remaining"]).encode()),
-                    (b"x-ratelimit-reset", str(int(limit_info["reset_time"])).encode()),
-                ]
-            }
-            await send(response)
-            
-            body = {
-                "error": "Rate limit exceeded",
-                "message": "Too many requests. Please try again later.",
-                "retry_after": int(limit_info["reset_time"] - time.time())
-            }
-            
+                "headers": [(b"content-type", b"application/json")] + headers
+            })
             await send({
                 "type": "http.response.body",
-                "body": str(body).encode()
+                "body": json.dumps({
+                    "error": "Rate limit exceeded",
+                    "message": "Too many requests. Please try again later.",
+                    "retry_after": max(1, math.ceil(result.retry_after))
+                }).encode()
             })
             return
-        
-        # Add rate limit headers to response
-        original_send = send
-        
+
         async def send_with_headers(message):
             if message["type"] == "http.response.start":
-                message["headers"].extend([
-                    (b"x-ratelimit-remaining", str(limit_info["remaining"]).encode()),
-                    (b"x-ratelimit-reset", str(int(limit_info["reset_time"])).encode()),
-                ])
-            await original_send(message)
-        
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + headers
+            await send(message)
+
         await self.app(scope, receive, send_with_headers)
 
+
 def rate_limit(max_requests: int, window_seconds: int = 60):
-    """Decorator for rate limiting specific endpoints."""
+    """
+    Decorator for rate limiting specific endpoints.
+
+    The endpoint must accept a `request: Request` parameter; prefer
+    `dependencies=[Depends(RateLimit(...))]` for new routes.
+    """
+    policy = RateLimit(max_requests, window_seconds)
+
     def decorator(func):
+        @wraps(func)
         async def wrapper(*args, **kwargs):
-            # Get client identifier (IP or user ID)
-            client_id = "default"  # This should be extracted from request context
-            
-            allowed, limit_info = await rate_limiter.is_allowed(
-                f"{func.__name__}:{client_id}",
-                max_requests,
-                window_seconds
-            )
-            
-            if not allowed:
-                from fastapi import HTTPException
-                raise HTTPException(
-                    status_code=429,
-                    detail={
-                        "error": "Rate limit exceeded",
-                        "retry_after": int(limit_info["reset_time"] - time.time())
-                    }
-                )
-            
+            request = kwargs.get("request") or next((a for a in args if isinstance(a, Request)), None)
+            if request is not None:
+                await policy(request)
             return await func(*args, **kwargs)
         return wrapper
-    return decorator 
\ No newline at end of file
+    return decorator
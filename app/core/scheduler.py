@@ -1,181 +1,542 @@
+"""
+Job-Scheduler für periodische Hintergrundaufgaben
+
+- Läuft in jedem Worker, Jobs führt aber nur der Leader aus: PostgreSQL
+  Advisory-Lock auf einer eigenen Verbindung bzw. Datei-Lock bei SQLite.
+  Stirbt der Leader, gibt die Datenbank/das Betriebssystem den Lock frei und
+  ein anderer Worker übernimmt beim nächsten Versuch.
+- Zustand pro Job in der Tabelle scheduled_jobs (letzter/nächster Lauf,
+  Status, Dauer). Fällige Jobs werden vor dem Start per bedingtem UPDATE
+  beansprucht, sodass ein Job auch bei einem Leader-Wechsel nicht doppelt läuft.
+- Verpasste Läufe (Neustart, Deployment) werden einmal nachgeholt, danach
+  geht es mit dem regulären Zeitplan weiter.
+- Jeder Job hat ein Timeout; fehlgeschlagene Läufe werden nach retry_seconds
+  wiederholt.
+"""
+
 import asyncio
 import logging
-from datetime import datetime, time
-from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
+import os
+import socket
+import time as time_module
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
-from ..core.database import get_db
+from sqlalchemy import or_, select, update
+
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal, DATABASE_URL, IS_POSTGRESQL, get_db
+from ..models.project import Project
+from ..models.scheduled_job import ScheduledJob
 from ..services.credit_service import CreditService
 from ..services.geo_service import geo_service
-from ..models.project import Project
-from sqlalchemy import select
+from ..services.gdpr_service import GDPRService
+from ..services.retention_service import RetentionService
 
 logger = logging.getLogger(__name__)
 
 
-class CreditScheduler:
-    """Scheduler für tägliche Credit-Abzüge"""
-    
+class FileLeaderLock:
+    """Leader-Lock über eine exklusiv gesperrte Datei (SQLite, ein Host)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    async def acquire(self) -> bool:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        lock_file = open(self.path, "a+")
+        try:
+            try:
+                import fcntl
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except ImportError:
+                import msvcrt
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    async def is_held(self) -> bool:
+        return self._file is not None
+
+    async def release(self):
+        if self._file is not None:
+            # Schliessen gibt den Lock frei
+            self._file.close()
+            self._file = None
+
+
+class PostgresLeaderLock:
+    """Leader-Lock über pg_try_advisory_lock auf einer dauerhaft offenen Verbindung"""
+
+    def __init__(self, dsn: str, key: int):
+        self.dsn = dsn
+        self.key = key
+        self._connection = None
+
+    async def acquire(self) -> bool:
+        import asyncpg
+
+        connection = await asyncpg.connect(self.dsn, ssl="require", timeout=10)
+        try:
+            acquired = await connection.fetchval("SELECT pg_try_advisory_lock($1)", self.key)
+        except Exception:
+            await connection.close()
+            raise
+        if not acquired:
+            await connection.close()
+            return False
+        self._connection = connection
+        return True
+
+    async def is_held(self) -> bool:
+        """Der Lock gilt, solange die Verbindung lebt"""
+        if self._connection is None or self._connection.is_closed():
+            self._connection = None
+            return False
+        try:
+            await self._connection.fetchval("SELECT 1", timeout=10)
+            return True
+        except Exception as e:
+            logger.warning(f"Scheduler: Leader-Verbindung verloren: {e}")
+            await self.release()
+            return False
+
+    async def release(self):
+        connection, self._connection = self._connection, None
+        if connection is None:
+            return
+        try:
+            if not connection.is_closed():
+                await connection.execute("SELECT pg_advisory_unlock($1)", self.key)
+                await connection.close()
+        except Exception:
+            connection.terminate()
+
+
+def _create_leader_lock():
+    if IS_POSTGRESQL:
+        dsn = DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+        return PostgresLeaderLock(dsn, settings.scheduler_advisory_lock_id)
+    return FileLeaderLock(settings.scheduler_lock_file)
+
+
+@dataclass
+class Job:
+    """Ein periodischer Job: fester Abstand (interval) oder täglich zu einer Uhrzeit (daily_at, lokale Zeit)"""
+    name: str
+    func: Callable[[], Awaitable[Any]]
+    interval: Optional[timedelta] = None
+    daily_at: Optional[time] = None
+    timeout_seconds: float = 1800
+    retry_seconds: float = 3600
+
+    @property
+    def schedule(self) -> str:
+        if self.daily_at is not None:
+            return f"daily {self.daily_at.strftime('%H:%M')}"
+        return f"every {int(self.interval.total_seconds())}s"
+
+    def next_run_after(self, moment: datetime) -> datetime:
+        """Nächster regulärer Lauf nach `moment` (beides naive UTC)"""
+        if self.daily_at is None:
+            return moment + self.interval
+        local = moment.replace(tzinfo=timezone.utc).astimezone()
+        candidate = datetime.combine(local.date(), self.daily_at, tzinfo=local.tzinfo)
+        if candidate <= local:
+            candidate += timedelta(days=1)
+        return candidate.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _summarize(result: Any) -> Optional[str]:
+    """Kurzfassung eines Job-Ergebnisses für scheduled_jobs.last_result"""
+    if result is None:
+        return None
+    return str(result)[:2000]
+
+
+class JobScheduler:
+    """Führt registrierte Jobs aus, sofern dieser Worker der Leader ist"""
+
     def __init__(self):
+        self.jobs: Dict[str, Job] = {}
         self.is_running = False
+        self.is_leader = False
         self.task: Optional[asyncio.Task] = None
-    
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._leader_lock = None
+
+    def register(self, name: str, func: Callable[[], Awaitable[Any]], *,
+                 interval: Optional[timedelta] = None, daily_at: Optional[time] = None,
+                 timeout_seconds: float = 1800, retry_seconds: float = 3600):
+        """Registriert einen Job (genau eins von interval/daily_at)"""
+        if (interval is None) == (daily_at is None):
+            raise ValueError(f"Job {name}: genau eins von interval/daily_at angeben")
+        self.jobs[name] = Job(name, func, interval, daily_at, timeout_seconds, retry_seconds)
+
     async def start(self):
         """Startet den Scheduler"""
         if self.is_running:
-            logger.warning("Credit-Scheduler läuft bereits")
+            logger.warning("Scheduler läuft bereits")
             return
-        
+        if not settings.scheduler_enabled:
+            logger.info("Scheduler deaktiviert (SCHEDULER_ENABLED=false)")
+            return
+
         self.is_running = True
+        self._leader_lock = _create_leader_lock()
         self.task = asyncio.create_task(self._run_scheduler())
-        logger.info("Credit-Scheduler gestartet")
-    
+        logger.info(f"Scheduler gestartet ({len(self.jobs)} Jobs, Worker {self.worker_id})")
+
     async def stop(self):
-        """Stoppt den Scheduler mit verbesserter Fehlerbehandlung"""
+        """Stoppt den Scheduler und gibt den Leader-Lock frei"""
         if not self.is_running:
-            logger.info("Credit-Scheduler war bereits gestoppt")
+            logger.info("Scheduler war bereits gestoppt")
             return
-        
-        logger.info("Stoppe Credit-Scheduler...")
+
+        logger.info("Stoppe Scheduler...")
         self.is_running = False
-        
+
         if self.task and not self.task.done():
-            logger.info("Cancelling Scheduler-Task...")
             self.task.cancel()
-            
             try:
-                # Warte auf Task-Completion mit Timeout
                 await asyncio.wait_for(self.task, timeout=3.0)
-                logger.info("Scheduler-Task erfolgreich beendet")
             except asyncio.CancelledError:
                 logger.info("Scheduler-Task wurde abgebrochen (erwartet)")
             except asyncio.TimeoutError:
                 logger.warning("Scheduler-Task Shutdown-Timeout erreicht")
             except Exception as e:
                 logger.warning(f"Unerwarteter Fehler beim Scheduler-Shutdown: {e}")
-        
-        logger.info("Credit-Scheduler gestoppt")
-    
+
+        await self._release_leadership()
+        logger.info("Scheduler gestoppt")
+
     async def _run_scheduler(self):
-        """Hauptschleife des Schedulers mit verbesserter Cancellation-Behandlung"""
+        """Hauptschleife: Leader werden/bleiben, fällige Jobs ausführen, schlafen"""
         try:
             while self.is_running:
                 try:
-                    # Warte bis zur nächsten Ausführungszeit (täglich um 02:00 Uhr)
-                    now = datetime.now()
-                    next_run = now.replace(hour=2, minute=0, second=0, microsecond=0)
-                    
-                    if now >= next_run:
-                        next_run = next_run.replace(day=next_run.day + 1)
-                    
-                    wait_seconds = (next_run - now).total_seconds()
-                    logger.info(f"Nächste Credit-Abzug-Ausführung: {next_run} (in {wait_seconds:.0f} Sekunden)")
-                    
-                    # Verwende asyncio.sleep mit regelmäßiger Prüfung auf Cancellation
-                    await asyncio.sleep(min(wait_seconds, 300))  # Max 5 Minuten Sleep
-                    
-                    # Prüfe ob wir noch laufen sollen (nach dem Sleep)
-                    if not self.is_running:
-                        logger.info("Scheduler wurde gestoppt während Sleep")
-                        break
-                    
-                    # Führe tägliche Credit-Abzüge aus
-                    await self._process_daily_deductions()
-
-                    # Ergänzung: Periodisches Geocoding-Update für Projekte ohne Koordinaten
-                    await self._update_project_geocoding_batch()
-                    
+                    if not await self._ensure_leader():
+                        await asyncio.sleep(settings.scheduler_leader_retry_seconds)
+                        continue
+                    delay = await self._run_due_jobs()
+                    await asyncio.sleep(delay)
                 except asyncio.CancelledError:
-                    logger.info("Credit-Scheduler wurde abgebrochen")
-                    break
+                    raise
                 except Exception as e:
-                    if self.is_running:  # Nur loggen wenn wir noch laufen sollen
-                        logger.error(f"Fehler im Credit-Scheduler: {e}")
-                        # Warte 1 Stunde bei Fehlern, aber prüfe regelmäßig ob wir stoppen sollen
-                        for _ in range(360):  # 360 * 10 = 3600 Sekunden = 1 Stunde
-                            if not self.is_running:
-                                break
-                            try:
-                                await asyncio.sleep(10)
-                            except asyncio.CancelledError:
-                                logger.info("Scheduler wurde während Fehler-Wartezeit abgebrochen")
-                                break
-                    else:
-                        break
+                    logger.error(f"Fehler im Scheduler: {e}")
+                    await asyncio.sleep(settings.scheduler_leader_retry_seconds)
         except asyncio.CancelledError:
-            logger.info("Credit-Scheduler Hauptschleife wurde abgebrochen")
-        except Exception as e:
-            logger.error(f"Unerwarteter Fehler in Credit-Scheduler Hauptschleife: {e}")
+            logger.info("Scheduler-Hauptschleife wurde abgebrochen")
         finally:
-            logger.info("Credit-Scheduler Hauptschleife beendet")
-    
-    async def _process_daily_deductions(self):
-        """Verarbeitet tägliche Credit-Abzüge"""
+            await self._release_leadership()
+            logger.info("Scheduler-Hauptschleife beendet")
+
+    async def _ensure_leader(self) -> bool:
+        """Prüft den gehaltenen Lock bzw. versucht, Leader zu werden"""
+        if self.is_leader:
+            if await self._leader_lock.is_held():
+                return True
+            self.is_leader = False
+            logger.warning("Scheduler: Leader-Rolle verloren")
+
         try:
-            logger.info("Starte tägliche Credit-Abzüge...")
-            
-            # Erstelle neue Datenbank-Session
-            async for db in get_db():
-                try:
-                    result = await CreditService.process_all_daily_deductions(db)
-                    
-                    logger.info(
-                        f"Tägliche Credit-Abzüge abgeschlossen: "
-                        f"{result['processed_users']} User verarbeitet, "
-                        f"{result['downgraded_users']} downgraded"
-                    )
-                    
-                except Exception as e:
-                    logger.error(f"Fehler bei täglichen Credit-Abzügen: {e}")
-                finally:
-                    await db.close()
-                    
+            acquired = await self._leader_lock.acquire()
         except Exception as e:
-            logger.error(f"Fehler beim Verarbeiten der täglichen Credit-Abzüge: {e}")
+            logger.warning(f"Scheduler: Leader-Lock nicht erreichbar: {e}")
+            return False
+        if not acquired:
+            return False
+
+        self.is_leader = True
+        logger.info(f"Scheduler: Worker {self.worker_id} ist Leader")
+        await self._sync_jobs()
+        return True
+
+    async def _release_leadership(self):
+        if self._leader_lock is not None:
+            try:
+                await self._leader_lock.release()
+            except Exception as e:
+                logger.warning(f"Scheduler: Freigabe des Leader-Locks fehlgeschlagen: {e}")
+        self.is_leader = False
 
-    async def _update_project_geocoding_batch(self):
-        """Aktualisiert Geocoding-Daten für Projekte ohne gespeicherte Koordinaten.
-        Läuft täglich im Scheduler nach den Credit-Abzügen.
+    async def _sync_jobs(self):
+        """Legt fehlende Zeilen in scheduled_jobs an und übernimmt geänderte Zeitpläne"""
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(ScheduledJob).where(ScheduledJob.name.in_(list(self.jobs))))
+            rows = {row.name: row for row in result.scalars().all()}
+            for job in self.jobs.values():
+                row = rows.get(job.name)
+                if row is None:
+                    # Neuer Job: sofort fällig (alle Jobs sind idempotent)
+                    db.add(ScheduledJob(name=job.name, schedule=job.schedule, next_run_at=now,
+                                        run_count=0, failure_count=0))
+                elif row.schedule != job.schedule:
+                    row.schedule = job.schedule
+                    row.next_run_at = job.next_run_after(now)
+                elif row.next_run_at is not None and row.next_run_at < now:
+                    logger.info(f"Scheduler: verpasster Lauf von {job.name} ({row.next_run_at} UTC) wird nachgeholt")
+            await db.commit()
+
+    async def _run_due_jobs(self) -> float:
+        """Führt alle fälligen Jobs nacheinander aus; gibt die Wartezeit bis zur nächsten Prüfung zurück"""
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(ScheduledJob.name, ScheduledJob.next_run_at)
+                .where(ScheduledJob.name.in_(list(self.jobs)))
+            )
+            schedule = result.all()
+
+        due = sorted(
+            (row for row in schedule if row.next_run_at is None or row.next_run_at <= now),
+            key=lambda row: row.next_run_at or now
+        )
+        for row in due:
+            if not self.is_running or not await self._leader_lock.is_held():
+                return 0
+            await self.run_job(row.name)
+        if due:
+            return 0
+
+        upcoming = [row.next_run_at for row in schedule if row.next_run_at is not None]
+        delay = settings.scheduler_poll_seconds
+        if upcoming:
+            delay = min(delay, (min(upcoming) - now).total_seconds())
+        return max(1.0, delay)
+
+    async def _claim(self, job: Job, now: datetime, force: bool) -> bool:
+        """Beansprucht einen fälligen Job atomar (scheitert, wenn ein anderer Worker ihn ausführt)"""
+        conditions = [
+            ScheduledJob.name == job.name,
+            or_(
+                ScheduledJob.running_since.is_(None),
+                ScheduledJob.running_since < now - timedelta(seconds=job.timeout_seconds + 60)
+            )
+        ]
+        if not force:
+            conditions.append(or_(ScheduledJob.next_run_at.is_(None), ScheduledJob.next_run_at <= now))
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(ScheduledJob).where(*conditions)
+                .values(running_since=now, locked_by=self.worker_id, last_run_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            return result.rowcount == 1
+
+    async def run_job(self, name: str, force: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Führt einen Job aus und speichert das Ergebnis in scheduled_jobs
+
+        force=True startet den Job auch vor seiner Fälligkeit (Admin/Tests).
+        Gibt None zurück, wenn der Job gerade anderswo läuft bzw. nicht fällig ist.
         """
+        job = self.jobs[name]
+        now = datetime.utcnow()
+        if not await self._claim(job, now, force):
+            return None
+
+        logger.info(f"Scheduler: starte {job.name}")
+        started = time_module.monotonic()
+        status, error, summary = "success", None, None
         try:
-            logger.info("Starte tägliches Projekt-Geocoding-Update (Batch)...")
-            async for db in get_db():
-                try:
-                    # Wähle eine überschaubare Menge pro Lauf, z. B. 100 Projekte ohne Koordinaten
-                    result = await db.execute(
-                        select(Project).where(
-                            (getattr(Project, 'address_latitude') == None) |
-                            (getattr(Project, 'address_longitude') == None)
-                        ).limit(100)
-                    )
-                    projects = result.scalars().all()
-
-                    updated = 0
-                    for project in projects:
-                        if await geo_service.update_project_geocoding(db, project.id):
-                            updated += 1
-
-                    logger.info(f"Projekt-Geocoding-Update abgeschlossen: {updated} Projekte aktualisiert")
-                except Exception as e:
-                    logger.error(f"Fehler beim Projekt-Geocoding-Update: {e}")
-                finally:
-                    await db.close()
+            summary = _summarize(await asyncio.wait_for(job.func(), timeout=job.timeout_seconds))
+        except asyncio.TimeoutError:
+            status, error = "timeout", f"Abbruch nach {job.timeout_seconds:g}s"
+        except asyncio.CancelledError:
+            # Shutdown: running_since läuft ab, der nächste Leader wiederholt den Lauf
+            raise
         except Exception as e:
-            logger.error(f"Fehler im Geocoding-Batch: {e}")
+            status, error = "failed", f"{type(e).__name__}: {e}"[:2000]
+        duration = time_module.monotonic() - started
+
+        finished = datetime.utcnow()
+        next_run_at = job.next_run_after(finished)
+        if status != "success":
+            next_run_at = min(next_run_at, finished + timedelta(seconds=job.retry_seconds))
+            logger.error(f"Scheduler: {job.name} {status} nach {duration:.1f}s: {error}")
+        else:
+            logger.info(f"Scheduler: {job.name} abgeschlossen in {duration:.1f}s ({summary})")
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(ScheduledJob).where(ScheduledJob.name == job.name)
+                .values(
+                    running_since=None,
+                    locked_by=None,
+                    last_finished_at=finished,
+                    last_status=status,
+                    last_error=error,
+                    last_result=summary,
+                    last_duration_seconds=duration,
+                    run_count=ScheduledJob.run_count + 1,
+                    failure_count=ScheduledJob.failure_count + (0 if status == "success" else 1),
+                    next_run_at=next_run_at,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        return {"job": job.name, "status": status, "error": error, "result": summary, "duration": duration}
+
+    async def get_status(self) -> List[Dict[str, Any]]:
+        """Zustand aller Jobs (für Monitoring/Admin)"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(ScheduledJob).order_by(ScheduledJob.name))
+            return [
+                {
+                    "name": row.name,
+                    "schedule": row.schedule,
+                    "next_run_at": row.next_run_at,
+                    "last_run_at": row.last_run_at,
+                    "last_status": row.last_status,
+                    "last_error": row.last_error,
+                    "last_duration_seconds": row.last_duration_seconds,
+                    "running_since": row.running_since,
+                    "locked_by": row.locked_by,
+                }
+                for row in result.scalars().all()
+            ]
+
+
+# --- Jobs ---------------------------------------------------------------
+
+async def process_daily_deductions_job() -> Dict[str, int]:
+    """Tägliche Credit-Abzüge (pro User höchstens einmal pro Tag)"""
+    async with AsyncSessionLocal() as db:
+        return await CreditService.process_all_daily_deductions(db)
+
+
+async def update_project_geocoding_job() -> int:
+    """Geocoding für bis zu 100 Projekte ohne gespeicherte Koordinaten"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Project.id).where(
+                (Project.address_latitude == None) | (Project.address_longitude == None)
+            ).limit(100)
+        )
+        updated = 0
+        for project_id in result.scalars().all():
+            if await geo_service.update_project_geocoding(db, project_id):
+                updated += 1
+        return updated
+
+
+async def run_retention_job() -> Dict[str, int]:
+    """Löscht/archiviert abgelaufene Zeilen und anonymisiert abgelaufene Benutzer"""
+    if not settings.retention_enabled:
+        return {"deleted": 0, "anonymized": 0}
+    results = await RetentionService.run_all()
+    async with AsyncSessionLocal() as db:
+        anonymized = await GDPRService.cleanup_expired_data(db)
+    return {"deleted": sum(r["deleted"] for r in results), "anonymized": anonymized}
+
+
+async def update_overdue_invoices_job() -> int:
+    """Markiert überfällige Rechnungen"""
+    from ..services.invoice_service import InvoiceService
+
+    async with AsyncSessionLocal() as db:
+        return await InvoiceService.update_overdue_invoices(db)
+
 
+async def check_overdue_fees_job() -> dict:
+    """Markiert überfällige BuildWise-Gebühren"""
+    from ..services.buildwise_fee_service import BuildWiseFeeService
 
-# Globaler Scheduler-Instance
-credit_scheduler = CreditScheduler()
+    async with AsyncSessionLocal() as db:
+        return await BuildWiseFeeService.check_overdue_fees(db)
+
+
+async def archive_completed_tasks_job() -> int:
+    """Archiviert Tasks, die seit 14 Tagen erledigt sind"""
+    from ..services.task_archiving_service import archive_completed_tasks
+
+    async with AsyncSessionLocal() as db:
+        return await archive_completed_tasks(db)
+
+
+async def renew_calendar_webhooks_job():
+    """Erneuert Kalender-Webhooks, die in den nächsten 24 Stunden ablaufen"""
+    from ..services.calendar_webhook_service import calendar_webhook_service
+
+    async with AsyncSessionLocal() as db:
+        return await calendar_webhook_service.renew_expiring_webhooks(db)
+
+
+async def cleanup_pdf_cache_job() -> int:
+    """Löscht PDF-Cache-Einträge, die seit pdf_cache_ttl_days nicht benutzt wurden"""
+    from ..services.pdf_render_service import pdf_renderer
+
+    return await asyncio.to_thread(pdf_renderer.cleanup_cache)
+
+
+async def create_monthly_fee_invoices_job() -> dict:
+    """Sammelrechnungen des Vormonats (setzt einen abgebrochenen Lauf fort, sonst no-op)"""
+    from ..services.monthly_invoice_service import MonthlyInvoiceService
+
+    last_month = datetime.utcnow().date().replace(day=1) - timedelta(days=1)
+    return await MonthlyInvoiceService.create_monthly_invoices(last_month.month, last_month.year)
+
+
+async def reconcile_finance_rollups_job() -> dict:
+    """Gleicht das Finanz-Rollup mit den Ausgaben, Kostenpositionen, Rechnungen und Gebühren ab"""
+    from ..services.finance_rollup_service import reconcile_finance_rollups
+
+    return await reconcile_finance_rollups()
+
+
+async def snapshot_resource_kpis_job() -> dict:
+    """Schreibt die KPI-Momentaufnahmen des Vortags (und ausgefallener Tage) für alle Dienstleister"""
+    from ..services.resource_kpi_service import snapshot_resource_kpis
+
+    return await snapshot_resource_kpis()
+
+
+# Globaler Scheduler (alle Worker registrieren dieselben Jobs, nur der Leader führt sie aus)
+job_scheduler = JobScheduler()
+job_scheduler.register("daily_credit_deductions", process_daily_deductions_job,
+                       daily_at=time(2, 0), timeout_seconds=1800)
+job_scheduler.register("project_geocoding", update_project_geocoding_job,
+                       daily_at=time(2, 30), timeout_seconds=900)
+job_scheduler.register("retention", run_retention_job,
+                       daily_at=time(3, 0), timeout_seconds=3600)
+job_scheduler.register("task_archiving", archive_completed_tasks_job,
+                       daily_at=time(3, 30), timeout_seconds=600)
+job_scheduler.register("pdf_cache_cleanup", cleanup_pdf_cache_job,
+                       daily_at=time(3, 45), timeout_seconds=600)
+job_scheduler.register("monthly_fee_invoices", create_monthly_fee_invoices_job,
+                       daily_at=time(4, 15), timeout_seconds=3600, retry_seconds=1800)
+job_scheduler.register("finance_rollup_reconciliation", reconcile_finance_rollups_job,
+                       daily_at=time(4, 30), timeout_seconds=1800)
+job_scheduler.register("resource_kpi_snapshots", snapshot_resource_kpis_job,
+                       daily_at=time(0, 15), timeout_seconds=1800, retry_seconds=1800)
+job_scheduler.register("overdue_invoices", update_overdue_invoices_job,
+                       interval=timedelta(hours=1), timeout_seconds=300, retry_seconds=900)
+job_scheduler.register("overdue_fees", check_overdue_fees_job,
+                       interval=timedelta(hours=1), timeout_seconds=300, retry_seconds=900)
+job_scheduler.register("calendar_webhook_renewal", renew_calendar_webhooks_job,
+                       interval=timedelta(hours=6), timeout_seconds=600, retry_seconds=1800)
+
+# Bisheriger Name
+credit_scheduler = job_scheduler
 
 
 async def start_credit_scheduler():
-    """Startet den Credit-Scheduler (für FastAPI Startup Event)"""
-    await credit_scheduler.start()
+    """Startet den Scheduler (für FastAPI Startup Event)"""
+    await job_scheduler.start()
 
 
 async def stop_credit_scheduler():
-    """Stoppt den Credit-Scheduler (für FastAPI Shutdown Event)"""
-    await credit_scheduler.stop()
+    """Stoppt den Scheduler (für FastAPI Shutdown Event)"""
+    await job_scheduler.stop()
 
 
 # Manuelle Ausführung für Tests
@@ -183,25 +544,25 @@ async def run_daily_deductions_manual():
     """Manuelle Ausführung der täglichen Credit-Abzüge (für Tests/Admin)"""
     try:
         logger.info("Manuelle Ausführung der täglichen Credit-Abzüge...")
-        
+
         async for db in get_db():
             try:
                 result = await CreditService.process_all_daily_deductions(db)
-                
+
                 logger.info(
                     f"Manuelle Credit-Abzüge abgeschlossen: "
                     f"{result['processed_users']} User verarbeitet, "
                     f"{result['downgraded_users']} downgraded"
                 )
-                
+
                 return result
-                
+
             except Exception as e:
                 logger.error(f"Fehler bei manuellen Credit-Abzügen: {e}")
                 raise
             finally:
                 await db.close()
-                
+
     except Exception as e:
         logger.error(f"Fehler bei manueller Ausführung der Credit-Abzüge: {e}")
-        raise 
\ No newline at end of file
+        raise
@@ -1,5 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import partial
+from typing import Any, Callable, Optional
+import asyncio
 import hashlib
 
 from jose import JWTError, jwt
@@ -12,6 +15,22 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 oauth2_scheme_name = "Bearer"
 
+# Eigener Thread-Pool für CPU-lastige Kryptografie (bcrypt gibt den GIL frei),
+# damit Logins den Event-Loop nicht blockieren
+_crypto_executor = ThreadPoolExecutor(
+    max_workers=settings.crypto_max_workers,
+    thread_name_prefix="crypto"
+)
+# Begrenzt laufende + wartende Operationen; weitere Aufrufer warten asynchron
+_crypto_semaphore = asyncio.Semaphore(settings.crypto_max_concurrency)
+
+
+async def run_in_crypto_executor(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Führt eine blockierende Krypto-Funktion im Krypto-Thread-Pool aus"""
+    async with _crypto_semaphore:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_crypto_executor, partial(func, *args, **kwargs))
+
 
 def verify_password_simple(plain_password: str, hashed_password: str) -> bool:
     """Einfache SHA256-Passwort-Verifikation für Dienstleister-Login"""
@@ -36,6 +55,16 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password ohne Blockieren des Event-Loops"""
+    return await run_in_crypto_executor(verify_password, plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    """get_password_hash ohne Blockieren des Event-Loops"""
+    return await run_in_crypto_executor(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[int] = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(
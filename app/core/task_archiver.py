@@ -1,6 +1,7 @@
 """
-Background Task für automatische Archivierung von completed Tasks
-Läuft täglich und archiviert Tasks die seit 14 Tagen completed sind
+Manuelle Archivierung von completed Tasks
+Die tägliche Ausführung übernimmt der Job "task_archiving" in app/core/scheduler.py
+(nur auf dem Leader-Worker); dieses Modul dient nur noch dem manuellen Aufruf.
 """
 
 import asyncio
@@ -34,33 +35,6 @@ async def run_task_archiver():
         return 0
 
 
-async def schedule_task_archiver():
-    """Plane die tägliche Ausführung der Task-Archivierung"""
-    while True:
-        try:
-            # Führe Archivierung aus
-            await run_task_archiver()
-            
-            # Warte 24 Stunden bis zur nächsten Ausführung
-            await asyncio.sleep(24 * 60 * 60)  # 24 Stunden
-            
-        except Exception as e:
-            logger.error(f"[ERROR] Fehler im Task-Archiver Scheduler: {e}")
-            # Warte 1 Stunde bei Fehler, dann versuche es erneut
-            await asyncio.sleep(60 * 60)
-
-
-def start_task_archiver_background():
-    """Starte den Task-Archiver als Background-Task"""
-    logger.info("[INFO] Starte Task-Archiver Background-Service...")
-    
-    # Erstelle und starte den Background-Task
-    loop = asyncio.get_event_loop()
-    loop.create_task(schedule_task_archiver())
-    
-    logger.info("[SUCCESS] Task-Archiver Background-Service gestartet")
-
-
 if __name__ == "__main__":
     # Für manuellen Test
     import sys
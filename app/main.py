@@ -375,6 +375,54 @@ async def on_startup():
     except Exception as e:
         print(f"[WARNING] Database optimizations failed: {e}")
     
+    # Start Push-Broker für Benachrichtigungs-Streams
+    try:
+        from .core.pubsub import start_broker
+        await start_broker()
+        print("[SUCCESS] Push-Broker started")
+        
+        from .services.notification_stats_cache import run_stats_invalidation_listener
+        app.state.stats_invalidation_task = asyncio.create_task(run_stats_invalidation_listener())
+        
+        from .services.identity_cache import run_identity_invalidation_listener
+        app.state.identity_invalidation_task = asyncio.create_task(run_identity_invalidation_listener())
+    except Exception as e:
+        print(f"[ERROR] Failed to start Push-Broker: {e}")
+    
+    # Cache (Redis als zweite Ebene, sofern konfiguriert) und Tag-Invalidierung
+    try:
+        from .core.cache import cache_service, run_tag_invalidation_listener
+        from .services import cache_invalidation  # registriert die SQLAlchemy-Events
+        from .services import finance_rollup_service  # registriert die SQLAlchemy-Events
+        await cache_service.connect()
+        app.state.cache_invalidation_task = asyncio.create_task(run_tag_invalidation_listener())
+    except Exception as e:
+        print(f"[WARNING] Cache-Verbindung fehlgeschlagen: {e}")
+    
+    # Start Audit-Log-Writer (gepufferte Audit-Logs)
+    try:
+        from .services.audit_log_writer import start_audit_log_writer
+        await start_audit_log_writer()
+        print("[SUCCESS] Audit-Log-Writer started")
+    except Exception as e:
+        print(f"[ERROR] Failed to start Audit-Log-Writer: {e}")
+    
+    # Start Hintergrund-Aufträge (persistente Queue)
+    try:
+        from .core.background_tasks import start_background_task_manager
+        await start_background_task_manager()
+        print("[SUCCESS] Background-Task-Manager started")
+    except Exception as e:
+        print(f"[ERROR] Failed to start Background-Task-Manager: {e}")
+    
+    # Start Outbox-Dispatcher (Domain-Events)
+    try:
+        from .core.outbox import start_outbox_dispatcher
+        await start_outbox_dispatcher()
+        print("[SUCCESS] Outbox-Dispatcher started")
+    except Exception as e:
+        print(f"[ERROR] Failed to start Outbox-Dispatcher: {e}")
+    
     # Start Credit Scheduler
     try:
         from .core.scheduler import start_credit_scheduler
@@ -407,6 +455,62 @@ async def on_shutdown():
     except Exception as e:
         print(f"[WARNING] Fehler beim Stoppen des Credit-Schedulers: {e}")
     
+    # Stoppe Outbox-Dispatcher (offene Events werden später erneut ausgeliefert)
+    try:
+        from .core.outbox import stop_outbox_dispatcher
+        await asyncio.wait_for(stop_outbox_dispatcher(), timeout=10.0)
+        print("[SUCCESS] Outbox-Dispatcher gestoppt")
+    except asyncio.TimeoutError:
+        print("[WARNING] Outbox-Dispatcher Shutdown-Timeout erreicht")
+    except Exception as e:
+        print(f"[WARNING] Fehler beim Stoppen des Outbox-Dispatchers: {e}")
+    
+    # Stoppe Hintergrund-Aufträge (laufende gehen zurück in die Queue)
+    try:
+        from .core.background_tasks import stop_background_task_manager
+        await asyncio.wait_for(stop_background_task_manager(), timeout=10.0)
+        print("[SUCCESS] Background-Task-Manager gestoppt")
+    except asyncio.TimeoutError:
+        print("[WARNING] Background-Task-Manager Shutdown-Timeout erreicht")
+    except Exception as e:
+        print(f"[WARNING] Fehler beim Stoppen des Background-Task-Managers: {e}")
+    
+    # PDF-Prozess-Pool beenden
+    try:
+        from .services.pdf_render_service import pdf_renderer
+        pdf_renderer.shutdown()
+    except Exception as e:
+        print(f"[WARNING] Fehler beim Beenden des PDF-Prozess-Pools: {e}")
+    
+    # Stoppe Audit-Log-Writer (schreibt ausstehende Einträge)
+    try:
+        from .services.audit_log_writer import stop_audit_log_writer
+        await asyncio.wait_for(stop_audit_log_writer(), timeout=10.0)
+        print("[SUCCESS] Audit-Log-Writer gestoppt")
+    except asyncio.TimeoutError:
+        print("[WARNING] Audit-Log-Writer Shutdown-Timeout erreicht")
+    except Exception as e:
+        print(f"[WARNING] Fehler beim Stoppen des Audit-Log-Writers: {e}")
+    
+    # Cache-Verbindung schließen
+    try:
+        from .core.cache import cache_service
+        await cache_service.disconnect()
+    except Exception as e:
+        print(f"[WARNING] Fehler beim Schließen des Caches: {e}")
+    
+    # Stoppe Push-Broker
+    try:
+        for task_name in ("stats_invalidation_task", "identity_invalidation_task", "cache_invalidation_task"):
+            task = getattr(app.state, task_name, None)
+            if task:
+                task.cancel()
+        
+        from .core.pubsub import stop_broker
+        await asyncio.wait_for(stop_broker(), timeout=5.0)
+    except Exception as e:
+        print(f"[WARNING] Fehler beim Stoppen des Push-Brokers: {e}")
+    
     # Kurze Pause für graceful shutdown
     try:
         await asyncio.sleep(0.1)
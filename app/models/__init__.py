@@ -12,9 +12,15 @@ from .milestone import Milestone, MilestoneStatus, MilestonePriority
 from .quote import Quote, QuoteStatus
 from .message import Message, MessageType
 from .audit_log import AuditLog, AuditAction
+from .security_counter import SecurityCounter
+from .scheduled_job import ScheduledJob
+from .background_job import BackgroundJob
+from .outbox_event import OutboxEvent
 from .cost_position import CostPosition
 from .buildwise_fee import BuildWiseFee, BuildWiseFeeItem
+from .monthly_fee_invoice import MonthlyFeeInvoice, MonthlyInvoiceRun
 from .expense import Expense
+from .project_finance_rollup import ProjectFinanceRollup
 from .user_credits import UserCredits, PlanStatus
 from .credit_event import CreditEvent, CreditEventType
 from .credit_purchase import CreditPurchase, PurchaseStatus, CreditPackage
@@ -33,10 +39,10 @@ from .notification import Notification, NotificationType, NotificationPriority
 from .resource import (
     Resource, ResourceStatus, ResourceVisibility, ResourceAllocation, 
     AllocationStatus, ResourceRequest, RequestStatus, ResourceCalendarEntry, 
-    CalendarEntryStatus, ResourceKPIs
+    CalendarEntryStatus, ResourceKPIs, ResourceKPISnapshot
 )
 from .contact import Contact
-from .notification_preference import NotificationPreference
+from .notification_preference import NotificationPreference, NotificationPreferenceCategory
 
 __all__ = [
     "Base",
@@ -75,10 +81,17 @@ __all__ = [
     "MessageType",
     "AuditLog",
     "AuditAction",
+    "SecurityCounter",
+    "ScheduledJob",
+    "BackgroundJob",
+    "OutboxEvent",
     "CostPosition",
     "BuildWiseFee",
     "BuildWiseFeeItem",
+    "MonthlyFeeInvoice",
+    "MonthlyInvoiceRun",
     "Expense",
+    "ProjectFinanceRollup",
     "UserCredits",
     "PlanStatus",
     "CreditEvent",
@@ -127,7 +140,9 @@ __all__ = [
     "ResourceCalendarEntry",
     "CalendarEntryStatus",
     "ResourceKPIs",
+    "ResourceKPISnapshot",
     # Contact Book
     "Contact",
-    "NotificationPreference"
+    "NotificationPreference",
+    "NotificationPreferenceCategory"
 ]
@@ -66,7 +66,7 @@ class AuditLog(Base):
     requires_review = Column(Boolean, default=False)  # Benötigt manuelle Überprüfung
     
     # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     
     # Relationships
     user = relationship("User") 
\ No newline at end of file
@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, Text, Index
+
+from .base import Base
+
+
+class BackgroundJob(Base):
+    """
+    Persistenter Auftrag des BackgroundTaskManagers
+    
+    Die Funktion wird über ihren Importpfad ("modul:name") gespeichert,
+    Argumente als JSON - so überstehen wartende Aufträge einen Neustart und
+    können von jedem Worker übernommen werden.
+    """
+    __tablename__ = "background_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(String(200), nullable=False, unique=True)
+    func_path = Column(String(300), nullable=False)  # z.B. "app.services.pdf_service:render"
+    lane = Column(String(10), nullable=False, default="async")  # async, thread, process
+    args = Column(Text, nullable=True)  # JSON-Liste
+    kwargs = Column(Text, nullable=True)  # JSON-Objekt
+    
+    status = Column(String(20), nullable=False, default="pending")  # pending, running, completed, failed, cancelled
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    timeout_seconds = Column(Float, nullable=True)
+    run_after = Column(DateTime, nullable=False)  # UTC, frühester (nächster) Start
+    
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True, index=True)  # Ergebnis wird danach gelöscht
+    locked_by = Column(String(100), nullable=True)  # Worker-Kennung (Host:PID)
+    
+    result = Column(Text, nullable=True)  # JSON
+    error = Column(Text, nullable=True)
+    
+    __table_args__ = (
+        # Abholen des nächsten fälligen Auftrags
+        Index("ix_background_jobs_status_run_after", "status", "run_after"),
+    )
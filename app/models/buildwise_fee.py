@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, Date, Boolean, Text, ForeignKey, CheckConstraint, DateTime
+from sqlalchemy import Column, Integer, String, Numeric, Date, Boolean, Text, ForeignKey, CheckConstraint, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
@@ -69,6 +69,8 @@ class BuildWiseFee(Base):
         CheckConstraint("fee_percentage >= 0 AND fee_percentage <= 100", name="valid_percentage"),
         CheckConstraint("fee_amount >= 0", name="valid_fee_amount"),
         CheckConstraint("quote_amount >= 0", name="valid_quote_amount"),
+        # Statistiken je Dienstleister und Überfälligkeitsprüfung (Status + Fälligkeit)
+        Index("ix_buildwise_fees_provider_status_due", "service_provider_id", "status", "due_date"),
     )
 
 class BuildWiseFeeItem(Base):
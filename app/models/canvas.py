@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
@@ -14,6 +14,10 @@ class Canvas(Base):
     viewport_x = Column(Float, default=0.0)
     viewport_y = Column(Float, default=0.0)
     viewport_scale = Column(Float, default=1.0)
+    # Operations-Log: seq = letzte vergebene Sequenznummer, Operationen bis
+    # compacted_seq sind verdichtet (nur noch im Zustand der Objekte enthalten)
+    seq = Column(Integer, nullable=False, default=0, server_default="0")
+    compacted_seq = Column(Integer, nullable=False, default=0, server_default="0")
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -42,6 +46,7 @@ class CanvasObject(Base):
     font_family = Column(String(100), default="Arial")
     image_url = Column(String(500), nullable=True)
     points = Column(JSON, nullable=True)  # Für Linien und Pfade
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -63,6 +68,7 @@ class CollaborationArea(Base):
     height = Column(Float, nullable=False)
     color = Column(String(50), default="#3b82f6")
     assigned_users = Column(JSON, default=list)  # Liste von User-IDs
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -71,6 +77,31 @@ class CollaborationArea(Base):
     canvas = relationship("Canvas", back_populates="areas")
     creator = relationship("User", back_populates="created_collaboration_areas")
 
+class CanvasOperation(Base):
+    """
+    Eintrag im Operations-Log eines Canvas
+
+    Jede angewendete Einfüge-, Änderungs- oder Löschoperation erhält die nächste
+    Sequenznummer des Canvas. Clients holen verpasste Operationen ab ihrer
+    letzten bekannten seq nach; ältere Einträge werden regelmäßig verdichtet.
+    """
+    __tablename__ = "canvas_operations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    canvas_id = Column(Integer, ForeignKey("canvases.id", ondelete="CASCADE"), nullable=False)
+    seq = Column(Integer, nullable=False)
+    op = Column(String(10), nullable=False)  # insert, update, delete
+    target = Column(String(10), nullable=False)  # object, area
+    target_id = Column(String(255), nullable=False)  # object_id bzw. area_id
+    data = Column(JSON, nullable=True)  # eingefügte bzw. geänderte Felder
+    version = Column(Integer, nullable=True)  # Version nach der Operation
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("canvas_id", "seq", name="uq_canvas_operations_canvas_seq"),
+    )
+
 class CanvasSession(Base):
     __tablename__ = "canvas_sessions"
     
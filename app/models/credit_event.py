@@ -58,8 +58,11 @@ class CreditEvent(Base):
     # IP-Adresse für Sicherheit
     ip_address = Column(String(45), nullable=True)
     
+    # Verhindert doppelte Buchungen, z.B. "daily_deduction:42:2025-01-31" (ein Abzug pro User und Tag)
+    idempotency_key = Column(String(100), nullable=True, unique=True)
+    
     # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     
     # Relationships
     user_credits = relationship("UserCredits", back_populates="credit_events")
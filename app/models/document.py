@@ -273,7 +273,7 @@ class DocumentAccessLog(Base):
     access_type = Column(String(50), nullable=False)  # VIEW, DOWNLOAD, EDIT, etc.
     ip_address = Column(String(45))
     user_agent = Column(Text)
-    accessed_at = Column(DateTime, default=datetime.utcnow)
+    accessed_at = Column(DateTime, default=datetime.utcnow, index=True)
     duration_seconds = Column(Integer)
     
     # Erfolg/Fehler
@@ -0,0 +1,71 @@
+from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, Text, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+
+from .base import Base
+
+
+class MonthlyFeeInvoice(Base):
+    """
+    Monatliche Sammelrechnung der offenen BuildWise-Gebühren eines Dienstleisters
+
+    Eine Zeile pro Dienstleister und Monat (Unique-Constraint) - ein erneuter
+    Lauf für denselben Monat legt keine zweite Rechnung an.
+    """
+    __tablename__ = "monthly_fee_invoices"
+
+    id = Column(Integer, primary_key=True, index=True)
+    service_provider_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    fee_month = Column(Integer, nullable=False)
+    fee_year = Column(Integer, nullable=False)
+    run_id = Column(Integer, ForeignKey("monthly_invoice_runs.id"), nullable=True)
+
+    invoice_number = Column(String(50), nullable=False, unique=True)
+    invoice_date = Column(Date, nullable=False)
+    due_date = Column(Date, nullable=False)
+    fee_count = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Numeric(10, 2), nullable=False, default=0)
+    currency = Column(String(3), nullable=False, default="CHF")
+    fee_ids = Column(Text, nullable=True)  # JSON-Liste der abgerechneten Gebühren
+
+    pdf_path = Column(String(255), nullable=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("service_provider_id", "fee_year", "fee_month", name="uq_monthly_fee_invoice_provider_month"),
+    )
+
+
+class MonthlyInvoiceRun(Base):
+    """
+    Fortschritt eines Monatslaufs (eine Zeile pro Monat)
+
+    last_user_id ist der Checkpoint: jeder Batch committet seine Rechnungen,
+    Dokumente und den neuen Checkpoint in einer Transaktion. Ein abgebrochener
+    Lauf setzt beim nächsten Start hinter dem letzten vollständigen Batch fort.
+    """
+    __tablename__ = "monthly_invoice_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    fee_month = Column(Integer, nullable=False)
+    fee_year = Column(Integer, nullable=False)
+    status = Column(String(20), nullable=False, default="running")  # running, completed, failed
+    invoice_date = Column(Date, nullable=False)
+
+    last_user_id = Column(Integer, nullable=False, default=0)
+    total_users = Column(Integer, nullable=False, default=0)
+    processed_users = Column(Integer, nullable=False, default=0)
+    invoices_created = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Numeric(12, 2), nullable=False, default=0)
+    batch_count = Column(Integer, nullable=False, default=0)
+    batch_timings = Column(Text, nullable=True)  # JSON, Dauer der letzten Batches je Phase
+    errors = Column(Text, nullable=True)  # JSON-Liste der Fehlermeldungen
+
+    locked_by = Column(String(100), nullable=True)  # Worker-Kennung (Host:PID)
+    heartbeat_at = Column(DateTime, nullable=True)
+    started_at = Column(DateTime, server_default=func.now(), nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("fee_year", "fee_month", name="uq_monthly_invoice_run_month"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -39,6 +39,10 @@ class Notification(Base):
     Speichert alle Arten von Benachrichtigungen für Benutzer
     """
     __tablename__ = "notifications"
+    __table_args__ = (
+        # Deckt die Badge-Statistik (Conditional Aggregation pro Empfänger) ab
+        Index("ix_notifications_recipient_status", "recipient_id", "is_read", "is_acknowledged", "priority"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Text, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Text, DateTime, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.models.base import Base
@@ -29,3 +29,24 @@ class NotificationPreference(Base):
     def __repr__(self):
         return f"<NotificationPreference(id={self.id}, contact_id={self.contact_id}, enabled={self.enabled})>"
 
+
+
+class NotificationPreferenceCategory(Base):
+    """
+    Normalisierte Kategorien einer Benachrichtigungspräferenz
+    
+    Spiegelt das JSON-Feld NotificationPreference.categories, damit passende
+    Empfänger einer Ausschreibung mit einer indizierten Abfrage gefunden werden.
+    """
+    __tablename__ = "notification_preference_categories"
+    __table_args__ = (
+        UniqueConstraint("preference_id", "category", name="uq_notification_preference_category"),
+        Index("ix_notification_preference_categories_lookup", "category", "preference_id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    preference_id = Column(Integer, ForeignKey("notification_preferences.id", ondelete="CASCADE"), nullable=False, index=True)
+    category = Column(String(100), nullable=False)
+    
+    def __repr__(self):
+        return f"<NotificationPreferenceCategory(preference_id={self.preference_id}, category='{self.category}')>"
@@ -0,0 +1,40 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
+
+from .base import Base
+
+
+class OutboxEvent(Base):
+    """
+    Domain-Event im Transactional Outbox
+    
+    Wird in derselben Transaktion wie die Zustandsänderung geschrieben
+    (z.B. Angebot angenommen) und danach vom OutboxDispatcher an die
+    registrierten Handler ausgeliefert - in Reihenfolge je Aggregat.
+    """
+    __tablename__ = "outbox_events"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(String(36), nullable=False, unique=True)
+    event_type = Column(String(100), nullable=False, index=True)  # z.B. "QuoteAccepted"
+    aggregate_type = Column(String(50), nullable=False)  # z.B. "milestone"
+    aggregate_id = Column(Integer, nullable=False)
+    payload = Column(Text, nullable=True)  # JSON-Objekt
+    
+    status = Column(String(20), nullable=False, default="pending")  # pending, processing, delivered, dead
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=8)
+    available_at = Column(DateTime, nullable=False)  # UTC, früheste (nächste) Auslieferung
+    handled = Column(Text, nullable=True)  # JSON-Liste der bereits erfolgreichen Handler
+    
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    processed_at = Column(DateTime, nullable=True, index=True)
+    locked_by = Column(String(100), nullable=True)  # Worker-Kennung (Host:PID)
+    last_error = Column(Text, nullable=True)
+    
+    __table_args__ = (
+        # Abholen fälliger Events
+        Index("ix_outbox_events_status_available_at", "status", "available_at"),
+        # Reihenfolge je Aggregat (früheres, noch offenes Event blockiert)
+        Index("ix_outbox_events_aggregate", "aggregate_type", "aggregate_id", "id"),
+    )
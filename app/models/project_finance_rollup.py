@@ -0,0 +1,43 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, UniqueConstraint, Index
+from sqlalchemy.sql import func
+
+from .base import Base
+
+
+class ProjectFinanceRollup(Base):
+    """
+    Vorberechnete Finanzsummen eines Projekts je Quelle × Bauphase × Kategorie × Monat
+
+    Quellen (source):
+    - expense: Ausgaben nach construction_phase/category, Monat aus date
+    - cost_position: Kostenpositionen nach category, Monat aus created_at;
+      paid_amount = Positionen bezahlter Rechnungen
+    - invoice: Rechnungen nach Status, Monat aus invoice_date
+    - buildwise_fee: BuildWise-Gebühren nach Status, Monat aus created_at
+
+    Wird von finance_rollup_service beim Commit für die betroffenen Projekte
+    neu berechnet und nachts abgeglichen. Leere Phase/Kategorie ist "".
+    """
+    __tablename__ = "project_finance_rollup"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    source = Column(String(20), nullable=False)
+    phase = Column(String(100), nullable=False, default="")
+    category = Column(String(50), nullable=False, default="")
+    period_year = Column(Integer, nullable=True)
+    period_month = Column(Integer, nullable=True)
+
+    item_count = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Float, nullable=False, default=0.0)
+    paid_amount = Column(Float, nullable=False, default=0.0)
+    last_date = Column(DateTime, nullable=True)  # jüngstes Datum der Gruppe
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint(
+            "project_id", "source", "phase", "category", "period_year", "period_month",
+            name="uq_project_finance_rollup_group"
+        ),
+        Index("ix_project_finance_rollup_project_source", "project_id", "source"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Numeric, ForeignKey, Enum, JSON
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, Text, Numeric, Float, ForeignKey, Enum, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -280,4 +280,51 @@ class ResourceKPIs(Base):
     service_provider = relationship("User", foreign_keys=[service_provider_id])
 
     def __repr__(self):
-        return f"<ResourceKPIs(id={self.id}, service_provider_id={self.service_provider_id}, utilization_rate={self.utilization_rate})>"
\ No newline at end of file
+        return f"<ResourceKPIs(id={self.id}, service_provider_id={self.service_provider_id}, utilization_rate={self.utilization_rate})>"
+
+
+class ResourceKPISnapshot(Base):
+    """
+    Tägliche KPI-Momentaufnahme eines Dienstleisters (eine Zeile pro Tag)
+
+    - Aktivität des Tages: angelegte Ressourcen und Zuweisungen, abgegebene
+      Angebote, Antwortzeiten, Umsatz der an diesem Tag angelegten Ressourcen
+    - Bestand zum Zeitpunkt der Aufnahme (Status, Personentage, Auslastung);
+      bei nachträglich befüllten Tagen leer, da nicht rekonstruierbar
+
+    Wird vom nächtlichen Job geschrieben; Verläufe und Monatstrends lesen
+    diese Zeilen statt alle Ressourcen und Zuweisungen.
+    """
+    __tablename__ = "resource_kpi_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    service_provider_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    snapshot_date = Column(Date, nullable=False, index=True)
+
+    # Aktivität des Tages
+    resources_created = Column(Integer, nullable=False, default=0)
+    person_days_created = Column(Integer, nullable=False, default=0)
+    revenue_created = Column(Float, nullable=False, default=0.0)
+    allocations_created = Column(Integer, nullable=False, default=0)
+    offers_submitted = Column(Integer, nullable=False, default=0)
+    response_hours_total = Column(Float, nullable=False, default=0.0)
+    response_count = Column(Integer, nullable=False, default=0)
+
+    # Bestand zum Zeitpunkt der Aufnahme
+    resources_available = Column(Integer, nullable=True)
+    resources_allocated = Column(Integer, nullable=True)
+    resources_completed = Column(Integer, nullable=True)
+    person_days_available = Column(Integer, nullable=True)
+    person_days_allocated = Column(Integer, nullable=True)
+    person_days_completed = Column(Integer, nullable=True)
+    utilization_rate = Column(Float, nullable=True)
+    total_revenue = Column(Float, nullable=True)
+
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("service_provider_id", "snapshot_date", name="uq_resource_kpi_snapshot_provider_date"),
+    )
+
+    def __repr__(self):
+        return f"<ResourceKPISnapshot(service_provider_id={self.service_provider_id}, snapshot_date={self.snapshot_date})>"
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, Text
+
+from .base import Base
+
+
+class ScheduledJob(Base):
+    """
+    Zustand eines periodischen Jobs des Schedulers (eine Zeile pro Job)
+    
+    next_run_at in der Vergangenheit bedeutet "fällig" - auch nach einem
+    Neustart oder Leader-Wechsel, verpasste Läufe werden so einmal nachgeholt.
+    running_since/locked_by markieren einen laufenden Job, damit ihn kein
+    zweiter Worker gleichzeitig startet.
+    """
+    __tablename__ = "scheduled_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False, unique=True)
+    schedule = Column(String(100), nullable=True)  # z.B. "daily 02:00" oder "every 3600s"
+    next_run_at = Column(DateTime, nullable=True, index=True)  # UTC
+    last_run_at = Column(DateTime, nullable=True)  # UTC, Start des letzten Laufs
+    last_finished_at = Column(DateTime, nullable=True)
+    last_status = Column(String(20), nullable=True)  # success, failed, timeout
+    last_error = Column(Text, nullable=True)
+    last_result = Column(Text, nullable=True)
+    last_duration_seconds = Column(Float, nullable=True)
+    run_count = Column(Integer, nullable=False, default=0)
+    failure_count = Column(Integer, nullable=False, default=0)
+    running_since = Column(DateTime, nullable=True)
+    locked_by = Column(String(100), nullable=True)  # Worker-Kennung (Host:PID)
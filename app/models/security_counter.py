@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+
+from .base import Base
+
+
+class SecurityCounter(Base):
+    """
+    Zähler für sicherheitsrelevante Ereignisse (z.B. fehlgeschlagene Logins)
+    
+    Pro (identifier, action) wird je Zeit-Bucket eine Zeile atomar hochgezählt.
+    Ein Sliding-Window ist damit die Summe weniger Buckets statt eines
+    Scans über die Audit-Logs.
+    """
+    __tablename__ = "security_counters"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    identifier = Column(String(255), nullable=False)  # z.B. "ip:1.2.3.0" oder "user:42"
+    action = Column(String(50), nullable=False)  # z.B. "failed_login"
+    bucket_start = Column(DateTime, nullable=False, index=True)  # Beginn des Buckets (UTC)
+    count = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        # Dient gleichzeitig als Index für Sliding-Window-Abfragen
+        UniqueConstraint("identifier", "action", "bucket_start", name="uq_security_counters_bucket"),
+    )
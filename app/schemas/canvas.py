@@ -47,6 +47,7 @@ class CanvasObject(CanvasObjectBase):
     id: int
     object_id: str
     canvas_id: int
+    version: int = 1
     created_by: int
     created_at: datetime
     updated_at: datetime
@@ -80,6 +81,7 @@ class CollaborationArea(CollaborationAreaBase):
     id: int
     area_id: str
     canvas_id: int
+    version: int = 1
     created_by: int
     created_at: datetime
     updated_at: datetime
@@ -147,12 +149,67 @@ class CanvasState(BaseModel):
     objects: List[CanvasObject] = []
     areas: List[CollaborationArea] = []
     viewport: Dict[str, float] = {"x": 0.0, "y": 0.0, "scale": 1.0}
+    seq: int = 0  # Stand des Operations-Logs
 
 class CanvasSaveRequest(BaseModel):
     objects: List[CanvasObjectCreate]
     areas: List[CollaborationAreaCreate]
     viewport: Dict[str, float]
 
+# Operations-Log Schemas
+class CanvasOperationType(str, Enum):
+    INSERT = "insert"
+    UPDATE = "update"
+    DELETE = "delete"
+
+class CanvasOperationTarget(str, Enum):
+    OBJECT = "object"
+    AREA = "area"
+
+class CanvasOperationIn(BaseModel):
+    op: CanvasOperationType
+    target: CanvasOperationTarget = CanvasOperationTarget.OBJECT
+    id: Optional[str] = None  # object_id/area_id, bei insert optional (vom Client vergebene UUID)
+    data: Dict[str, Any] = {}  # insert: alle Felder, update: nur geänderte Felder
+    base_version: Optional[int] = None  # Version, auf der die Änderung beruht (None = ohne Prüfung)
+
+class CanvasOperationBatch(BaseModel):
+    base_seq: int = 0  # zuletzt bekannte seq des Clients
+    ops: List[CanvasOperationIn] = []
+    viewport: Optional[Dict[str, float]] = None
+
+class CanvasOperationOut(BaseModel):
+    seq: int
+    op: CanvasOperationType
+    target: CanvasOperationTarget
+    target_id: str
+    data: Optional[Dict[str, Any]] = None
+    version: Optional[int] = None
+    created_by: int
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class CanvasOperationConflict(BaseModel):
+    index: int  # Position der Operation im Batch
+    id: Optional[str] = None
+    reason: str  # exists, not_found, version_conflict, invalid
+    current_version: Optional[int] = None
+    detail: Optional[str] = None
+
+class CanvasOperationResult(BaseModel):
+    seq: int
+    applied: List[CanvasOperationOut] = []
+    conflicts: List[CanvasOperationConflict] = []
+    missed: List[CanvasOperationOut] = []  # Operationen anderer Nutzer seit base_seq
+    resync: bool = False  # base_seq bereits verdichtet: Zustand neu laden
+
+class CanvasOperationsSince(BaseModel):
+    seq: int
+    ops: List[CanvasOperationOut] = []
+    state: Optional[CanvasState] = None  # Vollzustand, falls since_seq bereits verdichtet ist
+
 # Export Schemas
 class CanvasExportRequest(BaseModel):
     format: str = "png"  # png, pdf
@@ -177,6 +234,11 @@ class CanvasMessageType(str, Enum):
     CURSOR_MOVE = "cursor_move"
     USER_JOIN = "user_join"
     USER_LEAVE = "user_leave"
+    OPERATIONS = "operations"  # Operations-Batch (Client) bzw. angewendete Operationen (Server)
+    CURSORS = "cursors"  # gebündelte Cursor-Positionen eines Ticks
+    ACK = "ack"
+    RESYNC = "resync"
+    ERROR = "error"
 
 class CanvasMessage(BaseModel):
     type: CanvasMessageType
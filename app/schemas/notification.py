@@ -44,6 +44,8 @@ class NotificationStats(BaseModel):
     unread_count: int
     unacknowledged_count: int
     urgent_count: int
+    read_count: int = 0
+    acknowledged_count: int = 0
     
 class NotificationBulkAction(BaseModel):
     """Schema für Bulk-Aktionen auf Benachrichtigungen"""
@@ -620,22 +620,9 @@ class AcceptanceService:
                         milestone.completed_at = datetime.now()
                         print(f"[SUCCESS] Milestone {milestone.title} als abgenommen markiert")
                         
-                        # Sende Benachrichtigung an den Dienstleister über die finale Abnahme
-                        try:
-                            from .notification_service import NotificationService
-                            await NotificationService.create_milestone_completed_notification(db, milestone.id)
-                        except Exception as e:
-                            print(f"[WARNING] Fehler beim Erstellen der Abnahme-Benachrichtigung: {e}")
-                            # Fehler bei Benachrichtigung sollte nicht die Abnahme blockieren
-                        
-                        # Inkrementiere completed_offers_count für alle betroffenen Dienstleister
-                        try:
-                            from .milestone_completion_service import MilestoneCompletionService
-                            await MilestoneCompletionService.increment_completed_offers_count(db, milestone.id)
-                            print(f"[SUCCESS] completed_offers_count für betroffene Dienstleister von Milestone {milestone.id} inkrementiert")
-                        except Exception as e:
-                            print(f"[WARNING] Fehler beim Inkrementieren der completed_offers_count: {e}")
-                            # Fehler nicht kritisch, da Hauptfunktion (Abnahme) bereits erfolgreich
+                        # Benachrichtigung und completed_offers_count folgen über das MilestoneCompleted-Event
+                        from .domain_events import record_milestone_completed
+                        record_milestone_completed(db, milestone)
                         
                         # Vergebe Credits an Bauträger für Projekt-Abschluss
                         try:
@@ -0,0 +1,164 @@
+"""
+Gepufferter Writer für Audit-Logs
+
+- Einträge landen in einer begrenzten In-Process-Queue
+- Ein Hintergrund-Task schreibt sie gesammelt per Bulk-INSERT über eine
+  eigene Verbindung (kein Commit auf der Session des Aufrufers)
+- Fallback: direktes Schreiben, wenn der Writer nicht läuft, die Queue voll ist
+  oder der Aufrufer es verlangt (sync=True)
+- Beim Shutdown wird die Queue vollständig geleert
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from ..core.config import settings
+from ..core import database
+from ..models.audit_log import AuditLog
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLogWriter:
+    """Sammelt Audit-Log-Einträge und schreibt sie in Batches"""
+
+    def __init__(self, queue_size: int, batch_size: int, flush_interval: float):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Bereits aus der Queue entnommene, noch nicht geschriebene Einträge
+        self._pending: List[Dict[str, Any]] = []
+        self._closed = False
+        self.written = 0
+        self.fallback_writes = 0
+        self.failed = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Startet den Hintergrund-Writer"""
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._closed = False
+        self._task = asyncio.create_task(self._run())
+        logger.info("Audit-Log-Writer gestartet")
+
+    async def stop(self):
+        """Stoppt den Writer und schreibt alle noch wartenden Einträge"""
+        if self._task is None:
+            return
+        # Flag zusätzlich zum Cancel: wait_for kann ein Cancel verschlucken,
+        # wenn gleichzeitig ein Eintrag eintrifft
+        self._closed = True
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        rows, self._pending = self._pending, []
+        while not self._queue.empty():
+            rows.append(self._queue.get_nowait())
+        for start in range(0, len(rows), self.batch_size):
+            await self._write_batch(rows[start:start + self.batch_size])
+        logger.info(f"Audit-Log-Writer gestoppt ({len(rows)} Einträge beim Shutdown geschrieben)")
+
+    async def submit(self, values: Dict[str, Any], sync: bool = False):
+        """
+        Übergibt einen Eintrag an den Writer
+
+        Args:
+            values: Spaltenwerte für audit_logs
+            sync: Sofort schreiben (z.B. für rechtlich relevante Nachweise)
+        """
+        if not sync and self.is_running:
+            try:
+                self._queue.put_nowait(values)
+                return
+            except asyncio.QueueFull:
+                logger.warning("Audit-Log-Queue voll - schreibe Eintrag direkt")
+        self.fallback_writes += 1
+        await self.write_now([values])
+
+    async def write_now(self, rows: List[Dict[str, Any]]):
+        """Schreibt Einträge direkt über eine eigene Verbindung"""
+        async with database.engine.begin() as conn:
+            await conn.execute(insert(AuditLog.__table__), rows)
+        self.written += len(rows)
+
+    async def _write_batch(self, rows: List[Dict[str, Any]]):
+        # Ein Fehlversuch (z.B. Verbindungsabbruch) wird einmal wiederholt
+        for attempt in range(2):
+            try:
+                await self.write_now(rows)
+                return
+            except Exception as e:
+                if attempt == 0:
+                    logger.warning(f"Audit-Log-Batch fehlgeschlagen, neuer Versuch: {e}")
+                    await asyncio.sleep(1)
+                else:
+                    self.failed += len(rows)
+                    logger.error(f"{len(rows)} Audit-Log-Einträge konnten nicht geschrieben werden: {e}")
+                    for row in rows:
+                        logger.error(f"Verlorener Audit-Log-Eintrag: {row}")
+
+    async def _run(self):
+        """Hauptschleife: wartet auf Einträge und schreibt sie gesammelt"""
+        loop = asyncio.get_running_loop()
+        while not self._closed:
+            self._pending = [await self._queue.get()]
+            # Kurz weiter sammeln, bis der Batch voll oder das Intervall vorbei ist
+            deadline = loop.time() + self.flush_interval
+            while len(self._pending) < self.batch_size and not self._closed:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    self._pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            rows, self._pending = self._pending, []
+            write = asyncio.ensure_future(self._write_batch(rows))
+            try:
+                await asyncio.shield(write)
+            except asyncio.CancelledError:
+                # Laufenden Batch beim Stoppen noch abschließen
+                await write
+                raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Writer-Statistiken für Monitoring"""
+        return {
+            "running": self.is_running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "written": self.written,
+            "fallback_writes": self.fallback_writes,
+            "failed": self.failed
+        }
+
+
+audit_log_writer = AuditLogWriter(
+    queue_size=settings.audit_log_queue_size,
+    batch_size=settings.audit_log_batch_size,
+    flush_interval=settings.audit_log_flush_interval_seconds
+)
+
+
+async def start_audit_log_writer():
+    """Startet den Audit-Log-Writer (für FastAPI Startup Event)"""
+    await audit_log_writer.start()
+
+
+async def stop_audit_log_writer():
+    """Stoppt den Audit-Log-Writer und schreibt ausstehende Einträge (Shutdown)"""
+    await audit_log_writer.stop()
@@ -3,7 +3,7 @@ from datetime import date, timedelta, datetime
 from decimal import Decimal
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func, and_, or_, extract, select
+from sqlalchemy import func, and_, or_, case, extract, select, update
 from sqlalchemy.exc import IntegrityError
 
 from app.models.buildwise_fee import BuildWiseFee, BuildWiseFeeItem, BuildWiseFeeStatus
@@ -16,8 +16,13 @@ from app.schemas.buildwise_fee import (
     BuildWiseFeeItemCreate,
     BuildWiseFeeStatistics
 )
+from app.core.cache import cache_result
+from app.core.database import AsyncSessionLocal
 from app.core.config import settings, get_fee_percentage
-from app.services.pdf_generator import BuildWisePDFGenerator
+from app.services.pdf_render_service import normalize_spec, pdf_renderer
+
+# Gebühren-Statistiken (Admin-Dashboard); Änderungen an Gebühren invalidieren sofort
+STATISTICS_CACHE_TTL = 600
 
 class BuildWiseFeeService:
     
@@ -391,96 +396,92 @@ class BuildWiseFeeService:
     
     @staticmethod
     async def get_statistics(db: AsyncSession, service_provider_id: Optional[int] = None) -> BuildWiseFeeStatistics:
-        """Holt Statistiken für BuildWise-Gebühren."""
+        """Holt Statistiken für BuildWise-Gebühren (gecacht je Dienstleister und Tag)."""
+        
+        data = await BuildWiseFeeService._statistics_data(service_provider_id, date.today())
+        return BuildWiseFeeStatistics(**data)
+    
+    @staticmethod
+    @cache_result(ttl=STATISTICS_CACHE_TTL, tags=("buildwise_fees",))
+    async def _statistics_data(service_provider_id: Optional[int], today: date) -> dict:
+        """
+        Gecachte Statistiken auf eigener Session (die Hintergrund-Aktualisierung
+        des Caches kann die Anfrage überdauern).
+        
+        `today` ist Teil des Cache-Schlüssels, damit "überfällig" nicht über
+        Mitternacht hinaus gecacht wird; jede Gebühren-Änderung verwirft den
+        Tag "buildwise_fees" (siehe cache_invalidation).
+        """
+        async with AsyncSessionLocal() as db:
+            return await BuildWiseFeeService._query_statistics(db, service_provider_id, today)
+    
+    @staticmethod
+    async def _query_statistics(db: AsyncSession, service_provider_id: Optional[int], today: date) -> dict:
+        """Kennzahlen in einer Abfrage (bedingte Aggregation) plus Monatsaufschlüsselung."""
+        
+        provider_filter = []
+        if service_provider_id:
+            provider_filter.append(BuildWiseFee.service_provider_id == service_provider_id)
+        
+        def amount_where(*conditions):
+            return func.coalesce(func.sum(case((and_(*conditions), BuildWiseFee.fee_amount), else_=0)), 0)
+        
+        def count_where(*conditions):
+            return func.coalesce(func.sum(case((and_(*conditions), 1), else_=0)), 0)
+        
+        statuses = [status.value for status in BuildWiseFeeStatus]
         
         try:
-            if service_provider_id:
-                print(f"[DEBUG] Lade BuildWise-Gebühren Statistiken für Dienstleister {service_provider_id}...")
-            else:
-                print("[DEBUG] Lade BuildWise-Gebühren Statistiken (alle)...")
-            
-            # Base query mit optionalem Service Provider Filter
-            base_query = select(BuildWiseFee)
-            if service_provider_id:
-                base_query = base_query.where(BuildWiseFee.service_provider_id == service_provider_id)
-            
-            # Gesamtanzahl
-            total_fees_query = select(func.count(BuildWiseFee.id))
-            if service_provider_id:
-                total_fees_query = total_fees_query.where(BuildWiseFee.service_provider_id == service_provider_id)
-            total_fees_result = await db.execute(total_fees_query)
-            total_fees = total_fees_result.scalar() or 0
-            print(f"   - Gesamtanzahl Gebühren: {total_fees}")
-            
-            # Gesamtbetrag
-            total_amount_query = select(func.sum(BuildWiseFee.fee_amount))
-            if service_provider_id:
-                total_amount_query = total_amount_query.where(BuildWiseFee.service_provider_id == service_provider_id)
-            total_amount_result = await db.execute(total_amount_query)
-            total_amount = total_amount_result.scalar() or Decimal("0.0")
-            print(f"   - Gesamtbetrag: {total_amount}")
-            
-            # Bezahlte Gebühren
-            paid_query = select(func.sum(BuildWiseFee.fee_amount)).where(BuildWiseFee.status == 'paid')
-            if service_provider_id:
-                paid_query = paid_query.where(BuildWiseFee.service_provider_id == service_provider_id)
-            paid_result = await db.execute(paid_query)
-            total_paid = paid_result.scalar() or Decimal("0.0")
-            print(f"   - Bezahlt: {total_paid}")
-            
-            # Aktuelles Datum für Fälligkeitsberechnung
-            today = date.today()
-            
-            # Offene Gebühren - Status 'open'
-            open_query = select(func.sum(BuildWiseFee.fee_amount)).where(BuildWiseFee.status == 'open')
-            if service_provider_id:
-                open_query = open_query.where(BuildWiseFee.service_provider_id == service_provider_id)
-            open_result = await db.execute(open_query)
-            total_open = open_result.scalar() or Decimal("0.0")
-            print(f"   - Offen: {total_open}")
-            
-            # Überfällige Gebühren - basierend auf Fälligkeitsdatum, nicht Status
-            overdue_query = select(func.sum(BuildWiseFee.fee_amount)).where(
-                BuildWiseFee.due_date < today,
-                BuildWiseFee.status != 'paid'  # Bezahlte Gebühren sind nicht überfällig
-            )
-            if service_provider_id:
-                overdue_query = overdue_query.where(BuildWiseFee.service_provider_id == service_provider_id)
-            overdue_result = await db.execute(overdue_query)
-            total_overdue = overdue_result.scalar() or Decimal("0.0")
-            print(f"   - Überfällig: {total_overdue}")
+            totals_query = select(
+                func.count(BuildWiseFee.id).label("total_fees"),
+                func.coalesce(func.sum(BuildWiseFee.fee_amount), 0).label("total_amount"),
+                amount_where(BuildWiseFee.status == 'paid').label("total_paid"),
+                amount_where(BuildWiseFee.status == 'open').label("total_open"),
+                # Überfällig nach Fälligkeitsdatum, nicht nach Status; bezahlte sind nie überfällig
+                amount_where(BuildWiseFee.due_date < today, BuildWiseFee.status != 'paid').label("total_overdue"),
+                *(count_where(BuildWiseFee.status == status).label(f"count_{status}") for status in statuses),
+                *(amount_where(BuildWiseFee.status == status).label(f"amount_{status}") for status in statuses)
+            ).where(*provider_filter)
+            totals = (await db.execute(totals_query)).one()
+            
+            total_fees = totals.total_fees or 0
+            total_amount = totals.total_amount
+            total_paid = totals.total_paid
+            total_open = totals.total_open
+            total_overdue = totals.total_overdue
+            status_breakdown = {
+                status: {
+                    'count': int(getattr(totals, f"count_{status}")),
+                    'amount': float(getattr(totals, f"amount_{status}") or 0)
+                }
+                for status in statuses
+                if getattr(totals, f"count_{status}")
+            }
         
         except Exception as e:
-            print(f"[ERROR] Debug: Fehler bei Basis-Statistiken: {e}")
+            print(f"[ERROR] Fehler bei Basis-Statistiken: {e}")
             # Fallback-Werte
             total_fees = 0
             total_amount = Decimal("0.0")
             total_paid = Decimal("0.0")
             total_open = Decimal("0.0")
             total_overdue = Decimal("0.0")
+            status_breakdown = {}
         
-        # Monatliche Aufschlüsselung - mit Fehlerbehandlung
+        # Monatliche Aufschlüsselung der letzten 12 Monate mit Gebühren
         monthly_breakdown = []
         try:
+            month = extract('month', BuildWiseFee.invoice_date)
+            year = extract('year', BuildWiseFee.invoice_date)
             monthly_query = select(
-                extract('month', BuildWiseFee.invoice_date).label('month'),
-                extract('year', BuildWiseFee.invoice_date).label('year'),
+                month.label('month'),
+                year.label('year'),
                 func.sum(BuildWiseFee.fee_amount).label('amount'),
                 func.count(BuildWiseFee.id).label('count')
             ).where(
-                BuildWiseFee.invoice_date.is_not(None)
-            )
-            
-            if service_provider_id:
-                monthly_query = monthly_query.where(BuildWiseFee.service_provider_id == service_provider_id)
-            
-            monthly_query = monthly_query.group_by(
-                extract('month', BuildWiseFee.invoice_date),
-                extract('year', BuildWiseFee.invoice_date)
-            ).order_by(
-                extract('year', BuildWiseFee.invoice_date).desc(),
-                extract('month', BuildWiseFee.invoice_date).desc()
-            ).limit(12)
+                BuildWiseFee.invoice_date.is_not(None),
+                *provider_filter
+            ).group_by(month, year).order_by(year.desc(), month.desc()).limit(12)
             
             monthly_result = await db.execute(monthly_query)
             for row in monthly_result:
@@ -491,47 +492,20 @@ class BuildWiseFeeService:
                         'amount': float(row.amount or 0),
                         'count': int(row.count or 0)
                     })
-            print(f"   - Monatliche Aufschlüsselung: {len(monthly_breakdown)} Einträge")
         
         except Exception as e:
-            print(f"[ERROR] Debug: Fehler bei monatlicher Aufschlüsselung: {e}")
+            print(f"[ERROR] Fehler bei monatlicher Aufschlüsselung: {e}")
             monthly_breakdown = []
         
-        # Status-Aufschlüsselung - mit Fehlerbehandlung
-        status_breakdown = {}
-        try:
-            status_query = select(
-                BuildWiseFee.status,
-                func.count(BuildWiseFee.id).label('count'),
-                func.sum(BuildWiseFee.fee_amount).label('amount')
-            )
-            
-            if service_provider_id:
-                status_query = status_query.where(BuildWiseFee.service_provider_id == service_provider_id)
-            
-            status_query = status_query.group_by(BuildWiseFee.status)
-            
-            status_result = await db.execute(status_query)
-            for row in status_result:
-                status_breakdown[row.status] = {
-                    'count': int(row.count),
-                    'amount': float(row.amount or 0)
-                }
-            print(f"   - Status-Aufschlüsselung: {len(status_breakdown)} Einträge")
-        
-        except Exception as e:
-            print(f"[ERROR] Debug: Fehler bei Status-Aufschlüsselung: {e}")
-            status_breakdown = {}
-        
-        return BuildWiseFeeStatistics(
-            total_fees=total_fees,
-            total_amount=float(total_amount),
-            total_paid=float(total_paid),
-            total_open=float(total_open),
-            total_overdue=float(total_overdue),
-            monthly_breakdown=monthly_breakdown,
-            status_breakdown=status_breakdown
-        )
+        return {
+            "total_fees": total_fees,
+            "total_amount": float(total_amount),
+            "total_paid": float(total_paid),
+            "total_open": float(total_open),
+            "total_overdue": float(total_overdue),
+            "monthly_breakdown": monthly_breakdown,
+            "status_breakdown": status_breakdown
+        }
     
     @staticmethod
     async def generate_invoice(db: AsyncSession, fee_id: int) -> bool:
@@ -564,9 +538,6 @@ class BuildWiseFeeService:
             if not project or not quote or not cost_position:
                 return False
             
-            # Erstelle PDF-Generator
-            pdf_generator = BuildWisePDFGenerator()
-            
             # Erstelle Ausgabepfad
             invoices_dir = "storage/invoices"
             os.makedirs(invoices_dir, exist_ok=True)
@@ -615,23 +586,19 @@ class BuildWiseFeeService:
                 'contractor_name': cost_position.contractor_name
             }
             
-            # Generiere PDF
-            success = pdf_generator.generate_invoice_pdf(
-                fee_data=fee_data,
-                project_data=project_data,
-                quote_data=quote_data,
-                cost_position_data=cost_position_data,
-                output_path=output_path
-            )
+            # Generiere PDF (Prozess-Pool, Cache nach Inhalt)
+            await pdf_renderer.render_to(normalize_spec("buildwise_fee_invoice", {
+                'fee_data': fee_data,
+                'project_data': project_data,
+                'quote_data': quote_data,
+                'cost_position_data': cost_position_data
+            }), output_path)
             
-            if success:
-                # Aktualisiere Gebühr
-                fee.invoice_pdf_generated = True
-                fee.invoice_pdf_path = output_path
-                await db.commit()
-                return True
-            else:
-                return False
+            # Aktualisiere Gebühr
+            fee.invoice_pdf_generated = True
+            fee.invoice_pdf_path = output_path
+            await db.commit()
+            return True
                 
         except Exception as e:
             print(f"Fehler beim Generieren der PDF: {e}")
@@ -681,9 +648,6 @@ class BuildWiseFeeService:
             if not quote or not cost_position:
                 return {"success": False, "error": "Angebot oder Kostenposition nicht gefunden"}
             
-            # Erstelle PDF-Generator
-            pdf_generator = BuildWisePDFGenerator()
-            
             # Erstelle Ausgabepfad für PDF
             invoices_dir = "storage/invoices"
             os.makedirs(invoices_dir, exist_ok=True)
@@ -723,15 +687,15 @@ class BuildWiseFeeService:
                 'contractor_name': cost_position.contractor_name
             }
             
-            # Generiere PDF (nur Gewerk-Daten)
-            success = pdf_generator.generate_gewerk_invoice_pdf(
-                fee_data=fee_data,
-                quote_data=quote_data,
-                cost_position_data=cost_position_data,
-                output_path=pdf_output_path
-            )
-            
-            if not success:
+            # Generiere PDF (nur Gewerk-Daten; Prozess-Pool, Cache nach Inhalt)
+            try:
+                await pdf_renderer.render_to(normalize_spec("buildwise_gewerk_invoice", {
+                    'fee_data': fee_data,
+                    'quote_data': quote_data,
+                    'cost_position_data': cost_position_data
+                }), pdf_output_path)
+            except Exception as e:
+                print(f"Fehler beim Generieren der Gewerk-PDF: {e}")
                 return {"success": False, "error": "PDF-Generierung fehlgeschlagen"}
             
             # Erstelle Dokument-Verzeichnis
@@ -813,19 +777,22 @@ class BuildWiseFeeService:
         """
         
         today = date.today()
-        print(f"[DEBUG] [BuildWiseFeeService] Prüfe auf überfällige Gebühren (Stand: {today})")
         
-        overdue_query = select(BuildWiseFee).where(
-            and_(
+        # Ein UPDATE für alle betroffenen Gebühren statt Laden und Ändern je Gebühr
+        result = await db.execute(
+            update(BuildWiseFee)
+            .where(
                 BuildWiseFee.status == 'open',
-                BuildWiseFee.due_date < today.isoformat()
+                BuildWiseFee.due_date < today
             )
+            .values(status='overdue', updated_at=datetime.utcnow())
+            .returning(BuildWiseFee.id)
+            .execution_options(synchronize_session=False)
         )
+        updated_fee_ids = sorted(result.scalars().all())
+        await db.commit()
         
-        overdue_result = await db.execute(overdue_query)
-        overdue_fees = overdue_result.scalars().all()
-        
-        if not overdue_fees:
+        if not updated_fee_ids:
             print(f"[SUCCESS] [BuildWiseFeeService] Keine überfälligen Gebühren gefunden")
             return {
                 "message": "Keine überfälligen Gebühren gefunden",
@@ -833,23 +800,11 @@ class BuildWiseFeeService:
                 "updated_fees": []
             }
         
-        # Markiere als überfällig
-        updated_fee_ids = []
-        for fee in overdue_fees:
-            fee.status = 'overdue'
-            fee.updated_at = datetime.utcnow()
-            updated_fee_ids.append(fee.id)
-            
-            days_overdue = (today - fee.due_date).days
-            print(f"[WARNING] [BuildWiseFeeService] Gebühr {fee.invoice_number} ist {days_overdue} Tage überfällig")
-        
-        await db.commit()
-        
-        print(f"[SUCCESS] [BuildWiseFeeService] {len(overdue_fees)} Gebühren als überfällig markiert")
+        print(f"[SUCCESS] [BuildWiseFeeService] {len(updated_fee_ids)} Gebühren als überfällig markiert")
         
         return {
-            "message": f"{len(overdue_fees)} Gebühren als überfällig markiert",
-            "overdue_count": len(overdue_fees),
+            "message": f"{len(updated_fee_ids)} Gebühren als überfällig markiert",
+            "overdue_count": len(updated_fee_ids),
             "updated_fees": updated_fee_ids
         }
     
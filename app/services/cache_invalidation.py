@@ -0,0 +1,158 @@
+"""
+Tag-basierte Cache-Invalidierung über SQLAlchemy-Events
+
+- Geänderte Projekte, Gewerke, Angebote, Dokumente, Ausgaben, Rechnungen und
+  Kostenpositionen werden auf Cache-Tags abgebildet (z.B. "project:42",
+  "milestone:7")
+- ORM-Änderungen werden nach dem Flush gesammelt, Bulk-UPDATE/DELETE-Statements
+  vor der Ausführung (betroffene Zeilen per SELECT mit derselben Bedingung)
+- Invalidiert wird erst nach dem Commit; bei Rollback werden die Tags verworfen
+
+Gecachte Ergebnisse deklarieren dieselben Tags, z.B.:
+
+    @cache_result(ttl=600, tags=("project:{project_id}",))
+    async def get_dashboard(db, project_id: int): ...
+"""
+
+import logging
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from ..core.cache import cache_service
+from ..models.buildwise_fee import BuildWiseFee
+from ..models.cost_position import CostPosition
+from ..models.document import Document
+from ..models.expense import Expense
+from ..models.invoice import Invoice
+from ..models.milestone import Milestone
+from ..models.project import Project
+from ..models.quote import Quote
+
+logger = logging.getLogger(__name__)
+
+# Modell -> (Tag-Präfix, Spalte); jede Zeile erzeugt einen Tag pro Eintrag.
+# Spalte None: fester Tag ohne Wert, den jede Änderung der Tabelle erzeugt
+TAG_SOURCES: Dict[type, Tuple[Tuple[str, Optional[str]], ...]] = {
+    Project: (("project", "id"),),
+    Milestone: (("milestone", "id"), ("project", "project_id")),
+    Quote: (("quote", "id"), ("project", "project_id"), ("milestone", "milestone_id")),
+    Document: (("document", "id"), ("project", "project_id")),
+    Expense: (("expense", "id"), ("project", "project_id")),
+    Invoice: (("invoice", "id"), ("project", "project_id"), ("milestone", "milestone_id")),
+    CostPosition: (("cost_position", "id"), ("project", "project_id"), ("invoice", "invoice_id")),
+    BuildWiseFee: (("buildwise_fee", "id"), ("project", "project_id"), ("buildwise_fees", None)),
+}
+
+_SOURCES_BY_TABLE = {model.__table__: sources for model, sources in TAG_SOURCES.items()}
+
+# Schlüssel in Session.info für noch nicht committete Tags
+_PENDING_KEY = "cache_invalidation_pending"
+
+# Marker: Statement ohne auswertbare Bedingung, der gesamte Cache wird verworfen
+_ALL = "*"
+
+
+def _pending(session) -> Set[str]:
+    return session.info.setdefault(_PENDING_KEY, set())
+
+
+def _tags_for_values(sources: Iterable[Tuple[str, Optional[str]]], values) -> Set[str]:
+    """Tags aus Spaltenwerten (Mapping oder Objekt)"""
+    tags = set()
+    for prefix, column in sources:
+        if column is None:
+            tags.add(prefix)
+            continue
+        value = values.get(column) if isinstance(values, dict) else getattr(values, column, None)
+        if value is not None:
+            tags.add(f"{prefix}:{value}")
+    return tags
+
+
+def _tags_for_object(obj, sources) -> Set[str]:
+    """Tags eines ORM-Objekts, inklusive der Werte vor der Änderung"""
+    tags = set()
+    state = inspect(obj)
+    for prefix, column in sources:
+        if column is None:
+            tags.add(prefix)
+            continue
+        history = state.attrs[column].history
+        for value in (*history.added, *history.unchanged, *history.deleted):
+            if value is not None:
+                tags.add(f"{prefix}:{value}")
+    return tags
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tags(session, flush_context):
+    """Sammelt Tags neuer, geänderter und gelöschter Objekte"""
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        sources = TAG_SOURCES.get(type(obj))
+        if sources is None:
+            continue
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        _pending(session).update(_tags_for_object(obj, sources))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_statement_tags(orm_execute_state):
+    """Sammelt Tags der Zeilen, die ein Bulk-UPDATE/DELETE betreffen wird"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    statement = orm_execute_state.statement
+    sources = _SOURCES_BY_TABLE.get(getattr(statement, "table", None))
+    if sources is None:
+        return
+
+    session = orm_execute_state.session
+    parameters = orm_execute_state.parameters
+    if statement.whereclause is None:
+        if isinstance(parameters, list) and parameters and all("id" in row for row in parameters):
+            # Bulk-Update über Primärschlüssel (executemany)
+            for row in parameters:
+                _pending(session).update(_tags_for_values(sources, row))
+        else:
+            _pending(session).add(_ALL)
+        return
+
+    table = statement.table
+    columns = [table.c[column] for _, column in sources if column is not None]
+    rows = session.execute(
+        select(*columns).where(statement.whereclause),
+        parameters if isinstance(parameters, dict) else None
+    ).mappings().all()
+    pending = _pending(session)
+    for row in rows:
+        pending.update(_tags_for_values(sources, dict(row)))
+
+    # Neue Fremdschlüssel aus SET (z.B. Verschieben in ein anderes Projekt)
+    values = getattr(statement, "_values", None) or {}
+    for key, value in values.items():
+        name = getattr(key, "key", key)
+        new_value = getattr(value, "value", None)
+        for prefix, column in sources:
+            if column == name and new_value is not None:
+                pending.add(f"{prefix}:{new_value}")
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_tags(session):
+    """Invalidiert die gesammelten Tags nach dem Commit"""
+    tags = session.info.pop(_PENDING_KEY, None)
+    if not tags:
+        return
+    if _ALL in tags:
+        logger.info("Cache: Bulk-Statement ohne Bedingung, verwerfe den gesamten Cache")
+        cache_service.invalidate_all_nowait()
+        return
+    cache_service.invalidate_tags_nowait(tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_tags(session):
+    """Verwirft gesammelte Tags bei Rollback"""
+    session.info.pop(_PENDING_KEY, None)
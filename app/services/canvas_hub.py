@@ -0,0 +1,368 @@
+"""
+Kollaborations-Hub für Canvas-WebSockets
+
+- Fan-out über den Broker (PostgreSQL LISTEN/NOTIFY über alle Gunicorn-Worker,
+  In-Process bei SQLite): jeder Worker abonniert den Kanal eines Canvas einmal
+  und verteilt eingehende Nachrichten an seine lokalen Verbindungen
+- Cursor-Bewegungen werden je Canvas gesammelt und einmal pro Tick
+  (canvas_cursor_tick_ms) als ein Frame mit der letzten Position je Session
+  verschickt; in canvas_sessions werden sie nur gebündelt geschrieben
+- Framing: JSON-Textframes oder msgpack-Binärframes (?format=msgpack, sofern
+  msgpack installiert ist); ein Frame wird je Format nur einmal kodiert
+- Backpressure: jede Verbindung hat eine begrenzte Sendewarteschlange und einen
+  eigenen Sender-Task. Ist die Warteschlange voll, werden Cursor-Frames
+  verworfen, sonst ersetzt ein resync-Frame alle ausstehenden Frames (der
+  Client lädt über /canvas/{id}/operations?since_seq= nach). Hängt ein Send
+  länger als canvas_send_timeout_seconds, wird die Verbindung geschlossen.
+- Operationen werden über CanvasService.apply_operations mit kurzlebigen
+  Sessions angewendet; WebSockets belegen keine DB-Verbindung
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from typing import Any, Dict, Optional, Set, Tuple, Union
+
+from fastapi import WebSocket
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
+
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal
+from ..core.pubsub import RESYNC_MESSAGE, broker
+from ..schemas.canvas import CanvasMessageType, CanvasOperationBatch, CanvasOperationResult
+from .canvas_service import CanvasService
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Nachrichtentypen, die unverändert an die übrigen Teilnehmer weitergereicht werden
+RELAY_TYPES = {
+    CanvasMessageType.OBJECT_ADD.value, CanvasMessageType.OBJECT_UPDATE.value,
+    CanvasMessageType.OBJECT_DELETE.value, CanvasMessageType.AREA_ADD.value,
+    CanvasMessageType.AREA_UPDATE.value, CanvasMessageType.AREA_DELETE.value,
+}
+
+# WebSocket-Close-Code für überlastete Clients ("Try Again Later")
+CLOSE_SLOW_CONSUMER = 1013
+
+
+def canvas_channel(canvas_id: int) -> str:
+    """Broker-Kanal eines Canvas"""
+    return f"canvas:{canvas_id}"
+
+
+class Frame:
+    """Ausgehende Nachricht; wird je Format höchstens einmal kodiert"""
+
+    __slots__ = ("message", "droppable", "_text", "_binary")
+
+    def __init__(self, message: Dict[str, Any], droppable: bool = False):
+        self.message = message
+        self.droppable = droppable  # darf bei Überlast verworfen werden (Cursor)
+        self._text: Optional[str] = None
+        self._binary: Optional[bytes] = None
+
+    def encode(self, binary: bool) -> Union[str, bytes]:
+        if binary:
+            if self._binary is None:
+                self._binary = msgpack.packb(self.message, use_bin_type=True)
+            return self._binary
+        if self._text is None:
+            self._text = json.dumps(self.message, separators=(",", ":"))
+        return self._text
+
+
+class CanvasConnection:
+    """Eine WebSocket-Verbindung mit begrenzter Sendewarteschlange"""
+
+    def __init__(self, websocket: WebSocket, canvas_id: int, user_id: int, session_id: str, binary: bool):
+        self.id = uuid.uuid4().hex
+        self.websocket = websocket
+        self.canvas_id = canvas_id
+        self.user_id = user_id
+        self.session_id = session_id
+        self.binary = binary and MSGPACK_AVAILABLE
+        self.closed = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=settings.canvas_send_queue_size)
+        self._sender: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._sender = asyncio.create_task(self._send_loop())
+
+    def send(self, frame: Frame):
+        """Stellt einen Frame zum Senden ein, ohne zu blockieren"""
+        if self.closed:
+            return
+        try:
+            self._queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            if frame.droppable:
+                # Der nächste Cursor-Tick ersetzt diesen Frame
+                return
+            # Langsamer Client: ausstehende Frames verwerfen, Client lädt nach
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(Frame({"type": CanvasMessageType.RESYNC.value}))
+
+    def send_error(self, detail: str, request_id: Optional[Any] = None):
+        self.send(Frame({"type": CanvasMessageType.ERROR.value, "request_id": request_id, "detail": detail}))
+
+    def decode(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Dekodiert eine empfangene WebSocket-Nachricht (Text oder Binär)"""
+        if message.get("bytes") is not None:
+            if not MSGPACK_AVAILABLE:
+                raise ValueError("Binärframes werden nicht unterstützt")
+            return msgpack.unpackb(message["bytes"], raw=False)
+        return json.loads(message.get("text") or "")
+
+    async def _send_loop(self):
+        timeout = settings.canvas_send_timeout_seconds
+        try:
+            while True:
+                frame = await self._queue.get()
+                data = frame.encode(self.binary)
+                if isinstance(data, bytes):
+                    await asyncio.wait_for(self.websocket.send_bytes(data), timeout=timeout)
+                else:
+                    await asyncio.wait_for(self.websocket.send_text(data), timeout=timeout)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            logger.info(f"Canvas {self.canvas_id}: Client {self.user_id} zu langsam, Verbindung wird geschlossen")
+            await self.close(CLOSE_SLOW_CONSUMER)
+        except Exception as e:
+            logger.debug(f"Canvas {self.canvas_id}: Senden an Client {self.user_id} fehlgeschlagen: {e}")
+            await self.close()
+
+    async def close(self, code: int = 1000):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    async def stop(self):
+        self.closed = True
+        if self._sender is not None and not self._sender.done():
+            self._sender.cancel()
+            try:
+                await self._sender
+            except (asyncio.CancelledError, Exception):
+                pass
+
+
+class CanvasRoom:
+    """Alle Verbindungen eines Canvas in diesem Worker"""
+
+    def __init__(self, canvas_id: int):
+        self.canvas_id = canvas_id
+        self.connections: Dict[str, CanvasConnection] = {}
+        self.cursors: Dict[str, Dict[str, Any]] = {}  # session_id -> letzte Position seit dem letzten Tick
+        self.presence: Dict[str, Tuple[float, float]] = {}  # session_id -> Position für canvas_sessions
+        self._cursor_moved = asyncio.Event()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def start(self):
+        self._queue = broker.subscribe(canvas_channel(self.canvas_id))
+        self._tasks = {
+            asyncio.create_task(self._receive_loop()),
+            asyncio.create_task(self._tick_loop()),
+        }
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = set()
+        if self._queue is not None:
+            broker.unsubscribe(canvas_channel(self.canvas_id), self._queue)
+            self._queue = None
+        await self.flush_presence()
+
+    def deliver(self, frame: Frame, exclude: Optional[str] = None):
+        for connection_id, connection in list(self.connections.items()):
+            if connection_id != exclude:
+                connection.send(frame)
+
+    async def flush_presence(self):
+        """Schreibt die gesammelten Cursor-Positionen in einem Statement"""
+        if not self.presence:
+            return
+        positions, self.presence = self.presence, {}
+        try:
+            async with AsyncSessionLocal() as db:
+                await CanvasService(db).update_cursor_positions(positions)
+        except Exception as e:
+            logger.warning(f"Canvas {self.canvas_id}: Cursor-Positionen nicht gespeichert: {e}")
+
+    async def _receive_loop(self):
+        """Verteilt Nachrichten aller Worker an die lokalen Verbindungen"""
+        while True:
+            message = await self._queue.get()
+            if message == RESYNC_MESSAGE:
+                # Broker-Reconnect oder zu grosse Nachricht: alle Clients laden nach
+                self.deliver(Frame({"type": CanvasMessageType.RESYNC.value}))
+                continue
+            try:
+                envelope = json.loads(message)
+                self.deliver(Frame(envelope["f"], droppable=envelope.get("d", False)), exclude=envelope.get("o"))
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Canvas {self.canvas_id}: ungültige Nachricht ignoriert: {e}")
+
+    async def _tick_loop(self):
+        """Verschickt Cursor-Bewegungen gebündelt einmal pro Tick"""
+        loop = asyncio.get_running_loop()
+        tick = settings.canvas_cursor_tick_ms / 1000
+        last_flush = loop.time()
+        while True:
+            await self._cursor_moved.wait()
+            await asyncio.sleep(tick)
+            self._cursor_moved.clear()
+
+            cursors = list(self.cursors.values())
+            self.cursors.clear()
+            if cursors:
+                await canvas_hub.publish(
+                    self.canvas_id, {"type": CanvasMessageType.CURSORS.value, "cursors": cursors}, droppable=True
+                )
+
+            if loop.time() - last_flush >= settings.canvas_presence_flush_seconds:
+                last_flush = loop.time()
+                await self.flush_presence()
+
+
+class CanvasHub:
+    """Verwaltet die Canvas-Räume dieses Workers"""
+
+    def __init__(self):
+        self._rooms: Dict[int, CanvasRoom] = {}
+
+    async def join(self, websocket: WebSocket, canvas_id: int, user_id: int, session_id: str,
+                   binary: bool = False) -> CanvasConnection:
+        """Registriert eine (bereits akzeptierte) WebSocket-Verbindung"""
+        room = self._rooms.get(canvas_id)
+        if room is None:
+            room = CanvasRoom(canvas_id)
+            room.start()
+            self._rooms[canvas_id] = room
+
+        connection = CanvasConnection(websocket, canvas_id, user_id, session_id, binary)
+        connection.start()
+        room.connections[connection.id] = connection
+        await self.publish(
+            canvas_id,
+            {"type": CanvasMessageType.USER_JOIN.value, "user_id": user_id, "session_id": session_id},
+            origin=connection.id
+        )
+        return connection
+
+    async def leave(self, connection: CanvasConnection):
+        """Entfernt eine Verbindung; der letzte Teilnehmer schliesst den Raum"""
+        await connection.stop()
+        room = self._rooms.get(connection.canvas_id)
+        if room is None:
+            return
+        room.connections.pop(connection.id, None)
+        room.cursors.pop(connection.session_id, None)
+        await self.publish(
+            connection.canvas_id,
+            {"type": CanvasMessageType.USER_LEAVE.value, "user_id": connection.user_id, "session_id": connection.session_id},
+            origin=connection.id
+        )
+        if not room.connections and self._rooms.get(connection.canvas_id) is room:
+            del self._rooms[connection.canvas_id]
+            await room.stop()
+
+    def move_cursor(self, connection: CanvasConnection, x: float, y: float):
+        """Merkt die Cursor-Position bis zum nächsten Tick vor"""
+        room = self._rooms.get(connection.canvas_id)
+        if room is None:
+            return
+        room.cursors[connection.session_id] = {
+            "user_id": connection.user_id, "session_id": connection.session_id, "x": x, "y": y
+        }
+        room.presence[connection.session_id] = (x, y)
+        room._cursor_moved.set()
+
+    async def publish(self, canvas_id: int, message: Dict[str, Any], origin: Optional[str] = None,
+                      droppable: bool = False):
+        """Veröffentlicht eine Nachricht an alle Teilnehmer eines Canvas (alle Worker)"""
+        envelope = {"o": origin, "d": droppable, "f": message}
+        await broker.publish(canvas_channel(canvas_id), json.dumps(envelope, separators=(",", ":")))
+
+    async def publish_operations(self, canvas_id: int, result: CanvasOperationResult, origin: Optional[str] = None):
+        """Verteilt angewendete Operationen an die übrigen Teilnehmer"""
+        if not result.applied:
+            return
+        await self.publish(
+            canvas_id,
+            jsonable_encoder({"type": CanvasMessageType.OPERATIONS.value, "seq": result.seq, "ops": result.applied}),
+            origin=origin
+        )
+
+    async def handle_message(self, connection: CanvasConnection, message: Dict[str, Any]):
+        """Verarbeitet eine Nachricht eines Clients"""
+        message_type = message.get("type")
+        data = message.get("data") or {}
+
+        if message_type == CanvasMessageType.CURSOR_MOVE.value:
+            self.move_cursor(connection, float(data["x"]), float(data["y"]))
+
+        elif message_type == CanvasMessageType.OPERATIONS.value:
+            try:
+                batch = CanvasOperationBatch(**data)
+            except ValidationError as e:
+                connection.send_error(str(e), message.get("request_id"))
+                return
+            async with AsyncSessionLocal() as db:
+                result = await CanvasService(db).apply_operations(connection.canvas_id, batch, connection.user_id)
+            if result is None:
+                connection.send_error("Canvas nicht gefunden", message.get("request_id"))
+                return
+            connection.send(Frame({
+                "type": CanvasMessageType.ACK.value,
+                "request_id": message.get("request_id"),
+                **result.model_dump(mode="json")
+            }))
+            await self.publish_operations(connection.canvas_id, result, origin=connection.id)
+
+        elif message_type in RELAY_TYPES:
+            await self.publish(
+                connection.canvas_id,
+                {"type": message_type, "data": data, "user_id": connection.user_id},
+                origin=connection.id
+            )
+
+        else:
+            connection.send_error(f"Unbekannter Nachrichtentyp: {message_type}")
+
+    def connection_count(self, canvas_id: Optional[int] = None) -> int:
+        """Anzahl lokaler Verbindungen (gesamt oder für ein Canvas)"""
+        if canvas_id is not None:
+            room = self._rooms.get(canvas_id)
+            return len(room.connections) if room else 0
+        return sum(len(room.connections) for room in self._rooms.values())
+
+    async def stop(self):
+        """Schliesst alle Räume (für FastAPI Shutdown Event)"""
+        rooms, self._rooms = list(self._rooms.values()), {}
+        for room in rooms:
+            for connection in list(room.connections.values()):
+                await connection.stop()
+                await connection.close(1001)
+            await room.stop()
+
+
+# Globaler Hub (ein Exemplar pro Worker)
+canvas_hub = CanvasHub()
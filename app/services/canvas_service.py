@@ -1,7 +1,11 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
-from typing import List, Optional, Dict, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import and_, bindparam, func, delete, insert, select, update
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
+import asyncio
+from enum import Enum
+from pydantic import ValidationError
 import uuid
 import json
 import os
@@ -9,21 +13,39 @@ from PIL import Image, ImageDraw, ImageFont
 import io
 import base64
 
-from ..models.canvas import Canvas, CanvasObject, CollaborationArea, CanvasSession
+from ..models.canvas import Canvas, CanvasObject, CollaborationArea, CanvasSession, CanvasOperation
 from ..models.user import User
 from ..models.project import Project
 from ..schemas.canvas import (
     CanvasCreate, CanvasUpdate, CanvasObjectCreate, CanvasObjectUpdate,
     CollaborationAreaCreate, CollaborationAreaUpdate, CanvasSessionCreate,
-    CanvasState, CanvasExportRequest, CanvasExportResponse, UserCursor
+    CanvasState, CanvasExportRequest, CanvasExportResponse, UserCursor,
+    CanvasOperationType, CanvasOperationTarget, CanvasOperationIn, CanvasOperationBatch,
+    CanvasOperationOut, CanvasOperationConflict, CanvasOperationResult, CanvasOperationsSince
 )
 
+# Operationsziele: Modell, Schlüsselspalte, Schemas für insert und update
+OPERATION_TARGETS = {
+    "object": (CanvasObject, "object_id", CanvasObjectCreate, CanvasObjectUpdate),
+    "area": (CollaborationArea, "area_id", CollaborationAreaCreate, CollaborationAreaUpdate),
+}
+
+# Verdichtung des Operations-Logs: sobald mehr als OPLOG_RETENTION + COMPACTION_INTERVAL
+# Operationen vorliegen, werden alle bis auf die letzten OPLOG_RETENTION gelöscht.
+# Der Zustand steckt vollständig in den Objekt-Zeilen (Snapshot mit seq), das Log
+# dient nur dem Nachholen kurz getrennter Clients.
+OPLOG_RETENTION = 200
+COMPACTION_INTERVAL = 500
+
 class CanvasService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
+    async def _first(self, query):
+        return (await self.db.execute(query.limit(1))).scalars().first()
+
     # Canvas Management
-    def create_canvas(self, canvas_data: CanvasCreate, user_id: int) -> Canvas:
+    async def create_canvas(self, canvas_data: CanvasCreate, user_id: int) -> Canvas:
         """Erstellt ein neues Canvas für ein Projekt"""
         db_canvas = Canvas(
             project_id=canvas_data.project_id,
@@ -35,25 +57,37 @@ class CanvasService:
             created_by=user_id
         )
         self.db.add(db_canvas)
-        self.db.commit()
-        self.db.refresh(db_canvas)
+        await self.db.commit()
+        await self.db.refresh(db_canvas)
         return db_canvas
 
-    def get_canvas_by_project(self, project_id: int) -> Optional[Canvas]:
-        """Holt das Canvas für ein Projekt"""
-        return self.db.query(Canvas).filter(Canvas.project_id == project_id).first()
+    async def get_canvas(self, canvas_id: int, with_content: bool = False) -> Optional[Canvas]:
+        """Holt ein Canvas (optional mit Objekten und Bereichen)"""
+        query = select(Canvas).where(Canvas.id == canvas_id)
+        if with_content:
+            query = query.options(selectinload(Canvas.objects), selectinload(Canvas.areas))
+        return await self._first(query)
 
-    def get_or_create_canvas(self, project_id: int, user_id: int) -> Canvas:
+    async def get_canvas_by_project(self, project_id: int) -> Optional[Canvas]:
+        """Holt das Canvas für ein Projekt (mit Objekten und Bereichen)"""
+        return await self._first(
+            select(Canvas)
+            .where(Canvas.project_id == project_id)
+            .options(selectinload(Canvas.objects), selectinload(Canvas.areas))
+        )
+
+    async def get_or_create_canvas(self, project_id: int, user_id: int) -> Canvas:
         """Holt ein Canvas oder erstellt es, falls es nicht existiert"""
-        canvas = self.get_canvas_by_project(project_id)
+        canvas = await self.get_canvas_by_project(project_id)
         if not canvas:
             canvas_data = CanvasCreate(project_id=project_id)
-            canvas = self.create_canvas(canvas_data, user_id)
+            await self.create_canvas(canvas_data, user_id)
+            canvas = await self.get_canvas_by_project(project_id)
         return canvas
 
-    def update_canvas(self, canvas_id: int, canvas_data: CanvasUpdate) -> Optional[Canvas]:
+    async def update_canvas(self, canvas_id: int, canvas_data: CanvasUpdate) -> Optional[Canvas]:
         """Aktualisiert ein Canvas"""
-        db_canvas = self.db.query(Canvas).filter(Canvas.id == canvas_id).first()
+        db_canvas = await self._first(select(Canvas).where(Canvas.id == canvas_id))
         if not db_canvas:
             return None
         
@@ -61,160 +95,149 @@ class CanvasService:
             setattr(db_canvas, field, value)
         
         db_canvas.updated_at = datetime.utcnow()
-        self.db.commit()
-        self.db.refresh(db_canvas)
-        return db_canvas
+        await self.db.commit()
+        return await self.get_canvas(canvas_id, with_content=True)
 
-    def delete_canvas(self, canvas_id: int) -> bool:
+    async def delete_canvas(self, canvas_id: int) -> bool:
         """Löscht ein Canvas"""
-        db_canvas = self.db.query(Canvas).filter(Canvas.id == canvas_id).first()
+        db_canvas = await self._first(select(Canvas).where(Canvas.id == canvas_id))
         if not db_canvas:
             return False
         
-        self.db.delete(db_canvas)
-        self.db.commit()
+        await self.db.delete(db_canvas)
+        await self.db.commit()
         return True
 
     # Canvas Objects
-    def create_canvas_object(self, canvas_id: int, object_data: CanvasObjectCreate, user_id: int) -> CanvasObject:
+    async def create_canvas_object(self, canvas_id: int, object_data: CanvasObjectCreate, user_id: int) -> Optional[CanvasObject]:
         """Erstellt ein neues Canvas-Objekt"""
-        db_object = CanvasObject(
-            canvas_id=canvas_id,
-            object_id=str(uuid.uuid4()),
-            type=object_data.type.value,
-            x=object_data.x,
-            y=object_data.y,
-            width=object_data.width,
-            height=object_data.height,
-            rotation=object_data.rotation,
-            content=object_data.content,
-            color=object_data.color,
-            font_size=object_data.font_size,
-            font_family=object_data.font_family,
-            image_url=object_data.image_url,
-            points=object_data.points,
-            created_by=user_id
+        object_id = str(uuid.uuid4())
+        operation = CanvasOperationIn(
+            op=CanvasOperationType.INSERT, target=CanvasOperationTarget.OBJECT,
+            id=object_id, data=object_data.dict()
         )
-        self.db.add(db_object)
-        self.db.commit()
-        self.db.refresh(db_object)
-        return db_object
+        if not await self._apply_single_operation(canvas_id, operation, user_id):
+            return None
+        return await self._first(select(CanvasObject).where(CanvasObject.object_id == object_id))
 
-    def update_canvas_object(self, object_id: str, object_data: CanvasObjectUpdate) -> Optional[CanvasObject]:
+    async def update_canvas_object(self, object_id: str, object_data: CanvasObjectUpdate, user_id: Optional[int] = None) -> Optional[CanvasObject]:
         """Aktualisiert ein Canvas-Objekt"""
-        db_object = self.db.query(CanvasObject).filter(CanvasObject.object_id == object_id).first()
+        db_object = await self._first(select(CanvasObject).where(CanvasObject.object_id == object_id))
         if not db_object:
             return None
         
-        for field, value in object_data.dict(exclude_unset=True).items():
-            if field == 'type' and value:
-                setattr(db_object, field, value.value)
-            else:
-                setattr(db_object, field, value)
-        
-        db_object.updated_at = datetime.utcnow()
-        self.db.commit()
-        self.db.refresh(db_object)
+        operation = CanvasOperationIn(
+            op=CanvasOperationType.UPDATE, target=CanvasOperationTarget.OBJECT,
+            id=object_id, data=object_data.dict(exclude_unset=True)
+        )
+        await self._apply_single_operation(db_object.canvas_id, operation, user_id or db_object.created_by)
+        await self.db.refresh(db_object)
         return db_object
 
-    def delete_canvas_object(self, object_id: str) -> bool:
+    async def delete_canvas_object(self, object_id: str, user_id: Optional[int] = None) -> bool:
         """Löscht ein Canvas-Objekt"""
-        db_object = self.db.query(CanvasObject).filter(CanvasObject.object_id == object_id).first()
+        db_object = await self._first(select(CanvasObject).where(CanvasObject.object_id == object_id))
         if not db_object:
             return False
         
-        self.db.delete(db_object)
-        self.db.commit()
-        return True
+        operation = CanvasOperationIn(
+            op=CanvasOperationType.DELETE, target=CanvasOperationTarget.OBJECT, id=object_id
+        )
+        return await self._apply_single_operation(db_object.canvas_id, operation, user_id or db_object.created_by)
 
-    def get_canvas_objects(self, canvas_id: int) -> List[CanvasObject]:
+    async def get_canvas_objects(self, canvas_id: int) -> List[CanvasObject]:
         """Holt alle Objekte eines Canvas"""
-        return self.db.query(CanvasObject).filter(CanvasObject.canvas_id == canvas_id).all()
+        result = await self.db.execute(select(CanvasObject).where(CanvasObject.canvas_id == canvas_id))
+        return list(result.scalars().all())
 
     # Collaboration Areas
-    def create_collaboration_area(self, canvas_id: int, area_data: CollaborationAreaCreate, user_id: int) -> CollaborationArea:
+    async def create_collaboration_area(self, canvas_id: int, area_data: CollaborationAreaCreate, user_id: int) -> Optional[CollaborationArea]:
         """Erstellt einen neuen Kollaborationsbereich"""
-        db_area = CollaborationArea(
-            canvas_id=canvas_id,
-            area_id=str(uuid.uuid4()),
-            name=area_data.name,
-            x=area_data.x,
-            y=area_data.y,
-            width=area_data.width,
-            height=area_data.height,
-            color=area_data.color,
-            assigned_users=area_data.assigned_users,
-            created_by=user_id
+        area_id = str(uuid.uuid4())
+        operation = CanvasOperationIn(
+            op=CanvasOperationType.INSERT, target=CanvasOperationTarget.AREA,
+            id=area_id, data=area_data.dict()
         )
-        self.db.add(db_area)
-        self.db.commit()
-        self.db.refresh(db_area)
-        return db_area
+        if not await self._apply_single_operation(canvas_id, operation, user_id):
+            return None
+        return await self._first(select(CollaborationArea).where(CollaborationArea.area_id == area_id))
 
-    def update_collaboration_area(self, area_id: str, area_data: CollaborationAreaUpdate) -> Optional[CollaborationArea]:
+    async def update_collaboration_area(self, area_id: str, area_data: CollaborationAreaUpdate, user_id: Optional[int] = None) -> Optional[CollaborationArea]:
         """Aktualisiert einen Kollaborationsbereich"""
-        db_area = self.db.query(CollaborationArea).filter(CollaborationArea.area_id == area_id).first()
+        db_area = await self._first(select(CollaborationArea).where(CollaborationArea.area_id == area_id))
         if not db_area:
             return None
         
-        for field, value in area_data.dict(exclude_unset=True).items():
-            setattr(db_area, field, value)
-        
-        db_area.updated_at = datetime.utcnow()
-        self.db.commit()
-        self.db.refresh(db_area)
+        operation = CanvasOperationIn(
+            op=CanvasOperationType.UPDATE, target=CanvasOperationTarget.AREA,
+            id=area_id, data=area_data.dict(exclude_unset=True)
+        )
+        await self._apply_single_operation(db_area.canvas_id, operation, user_id or db_area.created_by)
+        await self.db.refresh(db_area)
         return db_area
 
-    def delete_collaboration_area(self, area_id: str) -> bool:
+    async def delete_collaboration_area(self, area_id: str, user_id: Optional[int] = None) -> bool:
         """Löscht einen Kollaborationsbereich"""
-        db_area = self.db.query(CollaborationArea).filter(CollaborationArea.area_id == area_id).first()
+        db_area = await self._first(select(CollaborationArea).where(CollaborationArea.area_id == area_id))
         if not db_area:
             return False
         
-        self.db.delete(db_area)
-        self.db.commit()
-        return True
+        operation = CanvasOperationIn(
+            op=CanvasOperationType.DELETE, target=CanvasOperationTarget.AREA, id=area_id
+        )
+        return await self._apply_single_operation(db_area.canvas_id, operation, user_id or db_area.created_by)
 
-    def get_collaboration_areas(self, canvas_id: int) -> List[CollaborationArea]:
+    async def get_collaboration_areas(self, canvas_id: int) -> List[CollaborationArea]:
         """Holt alle Kollaborationsbereiche eines Canvas"""
-        return self.db.query(CollaborationArea).filter(CollaborationArea.canvas_id == canvas_id).all()
+        result = await self.db.execute(select(CollaborationArea).where(CollaborationArea.canvas_id == canvas_id))
+        return list(result.scalars().all())
 
-    def assign_user_to_area(self, area_id: str, user_id: int) -> bool:
+    async def assign_user_to_area(self, area_id: str, user_id: int) -> bool:
         """Weist einen Nutzer einem Kollaborationsbereich zu"""
-        db_area = self.db.query(CollaborationArea).filter(CollaborationArea.area_id == area_id).first()
+        db_area = await self._first(select(CollaborationArea).where(CollaborationArea.area_id == area_id))
         if not db_area:
             return False
         
-        if user_id not in db_area.assigned_users:
-            db_area.assigned_users.append(user_id)
-            self.db.commit()
+        assigned_users = list(db_area.assigned_users or [])
+        if user_id not in assigned_users:
+            await self._update_assigned_users(db_area, assigned_users + [user_id])
         return True
 
-    def remove_user_from_area(self, area_id: str, user_id: int) -> bool:
+    async def remove_user_from_area(self, area_id: str, user_id: int) -> bool:
         """Entfernt einen Nutzer aus einem Kollaborationsbereich"""
-        db_area = self.db.query(CollaborationArea).filter(CollaborationArea.area_id == area_id).first()
+        db_area = await self._first(select(CollaborationArea).where(CollaborationArea.area_id == area_id))
         if not db_area:
             return False
         
-        if user_id in db_area.assigned_users:
-            db_area.assigned_users.remove(user_id)
-            self.db.commit()
+        assigned_users = list(db_area.assigned_users or [])
+        if user_id in assigned_users:
+            assigned_users.remove(user_id)
+            await self._update_assigned_users(db_area, assigned_users)
         return True
 
+    async def _update_assigned_users(self, db_area: CollaborationArea, assigned_users: List[int]) -> None:
+        operation = CanvasOperationIn(
+            op=CanvasOperationType.UPDATE, target=CanvasOperationTarget.AREA,
+            id=db_area.area_id, data={"assigned_users": assigned_users}
+        )
+        await self._apply_single_operation(db_area.canvas_id, operation, db_area.created_by)
+
     # Canvas Sessions
-    def create_canvas_session(self, canvas_id: int, user_id: int) -> CanvasSession:
+    async def create_canvas_session(self, canvas_id: int, user_id: int) -> CanvasSession:
         """Erstellt eine neue Canvas-Session für einen Nutzer"""
         # Deaktiviere alte Sessions des Nutzers
-        old_sessions = self.db.query(CanvasSession).filter(
-            and_(
-                CanvasSession.canvas_id == canvas_id,
-                CanvasSession.user_id == user_id,
-                CanvasSession.is_active == True
+        await self.db.execute(
+            update(CanvasSession)
+            .where(
+                and_(
+                    CanvasSession.canvas_id == canvas_id,
+                    CanvasSession.user_id == user_id,
+                    CanvasSession.is_active == True
+                )
             )
-        ).all()
-        
-        for session in old_sessions:
-            session.is_active = False
+            .values(is_active=False)
+            .execution_options(synchronize_session=False)
+        )
         
         # Erstelle neue Session
         db_session = CanvasSession(
@@ -223,59 +246,83 @@ class CanvasService:
             session_id=str(uuid.uuid4())
         )
         self.db.add(db_session)
-        self.db.commit()
-        self.db.refresh(db_session)
+        await self.db.commit()
+        await self.db.refresh(db_session)
         return db_session
 
-    def update_cursor_position(self, session_id: str, cursor_x: float, cursor_y: float) -> bool:
+    async def update_cursor_position(self, session_id: str, cursor_x: float, cursor_y: float) -> bool:
         """Aktualisiert die Cursor-Position eines Nutzers"""
-        db_session = self.db.query(CanvasSession).filter(CanvasSession.session_id == session_id).first()
+        db_session = await self._first(select(CanvasSession).where(CanvasSession.session_id == session_id))
         if not db_session:
             return False
         
         db_session.cursor_x = cursor_x
         db_session.cursor_y = cursor_y
         db_session.last_activity = datetime.utcnow()
-        self.db.commit()
+        await self.db.commit()
         return True
 
-    def deactivate_session(self, session_id: str) -> bool:
+    async def update_cursor_positions(self, positions: Dict[str, Tuple[float, float]]) -> None:
+        """Schreibt die letzten Cursor-Positionen mehrerer Sessions in einem Statement"""
+        if not positions:
+            return
+        
+        table = CanvasSession.__table__
+        now = datetime.utcnow()
+        await self.db.execute(
+            update(table)
+            .where(table.c.session_id == bindparam("b_session_id"))
+            .values(cursor_x=bindparam("b_x"), cursor_y=bindparam("b_y"), last_activity=bindparam("b_now")),
+            [
+                {"b_session_id": session_id, "b_x": x, "b_y": y, "b_now": now}
+                for session_id, (x, y) in positions.items()
+            ]
+        )
+        await self.db.commit()
+
+    async def deactivate_session(self, session_id: str) -> bool:
         """Deaktiviert eine Canvas-Session"""
-        db_session = self.db.query(CanvasSession).filter(CanvasSession.session_id == session_id).first()
+        db_session = await self._first(select(CanvasSession).where(CanvasSession.session_id == session_id))
         if not db_session:
             return False
         
         db_session.is_active = False
-        self.db.commit()
+        await self.db.commit()
         return True
 
-    def get_active_users(self, canvas_id: int) -> List[UserCursor]:
+    async def get_active_users(self, canvas_id: int) -> List[UserCursor]:
         """Holt alle aktiven Nutzer eines Canvas"""
-        active_sessions = self.db.query(CanvasSession).filter(
-            and_(
-                CanvasSession.canvas_id == canvas_id,
-                CanvasSession.is_active == True,
-                CanvasSession.last_activity >= datetime.utcnow() - timedelta(minutes=5)
+        result = await self.db.execute(
+            select(CanvasSession, User)
+            .join(User, User.id == CanvasSession.user_id)
+            .where(
+                and_(
+                    CanvasSession.canvas_id == canvas_id,
+                    CanvasSession.is_active == True,
+                    CanvasSession.last_activity >= datetime.utcnow() - timedelta(minutes=5)
+                )
             )
-        ).all()
-        
-        users = []
-        for session in active_sessions:
-            user = self.db.query(User).filter(User.id == session.user_id).first()
-            if user:
-                users.append(UserCursor(
-                    user_id=user.id,
-                    user_name=f"{user.first_name} {user.last_name}",
-                    cursor_x=session.cursor_x,
-                    cursor_y=session.cursor_y
-                ))
-        
-        return users
+        )
+
+        return [
+            UserCursor(
+                user_id=user.id,
+                user_name=f"{user.first_name} {user.last_name}",
+                cursor_x=session.cursor_x,
+                cursor_y=session.cursor_y
+            )
+            for session, user in result.all()
+        ]
 
     # Canvas State Management
-    def save_canvas_state(self, canvas_id: int, state: CanvasState) -> bool:
-        """Speichert den aktuellen Canvas-Zustand"""
-        canvas = self.db.query(Canvas).filter(Canvas.id == canvas_id).first()
+    async def save_canvas_state(self, canvas_id: int, state: CanvasState, user_id: Optional[int] = None) -> bool:
+        """
+        Speichert den aktuellen Canvas-Zustand
+
+        Der Zustand wird mit den gespeicherten Objekten verglichen; nur neue,
+        geänderte und entfernte Objekte werden geschrieben und protokolliert.
+        """
+        canvas = await self._lock_canvas(canvas_id)
         if not canvas:
             return False
         
@@ -285,29 +332,22 @@ class CanvasService:
         canvas.viewport_scale = state.viewport.get("scale", 1.0)
         canvas.updated_at = datetime.utcnow()
         
-        # Lösche alte Objekte und Bereiche
-        self.db.query(CanvasObject).filter(CanvasObject.canvas_id == canvas_id).delete()
-        self.db.query(CollaborationArea).filter(CollaborationArea.canvas_id == canvas_id).delete()
-        
-        # Erstelle neue Objekte
-        for obj_data in state.objects:
-            self.create_canvas_object(canvas_id, obj_data, obj_data.created_by)
-        
-        # Erstelle neue Bereiche
-        for area_data in state.areas:
-            self.create_collaboration_area(canvas_id, area_data, area_data.created_by)
+        operations = await self._diff_state(canvas_id, state)
+        authors = {obj.object_id: obj.created_by for obj in state.objects}
+        authors.update({area.area_id: area.created_by for area in state.areas})
+        await self._apply_operations(canvas, operations, user_id or canvas.created_by, authors)
         
-        self.db.commit()
+        await self.db.commit()
         return True
 
-    def load_canvas_state(self, canvas_id: int) -> Optional[CanvasState]:
+    async def load_canvas_state(self, canvas_id: int) -> Optional[CanvasState]:
         """Lädt den Canvas-Zustand"""
-        canvas = self.db.query(Canvas).filter(Canvas.id == canvas_id).first()
+        canvas = await self._first(select(Canvas).where(Canvas.id == canvas_id))
         if not canvas:
             return None
         
-        objects = self.get_canvas_objects(canvas_id)
-        areas = self.get_collaboration_areas(canvas_id)
+        objects = await self.get_canvas_objects(canvas_id)
+        areas = await self.get_collaboration_areas(canvas_id)
         
         return CanvasState(
             objects=objects,
@@ -316,25 +356,314 @@ class CanvasService:
                 "x": canvas.viewport_x,
                 "y": canvas.viewport_y,
                 "scale": canvas.viewport_scale
+            },
+            seq=canvas.seq
+        )
+
+    # Operations-Log
+    async def apply_operations(self, canvas_id: int, batch: CanvasOperationBatch, user_id: int) -> Optional[CanvasOperationResult]:
+        """
+        Wendet einen Batch von Einfüge-, Änderungs- und Löschoperationen an
+
+        Operationen mit veralteter base_version oder unbekanntem Ziel werden als
+        Konflikt zurückgegeben, die übrigen angewendet. Die Antwort enthält
+        zusätzlich alle Operationen anderer Nutzer seit base_seq.
+        """
+        canvas = await self._lock_canvas(canvas_id)
+        if not canvas:
+            return None
+        
+        missed, resync = await self._operations_since(canvas, batch.base_seq)
+        
+        if batch.viewport is not None:
+            canvas.viewport_x = batch.viewport.get("x", canvas.viewport_x)
+            canvas.viewport_y = batch.viewport.get("y", canvas.viewport_y)
+            canvas.viewport_scale = batch.viewport.get("scale", canvas.viewport_scale)
+        
+        applied, conflicts = await self._apply_operations(canvas, batch.ops, user_id)
+        await self.db.commit()
+        
+        return CanvasOperationResult(
+            seq=canvas.seq,
+            applied=applied,
+            conflicts=conflicts,
+            missed=missed,
+            resync=resync
+        )
+
+    async def get_operations_since(self, canvas_id: int, since_seq: int) -> Optional[CanvasOperationsSince]:
+        """Holt alle Operationen nach since_seq oder den Vollzustand, falls diese bereits verdichtet sind"""
+        canvas = await self._first(select(Canvas).where(Canvas.id == canvas_id))
+        if not canvas:
+            return None
+        
+        ops, resync = await self._operations_since(canvas, since_seq)
+        if resync:
+            state = await self.load_canvas_state(canvas_id)
+            return CanvasOperationsSince(seq=state.seq, state=state)
+        return CanvasOperationsSince(seq=canvas.seq, ops=ops)
+
+    async def compact_operations(self, canvas_id: int) -> int:
+        """Verdichtet das Operations-Log eines Canvas; gibt die neue compacted_seq zurück"""
+        canvas = await self._lock_canvas(canvas_id)
+        if not canvas:
+            return 0
+        
+        await self._compact_operations(canvas)
+        await self.db.commit()
+        return canvas.compacted_seq
+
+    async def _lock_canvas(self, canvas_id: int) -> Optional[Canvas]:
+        """Sperrt die Canvas-Zeile, damit Sequenznummern lückenlos und eindeutig vergeben werden"""
+        return await self._first(select(Canvas).where(Canvas.id == canvas_id).with_for_update())
+
+    async def _apply_single_operation(self, canvas_id: int, operation: CanvasOperationIn, user_id: int) -> bool:
+        canvas = await self._lock_canvas(canvas_id)
+        if not canvas:
+            return False
+        
+        applied, _ = await self._apply_operations(canvas, [operation], user_id)
+        await self.db.commit()
+        return bool(applied)
+
+    async def _operations_since(self, canvas: Canvas, since_seq: int) -> Tuple[List[CanvasOperationOut], bool]:
+        """Operationen nach since_seq; True, falls ein Teil davon bereits verdichtet wurde"""
+        if since_seq >= canvas.seq:
+            return [], False
+        if since_seq < canvas.compacted_seq:
+            return [], True
+        
+        result = await self.db.execute(
+            select(CanvasOperation)
+            .where(
+                and_(
+                    CanvasOperation.canvas_id == canvas.id,
+                    CanvasOperation.seq > since_seq
+                )
+            )
+            .order_by(CanvasOperation.seq)
+        )
+        rows = result.scalars().all()
+        return [CanvasOperationOut.model_validate(row) for row in rows], False
+
+    @staticmethod
+    def _operation_fields(values: Dict[str, Any]) -> Dict[str, Any]:
+        """Enum-Werte in ihre Rohwerte umwandeln (Spaltenwerte und JSON im Log)"""
+        return {field: value.value if isinstance(value, Enum) else value for field, value in values.items()}
+
+    async def _diff_state(self, canvas_id: int, state: CanvasState) -> List[CanvasOperationIn]:
+        """Operationen, die den gespeicherten Zustand in den übergebenen überführen"""
+        operations = []
+        for target, items in ((CanvasOperationTarget.OBJECT, state.objects), (CanvasOperationTarget.AREA, state.areas)):
+            model, key, _, update_schema = OPERATION_TARGETS[target.value]
+            fields = list(update_schema.model_fields)
+            table = model.__table__
+            existing = {
+                row[key]: row
+                for row in (await self.db.execute(
+                    select(table.c[key], *(table.c[field] for field in fields)).where(table.c.canvas_id == canvas_id)
+                )).mappings()
             }
+            
+            incoming = set()
+            for item in items:
+                item_id = getattr(item, key)
+                values = self._operation_fields(item.dict(include=set(fields)))
+                incoming.add(item_id)
+                current = existing.get(item_id)
+                if current is None:
+                    operations.append(CanvasOperationIn(
+                        op=CanvasOperationType.INSERT, target=target, id=item_id, data=values
+                    ))
+                    continue
+                changed = {field: value for field, value in values.items() if current[field] != value}
+                if changed:
+                    operations.append(CanvasOperationIn(
+                        op=CanvasOperationType.UPDATE, target=target, id=item_id, data=changed
+                    ))
+            
+            for item_id in existing.keys() - incoming:
+                operations.append(CanvasOperationIn(op=CanvasOperationType.DELETE, target=target, id=item_id))
+        
+        return operations
+
+    async def _apply_operations(
+        self, canvas: Canvas, operations: List[CanvasOperationIn], user_id: int,
+        authors: Optional[Dict[str, int]] = None
+    ) -> Tuple[List[CanvasOperationOut], List[CanvasOperationConflict]]:
+        """
+        Prüft und wendet Operationen auf die gesperrte Canvas an (ohne Commit)
+
+        Alle Operationen eines Batches werden zuerst im Speicher zusammengeführt
+        (insert + update = ein INSERT, insert + delete = nichts) und dann mit je
+        einem DELETE, einem Bulk-UPDATE und einem Bulk-INSERT pro Typ geschrieben.
+        """
+        now = datetime.utcnow()
+        authors = authors or {}
+        
+        # Aktuelle Versionen aller referenzierten Objekte: eine Abfrage je Typ
+        versions: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for target, (model, key, _, _) in OPERATION_TARGETS.items():
+            ids = {op.id for op in operations if op.target.value == target and op.id}
+            if not ids:
+                continue
+            key_column = getattr(model, key)
+            rows = (await self.db.execute(
+                select(key_column, model.id, model.canvas_id, model.version).where(key_column.in_(ids))
+            )).all()
+            for target_id, pk, row_canvas_id, version in rows:
+                versions[(target, target_id)] = {
+                    "pk": pk,
+                    "version": version if row_canvas_id == canvas.id else None,
+                    "foreign": row_canvas_id != canvas.id
+                }
+        
+        inserts: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        updates: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        deletes: Dict[str, set] = {target: set() for target in OPERATION_TARGETS}
+        log: List[Dict[str, Any]] = []
+        conflicts: List[CanvasOperationConflict] = []
+        
+        for index, operation in enumerate(operations):
+            target = operation.target.value
+            model, key, create_schema, update_schema = OPERATION_TARGETS[target]
+            target_id = operation.id or str(uuid.uuid4())
+            state = versions.get((target, target_id))
+            
+            if operation.op == CanvasOperationType.INSERT:
+                if state and (state["foreign"] or state["version"] is not None):
+                    conflicts.append(CanvasOperationConflict(
+                        index=index, id=target_id, reason="exists",
+                        current_version=state["version"]
+                    ))
+                    continue
+                try:
+                    data = self._operation_fields(create_schema(**operation.data).dict())
+                except ValidationError as e:
+                    conflicts.append(CanvasOperationConflict(index=index, id=target_id, reason="invalid", detail=str(e)))
+                    continue
+                
+                version = 1
+                inserts[(target, target_id)] = {
+                    **data,
+                    key: target_id,
+                    "canvas_id": canvas.id,
+                    "version": version,
+                    "created_by": authors.get(target_id, user_id),
+                    "created_at": now,
+                    "updated_at": now
+                }
+                versions[(target, target_id)] = {"pk": None, "version": version, "foreign": False}
+            
+            else:
+                if not state or state["foreign"] or state["version"] is None:
+                    conflicts.append(CanvasOperationConflict(index=index, id=target_id, reason="not_found"))
+                    continue
+                if operation.base_version is not None and operation.base_version != state["version"]:
+                    conflicts.append(CanvasOperationConflict(
+                        index=index, id=target_id, reason="version_conflict",
+                        current_version=state["version"]
+                    ))
+                    continue
+                
+                if operation.op == CanvasOperationType.UPDATE:
+                    try:
+                        data = self._operation_fields(update_schema(**operation.data).dict(exclude_unset=True))
+                    except ValidationError as e:
+                        conflicts.append(CanvasOperationConflict(index=index, id=target_id, reason="invalid", detail=str(e)))
+                        continue
+                    if not data:
+                        continue
+                    
+                    version = state["version"] + 1
+                    pending_insert = inserts.get((target, target_id))
+                    if pending_insert is not None:
+                        pending_insert.update(data, version=version)
+                    else:
+                        updates.setdefault((target, target_id), {"id": state["pk"]}).update(
+                            data, version=version, updated_at=now
+                        )
+                    state["version"] = version
+                
+                else:
+                    data = None
+                    version = None
+                    inserts.pop((target, target_id), None)
+                    updates.pop((target, target_id), None)
+                    if state["pk"] is not None:
+                        deletes[target].add(state["pk"])
+                    state["version"] = None
+            
+            log.append({
+                "canvas_id": canvas.id,
+                "seq": canvas.seq + len(log) + 1,
+                "op": operation.op.value,
+                "target": target,
+                "target_id": target_id,
+                "data": data,
+                "version": version,
+                "created_by": user_id,
+                "created_at": now
+            })
+        
+        if not log:
+            return [], conflicts
+        
+        # Löschen vor Einfügen: eine im Batch gelöschte und neu angelegte ID bleibt eindeutig
+        for target, (model, _, _, _) in OPERATION_TARGETS.items():
+            if deletes[target]:
+                await self.db.execute(
+                    delete(model).where(model.id.in_(deletes[target])).execution_options(synchronize_session=False)
+                )
+            rows = [values for (row_target, _), values in updates.items() if row_target == target]
+            if rows:
+                await self.db.execute(update(model), rows)
+            rows = [values for (row_target, _), values in inserts.items() if row_target == target]
+            if rows:
+                await self.db.execute(insert(model), rows)
+        
+        await self.db.execute(insert(CanvasOperation), log)
+        canvas.seq += len(log)
+        canvas.updated_at = now
+        
+        if canvas.seq - canvas.compacted_seq > OPLOG_RETENTION + COMPACTION_INTERVAL:
+            await self._compact_operations(canvas)
+        
+        return [CanvasOperationOut(**entry) for entry in log], conflicts
+
+    async def _compact_operations(self, canvas: Canvas) -> None:
+        """Löscht alle Log-Einträge bis auf die letzten OPLOG_RETENTION"""
+        compacted_seq = max(canvas.seq - OPLOG_RETENTION, canvas.compacted_seq)
+        if compacted_seq == canvas.compacted_seq:
+            return
+        await self.db.execute(
+            delete(CanvasOperation).where(
+                and_(
+                    CanvasOperation.canvas_id == canvas.id,
+                    CanvasOperation.seq <= compacted_seq
+                )
+            )
         )
+        canvas.compacted_seq = compacted_seq
 
     # Export Functions
-    def export_canvas(self, canvas_id: int, export_request: CanvasExportRequest) -> CanvasExportResponse:
+    async def export_canvas(self, canvas_id: int, export_request: CanvasExportRequest) -> CanvasExportResponse:
         """Exportiert ein Canvas als Bild oder PDF"""
-        canvas = self.db.query(Canvas).filter(Canvas.id == canvas_id).first()
+        canvas = await self._first(select(Canvas).where(Canvas.id == canvas_id))
         if not canvas:
             return CanvasExportResponse(success=False, message="Canvas nicht gefunden")
         
         try:
-            # Erstelle ein Bild des Canvas
-            image = self._render_canvas_to_image(canvas, export_request)
+            # Erstelle ein Bild des Canvas (Rendering im Thread, blockiert den Event-Loop nicht)
+            objects = await self.get_canvas_objects(canvas.id)
+            areas = await self.get_collaboration_areas(canvas.id)
+            image = await asyncio.to_thread(self._render_canvas_to_image, objects, areas, export_request)
             
             if export_request.export_type == "download":
                 # Speichere als temporäre Datei
                 file_path = f"storage/exports/canvas_{canvas_id}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{export_request.format}"
                 os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                image.save(file_path)
+                await asyncio.to_thread(image.save, file_path)
                 
                 return CanvasExportResponse(
                     success=True,
@@ -343,7 +672,7 @@ class CanvasService:
                 )
             else:
                 # Speichere als Dokument
-                document_id = self._save_as_document(canvas, image, export_request.format)
+                document_id = await self._save_as_document(canvas, image, export_request.format)
                 
                 return CanvasExportResponse(
                     success=True,
@@ -354,12 +683,10 @@ class CanvasService:
         except Exception as e:
             return CanvasExportResponse(success=False, message=f"Export fehlgeschlagen: {str(e)}")
 
-    def _render_canvas_to_image(self, canvas: Canvas, export_request: CanvasExportRequest) -> Image.Image:
+    def _render_canvas_to_image(self, objects: List[CanvasObject], areas: List[CollaborationArea],
+                                export_request: CanvasExportRequest) -> Image.Image:
         """Rendert das Canvas als Bild"""
         # Bestimme Canvas-Größe
-        objects = self.get_canvas_objects(canvas.id)
-        areas = self.get_collaboration_areas(canvas.id)
-        
         if not objects and not areas:
             # Leeres Canvas
             width, height = 1920, 1080
@@ -409,7 +736,7 @@ class CanvasService:
         
         return image
 
-    def _save_as_document(self, canvas: Canvas, image: Image.Image, format: str) -> int:
+    async def _save_as_document(self, canvas: Canvas, image: Image.Image, format: str) -> int:
         """Speichert das Canvas als Dokument"""
         # Konvertiere Bild zu Bytes
         img_byte_arr = io.BytesIO()
@@ -434,8 +761,8 @@ class CanvasService:
         )
         
         self.db.add(document)
-        self.db.commit()
-        self.db.refresh(document)
+        await self.db.commit()
+        await self.db.refresh(document)
         
         # Speichere Datei
         os.makedirs(os.path.dirname(document.file_path), exist_ok=True)
@@ -445,15 +772,15 @@ class CanvasService:
         return document.id
 
     # Statistics
-    def get_canvas_statistics(self, canvas_id: int) -> Dict[str, Any]:
+    async def get_canvas_statistics(self, canvas_id: int) -> Dict[str, Any]:
         """Holt Statistiken für ein Canvas"""
-        canvas = self.db.query(Canvas).filter(Canvas.id == canvas_id).first()
+        canvas = await self._first(select(Canvas).where(Canvas.id == canvas_id))
         if not canvas:
             return {}
         
-        objects = self.get_canvas_objects(canvas_id)
-        areas = self.get_collaboration_areas(canvas_id)
-        active_users = self.get_active_users(canvas_id)
+        objects = await self.get_canvas_objects(canvas_id)
+        areas = await self.get_collaboration_areas(canvas_id)
+        active_users = await self.get_active_users(canvas_id)
         
         # Berechne Canvas-Größe
         if objects or areas:
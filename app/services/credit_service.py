@@ -1,10 +1,14 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, and_, func
+from sqlalchemy import select, update, insert, and_, or_, case, func, literal
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
+from fastapi import BackgroundTasks
 from typing import List, Optional, Dict, Tuple, Any
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 import logging
 
+from ..core.database import AsyncSessionLocal
+
 from ..models.user_credits import UserCredits, PlanStatus
 from ..models.credit_event import CreditEvent, CreditEventType
 from ..models.credit_purchase import CreditPurchase, CreditPackage, PurchaseStatus
@@ -16,6 +20,7 @@ from ..schemas.user_credits import (
 from ..services.security_service import SecurityService
 from ..models.audit_log import AuditAction
 from ..config.credit_config import credit_config
+from .deferred_effects import defer
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +34,9 @@ class CreditService:
     # Täglicher Credit-Abzug für Pro-Status (aus Konfiguration)
     DAILY_CREDIT_DEDUCTION = credit_config.DAILY_CREDIT_DEDUCTION
     
+    # Zeilen pro Transaktion beim täglichen Sammel-Abzug (begrenzt die Lock-Dauer)
+    DAILY_DEDUCTION_BATCH_SIZE = 1000
+    
     # Warnung bei niedrigen Credits (aus Konfiguration)
     LOW_CREDIT_WARNING_THRESHOLD = credit_config.LOW_CREDIT_WARNING_THRESHOLD
     
@@ -184,36 +192,86 @@ class CreditService:
         logger.info(f"User {user_id} hat {credits_to_add} Credits für {event_type.value} erhalten")
         return True
     
+    @staticmethod
+    def daily_deduction_key(user_id: int, day: date) -> str:
+        """Idempotenz-Schlüssel des täglichen Abzugs (ein Abzug pro User und UTC-Tag)"""
+        return f"daily_deduction:{user_id}:{day.isoformat()}"
+    
+    @staticmethod
+    def _daily_deduction_statement(now: datetime):
+        """
+        Bedingung und Werte des täglichen Abzugs (gemeinsam für Login und Sammel-Abzug)
+        
+        Fällig sind Pro-User mit Credits, die seit 00:00 UTC noch keinen Abzug
+        hatten; aufgebrauchte Konten werden im selben UPDATE auf Basic gesetzt.
+        """
+        deduction = CreditService.DAILY_CREDIT_DEDUCTION
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        eligible = and_(
+            UserCredits.plan_status == PlanStatus.PRO,
+            UserCredits.credits > 0,
+            or_(
+                UserCredits.last_daily_deduction.is_(None),
+                UserCredits.last_daily_deduction < today_start
+            )
+        )
+        exhausted = UserCredits.credits - deduction <= 0
+        values = {
+            "credits": case((exhausted, 0), else_=UserCredits.credits - deduction),
+            "plan_status": case(
+                (exhausted, literal(PlanStatus.BASIC, UserCredits.plan_status.type)),
+                else_=UserCredits.plan_status
+            ),
+            "last_pro_day": case((exhausted, now), else_=UserCredits.last_pro_day),
+            "total_pro_days": func.coalesce(UserCredits.total_pro_days, 0) + 1,
+            "last_daily_deduction": now,
+        }
+        return eligible, values
+    
     @staticmethod
     async def process_daily_credit_deduction(
         db: AsyncSession,
         user_id: int
     ) -> bool:
-        """Verarbeitet täglichen Credit-Abzug für Pro-Status (nur einmal pro Tag)"""
+        """
+        Verarbeitet täglichen Credit-Abzug für Pro-Status (nur einmal pro Tag)
         
-        user_credits = await CreditService.get_or_create_user_credits(db, user_id)
+        Bedingtes UPDATE ... RETURNING und Credit-Event in einer Transaktion; der
+        Idempotenz-Schlüssel pro User und Tag verhindert doppelte Buchungen, auch
+        wenn der Abzug parallel angestoßen wird.
+        """
+        now = datetime.now(timezone.utc)
+        eligible, values = CreditService._daily_deduction_statement(now)
         
-        # Prüfe ob User im Pro-Status ist
-        if not user_credits.is_pro_active():
-            logger.info(f"User {user_id} ist nicht im Pro-Status, kein Credit-Abzug")
+        result = await db.execute(
+            select(UserCredits.id, UserCredits.credits)
+            .where(UserCredits.user_id == user_id, eligible)
+            .with_for_update()
+        )
+        current = result.first()
+        if current is None:
+            exists = await db.execute(select(UserCredits.id).where(UserCredits.user_id == user_id))
+            if exists.first() is None:
+                # Erster Login: Credits mit Willkommensbonus anlegen, dann regulär abziehen
+                await CreditService.get_or_create_user_credits(db, user_id)
+                return await CreditService.process_daily_credit_deduction(db, user_id)
+            await db.rollback()
+            logger.info(f"User {user_id}: kein Credit-Abzug nötig (nicht im Pro-Status oder heute bereits abgezogen)")
             return False
         
-        # Prüfe ob heute bereits ein Credit abgezogen wurde
-        if user_credits.has_daily_deduction_today():
-            logger.info(f"User {user_id} hat heute bereits einen Credit-Abzug erhalten")
+        result = await db.execute(
+            update(UserCredits)
+            .where(UserCredits.id == current.id, eligible)
+            .values(**values)
+            .returning(UserCredits.credits, UserCredits.plan_status)
+            .execution_options(synchronize_session=False)
+        )
+        deducted = result.first()
+        if deducted is None:
+            await db.rollback()
             return False
         
-        # Ziehe täglichen Credit ab
-        old_credits = user_credits.credits
-        user_credits.credits -= CreditService.DAILY_CREDIT_DEDUCTION
-        user_credits.total_pro_days += 1
-        user_credits.last_daily_deduction = datetime.now(timezone.utc)
-        
-        # Prüfe ob Credits aufgebraucht sind
-        if user_credits.credits <= 0:
-            user_credits.downgrade_to_basic()
-            user_credits.credits = 0  # Nicht unter 0
-            
+        if deducted.plan_status == PlanStatus.BASIC:
             # Aktualisiere auch den subscription_plan in der User-Tabelle auf BASIS
             await db.execute(
                 update(User)
@@ -223,32 +281,51 @@ class CreditService:
                     subscription_status=SubscriptionStatus.INACTIVE
                 )
             )
-            
             logger.info(f"User {user_id} wurde automatisch auf Basic downgraded")
         
-        await db.commit()
-        await db.refresh(user_credits)
-        
-        # Erstelle Credit-Event
-        await CreditService.create_credit_event(
-            db=db,
-            user_credits_id=user_credits.id,
+        db.add(CreditEvent(
+            user_credits_id=current.id,
             event_type=CreditEventType.DAILY_DEDUCTION,
-            credits_change=-CreditService.DAILY_CREDIT_DEDUCTION,
+            credits_change=deducted.credits - current.credits,
+            credits_before=current.credits,
+            credits_after=deducted.credits,
             description="Täglicher Pro-Status Abzug beim Login",
-            ip_address=None
-        )
+            idempotency_key=CreditService.daily_deduction_key(user_id, now.date())
+        ))
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            logger.info(f"Täglicher Credit-Abzug für User {user_id} bereits gebucht")
+            return False
         
-        # Audit-Log
+        # Audit-Log (gepuffert)
         await SecurityService.create_audit_log(
             db, user_id, AuditAction.DATA_UPDATE,
-            f"Täglicher Credit-Abzug beim Login: {old_credits} -> {user_credits.credits}",
-            resource_type="user_credits", resource_id=user_credits.id
+            f"Täglicher Credit-Abzug beim Login: {current.credits} -> {deducted.credits}",
+            resource_type="user_credits", resource_id=current.id
         )
         
-        logger.info(f"Täglicher Credit-Abzug für User {user_id} verarbeitet: {old_credits} -> {user_credits.credits}")
+        logger.info(f"Täglicher Credit-Abzug für User {user_id} verarbeitet: {current.credits} -> {deducted.credits}")
         return True
     
+    @staticmethod
+    async def apply_daily_login_deduction(user_id: int) -> bool:
+        """Täglicher Login-Abzug mit eigener Session (läuft nach der Login-Antwort)"""
+        async with AsyncSessionLocal() as db:
+            return await CreditService.process_daily_credit_deduction(db, user_id)
+    
+    @staticmethod
+    def schedule_daily_login_deduction(background_tasks: BackgroundTasks, user: User) -> bool:
+        """
+        Vermerkt den täglichen Login-Abzug für einen Bauträger; ausgeführt wird
+        nach der Antwort. False, wenn nichts einzuplanen ist.
+        """
+        if user.user_role != UserRole.BAUTRAEGER:
+            return False
+        key = CreditService.daily_deduction_key(user.id, datetime.now(timezone.utc).date())
+        return defer(background_tasks, key, CreditService.apply_daily_login_deduction, user.id)
+    
     @staticmethod
     async def create_credit_event(
         db: AsyncSession,
@@ -627,66 +704,77 @@ class CreditService:
     
     @staticmethod
     async def process_all_daily_deductions(db: AsyncSession) -> Dict[str, int]:
-        """Verarbeitet tägliche Credit-Abzüge für alle aktiven Pro-User"""
+        """
+        Verarbeitet tägliche Credit-Abzüge für alle aktiven Pro-User (mengenbasiert)
         
-        # Hole alle aktiven Pro-User
-        result = await db.execute(
-            select(UserCredits)
-            .where(UserCredits.plan_status == PlanStatus.PRO)
-            .where(UserCredits.credits > 0)
-        )
-        active_pro_users = result.scalars().all()
+        Pro Chunk: Auswahl der fälligen Zeilen (PostgreSQL: FOR UPDATE SKIP LOCKED),
+        ein UPDATE ... RETURNING für Abzug und Downgrade, ein Bulk-UPDATE der
+        downgegradeten User und ein Bulk-INSERT der Credit-Events, danach Commit.
+        Idempotent pro Tag: Zeilen mit Abzug seit 00:00 UTC werden übersprungen.
+        """
+        now = datetime.now(timezone.utc)
+        eligible, values = CreditService._daily_deduction_statement(now)
         
         processed_count = 0
         downgraded_count = 0
+        last_id = 0
         
-        for user_credits in active_pro_users:
-            try:
-                # Prüfe ob heute bereits ein Credit abgezogen wurde
-                if user_credits.has_daily_deduction_today():
-                    logger.info(f"User {user_credits.user_id} hat heute bereits einen Credit-Abzug erhalten - überspringe")
-                    continue
-                
-                # Verarbeite täglichen Abzug
-                old_credits = user_credits.credits
-                user_credits.credits -= CreditService.DAILY_CREDIT_DEDUCTION
-                user_credits.total_pro_days += 1
-                user_credits.last_daily_deduction = datetime.now(timezone.utc)
-                
-                # Prüfe ob Credits aufgebraucht sind
-                if user_credits.credits <= 0:
-                    user_credits.downgrade_to_basic()
-                    user_credits.credits = 0
-                    
-                    # Aktualisiere auch den subscription_plan in der User-Tabelle auf BASIC
-                    await db.execute(
-                        update(User)
-                        .where(User.id == user_credits.user_id)
-                        .values(
-                            subscription_plan=SubscriptionPlan.BASIC,
-                            subscription_status='ACTIVE'
-                        )
+        while True:
+            # Chunk per Keyset über die ID (gesperrte Zeilen werden übersprungen, nicht erneut gelesen)
+            result = await db.execute(
+                select(UserCredits.id, UserCredits.credits)
+                .where(eligible, UserCredits.id > last_id)
+                .order_by(UserCredits.id)
+                .limit(CreditService.DAILY_DEDUCTION_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            credits_before = dict(result.all())
+            if not credits_before:
+                break
+            last_id = max(credits_before)
+            
+            result = await db.execute(
+                update(UserCredits)
+                .where(UserCredits.id.in_(credits_before), eligible)
+                .values(**values)
+                .returning(UserCredits.id, UserCredits.user_id, UserCredits.credits, UserCredits.plan_status)
+                .execution_options(synchronize_session=False)
+            )
+            deducted = result.all()
+            
+            downgraded_user_ids = [row.user_id for row in deducted if row.plan_status == PlanStatus.BASIC]
+            if downgraded_user_ids:
+                # subscription_plan in der User-Tabelle ebenfalls auf BASIS
+                await db.execute(
+                    update(User)
+                    .where(User.id.in_(downgraded_user_ids))
+                    .values(
+                        subscription_plan=SubscriptionPlan.BASIS,
+                        subscription_status=SubscriptionStatus.INACTIVE
                     )
-                    
-                    downgraded_count += 1
-                
-                # Erstelle Credit-Event
-                await CreditService.create_credit_event(
-                    db=db,
-                    user_credits_id=user_credits.id,
-                    event_type=CreditEventType.DAILY_DEDUCTION,
-                    credits_change=-CreditService.DAILY_CREDIT_DEDUCTION,
-                    description="Täglicher Pro-Status Abzug",
-                    ip_address=None
+                    .execution_options(synchronize_session=False)
                 )
-                
-                processed_count += 1
-                
-            except Exception as e:
-                logger.error(f"Fehler bei täglichem Credit-Abzug für User {user_credits.user_id}: {e}")
-                continue
-        
-        await db.commit()
+            
+            if deducted:
+                await db.execute(
+                    insert(CreditEvent),
+                    [
+                        {
+                            "user_credits_id": row.id,
+                            "event_type": CreditEventType.DAILY_DEDUCTION,
+                            "credits_change": row.credits - credits_before[row.id],
+                            "credits_before": credits_before[row.id],
+                            "credits_after": row.credits,
+                            "description": "Täglicher Pro-Status Abzug",
+                            "idempotency_key": CreditService.daily_deduction_key(row.user_id, now.date()),
+                        }
+                        for row in deducted
+                    ]
+                )
+            
+            await db.commit()
+            processed_count += len(deducted)
+            downgraded_count += len(downgraded_user_ids)
         
         logger.info(f"Tägliche Credit-Abzüge verarbeitet: {processed_count} User, {downgraded_count} downgraded")
         
@@ -0,0 +1,44 @@
+"""
+Nachgelagerte Seiteneffekte für Request-Handler
+
+- Der Handler vermerkt nur die Absicht (Schlüssel + Coroutine-Funktion); ausgeführt
+  wird nach dem Senden der Antwort (Starlette BackgroundTasks)
+- Dieselbe Absicht (gleicher Schlüssel) wird nicht erneut eingeplant, solange sie
+  in diesem Worker noch aussteht
+- Fehler werden geloggt und erreichen den Client nicht; die Funktionen müssen
+  selbst idempotent sein (z.B. über eindeutige Schlüssel in der Datenbank)
+"""
+
+import logging
+from typing import Any, Awaitable, Callable, Set
+
+from fastapi import BackgroundTasks
+
+logger = logging.getLogger(__name__)
+
+# Schlüssel der eingeplanten, noch nicht abgeschlossenen Effekte
+_pending: Set[str] = set()
+
+
+def defer(background_tasks: BackgroundTasks, key: str,
+          func: Callable[..., Awaitable[Any]], *args, **kwargs) -> bool:
+    """Plant `func(*args, **kwargs)` nach der Antwort ein; False, wenn `key` bereits aussteht"""
+    if key in _pending:
+        return False
+    _pending.add(key)
+    background_tasks.add_task(_run, key, func, args, kwargs)
+    return True
+
+
+async def _run(key: str, func: Callable[..., Awaitable[Any]], args: tuple, kwargs: dict):
+    try:
+        await func(*args, **kwargs)
+    except Exception as e:
+        logger.error(f"Nachgelagerter Effekt {key} fehlgeschlagen: {e}")
+    finally:
+        _pending.discard(key)
+
+
+def pending_count() -> int:
+    """Anzahl der ausstehenden Effekte (Monitoring)"""
+    return len(_pending)
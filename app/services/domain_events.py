@@ -0,0 +1,303 @@
+"""
+Domain-Events und ihre Handler (Transactional Outbox)
+
+Produzenten vermerken ein Event in der Transaktion der Zustandsänderung, z.B.
+`record_quote_accepted(db, quote)` vor dem Commit von `accept_quote`. Die
+Seiteneffekte (Kostenposition, BuildWise-Gebühr, Credits, Benachrichtigungen,
+Kommunikationszugriff) laufen danach im OutboxDispatcher.
+
+Handler müssen idempotent sein: ein Handler, dessen Änderungen committet
+wurden, bevor sein Vermerk gespeichert war (Absturz, Service mit eigenem
+Commit), kann erneut laufen.
+
+Aggregat ist das Gewerk (Milestone), sofern vorhanden - so werden Annahme,
+Rechnung und Abnahme eines Gewerks in dieser Reihenfolge verarbeitet.
+"""
+
+import logging
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.outbox import DomainEvent, event_handler, record_event
+from ..models.quote import Quote, QuoteStatus
+
+logger = logging.getLogger(__name__)
+
+QUOTE_ACCEPTED = "QuoteAccepted"
+INVOICE_SUBMITTED = "InvoiceSubmitted"
+MILESTONE_COMPLETED = "MilestoneCompleted"
+
+
+def _aggregate(milestone_id: Optional[int], fallback_type: str, fallback_id: int) -> Tuple[str, int]:
+    if milestone_id is not None:
+        return "milestone", milestone_id
+    return fallback_type, fallback_id
+
+
+# ---------------------------------------------------------------------------
+# Produzenten (ohne Commit, Teil der Transaktion des Aufrufers)
+# ---------------------------------------------------------------------------
+
+def record_quote_accepted(db: AsyncSession, quote: Quote):
+    aggregate_type, aggregate_id = _aggregate(quote.milestone_id, "quote", quote.id)
+    record_event(db, QUOTE_ACCEPTED, aggregate_type, aggregate_id, {
+        "quote_id": quote.id,
+        "project_id": quote.project_id,
+        "milestone_id": quote.milestone_id,
+        "service_provider_id": quote.service_provider_id or quote.user_id
+    })
+
+
+def record_invoice_submitted(db: AsyncSession, invoice):
+    aggregate_type, aggregate_id = _aggregate(invoice.milestone_id, "invoice", invoice.id)
+    record_event(db, INVOICE_SUBMITTED, aggregate_type, aggregate_id, {
+        "invoice_id": invoice.id,
+        "project_id": invoice.project_id,
+        "milestone_id": invoice.milestone_id
+    })
+
+
+def record_milestone_completed(db: AsyncSession, milestone):
+    record_event(db, MILESTONE_COMPLETED, "milestone", milestone.id, {
+        "milestone_id": milestone.id,
+        "project_id": milestone.project_id
+    })
+
+
+# ---------------------------------------------------------------------------
+# QuoteAccepted
+# ---------------------------------------------------------------------------
+
+async def _accepted_quote(db: AsyncSession, event: DomainEvent) -> Optional[Quote]:
+    """Lädt das Angebot; None, wenn es inzwischen nicht mehr angenommen ist"""
+    quote = (await db.execute(
+        select(Quote).where(Quote.id == event.payload["quote_id"])
+    )).scalar_one_or_none()
+    if quote is None or quote.status != QuoteStatus.ACCEPTED:
+        logger.info(f"{event.event_type}: Angebot {event.payload['quote_id']} nicht (mehr) angenommen, übersprungen")
+        return None
+    return quote
+
+
+@event_handler(QUOTE_ACCEPTED, name="cost_position")
+async def create_cost_position(db: AsyncSession, event: DomainEvent):
+    """Kostenposition für die Finanzen-Übersicht (existiert sie bereits, passiert nichts)"""
+    from .quote_service import create_cost_position_from_quote
+
+    quote = await _accepted_quote(db, event)
+    if quote is not None:
+        await create_cost_position_from_quote(db, quote)
+
+
+@event_handler(QUOTE_ACCEPTED, name="buildwise_fee")
+async def create_buildwise_fee(db: AsyncSession, event: DomainEvent):
+    """BuildWise-Vermittlungsgebühr, 30 Tage nach Angebotsannahme fällig"""
+    from ..models.cost_position import CostPosition
+    from .buildwise_fee_service import BuildWiseFeeService
+
+    quote = await _accepted_quote(db, event)
+    if quote is None:
+        return
+    cost_position_id = (await db.execute(
+        select(CostPosition.id).where(CostPosition.quote_id == quote.id).limit(1)
+    )).scalar_one_or_none()
+    try:
+        fee = await BuildWiseFeeService.create_fee_from_quote(
+            db=db,
+            quote_id=quote.id,
+            cost_position_id=cost_position_id,
+            fee_percentage=None  # aktueller Modus (4.7% in Production, 0% in Beta)
+        )
+    except ValueError as e:
+        message = str(e).lower()
+        if "bereits" in message or "existiert" in message:
+            logger.info(f"BuildWise-Gebühr für Angebot {quote.id} existiert bereits")
+            return
+        raise
+    logger.info(f"BuildWise-Gebühr {fee.invoice_number} für Angebot {quote.id} erstellt ({fee.fee_amount} {fee.currency})")
+
+
+@event_handler(QUOTE_ACCEPTED, name="credits")
+async def reward_quote_acceptance(db: AsyncSession, event: DomainEvent):
+    """Credits für den Bauträger (Bonus, wenn das Angebot aus einer Besichtigung stammt)"""
+    from ..models import Project
+    from ..models.credit_event import CreditEvent, CreditEventType
+    from ..models.inspection import Inspection, InspectionInvitation
+    from ..models.user_credits import UserCredits
+    from .credit_service import CreditService
+
+    quote = await _accepted_quote(db, event)
+    if quote is None:
+        return
+    owner_id = (await db.execute(
+        select(Project.owner_id).where(Project.id == quote.project_id)
+    )).scalar_one_or_none()
+    if not owner_id:
+        return
+
+    inspection_id = (await db.execute(
+        select(Inspection.id)
+        .join(InspectionInvitation, InspectionInvitation.inspection_id == Inspection.id)
+        .where(
+            and_(
+                Inspection.milestone_id == quote.milestone_id,
+                InspectionInvitation.quote_id == quote.id
+            )
+        )
+        .limit(1)
+    )).scalar_one_or_none()
+    if inspection_id:
+        # Prüft selbst, ob die Belohnung bereits vergeben wurde
+        await CreditService.reward_inspection_quote_acceptance(
+            db=db,
+            user_id=owner_id,
+            quote_id=quote.id,
+            inspection_id=inspection_id
+        )
+        return
+
+    already_rewarded = (await db.execute(
+        select(CreditEvent.id)
+        .join(UserCredits, UserCredits.id == CreditEvent.user_credits_id)
+        .where(
+            UserCredits.user_id == owner_id,
+            CreditEvent.event_type == CreditEventType.QUOTE_ACCEPTED,
+            CreditEvent.related_entity_type == "quote",
+            CreditEvent.related_entity_id == quote.id
+        ).limit(1)
+    )).scalar_one_or_none()
+    if already_rewarded:
+        return
+    await CreditService.add_credits_for_activity(
+        db=db,
+        user_id=owner_id,
+        event_type=CreditEventType.QUOTE_ACCEPTED,
+        description=f"Angebot akzeptiert: {quote.title}",
+        related_entity_type="quote",
+        related_entity_id=quote.id
+    )
+
+
+@event_handler(QUOTE_ACCEPTED, name="notification")
+async def notify_service_provider(db: AsyncSession, event: DomainEvent):
+    """Benachrichtigt den Dienstleister über die Annahme seines Angebots"""
+    from ..models import Milestone
+    from ..models.notification import Notification, NotificationPriority, NotificationType
+    from ..schemas.notification import NotificationCreate
+    from .notification_service import NotificationService
+
+    quote = await _accepted_quote(db, event)
+    if quote is None or quote.milestone_id is None:
+        return
+    recipient_id = quote.service_provider_id or quote.user_id
+    exists = (await db.execute(
+        select(Notification.id).where(
+            Notification.type == NotificationType.QUOTE_ACCEPTED,
+            Notification.related_quote_id == quote.id,
+            Notification.recipient_id == recipient_id
+        ).limit(1)
+    )).scalar_one_or_none()
+    if exists:
+        return
+    milestone_title = (await db.execute(
+        select(Milestone.title).where(Milestone.id == quote.milestone_id)
+    )).scalar_one_or_none()
+    if milestone_title is None:
+        logger.info(f"Milestone {quote.milestone_id} nicht gefunden - Benachrichtigung übersprungen")
+        return
+
+    await NotificationService.create_notification(
+        db=db,
+        notification_data=NotificationCreate(
+            recipient_id=recipient_id,
+            type=NotificationType.QUOTE_ACCEPTED,
+            title='Angebot angenommen',
+            message=f'Ihr Angebot für "{milestone_title}" wurde vom Bauträger angenommen. Sie können nun mit der Ausführung beginnen.',
+            priority=NotificationPriority.HIGH,
+            related_quote_id=quote.id,
+            related_project_id=quote.project_id,
+            related_milestone_id=quote.milestone_id
+        )
+    )
+
+
+@event_handler(QUOTE_ACCEPTED, name="communication_access")
+async def update_communication_access(db: AsyncSession, event: DomainEvent):
+    """Gibt die Kommunikation im Gewerk nur noch für den beauftragten Dienstleister frei"""
+    from .milestone_progress_service import milestone_progress_service
+
+    quote = await _accepted_quote(db, event)
+    if quote is None or quote.milestone_id is None:
+        return
+    await milestone_progress_service.update_communication_access_after_award(
+        db=db,
+        milestone_id=quote.milestone_id,
+        accepted_service_provider_id=quote.service_provider_id
+    )
+
+
+async def _milestone_notified(db: AsyncSession, notification_type, event: DomainEvent) -> bool:
+    """
+    Prüft, ob die Benachrichtigung des Events bereits existiert (frühere Auslieferung)
+
+    Events eines Gewerks werden der Reihe nach ausgeliefert: eine Benachrichtigung
+    des Typs zum Gewerk, die nach dem Event entstanden ist, stammt von diesem Event.
+    """
+    from ..models.notification import Notification
+
+    return (await db.execute(
+        select(Notification.id).where(
+            Notification.type == notification_type,
+            Notification.related_milestone_id == event.payload["milestone_id"],
+            Notification.created_at >= event.created_at
+        ).limit(1)
+    )).scalar_one_or_none() is not None
+
+
+# ---------------------------------------------------------------------------
+# InvoiceSubmitted
+# ---------------------------------------------------------------------------
+
+@event_handler(INVOICE_SUBMITTED, name="notification")
+async def notify_invoice_submitted(db: AsyncSession, event: DomainEvent):
+    """Benachrichtigt den Bauträger über die eingereichte Rechnung"""
+    from ..models.notification import NotificationType
+    from .notification_service import NotificationService
+
+    # Ohne Gewerk gibt es keinen Bauträger und damit keine Benachrichtigung
+    if event.payload["milestone_id"] is None or await _milestone_notified(db, NotificationType.INVOICE_SUBMITTED, event):
+        return
+    await NotificationService.create_invoice_submitted_notification(db, event.payload["invoice_id"])
+
+
+# ---------------------------------------------------------------------------
+# MilestoneCompleted
+# ---------------------------------------------------------------------------
+
+@event_handler(MILESTONE_COMPLETED, name="notification")
+async def notify_milestone_completed(db: AsyncSession, event: DomainEvent):
+    """Benachrichtigt den Dienstleister über die finale Abnahme"""
+    from ..models.notification import NotificationType
+    from .notification_service import NotificationService
+
+    if await _milestone_notified(db, NotificationType.MILESTONE_COMPLETED, event):
+        return
+    await NotificationService.create_milestone_completed_notification(db, event.payload["milestone_id"])
+
+
+@event_handler(MILESTONE_COMPLETED, name="completed_offers_count")
+async def count_completed_offers(db: AsyncSession, event: DomainEvent):
+    """
+    Erhöht completed_offers_count der beteiligten Dienstleister
+
+    Ohne eigenen Commit: die Erhöhung wird mit dem Vermerk des Handlers
+    committet, eine erneute Auslieferung zählt daher nicht doppelt.
+    """
+    from .milestone_completion_service import MilestoneCompletionService
+
+    if not await MilestoneCompletionService.increment_completed_offers_count(
+        db, event.payload["milestone_id"], commit=False
+    ):
+        raise RuntimeError(f"completed_offers_count für Milestone {event.payload['milestone_id']} nicht aktualisiert")
@@ -1,17 +1,43 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 from decimal import Decimal
 
-from ..models.expense import Expense
 from ..models.project import Project
-from ..models.cost_position import CostPosition
-from ..models.buildwise_fee import BuildWiseFee
+from ..models.project_finance_rollup import ProjectFinanceRollup
 
 class FinanceAnalyticsService:
-    """Service für erweiterte Finanz-Analytics mit Bauphasen-Berücksichtigung"""
+    """
+    Service für erweiterte Finanz-Analytics mit Bauphasen-Berücksichtigung
+    
+    Liest die vorberechneten Summen aus project_finance_rollup
+    (siehe finance_rollup_service) statt aller Ausgaben, Kostenpositionen
+    und Gebühren des Projekts.
+    """
+    
+    @staticmethod
+    async def _rollup_rows(db: AsyncSession, project_id: int, source: str, *conditions) -> List[ProjectFinanceRollup]:
+        """Rollup-Zeilen einer Quelle (expense, cost_position, invoice, buildwise_fee)"""
+        result = await db.execute(
+            select(ProjectFinanceRollup).where(
+                ProjectFinanceRollup.project_id == project_id,
+                ProjectFinanceRollup.source == source,
+                *conditions
+            )
+        )
+        return result.scalars().all()
+    
+    @staticmethod
+    def _totals(rows: List[ProjectFinanceRollup]) -> Dict:
+        total_amount = sum(row.total_amount for row in rows)
+        paid_amount = sum(row.paid_amount for row in rows)
+        return {
+            "total_amount": total_amount,
+            "paid_amount": paid_amount,
+            "remaining_amount": total_amount - paid_amount,
+            "count": sum(row.item_count for row in rows)
+        }
     
     @staticmethod
     async def get_expense_analytics_by_phase(
@@ -20,21 +46,17 @@ class FinanceAnalyticsService:
     ) -> Dict:
         """Analysiert Ausgaben nach Bauphasen"""
         
-        # Lade alle Ausgaben für das Projekt
-        result = await db.execute(
-            select(Expense)
-            .where(Expense.project_id == project_id)
-            .order_by(Expense.date.desc())
-        )
-        expenses = result.scalars().all()
+        rows = await FinanceAnalyticsService._rollup_rows(db, project_id, "expense")
         
         # Gruppierung nach Bauphase
         phase_analytics = {}
         total_amount = 0
+        total_count = 0
         
-        for expense in expenses:
-            phase = expense.construction_phase or "Unbekannt"
-            total_amount += expense.amount
+        for row in rows:
+            phase = row.phase or "Unbekannt"
+            total_amount += row.total_amount
+            total_count += row.item_count
             
             if phase not in phase_analytics:
                 phase_analytics[phase] = {
@@ -44,17 +66,17 @@ class FinanceAnalyticsService:
                     "latest_expense": None
                 }
             
-            phase_analytics[phase]["total_amount"] += expense.amount
-            phase_analytics[phase]["count"] += 1
+            phase_analytics[phase]["total_amount"] += row.total_amount
+            phase_analytics[phase]["count"] += row.item_count
             
             # Kategorie-Gruppierung pro Phase
-            if expense.category not in phase_analytics[phase]["categories"]:
-                phase_analytics[phase]["categories"][expense.category] = 0
-            phase_analytics[phase]["categories"][expense.category] += expense.amount
+            if row.category not in phase_analytics[phase]["categories"]:
+                phase_analytics[phase]["categories"][row.category] = 0
+            phase_analytics[phase]["categories"][row.category] += row.total_amount
             
             # Neueste Ausgabe pro Phase
-            if not phase_analytics[phase]["latest_expense"] or expense.date > phase_analytics[phase]["latest_expense"]:
-                phase_analytics[phase]["latest_expense"] = expense.date
+            if row.last_date and (not phase_analytics[phase]["latest_expense"] or row.last_date > phase_analytics[phase]["latest_expense"]):
+                phase_analytics[phase]["latest_expense"] = row.last_date
         
         # Berechne Prozentsätze
         for phase_data in phase_analytics.values():
@@ -65,7 +87,7 @@ class FinanceAnalyticsService:
         
         return {
             "total_amount": total_amount,
-            "total_count": len(expenses),
+            "total_count": total_count,
             "phase_breakdown": phase_analytics,
             "phases_with_expenses": len([p for p in phase_analytics.values() if p["total_amount"] > 0])
         }
@@ -89,23 +111,17 @@ class FinanceAnalyticsService:
         # Ausgaben-Analytics
         expense_analytics = await FinanceAnalyticsService.get_expense_analytics_by_phase(db, project_id)
         
-        # Cost Positions Analytics
-        cost_positions_result = await db.execute(
-            select(CostPosition).where(CostPosition.project_id == project_id)
+        # Kostenpositionen, Rechnungen und BuildWise-Gebühren aus dem Rollup
+        cost_positions = FinanceAnalyticsService._totals(
+            await FinanceAnalyticsService._rollup_rows(db, project_id, "cost_position")
         )
-        cost_positions = cost_positions_result.scalars().all()
-        
-        cost_positions_total = sum(cp.amount for cp in cost_positions)
-        cost_positions_paid = sum(cp.paid_amount for cp in cost_positions)
-        
-        # BuildWise Fees Analytics
-        fees_result = await db.execute(
-            select(BuildWiseFee).where(BuildWiseFee.project_id == project_id)
+        invoices = FinanceAnalyticsService._totals(
+            await FinanceAnalyticsService._rollup_rows(db, project_id, "invoice")
         )
-        fees = fees_result.scalars().all()
-        
-        fees_total = sum(fee.fee_amount for fee in fees)
-        fees_paid = sum(fee.fee_amount for fee in fees if fee.status == 'paid')
+        fees = FinanceAnalyticsService._totals(
+            await FinanceAnalyticsService._rollup_rows(db, project_id, "buildwise_fee")
+        )
+        cost_positions_total = cost_positions["total_amount"]
         
         # Budget-Analysis
         budget = project.budget or 0
@@ -122,18 +138,9 @@ class FinanceAnalyticsService:
                 "progress_percentage": project.progress_percentage
             },
             "expense_analytics": expense_analytics,
-            "cost_positions": {
-                "total_amount": cost_positions_total,
-                "paid_amount": cost_positions_paid,
-                "remaining_amount": cost_positions_total - cost_positions_paid,
-                "count": len(cost_positions)
-            },
-            "buildwise_fees": {
-                "total_amount": fees_total,
-                "paid_amount": fees_paid,
-                "remaining_amount": fees_total - fees_paid,
-                "count": len(fees)
-            },
+            "cost_positions": cost_positions,
+            "invoices": invoices,
+            "buildwise_fees": fees,
             "budget_analysis": {
                 "total_costs": total_costs,
                 "budget_utilization_percentage": budget_utilization,
@@ -188,26 +195,19 @@ class FinanceAnalyticsService:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=months * 30)
         
-        # Lade Ausgaben im Zeitraum
-        result = await db.execute(
-            select(Expense)
-            .where(
-                and_(
-                    Expense.project_id == project_id,
-                    Expense.date >= start_date,
-                    Expense.date <= end_date
-                )
-            )
-            .order_by(Expense.date.asc())
+        # Monatssummen im Zeitraum (ganze Monate)
+        rows = await FinanceAnalyticsService._rollup_rows(
+            db, project_id, "expense",
+            ProjectFinanceRollup.period_year * 12 + ProjectFinanceRollup.period_month >= start_date.year * 12 + start_date.month,
+            ProjectFinanceRollup.period_year * 12 + ProjectFinanceRollup.period_month <= end_date.year * 12 + end_date.month
         )
-        expenses = result.scalars().all()
         
         # Gruppierung nach Monat und Phase
         trends = {}
         
-        for expense in expenses:
-            month_key = expense.date.strftime("%Y-%m")
-            phase = expense.construction_phase or "Unbekannt"
+        for row in sorted(rows, key=lambda r: (r.period_year, r.period_month)):
+            month_key = f"{row.period_year:04d}-{row.period_month:02d}"
+            phase = row.phase or "Unbekannt"
             
             if month_key not in trends:
                 trends[month_key] = {}
@@ -215,7 +215,7 @@ class FinanceAnalyticsService:
             if phase not in trends[month_key]:
                 trends[month_key][phase] = 0
             
-            trends[month_key][phase] += expense.amount
+            trends[month_key][phase] += row.total_amount
         
         return {
             "period_months": months,
@@ -0,0 +1,269 @@
+"""
+Finanz-Rollup je Projekt (project_finance_rollup)
+
+- Ausgaben, Kostenpositionen, Rechnungen und BuildWise-Gebühren werden je
+  Quelle × Bauphase × Kategorie × Monat summiert (Anzahl, Betrag, bezahlt)
+- Schreib-Hooks: geänderte Projekte werden nach dem Flush gesammelt (ORM-Objekte
+  und Bulk-UPDATE/DELETE), vor dem Commit werden ihre Rollup-Zeilen in derselben
+  Transaktion per DELETE + INSERT ... SELECT ... GROUP BY neu berechnet
+- Neuberechnung je Projekt statt Deltas: Abhängigkeiten zwischen den Quellen
+  (Kostenposition bezahlt = Rechnung bezahlt) bleiben so immer konsistent
+- Schlägt die Neuberechnung fehl, wird nur der Savepoint zurückgerollt; der
+  nächtliche Abgleich (reconcile_finance_rollups) korrigiert Abweichungen
+
+Finanz-Auswertungen lesen nur noch das Rollup: O(Phasen × Kategorien × Monate)
+statt O(Zeilen).
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import String, case, cast, delete, event, extract, func, insert, inspect, literal_column, select, union_all
+from sqlalchemy.orm import Session
+
+from ..core.database import AsyncSessionLocal
+from ..models.buildwise_fee import BuildWiseFee
+from ..models.cost_position import CostPosition
+from ..models.expense import Expense
+from ..models.invoice import Invoice, InvoiceStatus
+from ..models.project import Project
+from ..models.project_finance_rollup import ProjectFinanceRollup
+
+logger = logging.getLogger(__name__)
+
+# Modelle, deren Änderungen das Rollup ihres Projekts betreffen
+ROLLUP_SOURCES = (Expense, CostPosition, Invoice, BuildWiseFee)
+_SOURCE_TABLES = {model.__table__ for model in ROLLUP_SOURCES}
+
+# Schlüssel in Session.info für Projekte, deren Rollup neu berechnet werden muss
+_PENDING_KEY = "finance_rollup_pending"
+
+# Marker: Bulk-Statement ohne auswertbare Bedingung, alle Projekte neu berechnen
+_ALL = "*"
+
+_ROLLUP_COLUMNS = (
+    "project_id", "source", "phase", "category", "period_year", "period_month",
+    "item_count", "total_amount", "paid_amount", "last_date"
+)
+
+
+# ---------------------------------------------------------------------------
+# Aggregation (eine GROUP BY-Abfrage je Quelle)
+# ---------------------------------------------------------------------------
+
+def _grouped(project_column, source: str, phase, category, date_column, amount, paid, count_column,
+             project_ids: Optional[Iterable[int]], *, from_obj=None):
+    # Konstanten als SQL-Literale: gebundene Parameter in SELECT und GROUP BY
+    # gelten in PostgreSQL als verschiedene Ausdrücke
+    empty = literal_column("''")
+    phase = func.coalesce(phase, empty) if phase is not None else empty
+    category = func.coalesce(category, empty)
+    group_keys = [project_column, extract("year", date_column), extract("month", date_column), category]
+    if phase is not empty:
+        group_keys.append(phase)
+
+    query = select(
+        project_column.label("project_id"),
+        literal_column(f"'{source}'", String).label("source"),
+        phase.label("phase"),
+        category.label("category"),
+        group_keys[1].label("period_year"),
+        group_keys[2].label("period_month"),
+        func.count(count_column).label("item_count"),
+        func.coalesce(func.sum(amount), 0.0).label("total_amount"),
+        func.coalesce(func.sum(paid), 0.0).label("paid_amount"),
+        func.max(date_column).label("last_date"),
+    )
+    if from_obj is not None:
+        query = query.select_from(from_obj)
+    conditions = [project_column.isnot(None)]
+    if project_ids is not None:
+        conditions.append(project_column.in_(list(project_ids)))
+    return query.where(*conditions).group_by(*group_keys)
+
+
+def _aggregate_queries(project_ids: Optional[Iterable[int]] = None) -> list:
+    """GROUP BY-Abfragen aller Quellen (Spalten wie _ROLLUP_COLUMNS)"""
+    project_ids = list(project_ids) if project_ids is not None else None
+    return [
+        _grouped(
+            Expense.project_id, "expense", Expense.construction_phase, Expense.category, Expense.date,
+            Expense.amount, literal_column("0.0"), Expense.id, project_ids
+        ),
+        _grouped(
+            CostPosition.project_id, "cost_position", None, CostPosition.category,
+            CostPosition.created_at, CostPosition.amount,
+            case((Invoice.status == InvoiceStatus.PAID, CostPosition.amount), else_=0.0),
+            CostPosition.id, project_ids,
+            from_obj=CostPosition.__table__.outerjoin(Invoice.__table__, CostPosition.invoice_id == Invoice.id)
+        ),
+        _grouped(
+            Invoice.project_id, "invoice", None, cast(Invoice.status, String),
+            Invoice.invoice_date, Invoice.total_amount,
+            case((Invoice.status == InvoiceStatus.PAID, Invoice.total_amount), else_=0.0),
+            Invoice.id, project_ids
+        ),
+        _grouped(
+            BuildWiseFee.project_id, "buildwise_fee", None, BuildWiseFee.status,
+            BuildWiseFee.created_at, BuildWiseFee.fee_amount,
+            case((BuildWiseFee.status == "paid", BuildWiseFee.fee_amount), else_=0),
+            BuildWiseFee.id, project_ids
+        ),
+    ]
+
+
+def _rebuild_statements(project_ids: Optional[Iterable[int]] = None) -> list:
+    """DELETE + INSERT ... SELECT für die Projekte (None = alle)"""
+    table = ProjectFinanceRollup.__table__
+    project_ids = list(project_ids) if project_ids is not None else None
+    delete_stmt = delete(table)
+    if project_ids is not None:
+        delete_stmt = delete_stmt.where(table.c.project_id.in_(project_ids))
+    return [delete_stmt] + [
+        insert(table).from_select(_ROLLUP_COLUMNS, query)
+        for query in _aggregate_queries(project_ids)
+    ]
+
+
+def _lock_statement(project_ids: Iterable[int]):
+    """Sperrt die Projektzeilen, damit parallele Neuberechnungen nacheinander laufen"""
+    return select(Project.id).where(Project.id.in_(sorted(project_ids))).order_by(Project.id).with_for_update()
+
+
+# ---------------------------------------------------------------------------
+# Schreib-Hooks
+# ---------------------------------------------------------------------------
+
+def _pending(session) -> Set:
+    return session.info.setdefault(_PENDING_KEY, set())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_projects(session, flush_context):
+    """Sammelt Projekte neuer, geänderter und gelöschter Finanz-Objekte"""
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if not isinstance(obj, ROLLUP_SOURCES):
+            continue
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        history = inspect(obj).attrs.project_id.history
+        for value in (*history.added, *history.unchanged, *history.deleted):
+            if value is not None:
+                _pending(session).add(value)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_statement_projects(orm_execute_state):
+    """Sammelt Projekte der Zeilen, die ein Bulk-UPDATE/DELETE betreffen wird"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    statement = orm_execute_state.statement
+    table = getattr(statement, "table", None)
+    if table not in _SOURCE_TABLES:
+        return
+
+    session = orm_execute_state.session
+    parameters = orm_execute_state.parameters
+    if statement.whereclause is None:
+        if isinstance(parameters, list) and parameters and all("project_id" in row for row in parameters):
+            _pending(session).update(row["project_id"] for row in parameters if row["project_id"] is not None)
+        else:
+            _pending(session).add(_ALL)
+        return
+
+    rows = session.execute(
+        select(table.c.project_id).where(statement.whereclause).distinct(),
+        parameters if isinstance(parameters, dict) else None
+    ).scalars().all()
+    pending = _pending(session)
+    pending.update(value for value in rows if value is not None)
+
+    # Neues Projekt aus SET (Verschieben in ein anderes Projekt)
+    values = getattr(statement, "_values", None) or {}
+    for key, value in values.items():
+        new_value = getattr(value, "value", None)
+        if getattr(key, "key", key) == "project_id" and new_value is not None:
+            pending.add(new_value)
+
+
+@event.listens_for(Session, "before_commit")
+def _rebuild_pending_projects(session):
+    """Berechnet das Rollup der gesammelten Projekte in der laufenden Transaktion neu"""
+    if any(isinstance(obj, ROLLUP_SOURCES) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.flush()
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+
+    project_ids = None if _ALL in pending else sorted(pending)
+    connection = session.connection()
+    savepoint = connection.begin_nested()
+    try:
+        if project_ids is not None:
+            connection.execute(_lock_statement(project_ids))
+        else:
+            logger.info("Finanz-Rollup: Bulk-Statement ohne Bedingung, berechne alle Projekte neu")
+        for statement in _rebuild_statements(project_ids):
+            connection.execute(statement)
+        savepoint.commit()
+    except Exception as e:
+        savepoint.rollback()
+        logger.error(f"Finanz-Rollup für Projekte {project_ids or 'alle'} nicht aktualisiert: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_projects(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# ---------------------------------------------------------------------------
+# Neuberechnung und nächtlicher Abgleich
+# ---------------------------------------------------------------------------
+
+async def rebuild_finance_rollups(db, project_ids: Optional[Iterable[int]] = None):
+    """Berechnet das Rollup der Projekte neu (None = alle); Commit durch den Aufrufer"""
+    project_ids = sorted(project_ids) if project_ids is not None else None
+    if project_ids:
+        await db.execute(_lock_statement(project_ids))
+    for statement in _rebuild_statements(project_ids):
+        await db.execute(statement)
+
+
+def _group_key(row) -> tuple:
+    return (
+        row.source, row.phase, row.category, row.period_year, row.period_month,
+        row.item_count, round(float(row.total_amount or 0), 2), round(float(row.paid_amount or 0), 2)
+    )
+
+
+async def reconcile_finance_rollups(chunk_size: int = 200) -> Dict[str, int]:
+    """
+    Vergleicht das Rollup mit den Quelldaten und berechnet abweichende Projekte neu
+
+    Fängt Änderungen ab, die an den Hooks vorbeigingen (SQL-Skripte, andere
+    Prozesse, fehlgeschlagene Neuberechnungen).
+    """
+    async with AsyncSessionLocal() as db:
+        project_ids = (await db.execute(select(Project.id).order_by(Project.id))).scalars().all()
+
+    repaired: List[int] = []
+    table = ProjectFinanceRollup.__table__
+    for start in range(0, len(project_ids), chunk_size):
+        chunk = project_ids[start:start + chunk_size]
+        async with AsyncSessionLocal() as db:
+            expected: Dict[int, Set[tuple]] = {}
+            for row in (await db.execute(union_all(*_aggregate_queries(chunk)))).all():
+                expected.setdefault(row.project_id, set()).add(_group_key(row))
+            current: Dict[int, Set[tuple]] = {}
+            for row in (await db.execute(select(table).where(table.c.project_id.in_(chunk)))).all():
+                current.setdefault(row.project_id, set()).add(_group_key(row))
+
+            drifted = [project_id for project_id in chunk if expected.get(project_id) != current.get(project_id)]
+            if drifted:
+                await rebuild_finance_rollups(db, drifted)
+                await db.commit()
+                repaired.extend(drifted)
+
+    if repaired:
+        logger.warning(f"Finanz-Rollup: {len(repaired)} Projekte korrigiert ({repaired[:20]})")
+    return {"projects": len(project_ids), "repaired": len(repaired)}
@@ -0,0 +1,429 @@
+"""
+Finanz-Charts eines Projekts in einer Abfrage
+
+- Alle Reihen der /financial-charts-Endpunkte (Zeitverlauf, Top-Kosten,
+  Kategorien, Zusammenfassung, Kostenaufschlüsselung, Kostenanalyse) kommen
+  aus einem Statement: CTEs für Rechnungen, Positionen bezahlter Rechnungen,
+  direkte Kostenpositionen und Ausgaben, per UNION ALL zu einer Ergebnismenge
+  verbunden (Spalte `kind` unterscheidet die Reihen)
+- Das Ergebnis wird pro Projekt gecacht (Tag "project:{project_id}") und bei
+  Änderungen an Projekt, Rechnungen, Kostenpositionen oder Ausgaben über
+  cache_invalidation verworfen
+- Die Endpunkte schneiden nur noch ihren Teil aus den gecachten Daten
+"""
+
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import DateTime, Float, Integer, String, cast, extract, func, literal_column, null, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.cache import cache_result
+from ..core.database import AsyncSessionLocal
+from ..models.cost_position import CostPosition
+from ..models.expense import Expense
+from ..models.invoice import Invoice, InvoiceStatus
+from ..models.project import Project
+
+# Top-Positionen je Quelle, die mindestens geladen werden (Volumen- und Kostenaufschlüsselung)
+ITEM_LIMIT = 20
+CHART_CACHE_TTL = 300
+
+CHART_COLORS = [
+    '#ff6b6b', '#4ecdc4', '#45b7d1', '#96ceb4', '#feca57',
+    '#ff9ff3', '#54a0ff', '#5f27cd', '#00d2d3', '#ff9f43'
+]
+
+# Spalten der gemeinsamen Ergebnismenge; nicht belegte Spalten sind typisierte NULLs
+# (PostgreSQL löst UNION-Typen paarweise auf, ein untypisiertes NULL würde zu text)
+_COLUMNS = {
+    "kind": String,
+    "label": String,
+    "period_year": Integer,
+    "period_month": Integer,
+    "amount": Float,
+    "item_count": Integer,
+    "item_id": Integer,
+    "description": String,
+    "category": String,
+    "cost_type": String,
+    "item_date": DateTime,
+    "contractor_id": Integer,
+    "contractor_name": String,
+    "invoice_number": String,
+    "position_order": Integer,
+}
+
+
+def _series(kind: str, **values):
+    columns = []
+    for name, type_ in _COLUMNS.items():
+        if name == "kind":
+            value = literal_column(f"'{kind}'", String)
+        else:
+            value = values.get(name, cast(null(), type_))
+        columns.append(value.label(name))
+    return select(*columns)
+
+
+def _chart_query(project_id: int, item_limit: int):
+    """Eine Abfrage für alle Chart-Reihen des Projekts"""
+    invoices = (
+        select(Invoice.id, Invoice.status, Invoice.total_amount, Invoice.invoice_date)
+        .where(Invoice.project_id == project_id)
+        .cte("project_invoices")
+    )
+    paid_positions = (
+        select(
+            CostPosition.id, CostPosition.description, CostPosition.amount, CostPosition.category,
+            CostPosition.cost_type, CostPosition.position_order,
+            Invoice.invoice_date.label("item_date"), Invoice.service_provider_id, Invoice.invoice_number,
+            func.row_number().over(order_by=(CostPosition.amount.desc(), CostPosition.id)).label("rank")
+        )
+        .join(Invoice, CostPosition.invoice_id == Invoice.id)
+        .where(Invoice.project_id == project_id, Invoice.status == InvoiceStatus.PAID)
+        .cte("paid_cost_positions")
+    )
+    direct_positions = (
+        select(
+            CostPosition.id, CostPosition.description, CostPosition.amount, CostPosition.category,
+            CostPosition.cost_type, CostPosition.position_order, CostPosition.contractor_name,
+            CostPosition.created_at.label("item_date"),
+            func.row_number().over(order_by=(CostPosition.amount.desc(), CostPosition.id)).label("rank")
+        )
+        .where(CostPosition.project_id == project_id)
+        .cte("direct_cost_positions")
+    )
+    expenses = (
+        select(
+            Expense.id, Expense.title, Expense.amount, Expense.category, Expense.date,
+            func.row_number().over(order_by=(Expense.amount.desc(), Expense.id)).label("rank")
+        )
+        .where(Expense.project_id == project_id)
+        .cte("project_expenses")
+    )
+
+    def monthly(kind, source, date_column, amount_column, *conditions):
+        year = cast(extract("year", date_column), Integer)
+        month = cast(extract("month", date_column), Integer)
+        return (
+            _series(kind, period_year=year, period_month=month,
+                    amount=func.sum(amount_column), item_count=func.count(source.c.id))
+            .select_from(source).where(*conditions).group_by(year, month)
+        )
+
+    def grouped(kind, source, column):
+        return (
+            _series(kind, label=column, amount=func.sum(source.c.amount), item_count=func.count(source.c.id))
+            .select_from(source).group_by(column)
+        )
+
+    def invoice_total(kind, *statuses):
+        return (
+            _series(kind, amount=func.coalesce(func.sum(invoices.c.total_amount), 0.0),
+                    item_count=func.count(invoices.c.id))
+            .select_from(invoices).where(invoices.c.status.in_(statuses))
+        )
+
+    return union_all(
+        _series("project", label=Project.name, amount=Project.budget).where(Project.id == project_id),
+        monthly("invoice_month", invoices, invoices.c.invoice_date, invoices.c.total_amount,
+                invoices.c.status == InvoiceStatus.PAID),
+        monthly("expense_month", expenses, expenses.c.date, expenses.c.amount),
+        grouped("paid_category", paid_positions, paid_positions.c.category),
+        grouped("direct_category", direct_positions, direct_positions.c.category),
+        grouped("expense_category", expenses, expenses.c.category),
+        grouped("paid_cost_type", paid_positions, paid_positions.c.cost_type),
+        grouped("direct_cost_type", direct_positions, direct_positions.c.cost_type),
+        invoice_total("paid_invoices", InvoiceStatus.PAID),
+        invoice_total("pending_invoices", InvoiceStatus.SENT, InvoiceStatus.VIEWED),
+        _series(
+            "paid_item", item_id=paid_positions.c.id, description=paid_positions.c.description,
+            amount=paid_positions.c.amount, category=paid_positions.c.category,
+            cost_type=paid_positions.c.cost_type, position_order=paid_positions.c.position_order,
+            item_date=paid_positions.c.item_date,
+            contractor_id=paid_positions.c.service_provider_id,
+            invoice_number=paid_positions.c.invoice_number
+        ).where(paid_positions.c.rank <= item_limit),
+        _series(
+            "direct_item", item_id=direct_positions.c.id, description=direct_positions.c.description,
+            amount=direct_positions.c.amount, category=direct_positions.c.category,
+            cost_type=direct_positions.c.cost_type, position_order=direct_positions.c.position_order,
+            item_date=direct_positions.c.item_date,
+            contractor_name=direct_positions.c.contractor_name
+        ).where(direct_positions.c.rank <= item_limit),
+        _series(
+            "expense_item", item_id=expenses.c.id, description=expenses.c.title,
+            amount=expenses.c.amount, category=expenses.c.category,
+            item_date=expenses.c.date
+        ).where(expenses.c.rank <= item_limit),
+    )
+
+
+def _sum_by_label(*groups: List[Dict[str, Any]]) -> Dict[str, float]:
+    totals: Dict[str, float] = {}
+    for rows in groups:
+        for row in rows:
+            totals[row["label"]] = totals.get(row["label"], 0) + float(row["amount"] or 0)
+    return totals
+
+
+def _merge_totals(*totals: Dict[str, float]) -> Dict[str, float]:
+    merged: Dict[str, float] = {}
+    for values in totals:
+        for label, amount in values.items():
+            merged[label] = merged.get(label, 0) + amount
+    return merged
+
+
+def _total(rows: List[Dict[str, Any]], field: str = "amount") -> float:
+    return sum(float(row[field] or 0) for row in rows)
+
+
+class FinancialChartService:
+    """Chart-Daten der Finanzübersicht eines Projekts"""
+
+    @staticmethod
+    @cache_result(ttl=CHART_CACHE_TTL, tags=("project:{project_id}",))
+    async def get_chart_data(project_id: int, item_limit: int = ITEM_LIMIT) -> Optional[Dict[str, Any]]:
+        """
+        Lädt alle Reihen in einer Abfrage (None, wenn das Projekt nicht existiert)
+
+        Zeitverlauf über alle Monate, Einzelpositionen als Top `item_limit` je Quelle.
+        Läuft auf einer eigenen Session, da die Hintergrund-Aktualisierung des
+        Caches die Anfrage überdauern kann.
+        """
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(_chart_query(project_id, item_limit))).mappings().all()
+        series: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for row in rows:
+            series[row["kind"]].append(dict(row))
+
+        if not series["project"]:
+            return None
+        project = series["project"][0]
+
+        # Zeitverlauf: bezahlte Rechnungen und direkte Ausgaben je Monat
+        monthly: Dict[tuple, Dict[str, Any]] = {}
+        for kind in ("invoice_month", "expense_month"):
+            for row in series[kind]:
+                key = (row["period_year"], row["period_month"])
+                if key not in monthly:
+                    monthly[key] = {
+                        "month": date(key[0], key[1], 1).strftime('%b %Y'),
+                        "expenses": 0,
+                        "income": 0,
+                        "invoices_count": 0
+                    }
+                monthly[key]["expenses"] += float(row["amount"] or 0)
+                if kind == "invoice_month":
+                    monthly[key]["invoices_count"] += row["item_count"]
+
+        def items(kind: str) -> List[Dict[str, Any]]:
+            return [
+                {
+                    "id": row["item_id"],
+                    "description": row["description"],
+                    "amount": row["amount"],
+                    "category": row["category"],
+                    "cost_type": row["cost_type"],
+                    "position_order": row["position_order"],
+                    "date": row["item_date"],
+                    "contractor_id": row["contractor_id"],
+                    "contractor_name": row["contractor_name"],
+                    "invoice_number": row["invoice_number"]
+                }
+                for row in sorted(series[kind], key=lambda r: (-r["amount"], r["item_id"]))
+            ]
+
+        return {
+            "project_id": project_id,
+            "project_name": project["label"],
+            "budget": project["amount"] or 0,
+            "timeline": [monthly[key] for key in sorted(monthly)],
+            "paid_invoices": _total(series["paid_invoices"]),
+            "pending_invoices": _total(series["pending_invoices"]),
+            "direct_expenses": _total(series["expense_category"]),
+            "direct_cost_positions": _total(series["direct_category"]),
+            "paid_position_count": int(_total(series["paid_category"], "item_count")),
+            "paid_position_amount": _total(series["paid_category"]),
+            "direct_position_count": int(_total(series["direct_category"], "item_count")),
+            "expense_count": int(_total(series["expense_category"], "item_count")),
+            "paid_categories": _sum_by_label(series["paid_category"]),
+            "direct_categories": _sum_by_label(series["direct_category"]),
+            "expense_categories": _sum_by_label(series["expense_category"]),
+            "cost_by_type": _sum_by_label(series["paid_cost_type"], series["direct_cost_type"]),
+            "paid_items": items("paid_item"),
+            "direct_items": items("direct_item"),
+            "expense_items": items("expense_item")
+        }
+
+    @staticmethod
+    async def load(db: AsyncSession, project_id: int, limit: int = ITEM_LIMIT) -> Optional[Dict[str, Any]]:
+        """
+        Gecachte Chart-Daten; Limits bis ITEM_LIMIT teilen sich einen Cache-Eintrag
+
+        `db` der Anfrage wird nicht verwendet (siehe get_chart_data).
+        """
+        return await FinancialChartService.get_chart_data(project_id, max(limit, ITEM_LIMIT))
+
+    @staticmethod
+    def timeline(data: Dict[str, Any], months: int = 12) -> Dict[str, Any]:
+        return {
+            "project_id": data["project_id"],
+            "project_name": data["project_name"],
+            "months": months,
+            "data": data["timeline"][-months:] if months > 0 else []
+        }
+
+    @staticmethod
+    def volume(data: Dict[str, Any], limit: int = 10) -> Dict[str, Any]:
+        all_expenses = [
+            {
+                "description": item["description"],
+                "amount": item["amount"],
+                "category": item["category"],
+                "type": "invoice",
+                "date": item["date"],
+                "contractor": item["contractor_id"]
+            }
+            for item in data["paid_items"][:limit]
+        ] + [
+            {
+                "description": item["description"],
+                "amount": item["amount"],
+                "category": item["category"],
+                "type": "expense",
+                "date": item["date"],
+                "contractor": None
+            }
+            for item in data["expense_items"][:limit]
+        ]
+        all_expenses.sort(key=lambda x: x['amount'], reverse=True)
+
+        return {
+            "project_id": data["project_id"],
+            "project_name": data["project_name"],
+            "limit": limit,
+            "data": all_expenses[:limit]
+        }
+
+    @staticmethod
+    def categories(data: Dict[str, Any]) -> Dict[str, Any]:
+        category_totals = _merge_totals(data["paid_categories"], data["direct_categories"], data["expense_categories"])
+        total_amount = sum(category_totals.values())
+
+        category_data = []
+        for i, (category, amount) in enumerate(sorted(category_totals.items(), key=lambda x: x[1], reverse=True)):
+            percentage = (amount / total_amount * 100) if total_amount > 0 else 0
+            category_data.append({
+                "category": category,
+                "amount": amount,
+                "percentage": round(percentage, 1),
+                "color": CHART_COLORS[i % len(CHART_COLORS)]
+            })
+
+        return {
+            "project_id": data["project_id"],
+            "project_name": data["project_name"],
+            "total_amount": total_amount,
+            "categories": category_data
+        }
+
+    @staticmethod
+    def summary(data: Dict[str, Any]) -> Dict[str, Any]:
+        # Gesamtausgaben: Rechnungen + direkte Ausgaben + direkte Kostenpositionen
+        total_expenses = data["paid_invoices"] + data["direct_expenses"] + data["direct_cost_positions"]
+        budget = data["budget"]
+        remaining_budget = budget - total_expenses
+        budget_percentage = (total_expenses / budget * 100) if budget > 0 else 0
+
+        return {
+            "project_id": data["project_id"],
+            "project_name": data["project_name"],
+            "budget": budget,
+            "total_expenses": total_expenses,
+            "paid_invoices": data["paid_invoices"],
+            "direct_expenses": data["direct_expenses"],
+            "direct_cost_positions": data["direct_cost_positions"],
+            "pending_invoices": data["pending_invoices"],
+            "remaining_budget": remaining_budget,
+            "budget_percentage": round(budget_percentage, 1),
+            "is_over_budget": total_expenses > budget
+        }
+
+    @staticmethod
+    def cost_breakdown(data: Dict[str, Any], limit: int = 20) -> Dict[str, Any]:
+        all_costs = [
+            {
+                "id": item["id"],
+                "type": "invoice",
+                "description": item["description"],
+                "amount": item["amount"],
+                "category": item["category"],
+                "date": item["date"],
+                "contractor_name": item["contractor_id"],  # Könnte erweitert werden um Namen
+                "invoice_number": item["invoice_number"],
+                "cost_type": item["cost_type"],
+                "position_order": item["position_order"]
+            }
+            for item in data["paid_items"][:limit]
+        ] + [
+            {
+                "id": item["id"],
+                "type": "cost_position",
+                "description": item["description"],
+                "amount": item["amount"],
+                "category": item["category"],
+                "date": item["date"],
+                "contractor_name": item["contractor_name"],
+                "invoice_number": None,
+                "cost_type": item["cost_type"],
+                "position_order": item["position_order"]
+            }
+            for item in data["direct_items"][:limit]
+        ] + [
+            {
+                "id": item["id"],
+                "type": "expense",
+                "description": item["description"],
+                "amount": item["amount"],
+                "category": item["category"],
+                "date": item["date"],
+                "contractor_name": None,
+                "invoice_number": None,
+                "cost_type": "direct",
+                "position_order": 0
+            }
+            for item in data["expense_items"][:limit]
+        ]
+        all_costs.sort(key=lambda x: x['amount'], reverse=True)
+
+        return {
+            "project_id": data["project_id"],
+            "project_name": data["project_name"],
+            "total_items": len(all_costs),
+            "costs": all_costs[:limit]
+        }
+
+    @staticmethod
+    def cost_analysis(data: Dict[str, Any]) -> Dict[str, Any]:
+        cost_by_category = _merge_totals(data["paid_categories"], data["direct_categories"], data["expense_categories"])
+        total_cost_positions = data["paid_position_count"] + data["direct_position_count"]
+        # Durchschnittliche Kostenposition über Rechnungs- und direkte Positionen
+        if total_cost_positions > 0:
+            avg_cost_position = (data["paid_position_amount"] + data["direct_cost_positions"]) / total_cost_positions
+        else:
+            avg_cost_position = 0
+
+        return {
+            "project_id": data["project_id"],
+            "project_name": data["project_name"],
+            "cost_by_type": data["cost_by_type"],
+            "cost_by_category": cost_by_category,
+            "average_cost_position": float(avg_cost_position),
+            "total_cost_positions": total_cost_positions,
+            "total_expenses": data["expense_count"],
+            "total_cost_items": total_cost_positions + data["expense_count"]
+        }
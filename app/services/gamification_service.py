@@ -142,13 +142,14 @@ class GamificationService:
         }
     
     @staticmethod
-    async def update_user_rank(db: AsyncSession, user_id: int) -> Dict[str, any]:
+    async def update_user_rank(db: AsyncSession, user_id: int, commit: bool = True) -> Dict[str, any]:
         """
         Aktualisiert den Rang eines Benutzers basierend auf completed_offers_count
         
         Args:
             db: Datenbank-Session
             user_id: ID des Benutzers
+            commit: False, wenn der Aufrufer die Transaktion committet
             
         Returns:
             Dict mit Rang-Informationen
@@ -184,7 +185,8 @@ class GamificationService:
                 )
             )
             
-            await db.commit()
+            if commit:
+                await db.commit()
             
             rank_info = {
                 'user_id': user_id,
@@ -214,6 +216,9 @@ class GamificationService:
             
         except Exception as e:
             logger.error(f"[GAMIFICATION] Fehler beim Aktualisieren des Rangs für Benutzer {user_id}: {e}")
+            if not commit:
+                # Rollback würde Änderungen des Aufrufers verwerfen
+                raise
             await db.rollback()
             return {}
     
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import zipfile
 import io
@@ -196,7 +197,8 @@ class GDPRService:
             f"Benutzerdaten anonymisiert: ID {user_id}",
             resource_type="user", resource_id=user_id,
             processing_purpose="Datenanonymisierung",
-            legal_basis="DSGVO Art. 17"
+            legal_basis="DSGVO Art. 17",
+            sync=True
         )
         
         return True
@@ -288,22 +290,38 @@ class GDPRService:
     
     @staticmethod
     async def cleanup_expired_data(db: AsyncSession) -> int:
-        """Bereinigt abgelaufene Daten"""
+        """
+        Bereinigt abgelaufene Daten
         
-        cleanup_date = datetime.utcnow().date() - timedelta(days=settings.data_retention_days)
+        Benutzer werden in Batches (Keyset über die ID) geladen und einzeln
+        anonymisiert, mit kurzer Pause zwischen den Batches.
+        """
         
-        # Benutzer mit abgelaufener Aufbewahrungsfrist anonymisieren
-        stmt = select(User).where(
-            User.data_retention_until < cleanup_date,
-            User.data_anonymized == False
-        )
-        result = await db.execute(stmt)
-        users_to_anonymize = result.scalars().all()
+        cleanup_date = datetime.utcnow().date() - timedelta(days=settings.data_retention_days)
+        batch_size = settings.retention_batch_size
         
         anonymized_count = 0
-        for user in users_to_anonymize:
-            if await GDPRService.anonymize_user_data(db, user.id):
-                anonymized_count += 1
+        last_id = 0
+        while True:
+            # Benutzer mit abgelaufener Aufbewahrungsfrist anonymisieren
+            stmt = select(User.id).where(
+                User.id > last_id,
+                User.data_retention_until < cleanup_date,
+                User.data_anonymized == False
+            ).order_by(User.id).limit(batch_size)
+            result = await db.execute(stmt)
+            user_ids = result.scalars().all()
+            if not user_ids:
+                break
+            
+            for user_id in user_ids:
+                if await GDPRService.anonymize_user_data(db, user_id):
+                    anonymized_count += 1
+            
+            last_id = user_ids[-1]
+            if len(user_ids) < batch_size:
+                break
+            await asyncio.sleep(settings.retention_batch_sleep_seconds)
         
         return anonymized_count
     
@@ -0,0 +1,254 @@
+"""
+Identitäts-Cache für get_current_user
+
+- Pro Token-Subject (E-Mail) wird ein unveränderlicher Schnappschuss der
+  User-Spalten für kurze Zeit im Speicher gehalten
+- Jede Anfrage erhält daraus eine eigene User-Instanz, die ohne Datenbankabfrage
+  in ihre Session übernommen wird (merge mit load=False)
+- Änderungen an Usern (ORM-Objekte und Bulk-UPDATE/DELETE) verwerfen den Eintrag
+  nach dem Commit, lokal und über eine Broker-Nachricht auf allen Workern
+- Versionszähler pro User: eine Abfrage, die sich mit einer Änderung
+  überschneidet, wird nicht gecacht; Einträge mit veralteter Version gelten
+  als nicht vorhanden
+"""
+
+import asyncio
+import copy
+import itertools
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Dict, Iterable, Mapping, NamedTuple, Optional, Set
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from ..core.config import settings
+from ..core.pubsub import RESYNC_MESSAGE, broker
+from ..models import User
+from .user_service import get_user_by_email
+
+logger = logging.getLogger(__name__)
+
+IDENTITY_CHANNEL = "users:identity"
+
+# Schlüssel in Session.info für noch nicht committete User-Änderungen
+_PENDING_KEY = "identity_cache_pending"
+
+# Eindeutige Kennung dieses Workers (eigene Broker-Nachrichten ignorieren)
+_ORIGIN = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_COLUMN_KEYS = tuple(attr.key for attr in inspect(User).column_attrs)
+
+
+class _Entry(NamedTuple):
+    expires: float
+    user_id: int
+    version: int
+    snapshot: Mapping
+
+
+class IdentityCache:
+    """Größenbegrenzter Cache für User-Schnappschüsse mit Versionszählern"""
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._subjects: Dict[int, str] = {}
+        # Version pro User, erhöht bei jeder Invalidierung
+        self._versions: "OrderedDict[int, int]" = OrderedDict()
+        self._version_floor = 0
+        self._clock = itertools.count(1)
+        self._stamp = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _version(self, user_id: int) -> int:
+        return self._versions.get(user_id, self._version_floor)
+
+    def stamp(self) -> int:
+        """Aktueller Stand der Versionszähler (vor der Abfrage merken)"""
+        return self._stamp
+
+    def get(self, subject: str) -> Optional[Mapping]:
+        """Schnappschuss für ein Token-Subject (None wenn nicht vorhanden/veraltet)"""
+        entry = self._entries.get(subject)
+        if entry is None or entry.expires < time.monotonic() or entry.version != self._version(entry.user_id):
+            if entry is not None:
+                self._drop(subject)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(subject)
+        self.hits += 1
+        return entry.snapshot
+
+    def store(self, subject: str, user: User, stamp: int):
+        """Speichert einen Schnappschuss, sofern der User seit `stamp` nicht geändert wurde"""
+        version = self._version(user.id)
+        if version > stamp:
+            return
+        values = inspect(user).dict
+        if any(key not in values for key in _COLUMN_KEYS):
+            # Nicht vollständig geladen (z.B. abgelaufene Attribute)
+            return
+        snapshot = MappingProxyType({key: copy.deepcopy(values[key]) for key in _COLUMN_KEYS})
+
+        self._drop(subject)
+        self._drop(self._subjects.get(user.id))
+        self._entries[subject] = _Entry(time.monotonic() + self.ttl_seconds, user.id, version, snapshot)
+        self._subjects[user.id] = subject
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def invalidate(self, user_ids: Optional[Iterable[int]] = None):
+        """Verwirft Einträge und erhöht die Versionen (None = alle)"""
+        self._stamp = next(self._clock)
+        if user_ids is None:
+            self._entries.clear()
+            self._subjects.clear()
+            self._versions.clear()
+            self._version_floor = self._stamp
+            return
+        for user_id in user_ids:
+            self._versions[user_id] = self._stamp
+            self._versions.move_to_end(user_id)
+            self._drop(self._subjects.get(user_id))
+        while len(self._versions) > self.max_entries:
+            _, evicted = self._versions.popitem(last=False)
+            self._version_floor = max(self._version_floor, evicted)
+
+    def _drop(self, subject: Optional[str]):
+        entry = self._entries.pop(subject, None) if subject is not None else None
+        if entry is not None and self._subjects.get(entry.user_id) == subject:
+            del self._subjects[entry.user_id]
+
+    def get_stats(self) -> Dict[str, int]:
+        """Cache-Statistiken für Monitoring"""
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+identity_cache = IdentityCache(
+    ttl_seconds=settings.identity_cache_ttl_seconds,
+    max_entries=settings.identity_cache_max_entries
+)
+
+
+async def get_cached_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    """
+    Lädt den User zu einem Token-Subject, bevorzugt aus dem Identitäts-Cache
+
+    Die zurückgegebene Instanz gehört zur Session `db` und verhält sich wie ein
+    frisch geladener User (Änderungen werden normal geschrieben).
+    """
+    if settings.identity_cache_ttl_seconds <= 0:
+        return await get_user_by_email(db, email=email)
+
+    snapshot = identity_cache.get(email)
+    if snapshot is None:
+        stamp = identity_cache.stamp()
+        user = await get_user_by_email(db, email=email)
+        if user is not None:
+            identity_cache.store(email, user, stamp)
+        return user
+
+    existing = db.identity_map.get(inspect(User).identity_key_from_primary_key((snapshot["id"],)))
+    if existing is not None:
+        return existing
+    user = User(**{key: copy.deepcopy(value) for key, value in snapshot.items()})
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
+
+
+def invalidate_identity(user_ids: Optional[Iterable[int]] = None):
+    """
+    Verwirft Einträge lokal und auf allen anderen Workern
+    (für Änderungen, die keine ORM-Events auslösen, z.B. Raw SQL)
+    """
+    user_ids = list(user_ids) if user_ids is not None else None
+    identity_cache.invalidate(user_ids)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    message = json.dumps({"origin": _ORIGIN, "users": user_ids})
+    loop.create_task(broker.publish(IDENTITY_CHANNEL, message))
+
+
+async def run_identity_invalidation_listener():
+    """Verwirft Einträge, die auf anderen Workern geändert wurden (läuft dauerhaft)"""
+    queue = broker.subscribe(IDENTITY_CHANNEL)
+    try:
+        while True:
+            message = await queue.get()
+            if message == RESYNC_MESSAGE:
+                identity_cache.invalidate()
+                continue
+            try:
+                data = json.loads(message)
+            except ValueError:
+                continue
+            if data.get("origin") == _ORIGIN:
+                continue
+            identity_cache.invalidate(data.get("users"))
+    finally:
+        broker.unsubscribe(IDENTITY_CHANNEL, queue)
+
+
+def _pending(session) -> Set:
+    return session.info.setdefault(_PENDING_KEY, set())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    """Merkt geänderte und gelöschte User"""
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+                continue
+            _pending(session).add(obj.id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_statement_users(orm_execute_state):
+    """Merkt die User, die ein Bulk-UPDATE/DELETE betreffen wird"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or not issubclass(mapper.class_, User):
+        return
+    statement = orm_execute_state.statement
+
+    session = orm_execute_state.session
+    parameters = orm_execute_state.parameters
+    if statement.whereclause is None:
+        if isinstance(parameters, list) and parameters and all("id" in row for row in parameters):
+            _pending(session).update(row["id"] for row in parameters)
+        else:
+            _pending(session).add(None)
+        return
+
+    result = session.execute(
+        select(User.__table__.c.id).where(statement.whereclause),
+        parameters if isinstance(parameters, dict) else None
+    )
+    _pending(session).update(result.scalars().all())
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    """Verwirft geänderte User nach dem Commit"""
+    user_ids = session.info.pop(_PENDING_KEY, None)
+    if user_ids:
+        invalidate_identity(None if None in user_ids else user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    """Verwirft gemerkte Änderungen bei Rollback"""
+    session.info.pop(_PENDING_KEY, None)
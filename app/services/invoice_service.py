@@ -20,6 +20,8 @@ from app.schemas.invoice import (
 )
 from app.core.config import settings
 from app.utils.uid_validator import UIDValidator, InvoiceUIDRequirements
+from app.services.domain_events import record_invoice_submitted
+from app.services.pdf_render_service import normalize_spec, pdf_renderer
 
 class InvoiceService:
     
@@ -170,17 +172,12 @@ class InvoiceService:
                 )
                 db.add(cost_position)
         
+        # Benachrichtigung des Bauträgers folgt über das InvoiceSubmitted-Event
+        record_invoice_submitted(db, invoice)
+        
         await db.commit()
         await db.refresh(invoice)
         
-        # Sende Benachrichtigung an den Bauträger über die eingereichte Rechnung
-        try:
-            from .notification_service import NotificationService
-            await NotificationService.create_invoice_submitted_notification(db, invoice.id)
-        except Exception as e:
-            print(f"[WARNING] Fehler beim Erstellen der Rechnungs-Benachrichtigung: {e}")
-            # Fehler bei Benachrichtigung sollte nicht die Rechnungserstellung blockieren
-        
         # [SUCCESS] Generiere PDF sofort bei Erstellung
         try:
             print(f"[DEBUG] Generiere PDF für neue manuelle Rechnung {invoice.id}")
@@ -309,24 +306,130 @@ class InvoiceService:
         # Nur neue Rechnung hinzufügen, bestehende ist bereits in der DB
         if not existing_invoice:
             db.add(invoice)
+        await db.flush()  # Flush um die invoice.id zu bekommen
+        
+        # Benachrichtigung des Bauträgers folgt über das InvoiceSubmitted-Event
+        record_invoice_submitted(db, invoice)
             
         await db.commit()
         await db.refresh(invoice)
         
-        # Sende Benachrichtigung an den Bauträger über die eingereichte Rechnung
-        try:
-            from .notification_service import NotificationService
-            await NotificationService.create_invoice_submitted_notification(db, invoice.id)
-        except Exception as e:
-            print(f"[WARNING] Fehler beim Erstellen der Rechnungs-Benachrichtigung: {e}")
-            # Fehler bei Benachrichtigung sollte nicht den Upload blockieren
-        
         # [SUCCESS] Automatische DMS-Integration für hochgeladene PDFs
         await InvoiceService.create_dms_document(db, invoice, str(file_path))
         
         print(f"[SUCCESS] PDF-Rechnung hochgeladen: {invoice.invoice_number} für Meilenstein {milestone.title}")
         return invoice
     
+    @staticmethod
+    def invoice_pdf_data(invoice: Invoice) -> Dict[str, Any]:
+        """
+        Inhalt des Rechnungs-PDFs als Render-Spec-Daten (pdf_generator.render_invoice)
+        
+        Erwartet geladene Beziehungen: milestone.project.owner, service_provider, cost_positions
+        """
+        bautraeger = invoice.milestone.project.owner if invoice.milestone.project.owner else None
+        recipient = None
+        
+        if bautraeger:
+            bautraeger_info = f"{bautraeger.first_name} {bautraeger.last_name}"
+            if bautraeger.company_name:
+                bautraeger_info = f"{bautraeger.company_name}<br/>{bautraeger_info}"
+            
+            # Adressinformationen hinzufügen
+            address_parts = []
+            if bautraeger.address_street:
+                address_parts.append(bautraeger.address_street)
+            if bautraeger.address_zip and bautraeger.address_city:
+                address_parts.append(f"{bautraeger.address_zip} {bautraeger.address_city}")
+            elif bautraeger.address_city:
+                address_parts.append(bautraeger.address_city)
+            if bautraeger.address_country and bautraeger.address_country != "Deutschland":
+                address_parts.append(bautraeger.address_country)
+            
+            if address_parts:
+                bautraeger_info += f"<br/>{'<br/>'.join(address_parts)}"
+            
+            # UID-Anzeige für Rechnungsempfänger
+            uid_requirements = InvoiceUIDRequirements.get_uid_display_requirements(
+                invoice_amount=invoice.total_amount,
+                seller_is_small_business=getattr(invoice.service_provider, 'is_small_business', False),
+                is_eu_cross_border=False  # TODO: Implementiere EU-Erkennung
+            )
+            
+            if uid_requirements['buyer_uid_required'] and bautraeger.company_uid:
+                bautraeger_info += f"<br/>USt-ID: {UIDValidator.format_uid_for_display(bautraeger.company_uid)}"
+            elif uid_requirements['buyer_uid_required'] and bautraeger.company_tax_number:
+                bautraeger_info += f"<br/>Steuernummer: {UIDValidator.format_tax_number_for_display(bautraeger.company_tax_number)}"
+            
+            if bautraeger.email:
+                bautraeger_info += f"<br/>{bautraeger.email}"
+            if bautraeger.phone:
+                bautraeger_info += f"<br/>{bautraeger.phone}"
+            recipient = bautraeger_info
+        
+        # Dienstleister-Kontaktdaten (Rechnungssteller)
+        dienstleister_info = f"{invoice.service_provider.first_name} {invoice.service_provider.last_name}"
+        if invoice.service_provider.company_name:
+            dienstleister_info = f"{invoice.service_provider.company_name}<br/>{dienstleister_info}"
+        
+        # Adressinformationen hinzufügen
+        address_parts = []
+        if invoice.service_provider.address_street:
+            address_parts.append(invoice.service_provider.address_street)
+        if invoice.service_provider.address_zip and invoice.service_provider.address_city:
+            address_parts.append(f"{invoice.service_provider.address_zip} {invoice.service_provider.address_city}")
+        elif invoice.service_provider.address_city:
+            address_parts.append(invoice.service_provider.address_city)
+        if invoice.service_provider.address_country and invoice.service_provider.address_country != "Deutschland":
+            address_parts.append(invoice.service_provider.address_country)
+        
+        if address_parts:
+            dienstleister_info += f"<br/>{'<br/>'.join(address_parts)}"
+        
+        # UID-Anzeige für Rechnungssteller
+        uid_requirements = InvoiceUIDRequirements.get_uid_display_requirements(
+            invoice_amount=invoice.total_amount,
+            seller_is_small_business=getattr(invoice.service_provider, 'is_small_business', False),
+            is_eu_cross_border=False  # TODO: Implementiere EU-Erkennung
+        )
+        
+        # Rechnungssteller muss immer USt-ID oder Steuernummer angeben (außer Kleinunternehmer)
+        if uid_requirements['seller_uid_required'] or uid_requirements['seller_tax_number_required']:
+            if invoice.service_provider.company_uid:
+                dienstleister_info += f"<br/>USt-ID: {UIDValidator.format_uid_for_display(invoice.service_provider.company_uid)}"
+            elif invoice.service_provider.company_tax_number:
+                dienstleister_info += f"<br/>Steuernummer: {UIDValidator.format_tax_number_for_display(invoice.service_provider.company_tax_number)}"
+        
+        if invoice.service_provider.email:
+            dienstleister_info += f"<br/>{invoice.service_provider.email}"
+        if invoice.service_provider.phone:
+            dienstleister_info += f"<br/>{invoice.service_provider.phone}"
+        
+        # [SUCCESS] Flexible Kostenpositionen oder Legacy-Ansatz
+        if invoice.cost_positions:
+            positions = [[pos.description, pos.amount] for pos in invoice.cost_positions]
+        else:
+            positions = []
+            if invoice.material_costs and invoice.material_costs > 0:
+                positions.append(['Materialkosten', invoice.material_costs])
+            if invoice.labor_costs and invoice.labor_costs > 0:
+                positions.append(['Arbeitskosten', invoice.labor_costs])
+            if invoice.additional_costs and invoice.additional_costs > 0:
+                positions.append(['Zusatzkosten', invoice.additional_costs])
+        
+        return {
+            "invoice_number": invoice.invoice_number,
+            "recipient": recipient,
+            "issuer": dienstleister_info,
+            "positions": positions,
+            "net_amount": invoice.net_amount,
+            "vat_rate": invoice.vat_rate,
+            "vat_amount": invoice.vat_amount,
+            "total_amount": invoice.total_amount,
+            "description": invoice.description,
+            "notes": invoice.notes
+        }
+    
     @staticmethod
     async def generate_invoice_pdf(db: AsyncSession, invoice_id: int) -> str:
         """Generiere eine PDF-Rechnung aus den Rechnungsdaten"""
@@ -355,194 +458,12 @@ class InvoiceService:
         pdf_filename = f"Rechnung_{invoice.invoice_number}_{invoice_id}.pdf"
         pdf_path = pdf_dir / pdf_filename
         
-        # [SUCCESS] Einfache PDF-Generierung mit ReportLab
+        bautraeger = invoice.milestone.project.owner if invoice.milestone.project.owner else None
+        
+        # [SUCCESS] PDF-Generierung mit ReportLab im Prozess-Pool (Cache nach Inhalt)
         try:
-            from reportlab.lib.pagesizes import A4
-            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from reportlab.lib.units import cm
-            from reportlab.lib import colors
-            from reportlab.pdfgen import canvas
-            
-            # Erstelle PDF-Dokument
-            doc = SimpleDocTemplate(str(pdf_path), pagesize=A4)
-            story = []
-            styles = getSampleStyleSheet()
-            
-            # Titel
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=18,
-                spaceAfter=20,
-                alignment=1  # Zentriert
-            )
-            story.append(Paragraph(f"RECHNUNG {invoice.invoice_number}", title_style))
-            story.append(Spacer(1, 20))
-            
-            # Bauträger-Kontaktdaten (Rechnungsempfänger)
-            bautraeger = invoice.milestone.project.owner if invoice.milestone.project.owner else None
-            
-            story.append(Paragraph("Rechnungsempfänger:", styles['Heading3']))
-            if bautraeger:
-                bautraeger_info = f"{bautraeger.first_name} {bautraeger.last_name}"
-                if bautraeger.company_name:
-                    bautraeger_info = f"{bautraeger.company_name}<br/>{bautraeger_info}"
-                
-                # Adressinformationen hinzufügen
-                address_parts = []
-                if bautraeger.address_street:
-                    address_parts.append(bautraeger.address_street)
-                if bautraeger.address_zip and bautraeger.address_city:
-                    address_parts.append(f"{bautraeger.address_zip} {bautraeger.address_city}")
-                elif bautraeger.address_city:
-                    address_parts.append(bautraeger.address_city)
-                if bautraeger.address_country and bautraeger.address_country != "Deutschland":
-                    address_parts.append(bautraeger.address_country)
-                
-                if address_parts:
-                    bautraeger_info += f"<br/>{'<br/>'.join(address_parts)}"
-                
-                # UID-Anzeige für Rechnungsempfänger
-                uid_requirements = InvoiceUIDRequirements.get_uid_display_requirements(
-                    invoice_amount=invoice.total_amount,
-                    seller_is_small_business=getattr(invoice.service_provider, 'is_small_business', False),
-                    is_eu_cross_border=False  # TODO: Implementiere EU-Erkennung
-                )
-                
-                if uid_requirements['buyer_uid_required'] and bautraeger.company_uid:
-                    bautraeger_info += f"<br/>USt-ID: {UIDValidator.format_uid_for_display(bautraeger.company_uid)}"
-                elif uid_requirements['buyer_uid_required'] and bautraeger.company_tax_number:
-                    bautraeger_info += f"<br/>Steuernummer: {UIDValidator.format_tax_number_for_display(bautraeger.company_tax_number)}"
-                
-                if bautraeger.email:
-                    bautraeger_info += f"<br/>{bautraeger.email}"
-                if bautraeger.phone:
-                    bautraeger_info += f"<br/>{bautraeger.phone}"
-                story.append(Paragraph(bautraeger_info, styles['Normal']))
-            else:
-                story.append(Paragraph("Bauträger-Daten nicht verfügbar", styles['Normal']))
-            
-            story.append(Spacer(1, 20))
-            
-            # Dienstleister-Kontaktdaten (Rechnungssteller)
-            story.append(Paragraph("Rechnungssteller:", styles['Heading3']))
-            dienstleister_info = f"{invoice.service_provider.first_name} {invoice.service_provider.last_name}"
-            if invoice.service_provider.company_name:
-                dienstleister_info = f"{invoice.service_provider.company_name}<br/>{dienstleister_info}"
-            
-            # Adressinformationen hinzufügen
-            address_parts = []
-            if invoice.service_provider.address_street:
-                address_parts.append(invoice.service_provider.address_street)
-            if invoice.service_provider.address_zip and invoice.service_provider.address_city:
-                address_parts.append(f"{invoice.service_provider.address_zip} {invoice.service_provider.address_city}")
-            elif invoice.service_provider.address_city:
-                address_parts.append(invoice.service_provider.address_city)
-            if invoice.service_provider.address_country and invoice.service_provider.address_country != "Deutschland":
-                address_parts.append(invoice.service_provider.address_country)
-            
-            if address_parts:
-                dienstleister_info += f"<br/>{'<br/>'.join(address_parts)}"
-            
-            # UID-Anzeige für Rechnungssteller
-            uid_requirements = InvoiceUIDRequirements.get_uid_display_requirements(
-                invoice_amount=invoice.total_amount,
-                seller_is_small_business=getattr(invoice.service_provider, 'is_small_business', False),
-                is_eu_cross_border=False  # TODO: Implementiere EU-Erkennung
-            )
-            
-            # Rechnungssteller muss immer USt-ID oder Steuernummer angeben (außer Kleinunternehmer)
-            if not uid_requirements['seller_uid_required'] and uid_requirements['seller_tax_number_required']:
-                if invoice.service_provider.company_uid:
-                    dienstleister_info += f"<br/>USt-ID: {UIDValidator.format_uid_for_display(invoice.service_provider.company_uid)}"
-                elif invoice.service_provider.company_tax_number:
-                    dienstleister_info += f"<br/>Steuernummer: {UIDValidator.format_tax_number_for_display(invoice.service_provider.company_tax_number)}"
-            elif uid_requirements['seller_uid_required']:
-                if invoice.service_provider.company_uid:
-                    dienstleister_info += f"<br/>USt-ID: {UIDValidator.format_uid_for_display(invoice.service_provider.company_uid)}"
-                elif invoice.service_provider.company_tax_number:
-                    dienstleister_info += f"<br/>Steuernummer: {UIDValidator.format_tax_number_for_display(invoice.service_provider.company_tax_number)}"
-            
-            if invoice.service_provider.email:
-                dienstleister_info += f"<br/>{invoice.service_provider.email}"
-            if invoice.service_provider.phone:
-                dienstleister_info += f"<br/>{invoice.service_provider.phone}"
-            story.append(Paragraph(dienstleister_info, styles['Normal']))
-            story.append(Spacer(1, 20))
-            
-            # Rechnungsdetails
-            invoice_data = [
-                ['Rechnungsnummer:', invoice.invoice_number],
-                ['Rechnungsdatum:', invoice.invoice_date.strftime('%d.%m.%Y')],
-                ['Fälligkeitsdatum:', invoice.due_date.strftime('%d.%m.%Y')],
-                ['Projekt:', invoice.milestone.project.name],
-                ['Gewerk:', invoice.milestone.title],
-            ]
-            
-            if invoice.work_period_from and invoice.work_period_to:
-                invoice_data.append(['Leistungszeitraum:', f"{invoice.work_period_from.strftime('%d.%m.%Y')} - {invoice.work_period_to.strftime('%d.%m.%Y')}"])
-            
-            # [SUCCESS] Flexible Kostenpositionen oder Legacy-Ansatz
-            story.append(Paragraph("Leistungsverzeichnis", styles['Heading2']))
-            story.append(Spacer(1, 10))
-            
-            # Lade Kostenpositionen wenn vorhanden
-            cost_positions_data = [['Position', 'Betrag (EUR)']]
-            
-            if invoice.cost_positions:
-                # [SUCCESS] Neue flexible Kostenpositionen
-                for pos in invoice.cost_positions:
-                    cost_positions_data.append([pos.description, f"{pos.amount:.2f}"])
-            else:
-                # Legacy: Verwende alte Kostenfelder falls vorhanden
-                if invoice.material_costs and invoice.material_costs > 0:
-                    cost_positions_data.append(['Materialkosten', f"{invoice.material_costs:.2f}"])
-                if invoice.labor_costs and invoice.labor_costs > 0:
-                    cost_positions_data.append(['Arbeitskosten', f"{invoice.labor_costs:.2f}"])
-                if invoice.additional_costs and invoice.additional_costs > 0:
-                    cost_positions_data.append(['Zusatzkosten', f"{invoice.additional_costs:.2f}"])
-            
-            # Zwischensumme und Gesamtbetrag
-            cost_positions_data.extend([
-                ['', ''],  # Leerzeile
-                ['Nettobetrag', f"{invoice.net_amount:.2f}"],
-                [f'MwSt. ({invoice.vat_rate:.0f}%)', f"{invoice.vat_amount:.2f}"],
-                ['', ''],  # Leerzeile
-                ['Gesamtbetrag', f"{invoice.total_amount:.2f}"]
-            ])
-            
-            cost_table = Table(cost_positions_data, colWidths=[12*cm, 4*cm])
-            cost_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),  # Header fett
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),  # Header-Hintergrund
-                ('GRID', (0, 0), (-1, -2), 1, colors.black),  # Gitter bis vor Gesamtbetrag
-                ('LINEBELOW', (0, -3), (-1, -3), 2, colors.black),  # Linie vor Gesamtbetrag
-                ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),  # Gesamtbetrag fett
-                ('FONTSIZE', (0, -1), (-1, -1), 12),  # Gesamtbetrag größer
-                ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),  # Gesamtbetrag-Hintergrund
-            ]))
-            
-            story.append(cost_table)
-            story.append(Spacer(1, 20))
-            
-            # Beschreibung
-            if invoice.description:
-                story.append(Paragraph("Leistungsbeschreibung", styles['Heading3']))
-                story.append(Paragraph(invoice.description, styles['Normal']))
-                story.append(Spacer(1, 20))
-            
-            # Notizen
-            if invoice.notes:
-                story.append(Paragraph("Anmerkungen", styles['Heading3']))
-                story.append(Paragraph(invoice.notes, styles['Normal']))
-            
-            # Erstelle PDF
-            doc.build(story)
+            spec = normalize_spec("invoice", InvoiceService.invoice_pdf_data(invoice))
+            await pdf_renderer.render_to(spec, str(pdf_path))
             
             print(f"[SUCCESS] PDF generiert: {pdf_path}")
             
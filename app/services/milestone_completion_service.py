@@ -18,13 +18,14 @@ class MilestoneCompletionService:
     """Service für Milestone-Completion-Logik"""
     
     @staticmethod
-    async def increment_completed_offers_count(db: AsyncSession, milestone_id: int) -> bool:
+    async def increment_completed_offers_count(db: AsyncSession, milestone_id: int, commit: bool = True) -> bool:
         """
         Inkrementiert completed_offers_count für alle Dienstleister, die an diesem Milestone beteiligt waren
         
         Args:
             db: Datenbank-Session
             milestone_id: ID des abgeschlossenen Milestones
+            commit: False, wenn der Aufrufer die Transaktion committet (z.B. Outbox-Handler)
             
         Returns:
             bool: True wenn erfolgreich, False bei Fehler
@@ -100,7 +101,7 @@ class MilestoneCompletionService:
                     # Aktualisiere Rang des Dienstleisters
                     try:
                         from .gamification_service import GamificationService
-                        rank_info = await GamificationService.update_user_rank(db, service_provider_id)
+                        rank_info = await GamificationService.update_user_rank(db, service_provider_id, commit=commit)
                         if rank_info.get('rank_changed'):
                             logger.info(f"[MILESTONE_COMPLETION] Rang-Update für Dienstleister {service_provider_id}: {rank_info['current_rank']['title']}")
                     except Exception as rank_error:
@@ -112,7 +113,8 @@ class MilestoneCompletionService:
                     continue
             
             # 4. Commit der Änderungen
-            await db.commit()
+            if commit:
+                await db.commit()
             
             logger.info(f"[MILESTONE_COMPLETION] Erfolgreich abgeschlossen: {updated_count} Dienstleister aktualisiert für Milestone {milestone_id}")
             return True
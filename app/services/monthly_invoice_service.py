@@ -1,155 +1,441 @@
-from sqlalchemy.orm import Session
-from datetime import datetime, date
-from typing import List, Dict, Any
+"""
+Monatliche Sammelrechnungen der BuildWise-Gebühren (Batch-Lauf)
+
+Ein Lauf pro Monat (MonthlyInvoiceRun) arbeitet die Dienstleister mit offenen
+Gebühren des Monats in Batches nach aufsteigender User-ID ab:
+
+1. Laden: Dienstleister hinter dem Checkpoint, ihre Gebühren und Kontaktdaten
+   (kurze Session - während des Renderns ist keine Transaktion offen)
+2. Rendern: alle PDFs des Batches gleichzeitig im Prozess-Pool (pdf_render_service)
+3. Speichern: Rechnungen, Dokumente und neuer Checkpoint in einer Transaktion
+
+Bricht ein Lauf ab, setzt der nächste Aufruf hinter dem letzten gespeicherten
+Batch fort; die PDFs eines abgebrochenen Batches kommen dann aus dem Cache.
+Dienstleister, die für den Monat bereits eine Rechnung haben, werden übersprungen.
+"""
+
+import asyncio
+import json
 import logging
+import os
+import socket
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, exists, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
 
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
 from app.models.buildwise_fee import BuildWiseFee
+from app.models.document import Document, DocumentType
+from app.models.monthly_fee_invoice import MonthlyFeeInvoice, MonthlyInvoiceRun
 from app.models.user import User
-from app.services.buildwise_fee_service import BuildWiseFeeService
-from app.services.document_service import DocumentService
+from app.services.pdf_render_service import normalize_spec, pdf_renderer
 
 logger = logging.getLogger(__name__)
 
+MONTH_NAMES = [
+    "Januar", "Februar", "März", "April", "Mai", "Juni",
+    "Juli", "August", "September", "Oktober", "November", "Dezember"
+]
+
+# Zeitangaben der letzten Batches im Lauf (für die Statusabfrage)
+MAX_BATCH_TIMINGS = 50
+
+_WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _open_fee_conditions(month: int, year: int) -> list:
+    """Offene Gebühren des Monats (nach created_at, wie BuildWiseFeeService.get_fees)"""
+    start_date = datetime(year, month, 1)
+    end_date = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return [
+        BuildWiseFee.status == "open",
+        BuildWiseFee.created_at >= start_date,
+        BuildWiseFee.created_at < end_date
+    ]
+
+
+def _invoice_number(service_provider_id: int, month: int, year: int) -> str:
+    return f"BW-M{year}{month:02d}-{service_provider_id:06d}"
+
+
+def _run_summary(run: MonthlyInvoiceRun) -> Dict[str, Any]:
+    duration = None
+    if run.started_at:
+        duration = ((run.finished_at or datetime.utcnow()) - run.started_at).total_seconds()
+    return {
+        "month": run.fee_month,
+        "year": run.fee_year,
+        "status": run.status,
+        "total_users": run.total_users,
+        "processed_users": run.processed_users,
+        "total_invoices_created": run.invoices_created,
+        "total_amount": float(run.total_amount or 0),
+        "batches": run.batch_count,
+        "batch_timings": json.loads(run.batch_timings) if run.batch_timings else [],
+        "errors": json.loads(run.errors) if run.errors else [],
+        "locked_by": run.locked_by,
+        "started_at": run.started_at.isoformat() if run.started_at else None,
+        "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+        "duration_seconds": round(duration, 1) if duration is not None else None
+    }
+
+
 class MonthlyInvoiceService:
-    def __init__(self, db: Session):
-        self.db = db
-        self.fee_service = BuildWiseFeeService(db)
-        self.document_service = DocumentService(db)
-    
-    def create_monthly_invoices(self, month: int, year: int) -> Dict[str, Any]:
-        """Erstelle monatliche Rechnungen für alle Benutzer mit offenen Gebühren"""
-        logger.info(f"Erstelle monatliche Rechnungen für {month}/{year}")
-        
-        # Hole alle Benutzer mit offenen Gebühren
-        users_with_fees = self.db.query(User).join(BuildWiseFee).filter(
-            BuildWiseFee.fee_month == month,
-            BuildWiseFee.fee_year == year,
-            BuildWiseFee.status == "open"
-        ).distinct().all()
-        
-        results = {
-            "total_users": len(users_with_fees),
-            "total_invoices_created": 0,
-            "total_amount": 0,
-            "errors": []
-        }
-        
-        for user in users_with_fees:
-            try:
-                # Erstelle Rechnung für diesen Benutzer
-                invoice_data = self.fee_service.create_monthly_invoice(user.id, month, year)
-                
-                if invoice_data:
-                    results["total_invoices_created"] += 1
-                    results["total_amount"] += invoice_data["total_amount"]
-                    
-                    # Erstelle Rechnungsdokument
-                    self._create_invoice_document(user, invoice_data, month, year)
-                    
-                    logger.info(f"Rechnung für Benutzer {user.id} erstellt: {invoice_data['invoice_number']}")
-                else:
-                    logger.info(f"Keine offenen Gebühren für Benutzer {user.id}")
-                    
-            except Exception as e:
-                error_msg = f"Fehler bei Rechnungserstellung für Benutzer {user.id}: {str(e)}"
-                logger.error(error_msg)
-                results["errors"].append(error_msg)
-        
-        logger.info(f"Monatliche Rechnungserstellung abgeschlossen: {results}")
-        return results
-    
-    def _create_invoice_document(self, user: User, invoice_data: Dict[str, Any], month: int, year: int):
-        """Erstelle ein Rechnungsdokument im Dokumentenbereich"""
+    """Erstellt die monatlichen Sammelrechnungen aller Dienstleister mit offenen Gebühren"""
+
+    @staticmethod
+    async def create_monthly_invoices(
+        month: int,
+        year: int,
+        batch_size: Optional[int] = None,
+        retry_failed: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Führt den Monatslauf aus oder setzt einen abgebrochenen Lauf fort
+
+        Ein abgeschlossener Lauf wird nicht wiederholt; mit `retry_failed`
+        werden Dienstleister ohne Rechnung (fehlgeschlagene PDFs) erneut
+        verarbeitet.
+
+        Raises:
+            RuntimeError: Wenn der Lauf gerade auf einem anderen Worker läuft
+        """
+        if not 1 <= month <= 12:
+            raise ValueError(f"Ungültiger Monat: {month}")
+        batch_size = batch_size or settings.monthly_invoice_batch_size
+
+        run = await MonthlyInvoiceService._claim_run(month, year, retry_failed)
+        if run.status == "completed":
+            logger.info(f"Monatsrechnungen {month:02d}/{year} bereits erstellt")
+            return _run_summary(run)
+
+        logger.info(f"Erstelle monatliche Rechnungen für {month:02d}/{year} ab User {run.last_user_id}")
+        errors = json.loads(run.errors) if run.errors else []
+        timings = json.loads(run.batch_timings) if run.batch_timings else []
+        cursor = run.last_user_id
         try:
-            # Erstelle Rechnungstext
-            invoice_text = self._generate_invoice_text(user, invoice_data, month, year)
-            
-            # Erstelle Dokument
-            document_data = {
-                "title": f"BuildWise-Gebührenrechnung {month:02d}/{year}",
-                "description": f"Monatliche BuildWise-Gebührenrechnung für {month:02d}/{year}",
-                "document_type": "invoice",
-                "project_id": 1,  # Globales Projekt für Gebühren
-                "category": "billing",
-                "tags": "buildwise,gebühren,rechnung,monatlich",
-                "is_public": False,
-                "content": invoice_text
-            }
-            
-            # Erstelle FormData für Dokument-Upload
-            from io import BytesIO
-            content_bytes = invoice_text.encode('utf-8')
-            content_file = BytesIO(content_bytes)
-            
-            # Hier würde normalerweise das Dokument hochgeladen werden
-            # Für jetzt nur Logging
-            logger.info(f"Rechnungsdokument erstellt für Benutzer {user.id}: {document_data['title']}")
-            
+            while True:
+                started = time.monotonic()
+                batch = await MonthlyInvoiceService._load_batch(run, cursor, batch_size)
+                if not batch:
+                    break
+                loaded = time.monotonic()
+
+                rendered = await MonthlyInvoiceService._render_batch(batch)
+                render_done = time.monotonic()
+
+                batch_errors = [
+                    f"Fehler bei Rechnungserstellung für Benutzer {item['service_provider_id']}: {result}"
+                    for item, result in zip(batch, rendered) if isinstance(result, Exception)
+                ]
+                for message in batch_errors:
+                    logger.error(message)
+                errors.extend(batch_errors)
+                timing = {
+                    "users": len(batch),
+                    "load_seconds": round(loaded - started, 3),
+                    "render_seconds": round(render_done - loaded, 3),
+                    "store_seconds": 0.0
+                }
+                timings = (timings + [timing])[-MAX_BATCH_TIMINGS:]
+
+                cursor = batch[-1]["service_provider_id"]
+                await MonthlyInvoiceService._store_batch(run.id, batch, rendered, cursor, errors, timings)
+                logger.info(
+                    f"Monatsrechnungen {month:02d}/{year}: Batch bis User {cursor} "
+                    f"({len(batch)} Dienstleister, Laden {timing['load_seconds']}s, "
+                    f"Rendern {timing['render_seconds']}s, Speichern {timing['store_seconds']}s)"
+                )
+
+            await MonthlyInvoiceService._finish_run(run.id, "completed")
         except Exception as e:
-            logger.error(f"Fehler beim Erstellen des Rechnungsdokuments: {str(e)}")
-    
-    def _generate_invoice_text(self, user: User, invoice_data: Dict[str, Any], month: int, year: int) -> str:
-        """Generiere Rechnungstext"""
-        month_names = [
-            "Januar", "Februar", "März", "April", "Mai", "Juni",
-            "Juli", "August", "September", "Oktober", "November", "Dezember"
-        ]
-        
-        invoice_text = f"""
-BUILDWISE GMBH
-Gebührenrechnung
+            logger.error(f"Monatsrechnungen {month:02d}/{year} abgebrochen: {e}")
+            await MonthlyInvoiceService._finish_run(run.id, "failed", error=str(e))
+            raise
 
-Rechnungsnummer: {invoice_data['invoice_number']}
-Rechnungsdatum: {datetime.now().strftime('%d.%m.%Y')}
-Fälligkeitsdatum: {invoice_data['due_date'].strftime('%d.%m.%Y')}
+        result = await MonthlyInvoiceService.get_run(month, year)
+        logger.info(f"Monatliche Rechnungserstellung abgeschlossen: {result}")
+        return result
 
-Rechnung an:
-{user.first_name} {user.last_name}
-{user.email}
+    @staticmethod
+    async def get_run(month: int, year: int) -> Optional[Dict[str, Any]]:
+        """Fortschritt und Batch-Zeiten des Monatslaufs (None, wenn es keinen gibt)"""
+        async with AsyncSessionLocal() as db:
+            run = (await db.execute(
+                select(MonthlyInvoiceRun).where(
+                    MonthlyInvoiceRun.fee_month == month,
+                    MonthlyInvoiceRun.fee_year == year
+                )
+            )).scalar_one_or_none()
+            return _run_summary(run) if run else None
 
-Gebühren für {month_names[month-1]} {year}
+    # ------------------------------------------------------------------
+    # Lauf-Verwaltung
+    # ------------------------------------------------------------------
 
-Gesamtbetrag: {invoice_data['total_amount']:.2f}€
-Anzahl Gebühren: {invoice_data['fee_count']}
+    @staticmethod
+    async def _claim_run(month: int, year: int, retry_failed: bool) -> MonthlyInvoiceRun:
+        """Legt den Lauf an bzw. übernimmt ihn (verwaist oder abgebrochen)"""
+        run_query = select(MonthlyInvoiceRun).where(
+            MonthlyInvoiceRun.fee_month == month,
+            MonthlyInvoiceRun.fee_year == year
+        )
+        async with AsyncSessionLocal() as db:
+            run = (await db.execute(run_query)).scalar_one_or_none()
+            if run is None:
+                total_users = (await db.execute(
+                    select(func.count(func.distinct(BuildWiseFee.service_provider_id)))
+                    .where(*_open_fee_conditions(month, year))
+                )).scalar() or 0
+                db.add(MonthlyInvoiceRun(
+                    fee_month=month,
+                    fee_year=year,
+                    status="running",
+                    invoice_date=date.today(),
+                    total_users=total_users
+                ))
+                try:
+                    await db.commit()
+                except IntegrityError:
+                    # Gleichzeitig von einem anderen Worker angelegt
+                    await db.rollback()
+                run = (await db.execute(run_query)).scalar_one()
 
-Die Gebühren basieren auf 1% der akzeptierten Angebote/Kostenvoranschläge.
+            if run.status == "completed" and not retry_failed:
+                return run
 
-Bitte überweisen Sie den Betrag innerhalb von 14 Tagen auf unser Konto.
+            now = datetime.utcnow()
+            values = {"locked_by": _WORKER_ID, "heartbeat_at": now, "status": "running", "finished_at": None}
+            if run.status == "completed":
+                # Nur Dienstleister ohne Rechnung werden erneut verarbeitet
+                values.update(last_user_id=0, processed_users=0, errors=None)
+            claimed = await db.execute(
+                update(MonthlyInvoiceRun)
+                .where(
+                    MonthlyInvoiceRun.id == run.id,
+                    or_(
+                        MonthlyInvoiceRun.locked_by.is_(None),
+                        MonthlyInvoiceRun.locked_by == _WORKER_ID,
+                        MonthlyInvoiceRun.heartbeat_at < now - timedelta(seconds=settings.monthly_invoice_stale_seconds)
+                    )
+                )
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            if claimed.rowcount == 0:
+                locked_by = run.locked_by
+                await db.rollback()
+                raise RuntimeError(f"Monatslauf {month:02d}/{year} läuft bereits auf Worker {locked_by}")
+            await db.commit()
+            await db.refresh(run)
+            return run
 
-Vielen Dank für Ihr Vertrauen!
+    @staticmethod
+    async def _finish_run(run_id: int, status: str, error: Optional[str] = None):
+        async with AsyncSessionLocal() as db:
+            values = {"status": status, "locked_by": None, "heartbeat_at": None, "finished_at": datetime.utcnow()}
+            if error:
+                run = await db.get(MonthlyInvoiceRun, run_id)
+                values["errors"] = json.dumps((json.loads(run.errors) if run.errors else []) + [error])
+            await db.execute(
+                update(MonthlyInvoiceRun)
+                .where(MonthlyInvoiceRun.id == run_id, MonthlyInvoiceRun.locked_by == _WORKER_ID)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
 
-BuildWise GmbH
-        """
-        
-        return invoice_text.strip()
-    
-    def check_overdue_invoices(self) -> Dict[str, Any]:
-        """Prüfe überfällige Rechnungen und markiere sie als overdue"""
-        logger.info("Prüfe überfällige Rechnungen")
-        
-        # Finde Rechnungen, die überfällig sind (älter als 28 Tage)
-        overdue_date = datetime.now().replace(day=28)
-        overdue_fees = self.db.query(BuildWiseFee).filter(
-            BuildWiseFee.status == "open",
-            BuildWiseFee.due_date < overdue_date
-        ).all()
-        
-        results = {
-            "total_overdue": len(overdue_fees),
-            "updated_fees": 0,
-            "errors": []
-        }
-        
-        for fee in overdue_fees:
-            try:
-                fee.status = "overdue"
-                self.db.commit()
-                results["updated_fees"] += 1
-                logger.info(f"Gebühr {fee.id} als überfällig markiert")
-            except Exception as e:
-                error_msg = f"Fehler beim Markieren der überfälligen Gebühr {fee.id}: {str(e)}"
-                logger.error(error_msg)
-                results["errors"].append(error_msg)
-        
-        logger.info(f"Überfällige Rechnungen geprüft: {results}")
-        return results 
\ No newline at end of file
+    # ------------------------------------------------------------------
+    # Batch-Phasen
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    async def _load_batch(run: MonthlyInvoiceRun, cursor: int, batch_size: int) -> List[Dict[str, Any]]:
+        """Nächste Dienstleister hinter dem Checkpoint mit Gebühren und Render-Spec"""
+        month, year = run.fee_month, run.fee_year
+        conditions = _open_fee_conditions(month, year)
+        already_invoiced = exists().where(
+            and_(
+                MonthlyFeeInvoice.service_provider_id == BuildWiseFee.service_provider_id,
+                MonthlyFeeInvoice.fee_month == month,
+                MonthlyFeeInvoice.fee_year == year
+            )
+        )
+        async with AsyncSessionLocal() as db:
+            provider_ids = (await db.execute(
+                select(BuildWiseFee.service_provider_id)
+                .where(*conditions, BuildWiseFee.service_provider_id > cursor, ~already_invoiced)
+                .distinct()
+                .order_by(BuildWiseFee.service_provider_id)
+                .limit(batch_size)
+            )).scalars().all()
+            if not provider_ids:
+                return []
+
+            fees = (await db.execute(
+                select(BuildWiseFee)
+                .where(*conditions, BuildWiseFee.service_provider_id.in_(provider_ids))
+                .order_by(BuildWiseFee.service_provider_id, BuildWiseFee.id)
+            )).scalars().all()
+            users = {
+                user.id: user for user in (await db.execute(
+                    select(User).where(User.id.in_(provider_ids))
+                )).scalars().all()
+            }
+
+        fees_by_provider: Dict[int, List[BuildWiseFee]] = {}
+        for fee in fees:
+            fees_by_provider.setdefault(fee.service_provider_id, []).append(fee)
+
+        from app.core.storage import get_invoice_path
+        output_dir = get_invoice_path() / "monthly" / f"{year}-{month:02d}"
+        invoice_date = run.invoice_date
+        due_date = invoice_date + timedelta(days=14)
+
+        batch = []
+        for provider_id in provider_ids:
+            provider_fees = fees_by_provider.get(provider_id, [])
+            user = users.get(provider_id)
+            net_amount = sum((Decimal(fee.fee_amount or 0) for fee in provider_fees), Decimal("0"))
+            tax_amount = sum((Decimal(fee.tax_amount or 0) for fee in provider_fees), Decimal("0"))
+            total_amount = net_amount + tax_amount
+            invoice_number = _invoice_number(provider_id, month, year)
+
+            address = None
+            if user is not None and (user.address_street or user.address_city):
+                city = " ".join(part for part in (user.address_zip, user.address_city) if part)
+                address = ", ".join(part for part in (user.address_street, city) if part)
+
+            spec = normalize_spec("buildwise_monthly_invoice", {
+                "invoice_data": {
+                    "invoice_number": invoice_number,
+                    "invoice_date": invoice_date,
+                    "due_date": due_date,
+                    "period": f"{MONTH_NAMES[month - 1]} {year}",
+                    "net_amount": float(net_amount),
+                    "tax_amount": float(tax_amount),
+                    "total_amount": float(total_amount)
+                },
+                "recipient_data": {
+                    "name": f"{user.first_name} {user.last_name}" if user else f"Benutzer {provider_id}",
+                    "company_name": user.company_name if user else None,
+                    "email": user.email if user else None,
+                    "address": address
+                },
+                "fees": [
+                    {
+                        "id": fee.id,
+                        "invoice_number": fee.invoice_number,
+                        "date": fee.created_at,
+                        "quote_amount": float(fee.quote_amount or 0),
+                        "fee_percentage": float(fee.fee_percentage or 0),
+                        "fee_amount": float(fee.fee_amount or 0)
+                    }
+                    for fee in provider_fees
+                ]
+            })
+            batch.append({
+                "service_provider_id": provider_id,
+                "fee_month": month,
+                "fee_year": year,
+                "project_id": provider_fees[0].project_id,
+                "invoice_number": invoice_number,
+                "invoice_date": invoice_date,
+                "due_date": due_date,
+                "fee_ids": [fee.id for fee in provider_fees],
+                "total_amount": total_amount,
+                "currency": provider_fees[0].currency,
+                "spec": spec,
+                "pdf_path": str(output_dir / f"{invoice_number}.pdf")
+            })
+        return batch
+
+    @staticmethod
+    async def _render_batch(batch: List[Dict[str, Any]]) -> List[Any]:
+        """Rendert alle PDFs des Batches im Prozess-Pool (Pfad oder Exception je Eintrag)"""
+        return await asyncio.gather(
+            *(pdf_renderer.render_to(item["spec"], item["pdf_path"]) for item in batch),
+            return_exceptions=True
+        )
+
+    @staticmethod
+    async def _store_batch(
+        run_id: int,
+        batch: List[Dict[str, Any]],
+        rendered: List[Any],
+        cursor: int,
+        errors: List[str],
+        timings: List[Dict[str, Any]]
+    ) -> Tuple[int, Decimal]:
+        """Rechnungen, Dokumente und Checkpoint in einer Transaktion"""
+        started = time.monotonic()
+        items = [item for item, result in zip(batch, rendered) if not isinstance(result, Exception)]
+        async with AsyncSessionLocal() as db:
+            documents = [
+                Document(
+                    project_id=item["project_id"],
+                    uploaded_by=item["service_provider_id"],
+                    title=f"BuildWise-Gebührenrechnung {item['invoice_number']}",
+                    description=f"Monatliche BuildWise-Gebührenrechnung ({len(item['fee_ids'])} Gebühren)",
+                    document_type=DocumentType.INVOICE.value,
+                    file_name=os.path.basename(item["pdf_path"]),
+                    file_path=item["pdf_path"],
+                    file_size=os.path.getsize(item["pdf_path"]),
+                    mime_type="application/pdf",
+                    category="BuildWise Gebühren",
+                    tags="buildwise,gebühren,rechnung,monatlich",
+                    is_public=False
+                )
+                for item in items
+            ]
+            db.add_all(documents)
+            await db.flush()
+
+            total_amount = sum((item["total_amount"] for item in items), Decimal("0"))
+            db.add_all([
+                MonthlyFeeInvoice(
+                    service_provider_id=item["service_provider_id"],
+                    fee_month=item["fee_month"],
+                    fee_year=item["fee_year"],
+                    run_id=run_id,
+                    invoice_number=item["invoice_number"],
+                    invoice_date=item["invoice_date"],
+                    due_date=item["due_date"],
+                    fee_count=len(item["fee_ids"]),
+                    total_amount=item["total_amount"],
+                    currency=item["currency"],
+                    fee_ids=json.dumps(item["fee_ids"]),
+                    pdf_path=item["pdf_path"],
+                    document_id=document.id
+                )
+                for item, document in zip(items, documents)
+            ])
+
+            await db.flush()
+            timings[-1]["store_seconds"] = round(time.monotonic() - started, 3)
+
+            checkpoint = await db.execute(
+                update(MonthlyInvoiceRun)
+                .where(MonthlyInvoiceRun.id == run_id, MonthlyInvoiceRun.locked_by == _WORKER_ID)
+                .values(
+                    last_user_id=cursor,
+                    processed_users=MonthlyInvoiceRun.processed_users + len(batch),
+                    invoices_created=MonthlyInvoiceRun.invoices_created + len(items),
+                    total_amount=MonthlyInvoiceRun.total_amount + total_amount,
+                    batch_count=MonthlyInvoiceRun.batch_count + 1,
+                    batch_timings=json.dumps(timings),
+                    errors=json.dumps(errors) if errors else None,
+                    heartbeat_at=datetime.utcnow()
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if checkpoint.rowcount == 0:
+                await db.rollback()
+                raise RuntimeError(f"Monatslauf {run_id} wurde von einem anderen Worker übernommen")
+            await db.commit()
+            return len(items), total_amount
@@ -3,13 +3,13 @@ Notification Preference Service
 Business Logic für Benachrichtigungspräferenzen
 """
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, update, delete, insert
 from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 import json
 from datetime import datetime
 
-from app.models.notification_preference import NotificationPreference
+from app.models.notification_preference import NotificationPreference, NotificationPreferenceCategory
 from app.models.contact import Contact
 from app.schemas.notification_preference import (
     NotificationPreferenceCreate,
@@ -23,6 +23,23 @@ class NotificationPreferenceService:
     def __init__(self, db: AsyncSession):
         self.db = db
     
+    async def _sync_categories(self, preference_id: int, categories: List[str]) -> None:
+        """
+        Synchronisiert die normalisierte Kategorie-Tabelle mit dem JSON-Feld
+        (wird im selben Commit wie die Präferenz geschrieben)
+        """
+        await self.db.execute(
+            delete(NotificationPreferenceCategory).where(
+                NotificationPreferenceCategory.preference_id == preference_id
+            )
+        )
+        unique_categories = list(dict.fromkeys(c for c in categories if c))
+        if unique_categories:
+            await self.db.execute(
+                insert(NotificationPreferenceCategory),
+                [{"preference_id": preference_id, "category": c} for c in unique_categories]
+            )
+    
     async def upsert_preference(
         self,
         data: NotificationPreferenceCreate,
@@ -66,6 +83,7 @@ class NotificationPreferenceService:
             existing.enabled = data.enabled
             existing.categories = categories_json
             existing.updated_at = datetime.utcnow()
+            await self._sync_categories(existing.id, data.categories)
             await self.db.commit()
             await self.db.refresh(existing)
             return existing
@@ -79,6 +97,8 @@ class NotificationPreferenceService:
                 categories=categories_json
             )
             self.db.add(preference)
+            await self.db.flush()
+            await self._sync_categories(preference.id, data.categories)
             await self.db.commit()
             await self.db.refresh(preference)
             return preference
@@ -182,6 +202,7 @@ class NotificationPreferenceService:
         
         preference.categories = json.dumps(categories)
         preference.updated_at = datetime.utcnow()
+        await self._sync_categories(preference.id, categories)
         await self.db.commit()
         await self.db.refresh(preference)
         
@@ -210,6 +231,11 @@ class NotificationPreferenceService:
         if not preference:
             raise ValueError("Präferenz nicht gefunden oder keine Berechtigung")
         
+        await self.db.execute(
+            delete(NotificationPreferenceCategory).where(
+                NotificationPreferenceCategory.preference_id == preference_id
+            )
+        )
         await self.db.execute(
             delete(NotificationPreference).where(NotificationPreference.id == preference_id)
         )
@@ -232,22 +258,15 @@ class NotificationPreferenceService:
             Liste der aktiven Präferenzen
         """
         result = await self.db.execute(
-            select(NotificationPreference).where(
+            select(NotificationPreference)
+            .join(
+                NotificationPreferenceCategory,
+                NotificationPreferenceCategory.preference_id == NotificationPreference.id
+            )
+            .where(
+                NotificationPreferenceCategory.category == category,
                 NotificationPreference.enabled == True,
                 NotificationPreference.user_id == bautraeger_user_id
             )
         )
-        all_preferences = result.scalars().all()
-        
-        # Filtere nach Kategorie (JSON-Suche)
-        matching_preferences = []
-        for pref in all_preferences:
-            try:
-                categories = json.loads(pref.categories)
-                if category in categories:
-                    matching_preferences.append(pref)
-            except (json.JSONDecodeError, TypeError):
-                continue
-        
-        return matching_preferences
-
+        return list(result.scalars().all())
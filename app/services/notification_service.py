@@ -1,8 +1,8 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func, desc
+from sqlalchemy import select, and_, or_, func, desc, case
 from sqlalchemy.orm import selectinload
 from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
 
 from ..models.notification import Notification, NotificationType, NotificationPriority
@@ -11,9 +11,10 @@ from ..models.quote import Quote
 from ..models.project import Project
 from ..models.milestone import Milestone
 from ..schemas.notification import (
-    NotificationCreate, NotificationUpdate, NotificationRead, NotificationStats,
+    NotificationCreate, NotificationUpdate, NotificationRead,
     QuoteNotificationData
 )
+from .notification_stats_cache import notification_stats_cache
 
 class NotificationService:
     """Service für Benachrichtigungsverwaltung"""
@@ -421,45 +422,6 @@ class NotificationService:
         result = await db.execute(query)
         return list(result.scalars().all())
     
-    @staticmethod
-    async def get_notification_stats(db: AsyncSession, user_id: int) -> NotificationStats:
-        """Holt Statistiken über Benachrichtigungen eines Benutzers"""
-        base_query = select(func.count(Notification.id)).where(Notification.recipient_id == user_id)
-        
-        # Gesamtanzahl
-        total_result = await db.execute(base_query)
-        total_count = total_result.scalar() or 0
-        
-        # Ungelesene
-        unread_result = await db.execute(
-            base_query.where(Notification.is_read == False)
-        )
-        unread_count = unread_result.scalar() or 0
-        
-        # Nicht quittierte
-        unacknowledged_result = await db.execute(
-            base_query.where(Notification.is_acknowledged == False)
-        )
-        unacknowledged_count = unacknowledged_result.scalar() or 0
-        
-        # Dringende
-        urgent_result = await db.execute(
-            base_query.where(
-                and_(
-                    Notification.priority == NotificationPriority.URGENT,
-                    Notification.is_acknowledged == False
-                )
-            )
-        )
-        urgent_count = urgent_result.scalar() or 0
-        
-        return NotificationStats(
-            total_count=total_count,
-            unread_count=unread_count,
-            unacknowledged_count=unacknowledged_count,
-            urgent_count=urgent_count
-        )
-    
     @staticmethod
     async def mark_notification_as_read(
         db: AsyncSession,
@@ -593,22 +555,19 @@ class NotificationService:
         db: AsyncSession,
         days_old: int = 30
     ) -> int:
-        """Löscht alte Benachrichtigungen (Standard: älter als 30 Tage)"""
-        from sqlalchemy import delete
+        """
+        Löscht alte, quittierte Benachrichtigungen (Standard: älter als 30 Tage)
         
-        cutoff_date = datetime.utcnow() - timedelta(days=days_old)
+        Läuft in kurzen Batches über die Retention-Richtlinie statt in einer
+        einzigen großen Transaktion; die Zähler-Caches werden dabei verworfen.
+        """
+        from .retention_service import RetentionService, get_retention_policies
         
-        result = await db.execute(
-            delete(Notification).where(
-                and_(
-                    Notification.created_at < cutoff_date,
-                    Notification.is_acknowledged == True
-                )
-            )
-        )
+        policy = next(p for p in get_retention_policies() if p.name == "notifications")
+        policy.retention_days = days_old
         
-        await db.commit()
-        return result.rowcount
+        result = await RetentionService.purge(policy)
+        return result["deleted"]
     
     @staticmethod
     async def notify_service_providers_for_new_tender(
@@ -627,87 +586,92 @@ class NotificationService:
         Returns:
             Liste der erstellten Benachrichtigungen
         """
-        from ..models.notification_preference import NotificationPreference
+        from sqlalchemy import insert
+        from ..models.notification_preference import NotificationPreference, NotificationPreferenceCategory
         from ..models.contact import Contact
+        from .notification_stream_service import NotificationStreamService
+        from .notification_stats_cache import record_created_notifications
         
         # Prüfe ob Milestone eine Kategorie hat
         if not milestone.category:
             return []
         
-        # Finde alle aktiven Benachrichtigungspräferenzen des Bauträgers
-        result = await db.execute(
-            select(NotificationPreference)
+        # Passende Empfänger mit einer indizierten Abfrage über die normalisierten Kategorien
+        recipients_result = await db.execute(
+            select(NotificationPreference.service_provider_id, Contact.company_name)
+            .join(
+                NotificationPreferenceCategory,
+                NotificationPreferenceCategory.preference_id == NotificationPreference.id
+            )
+            .outerjoin(Contact, Contact.id == NotificationPreference.contact_id)
             .where(
                 and_(
+                    NotificationPreferenceCategory.category == milestone.category,
                     NotificationPreference.user_id == bautraeger_id,
                     NotificationPreference.enabled == True
                 )
             )
         )
-        all_preferences = result.scalars().all()
-        
-        # Filtere Präferenzen nach Kategorie
-        matching_preferences = []
-        for pref in all_preferences:
-            try:
-                categories = json.loads(pref.categories) if isinstance(pref.categories, str) else pref.categories
-                if milestone.category in categories:
-                    matching_preferences.append(pref)
-            except (json.JSONDecodeError, TypeError):
-                continue
+        recipients = recipients_result.all()
         
-        # Erstelle Benachrichtigungen für jeden passenden Dienstleister
-        notifications = []
-        for pref in matching_preferences:
-            try:
-                # Hole Projekt-Informationen
-                project_name = "Unbekanntes Projekt"
-                if milestone.project_id:
-                    project_result = await db.execute(
-                        select(Project).where(Project.id == milestone.project_id)
-                    )
-                    project = project_result.scalar_one_or_none()
-                    if project:
-                        project_name = project.name
-                
-                # Hole Kontakt-Informationen
-                contact_result = await db.execute(
-                    select(Contact).where(Contact.id == pref.contact_id)
-                )
-                contact = contact_result.scalar_one_or_none()
-                company_name = contact.company_name if contact else "Unbekannte Firma"
-                
-                # Erstelle Benachrichtigung
-                notification = Notification(
-                    recipient_id=pref.service_provider_id,
-                    type=NotificationType.TENDER_INVITATION,
-                    priority=NotificationPriority.MEDIUM,
-                    title=f"Neue Ausschreibung: {milestone.title}",
-                    message=f"Eine neue Ausschreibung in der Kategorie '{milestone.category}' wurde von {company_name} erstellt. Projekt: {project_name}",
-                    data=json.dumps({
-                        "milestone_id": milestone.id,
-                        "milestone_title": milestone.title,
-                        "project_id": milestone.project_id,
-                        "project_name": project_name,
-                        "category": milestone.category,
-                        "bautraeger_id": bautraeger_id
-                    }),
-                    related_milestone_id=milestone.id,
-                    related_project_id=milestone.project_id,
-                    created_at=datetime.utcnow()
-                )
-                
-                db.add(notification)
-                notifications.append(notification)
-                
-            except Exception as e:
-                print(f"Fehler beim Erstellen der Benachrichtigung fuer Dienstleister {pref.service_provider_id}: {e}")
+        if not recipients:
+            return []
+        
+        # Projekt-Informationen einmalig laden
+        project_name = "Unbekanntes Projekt"
+        if milestone.project_id:
+            project_result = await db.execute(
+                select(Project.name).where(Project.id == milestone.project_id)
+            )
+            project_name = project_result.scalar_one_or_none() or project_name
+        
+        now = datetime.utcnow()
+        data = json.dumps({
+            "milestone_id": milestone.id,
+            "milestone_title": milestone.title,
+            "project_id": milestone.project_id,
+            "project_name": project_name,
+            "category": milestone.category,
+            "bautraeger_id": bautraeger_id
+        })
+        
+        rows = []
+        seen_recipients = set()
+        for service_provider_id, company_name in recipients:
+            # Ein Dienstleister kann über mehrere Kontakte verknüpft sein
+            if service_provider_id in seen_recipients:
                 continue
+            seen_recipients.add(service_provider_id)
+            rows.append({
+                "recipient_id": service_provider_id,
+                "type": NotificationType.TENDER_INVITATION,
+                "priority": NotificationPriority.NORMAL,
+                "title": f"Neue Ausschreibung: {milestone.title}",
+                "message": f"Eine neue Ausschreibung in der Kategorie '{milestone.category}' wurde von {company_name or 'Unbekannte Firma'} erstellt. Projekt: {project_name}",
+                "data": data,
+                "related_milestone_id": milestone.id,
+                "related_project_id": milestone.project_id,
+                "is_read": False,
+                "is_acknowledged": False,
+                "created_at": now
+            })
+        
+        # Ein Bulk-INSERT ... RETURNING für alle Empfänger
+        result = await db.scalars(insert(Notification).returning(Notification), rows)
+        notifications = list(result.all())
+        created = [(n.recipient_id, n.id, n.priority) for n in notifications]
+        await db.commit()
         
-        if notifications:
-            await db.commit()
-            print(f"=> {len(notifications)} Benachrichtigungen fuer neue Ausschreibung erstellt")
+        # Bulk-INSERTs laufen nicht durch den ORM-Flush: Push und Zähler explizit,
+        # die Auslieferung an die Streams erfolgt asynchron im Hintergrund
+        NotificationStreamService.publish_created_nowait(
+            [(recipient_id, notification_id) for recipient_id, notification_id, _ in created]
+        )
+        record_created_notifications(
+            [(recipient_id, priority) for recipient_id, _, priority in created]
+        )
         
+        print(f"=> {len(notifications)} Benachrichtigungen fuer neue Ausschreibung erstellt")
         return notifications
     
     @staticmethod
@@ -1440,6 +1404,10 @@ class NotificationService:
         """
         Holt Statistiken über Benachrichtigungen eines Benutzers
         
+        Liest zuerst aus dem Zähler-Cache; bei einem Miss werden alle Zähler
+        mit einer einzigen Abfrage über den Index
+        (recipient_id, is_read, is_acknowledged, priority) ermittelt.
+        
         Args:
             db: Datenbank-Session
             user_id: ID des Benutzers
@@ -1448,51 +1416,46 @@ class NotificationService:
             Dict[str, Any]: Statistiken über Benachrichtigungen
         """
         try:
-            # Gesamtanzahl
-            total_result = await db.execute(
-                select(func.count(Notification.id)).where(Notification.recipient_id == user_id)
-            )
-            total_count = total_result.scalar() or 0
-            
-            # Ungelesene
-            unread_result = await db.execute(
-                select(func.count(Notification.id)).where(
-                    and_(
-                        Notification.recipient_id == user_id,
-                        Notification.is_read == False
-                    )
+            counts = notification_stats_cache.get(user_id)
+            
+            if counts is None:
+                stamp = notification_stats_cache.stamp(user_id)
+                result = await db.execute(
+                    select(
+                        func.count(Notification.id),
+                        func.sum(case((Notification.is_read == False, 1), else_=0)),
+                        func.sum(case((Notification.is_acknowledged == False, 1), else_=0)),
+                        func.sum(case(
+                            (and_(
+                                Notification.priority == NotificationPriority.URGENT,
+                                Notification.is_acknowledged == False
+                            ), 1),
+                            else_=0
+                        ))
+                    ).where(Notification.recipient_id == user_id)
                 )
-            )
-            unread_count = unread_result.scalar() or 0
+                total_count, unread_count, unacknowledged_count, urgent_count = result.one()
+                counts = {
+                    "total_count": total_count or 0,
+                    "unread_count": unread_count or 0,
+                    "unacknowledged_count": unacknowledged_count or 0,
+                    "urgent_count": urgent_count or 0
+                }
+                notification_stats_cache.store(user_id, counts, stamp)
             
-            # Nicht quittierte
-            unacknowledged_result = await db.execute(
-                select(func.count(Notification.id)).where(
-                    and_(
-                        Notification.recipient_id == user_id,
-                        Notification.is_acknowledged == False
-                    )
-                )
-            )
-            unacknowledged_count = unacknowledged_result.scalar() or 0
-            
-            stats = {
-                "total_count": total_count,
-                "unread_count": unread_count,
-                "unacknowledged_count": unacknowledged_count,
-                "read_count": total_count - unread_count,
-                "acknowledged_count": total_count - unacknowledged_count
+            return {
+                **counts,
+                "read_count": counts["total_count"] - counts["unread_count"],
+                "acknowledged_count": counts["total_count"] - counts["unacknowledged_count"]
             }
             
-            print(f"[SUCCESS] Statistiken für Benutzer {user_id}: {stats}")
-            return stats
-            
         except Exception as e:
             print(f"[ERROR] Fehler beim Laden der Benachrichtigungsstatistiken für Benutzer {user_id}: {e}")
             return {
                 "total_count": 0,
                 "unread_count": 0,
                 "unacknowledged_count": 0,
+                "urgent_count": 0,
                 "read_count": 0,
                 "acknowledged_count": 0
             }
@@ -0,0 +1,255 @@
+"""
+Zähler-Cache für Benachrichtigungsstatistiken (Badge)
+
+- Pro Benutzer werden total/unread/unacknowledged/urgent im Speicher gehalten
+- Änderungen an Notification-Objekten (Erstellen, Lesen, Quittieren, Löschen)
+  werden nach dem Commit als Deltas auf den lokalen Eintrag angewendet
+- Andere Worker verwerfen ihren Eintrag über eine Broker-Nachricht
+- Einträge laufen nach einer TTL ab und werden dann per Abfrage abgeglichen
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.pubsub import RESYNC_MESSAGE, broker
+from ..models.notification import Notification, NotificationPriority
+
+logger = logging.getLogger(__name__)
+
+STATS_CHANNEL = "notifications:stats"
+COUNTER_KEYS = ("total_count", "unread_count", "unacknowledged_count", "urgent_count")
+
+# Schlüssel in Session.info für noch nicht committete Zähler-Deltas
+_PENDING_KEY = "notification_stats_pending"
+
+# Eindeutige Kennung dieses Workers (eigene Broker-Nachrichten ignorieren)
+_ORIGIN = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _counts(is_read, is_acknowledged, priority) -> Dict[str, int]:
+    """Beitrag einer einzelnen Benachrichtigung zu den Zählern"""
+    is_read = bool(is_read)
+    is_acknowledged = bool(is_acknowledged)
+    return {
+        "total_count": 1,
+        "unread_count": 0 if is_read else 1,
+        "unacknowledged_count": 0 if is_acknowledged else 1,
+        "urgent_count": 1 if priority == NotificationPriority.URGENT and not is_acknowledged else 0
+    }
+
+
+class NotificationStatsCache:
+    """Größenbegrenzter In-Memory-Cache für Benachrichtigungszähler"""
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Tuple[float, Dict[str, int]]]" = OrderedDict()
+        # Änderungsstempel pro Benutzer; verhindert, dass eine veraltete
+        # Abfrage eine zwischenzeitliche Änderung überschreibt
+        self._stamps: "OrderedDict[int, int]" = OrderedDict()
+        self._stamp_floor = 0
+        self._clock = itertools.count(1)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[Dict[str, int]]:
+        """Gibt die gecachten Zähler zurück (None wenn nicht vorhanden/abgelaufen)"""
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return dict(entry[1])
+
+    def stamp(self, user_id: int) -> int:
+        """Aktueller Änderungsstempel eines Benutzers (vor der Abfrage merken)"""
+        return self._stamps.get(user_id, self._stamp_floor)
+
+    def store(self, user_id: int, counts: Dict[str, int], stamp: int):
+        """Speichert abgefragte Zähler, sofern seit der Abfrage nichts geändert wurde"""
+        if self.stamp(user_id) != stamp:
+            return
+        self._entries[user_id] = (time.monotonic() + self.ttl_seconds, dict(counts))
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def apply_delta(self, user_id: int, delta: Dict[str, int]):
+        """Wendet eine Änderung auf einen vorhandenen Eintrag an"""
+        self._touch(user_id)
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return
+        counts = entry[1]
+        for key in COUNTER_KEYS:
+            counts[key] = max(0, counts[key] + delta.get(key, 0))
+
+    def invalidate(self, user_id: Optional[int] = None):
+        """Verwirft den Eintrag eines Benutzers (None = alle)"""
+        if user_id is None:
+            self._entries.clear()
+            self._stamp_floor = next(self._clock)
+            self._stamps.clear()
+            return
+        self._touch(user_id)
+        self._entries.pop(user_id, None)
+
+    def _touch(self, user_id: int):
+        self._stamps[user_id] = next(self._clock)
+        self._stamps.move_to_end(user_id)
+        while len(self._stamps) > self.max_entries:
+            _, evicted = self._stamps.popitem(last=False)
+            self._stamp_floor = max(self._stamp_floor, evicted)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Cache-Statistiken für Monitoring"""
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+notification_stats_cache = NotificationStatsCache(
+    ttl_seconds=settings.notification_stats_cache_ttl_seconds,
+    max_entries=settings.notification_stats_cache_max_entries
+)
+
+
+def invalidate_notification_stats(user_id: Optional[int] = None):
+    """
+    Verwirft Zähler lokal und auf allen anderen Workern
+    (für Bulk-Statements, die keine ORM-Events auslösen)
+    """
+    notification_stats_cache.invalidate(user_id)
+    _publish_invalidation([user_id] if user_id is not None else None)
+
+
+def record_created_notifications(created: Iterable[Tuple[int, NotificationPriority]]):
+    """
+    Überträgt per Bulk-INSERT erstellte Benachrichtigungen in den Cache
+    (Core-Statements lösen keine Flush-Events aus)
+    """
+    deltas: Dict[int, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTER_KEYS, 0))
+    for recipient_id, priority in created:
+        for key, value in _counts(False, False, priority).items():
+            deltas[recipient_id][key] += value
+    _apply_deltas(deltas)
+
+
+def _apply_deltas(deltas: Dict[int, Dict[str, int]]):
+    if not deltas:
+        return
+    for user_id, delta in deltas.items():
+        notification_stats_cache.apply_delta(user_id, delta)
+    _publish_invalidation(list(deltas.keys()))
+
+
+def _publish_invalidation(user_ids):
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    message = json.dumps({"origin": _ORIGIN, "users": user_ids})
+    loop.create_task(broker.publish(STATS_CHANNEL, message))
+
+
+async def run_stats_invalidation_listener():
+    """Verwirft Einträge, die auf anderen Workern geändert wurden (läuft dauerhaft)"""
+    queue = broker.subscribe(STATS_CHANNEL)
+    try:
+        while True:
+            message = await queue.get()
+            if message == RESYNC_MESSAGE:
+                notification_stats_cache.invalidate()
+                continue
+            try:
+                data = json.loads(message)
+            except ValueError:
+                continue
+            if data.get("origin") == _ORIGIN:
+                continue
+            user_ids = data.get("users")
+            if user_ids is None:
+                notification_stats_cache.invalidate()
+            else:
+                for user_id in user_ids:
+                    notification_stats_cache.invalidate(user_id)
+    finally:
+        broker.unsubscribe(STATS_CHANNEL, queue)
+
+
+def _attribute_before(state, key):
+    """Wert eines Attributs vor dem Flush"""
+    history = state.attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return state.attrs[key].value
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_stats_deltas(session, flush_context):
+    """Berechnet Zähler-Deltas aus neuen, geänderten und gelöschten Benachrichtigungen"""
+    deltas = None
+
+    def add(user_id, counts, sign):
+        nonlocal deltas
+        if deltas is None:
+            deltas = session.info.setdefault(_PENDING_KEY, defaultdict(lambda: dict.fromkeys(COUNTER_KEYS, 0)))
+        for key, value in counts.items():
+            deltas[user_id][key] += sign * value
+
+    for obj in session.new:
+        if isinstance(obj, Notification):
+            add(obj.recipient_id, _counts(obj.is_read, obj.is_acknowledged, obj.priority), 1)
+
+    for obj in session.dirty:
+        if not isinstance(obj, Notification):
+            continue
+        state = inspect(obj)
+        old = _counts(
+            _attribute_before(state, "is_read"),
+            _attribute_before(state, "is_acknowledged"),
+            _attribute_before(state, "priority")
+        )
+        new = _counts(obj.is_read, obj.is_acknowledged, obj.priority)
+        if old != new:
+            add(obj.recipient_id, old, -1)
+            add(obj.recipient_id, new, 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Notification):
+            state = inspect(obj)
+            old = _counts(
+                _attribute_before(state, "is_read"),
+                _attribute_before(state, "is_acknowledged"),
+                _attribute_before(state, "priority")
+            )
+            add(obj.recipient_id, old, -1)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_stats_deltas(session):
+    """Überträgt committete Deltas in den Cache und informiert andere Worker"""
+    deltas = session.info.pop(_PENDING_KEY, None)
+    if deltas:
+        _apply_deltas(deltas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_stats_deltas(session):
+    """Verwirft Deltas bei Rollback"""
+    session.info.pop(_PENDING_KEY, None)
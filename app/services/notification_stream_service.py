@@ -0,0 +1,189 @@
+"""
+Push-Kanal für Benachrichtigungen (Server-Sent Events)
+
+Ersetzt das Polling von /notifications und /notifications/stats:
+- Neue Benachrichtigungen werden nach dem Commit über den Broker
+  (PostgreSQL LISTEN/NOTIFY bzw. In-Process) an den Empfänger gemeldet
+- Jeder offene Stream lädt daraufhin nur die neuen Zeilen (id > last_id)
+- Nach Verbindungsabbrüchen setzt der Client über Last-Event-ID fort
+- Heartbeats halten Proxies und Load-Balancer offen
+"""
+
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, event, func, select
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal
+from ..core.pubsub import RESYNC_MESSAGE, broker
+from ..models.notification import Notification
+from ..schemas.notification import NotificationRead
+
+logger = logging.getLogger(__name__)
+
+# Schlüssel in Session.info für neu geflushte, noch nicht committete Benachrichtigungen
+_PENDING_KEY = "notification_stream_pending"
+
+# Referenzen auf laufende Publish-Tasks (sonst ggf. vorzeitig vom GC entfernt)
+_publish_tasks: Set[asyncio.Task] = set()
+
+
+def user_channel(user_id: int) -> str:
+    """Broker-Kanal eines Benutzers"""
+    return f"notifications:user:{user_id}"
+
+
+class NotificationStreamService:
+    """Service für den Benachrichtigungs-Push-Kanal"""
+
+    @staticmethod
+    async def publish_created(recipient_id: int, notification_id: int):
+        """Meldet eine neu erstellte Benachrichtigung an alle Streams des Empfängers"""
+        await broker.publish(
+            user_channel(recipient_id),
+            json.dumps({"id": notification_id})
+        )
+
+    @staticmethod
+    def publish_created_nowait(created: Iterable[Tuple[int, int]]):
+        """
+        Plant die Veröffentlichung von (recipient_id, notification_id)-Paaren
+        aus synchronem Kontext (z.B. SQLAlchemy-Events) ein
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Kein Event-Loop (z.B. Skripte) - Streams holen beim Reconnect nach
+            return
+
+        for recipient_id, notification_id in created:
+            task = loop.create_task(
+                NotificationStreamService.publish_created(recipient_id, notification_id)
+            )
+            _publish_tasks.add(task)
+            task.add_done_callback(_publish_tasks.discard)
+
+    @staticmethod
+    async def get_latest_id(user_id: int) -> int:
+        """Höchste Benachrichtigungs-ID eines Benutzers (0 wenn keine vorhanden)"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(func.max(Notification.id)).where(Notification.recipient_id == user_id)
+            )
+            return result.scalar() or 0
+
+    @staticmethod
+    async def fetch_since(user_id: int, last_id: int, limit: int) -> List[Notification]:
+        """Lädt Benachrichtigungen eines Benutzers mit ID > last_id (aufsteigend)"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Notification)
+                .where(
+                    and_(
+                        Notification.recipient_id == user_id,
+                        Notification.id > last_id
+                    )
+                )
+                .order_by(Notification.id)
+                .limit(limit)
+            )
+            return list(result.scalars().all())
+
+    @staticmethod
+    def format_event(notification: Notification) -> str:
+        """Formatiert eine Benachrichtigung als SSE-Frame"""
+        payload = NotificationRead.model_validate(notification).model_dump_json()
+        return f"id: {notification.id}\nevent: notification\ndata: {payload}\n\n"
+
+    @staticmethod
+    async def stream(user_id: int, last_event_id: Optional[int] = None) -> AsyncIterator[str]:
+        """
+        Liefert SSE-Frames für einen Benutzer
+
+        Args:
+            user_id: ID des Empfängers
+            last_event_id: Letzte vom Client empfangene ID (None = nur neue Ereignisse)
+        """
+        channel = user_channel(user_id)
+        # Zuerst abonnieren, damit zwischen Resume und Live-Betrieb nichts verloren geht
+        queue = broker.subscribe(channel)
+        replay_limit = settings.notification_stream_replay_limit
+        heartbeat = settings.notification_stream_heartbeat_seconds
+
+        try:
+            if last_event_id is None:
+                last_id = await NotificationStreamService.get_latest_id(user_id)
+            else:
+                last_id = last_event_id
+
+            yield f"retry: {settings.notification_stream_retry_ms}\n\n"
+
+            need_fetch = last_event_id is not None
+            while True:
+                if need_fetch:
+                    # Nachholen bis keine neuen Zeilen mehr vorhanden sind
+                    while True:
+                        notifications = await NotificationStreamService.fetch_since(
+                            user_id, last_id, replay_limit
+                        )
+                        for notification in notifications:
+                            last_id = notification.id
+                            yield NotificationStreamService.format_event(notification)
+                        if len(notifications) < replay_limit:
+                            break
+                    need_fetch = False
+
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+
+                # Alle bereits wartenden Meldungen zu einer Abfrage zusammenfassen
+                messages = [message]
+                while not queue.empty():
+                    messages.append(queue.get_nowait())
+
+                for item in messages:
+                    if item == RESYNC_MESSAGE:
+                        need_fetch = True
+                        break
+                    try:
+                        if json.loads(item)["id"] > last_id:
+                            need_fetch = True
+                            break
+                    except (ValueError, KeyError, TypeError):
+                        need_fetch = True
+                        break
+        finally:
+            broker.unsubscribe(channel, queue)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_new_notifications(session, flush_context):
+    """Merkt sich neu eingefügte Benachrichtigungen bis zum Commit"""
+    created = [
+        (obj.recipient_id, obj.id)
+        for obj in session.new
+        if isinstance(obj, Notification) and obj.id is not None
+    ]
+    if created:
+        session.info.setdefault(_PENDING_KEY, []).extend(created)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_new_notifications(session):
+    """Veröffentlicht Benachrichtigungen erst nach erfolgreichem Commit"""
+    created = session.info.pop(_PENDING_KEY, None)
+    if created:
+        NotificationStreamService.publish_created_nowait(created)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_new_notifications(session):
+    """Verwirft vorgemerkte Benachrichtigungen bei Rollback"""
+    session.info.pop(_PENDING_KEY, None)
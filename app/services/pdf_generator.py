@@ -388,6 +388,124 @@ class BuildWisePDFGenerator:
             print(f"Fehler beim Generieren der Gewerk-PDF: {e}")
             return False
 
+    def generate_monthly_invoice_pdf(
+        self,
+        invoice_data: dict,
+        recipient_data: dict,
+        fees: list,
+        output_path: str
+    ) -> bool:
+        """
+        Generiert die monatliche Sammelrechnung eines Dienstleisters
+        
+        Args:
+            invoice_data: Rechnungsnummer, Datum, Fälligkeit, Zeitraum, Summen
+            recipient_data: Name, Firma, E-Mail und Adresse des Dienstleisters
+            fees: Abgerechnete Gebühren (Rechnungsnummer, Datum, Angebotsbetrag, Satz, Gebühr)
+            output_path: Ausgabepfad für die PDF
+            
+        Returns:
+            bool: True wenn erfolgreich, False sonst
+        """
+        
+        try:
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            
+            doc = SimpleDocTemplate(
+                output_path,
+                pagesize=A4,
+                rightMargin=2*cm,
+                leftMargin=2*cm,
+                topMargin=2*cm,
+                bottomMargin=2*cm
+            )
+            story = []
+            
+            # Header
+            story.append(Paragraph("BUILDWISE GMBH", self.styles['Header']))
+            story.append(Paragraph(f"Gebührenrechnung {invoice_data['period']}", self.styles['SubHeader']))
+            
+            invoice_info = [
+                ["Rechnungsnummer:", invoice_data['invoice_number']],
+                ["Rechnungsdatum:", self._format_date(invoice_data.get('invoice_date'))],
+                ["Fälligkeitsdatum:", self._format_date(invoice_data.get('due_date'))],
+                ["Anzahl Gebühren:", str(len(fees))]
+            ]
+            invoice_table = Table(invoice_info, colWidths=[4*cm, 8*cm])
+            invoice_table.setStyle(TableStyle([
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, -1), 10),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ]))
+            story.append(invoice_table)
+            story.append(Spacer(1, 20))
+            
+            # Rechnungsempfänger
+            story.append(Paragraph("Rechnung an", self.styles['SubHeader']))
+            recipient_lines = [
+                recipient_data.get('company_name'),
+                recipient_data.get('name'),
+                recipient_data.get('address'),
+                recipient_data.get('email')
+            ]
+            story.append(Paragraph("<br/>".join(line for line in recipient_lines if line), self.styles['CustomNormal']))
+            story.append(Spacer(1, 20))
+            
+            # Gebühren
+            story.append(Paragraph("Abgerechnete Gebühren", self.styles['SubHeader']))
+            fee_rows = [["Nr.", "Datum", "Angebotsbetrag", "Satz", "Gebühr"]]
+            for fee in fees:
+                fee_rows.append([
+                    fee.get('invoice_number') or f"BW-{fee['id']:06d}",
+                    self._format_date(fee.get('date')),
+                    self._format_currency(fee.get('quote_amount', 0)),
+                    f"{fee.get('fee_percentage', 0)}%",
+                    self._format_currency(fee.get('fee_amount', 0))
+                ])
+            fee_table = Table(fee_rows, colWidths=[3.5*cm, 2.5*cm, 4*cm, 2*cm, 3.5*cm])
+            fee_table.setStyle(TableStyle([
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, -1), 9),
+                ('ALIGN', (2, 0), (-1, -1), 'RIGHT'),
+                ('BACKGROUND', (0, 0), (-1, 0), HexColor('#f0f0f0')),
+                ('LINEBELOW', (0, 0), (-1, 0), 1, colors.black),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+            ]))
+            story.append(fee_table)
+            story.append(Spacer(1, 20))
+            
+            # Summen
+            totals = [
+                ["Nettobetrag:", self._format_currency(invoice_data['net_amount'])],
+                ["Steuerbetrag:", self._format_currency(invoice_data['tax_amount'])],
+                ["Gesamtbetrag:", self._format_currency(invoice_data['total_amount'])]
+            ]
+            totals_table = Table(totals, colWidths=[4*cm, 8*cm])
+            totals_table.setStyle(TableStyle([
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+                ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, -1), 10),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+                ('BACKGROUND', (0, 0), (0, -1), HexColor('#f0f0f0')),
+            ]))
+            story.append(totals_table)
+            story.append(Spacer(1, 20))
+            
+            # Footer
+            story.append(Paragraph("Bitte überweisen Sie den Betrag innerhalb von 14 Tagen auf unser Konto.", self.styles['CustomNormal']))
+            story.append(Spacer(1, 30))
+            story.append(Paragraph("Vielen Dank für Ihr Vertrauen!", self.styles['CustomNormal']))
+            story.append(Paragraph("BuildWise GmbH", self.styles['Small']))
+            
+            doc.build(story)
+            return True
+            
+        except Exception as e:
+            print(f"Fehler beim Generieren der Monatsrechnung: {e}")
+            return False
+
     def _format_date(self, date_string: Optional[str]) -> str:
         """Formatiert ein Datum für die Anzeige"""
         if not date_string:
@@ -415,4 +533,106 @@ class BuildWisePDFGenerator:
             'overdue': 'Überfällig',
             'cancelled': 'Storniert'
         }
-        return status_labels.get(status, status.capitalize()) 
\ No newline at end of file
+        return status_labels.get(status, status.capitalize()) 
+
+# ---------------------------------------------------------------------------
+# Renderer für den PDF-Prozess-Pool (siehe pdf_render_service.TEMPLATES)
+# ---------------------------------------------------------------------------
+
+def render_buildwise_fee_invoice(data: dict, output_path: str):
+    """Rechnung für eine BuildWise-Gebühr (fee_data, project_data, quote_data, cost_position_data)"""
+    if not BuildWisePDFGenerator().generate_invoice_pdf(output_path=output_path, **data):
+        raise RuntimeError("PDF-Generierung der BuildWise-Rechnung fehlgeschlagen")
+
+
+def render_buildwise_gewerk_invoice(data: dict, output_path: str):
+    """Rechnung für eine BuildWise-Gebühr, nur Gewerk-Daten (fee_data, quote_data, cost_position_data)"""
+    if not BuildWisePDFGenerator().generate_gewerk_invoice_pdf(output_path=output_path, **data):
+        raise RuntimeError("PDF-Generierung der Gewerk-Rechnung fehlgeschlagen")
+
+
+def render_buildwise_monthly_invoice(data: dict, output_path: str):
+    """Monatliche Sammelrechnung (invoice_data, recipient_data, fees)"""
+    if not BuildWisePDFGenerator().generate_monthly_invoice_pdf(output_path=output_path, **data):
+        raise RuntimeError("PDF-Generierung der Monatsrechnung fehlgeschlagen")
+
+
+def render_invoice(data: dict, output_path: str):
+    """
+    Rechnung eines Dienstleisters an den Bauträger
+
+    `data` wird von InvoiceService.invoice_pdf_data vorbereitet (Kontaktblöcke
+    als Absätze, Positionen als [Beschreibung, Betrag]).
+    """
+    doc = SimpleDocTemplate(output_path, pagesize=A4)
+    story = []
+    styles = getSampleStyleSheet()
+    
+    # Titel
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=20,
+        alignment=1  # Zentriert
+    )
+    story.append(Paragraph(f"RECHNUNG {data['invoice_number']}", title_style))
+    story.append(Spacer(1, 20))
+    
+    # Bauträger-Kontaktdaten (Rechnungsempfänger)
+    story.append(Paragraph("Rechnungsempfänger:", styles['Heading3']))
+    story.append(Paragraph(data.get('recipient') or "Bauträger-Daten nicht verfügbar", styles['Normal']))
+    story.append(Spacer(1, 20))
+    
+    # Dienstleister-Kontaktdaten (Rechnungssteller)
+    story.append(Paragraph("Rechnungssteller:", styles['Heading3']))
+    story.append(Paragraph(data['issuer'], styles['Normal']))
+    story.append(Spacer(1, 20))
+    
+    # Leistungsverzeichnis
+    story.append(Paragraph("Leistungsverzeichnis", styles['Heading2']))
+    story.append(Spacer(1, 10))
+    
+    cost_positions_data = [['Position', 'Betrag (EUR)']]
+    for description, amount in data['positions']:
+        cost_positions_data.append([description, f"{amount:.2f}"])
+    
+    # Zwischensumme und Gesamtbetrag
+    cost_positions_data.extend([
+        ['', ''],  # Leerzeile
+        ['Nettobetrag', f"{data['net_amount']:.2f}"],
+        [f"MwSt. ({data['vat_rate']:.0f}%)", f"{data['vat_amount']:.2f}"],
+        ['', ''],  # Leerzeile
+        ['Gesamtbetrag', f"{data['total_amount']:.2f}"]
+    ])
+    
+    cost_table = Table(cost_positions_data, colWidths=[12*cm, 4*cm])
+    cost_table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),  # Header fett
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),  # Header-Hintergrund
+        ('GRID', (0, 0), (-1, -2), 1, colors.black),  # Gitter bis vor Gesamtbetrag
+        ('LINEBELOW', (0, -3), (-1, -3), 2, colors.black),  # Linie vor Gesamtbetrag
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),  # Gesamtbetrag fett
+        ('FONTSIZE', (0, -1), (-1, -1), 12),  # Gesamtbetrag größer
+        ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),  # Gesamtbetrag-Hintergrund
+    ]))
+    
+    story.append(cost_table)
+    story.append(Spacer(1, 20))
+    
+    # Beschreibung
+    if data.get('description'):
+        story.append(Paragraph("Leistungsbeschreibung", styles['Heading3']))
+        story.append(Paragraph(data['description'], styles['Normal']))
+        story.append(Spacer(1, 20))
+    
+    # Notizen
+    if data.get('notes'):
+        story.append(Paragraph("Anmerkungen", styles['Heading3']))
+        story.append(Paragraph(data['notes'], styles['Normal']))
+    
+    doc.build(story)
@@ -0,0 +1,205 @@
+"""
+PDF-Rendering im Prozess-Pool mit Inhalts-Cache
+
+- Eine Render-Spec ist {"template": <Name>, "data": {...}}: nur JSON-Werte und
+  vollständig - alles, was im Dokument erscheint, steckt in `data`, Renderer
+  greifen nicht auf die Datenbank zu
+- Renderer sind Modul-Funktionen `renderer(data, output_path)`, in TEMPLATES
+  über ihren Importpfad registriert; sie laufen in einem ProcessPoolExecutor
+  (blockieren den Event-Loop nicht, skalieren mit der Anzahl Kerne)
+- Das Ergebnis liegt unter dem SHA-256 der Spec im Cache-Verzeichnis. Ändert
+  sich die Rechnung oder Abnahme, ändert sich die Spec und damit der Schlüssel;
+  gleichzeitige Anfragen für dieselbe Spec teilen sich einen Render-Vorgang
+- Synchron warten: `await pdf_renderer.render_to(spec, pfad)`;
+  als Auftrag: `await submit_render(spec, pfad)` (BackgroundTaskManager)
+"""
+
+import asyncio
+import hashlib
+import importlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bei Layout-Änderungen erhöhen (verwirft alle gecachten Dokumente)
+RENDER_VERSION = 1
+
+TEMPLATES = {
+    "invoice": "app.services.pdf_generator:render_invoice",
+    "buildwise_fee_invoice": "app.services.pdf_generator:render_buildwise_fee_invoice",
+    "buildwise_gewerk_invoice": "app.services.pdf_generator:render_buildwise_gewerk_invoice",
+    "buildwise_monthly_invoice": "app.services.pdf_generator:render_buildwise_monthly_invoice",
+    "acceptance_protocol": "app.services.pdf_service:render_acceptance_protocol",
+    "defect_report": "app.services.pdf_service:render_defect_report",
+}
+
+
+def normalize_spec(template: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Spec in JSON-Form (Datumswerte, Decimal und Enums als Text)"""
+    if template not in TEMPLATES:
+        raise ValueError(f"Unbekannte PDF-Vorlage: {template}")
+    return json.loads(json.dumps({"template": template, "data": data}, default=_json_value))
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+def spec_hash(spec: Dict[str, Any]) -> str:
+    canonical = json.dumps([RENDER_VERSION, spec], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _render_in_worker(template: str, data: Dict[str, Any], output_path: str):
+    """Einstiegspunkt im Prozess-Pool (lädt den Renderer im Kindprozess)"""
+    module_name, _, name = TEMPLATES[template].partition(":")
+    renderer = getattr(importlib.import_module(module_name), name)
+    renderer(data, output_path)
+
+
+class PDFRenderer:
+    """Rendert Specs im Prozess-Pool und cacht die Ergebnisse nach Inhalts-Hash"""
+
+    def __init__(self, workers: int = 0, cache_dir: Optional[str] = None):
+        self.workers = workers or os.cpu_count() or 2
+        self._cache_dir = Path(cache_dir) if cache_dir else None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.stats = {"rendered": 0, "cache_hits": 0, "joined": 0, "failed": 0}
+
+    @property
+    def cache_dir(self) -> Path:
+        if self._cache_dir is None:
+            from ..core.storage import get_cache_path
+            self._cache_dir = get_cache_path() / "pdf"
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+        return self._cache_dir
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers)
+        return self._pool
+
+    def cached_path(self, spec: Dict[str, Any]) -> Path:
+        return self.cache_dir / f"{spec_hash(spec)}.pdf"
+
+    async def render(self, spec: Dict[str, Any]) -> str:
+        """Rendert die Spec (oder nimmt sie aus dem Cache) und gibt den Cache-Pfad zurück"""
+        digest = spec_hash(spec)
+        path = self.cache_dir / f"{digest}.pdf"
+        if path.exists():
+            self.stats["cache_hits"] += 1
+            os.utime(path)  # für die Aufräumfrist als "zuletzt benutzt" markieren
+            return str(path)
+
+        pending = self._in_flight.get(digest)
+        if pending is not None:
+            self.stats["joined"] += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[digest] = future
+        try:
+            await self._render_file(spec, path)
+            future.set_result(str(path))
+        except BaseException as e:
+            future.set_exception(e)
+            # Fehler nicht als "nie abgerufen" loggen, wenn niemand gewartet hat
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[digest]
+        return str(path)
+
+    async def render_to(self, spec: Dict[str, Any], output_path: str) -> str:
+        """Rendert die Spec und legt das PDF unter `output_path` ab"""
+        cached = await self.render(spec)
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        await asyncio.to_thread(shutil.copyfile, cached, output_path)
+        return output_path
+
+    async def _render_file(self, spec: Dict[str, Any], path: Path):
+        # In eine temporäre Datei rendern und atomar umbenennen (kein halbes PDF im Cache)
+        tmp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        try:
+            try:
+                await loop.run_in_executor(
+                    self._executor(), _render_in_worker, spec["template"], spec["data"], str(tmp_path)
+                )
+            except BrokenProcessPool:
+                # Abgestürzter Kindprozess: Pool neu aufbauen und einmal wiederholen
+                logger.warning("PDF-Prozess-Pool defekt, starte neu")
+                self._pool = None
+                await loop.run_in_executor(
+                    self._executor(), _render_in_worker, spec["template"], spec["data"], str(tmp_path)
+                )
+            os.replace(tmp_path, path)
+            self.stats["rendered"] += 1
+            logger.info(f"PDF {spec['template']} gerendert in {time.monotonic() - started:.2f}s")
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def cleanup_cache(self, max_age_days: Optional[int] = None) -> int:
+        """Löscht Cache-Einträge, die länger als `max_age_days` nicht benutzt wurden"""
+        max_age_days = settings.pdf_cache_ttl_days if max_age_days is None else max_age_days
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        for entry in self.cache_dir.iterdir():
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    entry.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "in_flight": len(self._in_flight), **self.stats}
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+pdf_renderer = PDFRenderer(workers=settings.pdf_render_workers)
+
+
+async def render_pdf_job(spec: Dict[str, Any], output_path: Optional[str] = None) -> Dict[str, Any]:
+    """Hintergrund-Auftrag: rendert eine Spec (Ergebnis im Auftragsstatus)"""
+    if output_path:
+        path = await pdf_renderer.render_to(spec, output_path)
+    else:
+        path = await pdf_renderer.render(spec)
+    return {"path": path, "hash": spec_hash(spec)}
+
+
+async def submit_render(spec: Dict[str, Any], output_path: Optional[str] = None) -> str:
+    """Plant das Rendern als Hintergrund-Auftrag ein und gibt die Task-ID zurück"""
+    from ..core.background_tasks import background_task_manager
+
+    return await background_task_manager.enqueue(
+        render_pdf_job, (spec, output_path),
+        task_id=f"pdf:{spec['template']}:{uuid.uuid4().hex}",
+        timeout_seconds=settings.pdf_render_timeout_seconds
+    )
@@ -6,20 +6,123 @@ from reportlab.lib.units import cm
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
 from datetime import datetime
 import os
-from typing import Optional
+from typing import Any, Dict, Optional
 
 from ..models import Acceptance, AcceptanceDefect
+from .pdf_render_service import normalize_spec, pdf_renderer
 
 
 class PDFService:
-    """Service für PDF-Generierung"""
+    """Service für PDF-Generierung (Rendern im Prozess-Pool, siehe pdf_render_service)"""
     
     @staticmethod
-    def generate_acceptance_protocol(acceptance: Acceptance) -> str:
+    def acceptance_protocol_data(acceptance: Acceptance) -> Dict[str, Any]:
+        """Inhalt des Abnahmeprotokolls als Render-Spec-Daten (render_acceptance_protocol)"""
+        project_rows = [
+            ['Projekt:', acceptance.project.title if acceptance.project else 'N/A'],
+            ['Gewerk:', acceptance.milestone.title if acceptance.milestone else 'N/A'],
+            ['Projekt-Nr.:', f"P-{acceptance.project_id}" if acceptance.project_id else 'N/A'],
+            ['Gewerk-Nr.:', f"M-{acceptance.milestone_id}" if acceptance.milestone_id else 'N/A'],
+            ['Abnahme-Nr.:', f"A-{acceptance.id}"],
+        ]
+        
+        if acceptance.project and hasattr(acceptance.project, 'address'):
+            project_rows.append(['Adresse:', acceptance.project.address or 'N/A'])
+        
+        participant_rows = [
+            ['Bauträger/Auftraggeber:', f"{acceptance.contractor.first_name} {acceptance.contractor.last_name}" if acceptance.contractor else 'N/A'],
+            ['E-Mail:', acceptance.contractor.email if acceptance.contractor else 'N/A'],
+            ['Dienstleister/Auftragnehmer:', f"{acceptance.service_provider.first_name} {acceptance.service_provider.last_name}" if acceptance.service_provider else 'N/A'],
+            ['E-Mail:', acceptance.service_provider.email if acceptance.service_provider else 'N/A'],
+        ]
+        
+        # Status formatieren
+        status_text = "Abgenommen" if acceptance.accepted else "Unter Vorbehalt" if acceptance.accepted is False else "Offen"
+        acceptance_type_text = {
+            'FINAL': 'Endabnahme',
+            'PARTIAL': 'Teilabnahme', 
+            'TECHNICAL': 'Technische Abnahme',
+            'VISUAL': 'Sichtabnahme'
+        }.get(acceptance.acceptance_type.value if acceptance.acceptance_type else 'FINAL', 'Endabnahme')
+        
+        detail_rows = [
+            ['Art der Abnahme:', acceptance_type_text],
+            ['Status:', status_text],
+            ['Abnahme-Datum:', acceptance.completed_at.strftime("%d.%m.%Y %H:%M") if acceptance.completed_at else 'N/A'],
+            ['Beginn der Abnahme:', acceptance.started_at.strftime("%d.%m.%Y %H:%M") if acceptance.started_at else 'N/A'],
+        ]
+        
+        if acceptance.warranty_start_date:
+            detail_rows.append(['Gewährleistungsbeginn:', acceptance.warranty_start_date.strftime("%d.%m.%Y")])
+            detail_rows.append(['Gewährleistungszeit:', f"{acceptance.warranty_period_months} Monate"])
+        
+        # Bewertung
+        rating_rows = []
+        if acceptance.overall_rating:
+            if acceptance.quality_rating:
+                rating_rows.append(['Qualität der Arbeiten:', f"{acceptance.quality_rating}/5 Sterne"])
+            if acceptance.timeliness_rating:
+                rating_rows.append(['Termintreue:', f"{acceptance.timeliness_rating}/5 Sterne"])
+            rating_rows.append(['Gesamtbewertung:', f"{acceptance.overall_rating}/5 Sterne"])
+        
+        defect_rows = []
+        for i, defect in enumerate(acceptance.defects or [], 1):
+            defect_rows.append([
+                str(i),
+                defect.title or 'N/A',
+                _severity_text(defect),
+                f"{defect.location or ''} {defect.room or ''}".strip() or 'N/A',
+                defect.description or 'N/A'
+            ])
+        
+        # Stand der Abnahme statt Renderzeit: gleiche Abnahme ergibt dasselbe Dokument (Cache)
+        document_time = _document_time(acceptance)
+        
+        return {
+            'project_rows': project_rows,
+            'participant_rows': participant_rows,
+            'detail_rows': detail_rows,
+            'rating_rows': rating_rows,
+            'acceptance_notes': acceptance.acceptance_notes,
+            'contractor_notes': acceptance.contractor_notes,
+            'defect_rows': defect_rows,
+            'document_date': document_time.strftime('%d.%m.%Y'),
+            'document_timestamp': document_time.strftime('%d.%m.%Y %H:%M'),
+            'place': acceptance.project.address if acceptance.project and hasattr(acceptance.project, 'address') else 'BuildWise',
+            'contractor_name': f"{acceptance.contractor.first_name} {acceptance.contractor.last_name}" if acceptance.contractor else '',
+            'service_provider_name': f"{acceptance.service_provider.first_name} {acceptance.service_provider.last_name}" if acceptance.service_provider else ''
+        }
+    
+    @staticmethod
+    def defect_report_data(acceptance: Acceptance) -> Dict[str, Any]:
+        """Inhalt des Mängelberichts als Render-Spec-Daten (render_defect_report)"""
+        defect_rows = []
+        for i, defect in enumerate(acceptance.defects, 1):
+            status_text = 'Behoben' if defect.resolved else 'Offen'
+            location = f"{defect.location or ''} {defect.room or ''}".strip() or 'N/A'
+            
+            defect_rows.append([
+                str(i),
+                defect.title or 'N/A',
+                _severity_text(defect),
+                location,
+                defect.description or 'N/A',
+                status_text
+            ])
+        
+        return {
+            'project_title': acceptance.project.title if acceptance.project else 'N/A',
+            'milestone_title': acceptance.milestone.title if acceptance.milestone else 'N/A',
+            'acceptance_id': acceptance.id,
+            'document_date': _document_time(acceptance).strftime('%d.%m.%Y'),
+            'defect_rows': defect_rows
+        }
+    
+    @staticmethod
+    async def generate_acceptance_protocol(acceptance: Acceptance) -> str:
         """Generiere Abnahmeprotokoll als PDF"""
         try:
-            from ..core.storage import get_pdf_path, get_relative_path
-            from pathlib import Path
+            from ..core.storage import get_pdf_path
             
             # Get PDF directory (works in dev and production)
             pdf_base = get_pdf_path()
@@ -31,272 +134,8 @@ class PDFService:
             filename = f"abnahmeprotokoll_{acceptance.id}_{timestamp}.pdf"
             filepath = str(pdf_dir / filename)
             
-            # PDF-Dokument erstellen
-            doc = SimpleDocTemplate(
-                filepath,
-                pagesize=A4,
-                rightMargin=2*cm,
-                leftMargin=2*cm,
-                topMargin=2*cm,
-                bottomMargin=2*cm
-            )
-            
-            # Styles
-            styles = getSampleStyleSheet()
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=18,
-                spaceAfter=30,
-                alignment=TA_CENTER
-            )
-            
-            heading_style = ParagraphStyle(
-                'CustomHeading',
-                parent=styles['Heading2'],
-                fontSize=14,
-                spaceAfter=12,
-                spaceBefore=20
-            )
-            
-            normal_style = styles['Normal']
-            normal_style.fontSize = 10
-            normal_style.spaceAfter = 6
-            
-            # Story (Inhalt) sammeln
-            story = []
-            
-            # Titel
-            story.append(Paragraph("ABNAHMEPROTOKOLL", title_style))
-            story.append(Spacer(1, 12))
-            
-            # Projekt-Informationen
-            story.append(Paragraph("1. PROJEKT-INFORMATIONEN", heading_style))
-            
-            project_data = [
-                ['Projekt:', acceptance.project.title if acceptance.project else 'N/A'],
-                ['Gewerk:', acceptance.milestone.title if acceptance.milestone else 'N/A'],
-                ['Projekt-Nr.:', f"P-{acceptance.project_id}" if acceptance.project_id else 'N/A'],
-                ['Gewerk-Nr.:', f"M-{acceptance.milestone_id}" if acceptance.milestone_id else 'N/A'],
-                ['Abnahme-Nr.:', f"A-{acceptance.id}"],
-            ]
-            
-            if acceptance.project and hasattr(acceptance.project, 'address'):
-                project_data.append(['Adresse:', acceptance.project.address or 'N/A'])
-            
-            project_table = Table(project_data, colWidths=[4*cm, 12*cm])
-            project_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 0),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-                ('TOPPADDING', (0, 0), (-1, -1), 3),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-            ]))
-            story.append(project_table)
-            story.append(Spacer(1, 20))
-            
-            # Teilnehmer
-            story.append(Paragraph("2. TEILNEHMER", heading_style))
-            
-            participants_data = [
-                ['Bauträger/Auftraggeber:', f"{acceptance.contractor.first_name} {acceptance.contractor.last_name}" if acceptance.contractor else 'N/A'],
-                ['E-Mail:', acceptance.contractor.email if acceptance.contractor else 'N/A'],
-                ['Dienstleister/Auftragnehmer:', f"{acceptance.service_provider.first_name} {acceptance.service_provider.last_name}" if acceptance.service_provider else 'N/A'],
-                ['E-Mail:', acceptance.service_provider.email if acceptance.service_provider else 'N/A'],
-            ]
-            
-            participants_table = Table(participants_data, colWidths=[4*cm, 12*cm])
-            participants_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 0),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-                ('TOPPADDING', (0, 0), (-1, -1), 3),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-            ]))
-            story.append(participants_table)
-            story.append(Spacer(1, 20))
-            
-            # Abnahme-Details
-            story.append(Paragraph("3. ABNAHME-DETAILS", heading_style))
-            
-            # Status formatieren
-            status_text = "Abgenommen" if acceptance.accepted else "Unter Vorbehalt" if acceptance.accepted is False else "Offen"
-            acceptance_type_text = {
-                'FINAL': 'Endabnahme',
-                'PARTIAL': 'Teilabnahme', 
-                'TECHNICAL': 'Technische Abnahme',
-                'VISUAL': 'Sichtabnahme'
-            }.get(acceptance.acceptance_type.value if acceptance.acceptance_type else 'FINAL', 'Endabnahme')
-            
-            details_data = [
-                ['Art der Abnahme:', acceptance_type_text],
-                ['Status:', status_text],
-                ['Abnahme-Datum:', acceptance.completed_at.strftime("%d.%m.%Y %H:%M") if acceptance.completed_at else 'N/A'],
-                ['Beginn der Abnahme:', acceptance.started_at.strftime("%d.%m.%Y %H:%M") if acceptance.started_at else 'N/A'],
-            ]
-            
-            if acceptance.warranty_start_date:
-                details_data.append(['Gewährleistungsbeginn:', acceptance.warranty_start_date.strftime("%d.%m.%Y")])
-                details_data.append(['Gewährleistungszeit:', f"{acceptance.warranty_period_months} Monate"])
-            
-            details_table = Table(details_data, colWidths=[4*cm, 12*cm])
-            details_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 0),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-                ('TOPPADDING', (0, 0), (-1, -1), 3),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-            ]))
-            story.append(details_table)
-            story.append(Spacer(1, 20))
-            
-            # Bewertung
-            if acceptance.overall_rating:
-                story.append(Paragraph("4. BEWERTUNG", heading_style))
-                
-                rating_data = []
-                if acceptance.quality_rating:
-                    rating_data.append(['Qualität der Arbeiten:', f"{acceptance.quality_rating}/5 Sterne"])
-                if acceptance.timeliness_rating:
-                    rating_data.append(['Termintreue:', f"{acceptance.timeliness_rating}/5 Sterne"])
-                if acceptance.overall_rating:
-                    rating_data.append(['Gesamtbewertung:', f"{acceptance.overall_rating}/5 Sterne"])
-                
-                if rating_data:
-                    rating_table = Table(rating_data, colWidths=[4*cm, 12*cm])
-                    rating_table.setStyle(TableStyle([
-                        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                        ('FONTSIZE', (0, 0), (-1, -1), 10),
-                        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                        ('LEFTPADDING', (0, 0), (-1, -1), 0),
-                        ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-                        ('TOPPADDING', (0, 0), (-1, -1), 3),
-                        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-                    ]))
-                    story.append(rating_table)
-                    story.append(Spacer(1, 20))
-            
-            # Notizen
-            if acceptance.acceptance_notes or acceptance.contractor_notes:
-                story.append(Paragraph("5. NOTIZEN UND BEMERKUNGEN", heading_style))
-                
-                if acceptance.acceptance_notes:
-                    story.append(Paragraph("<b>Allgemeine Notizen:</b>", normal_style))
-                    story.append(Paragraph(acceptance.acceptance_notes, normal_style))
-                    story.append(Spacer(1, 10))
-                
-                if acceptance.contractor_notes:
-                    story.append(Paragraph("<b>Notizen des Bauträgers:</b>", normal_style))
-                    story.append(Paragraph(acceptance.contractor_notes, normal_style))
-                    story.append(Spacer(1, 20))
-            
-            # Mängel
-            if acceptance.defects and len(acceptance.defects) > 0:
-                story.append(Paragraph("6. MÄNGELLISTE", heading_style))
-                
-                defect_data = [['Nr.', 'Titel', 'Schweregrad', 'Ort', 'Beschreibung']]
-                
-                for i, defect in enumerate(acceptance.defects, 1):
-                    severity_text = {
-                        'MINOR': 'Geringfügig',
-                        'MAJOR': 'Erheblich', 
-                        'CRITICAL': 'Kritisch'
-                    }.get(defect.severity.value if defect.severity else 'MINOR', 'Geringfügig')
-                    
-                    defect_data.append([
-                        str(i),
-                        defect.title or 'N/A',
-                        severity_text,
-                        f"{defect.location or ''} {defect.room or ''}".strip() or 'N/A',
-                        defect.description or 'N/A'
-                    ])
-                
-                defect_table = Table(defect_data, colWidths=[1*cm, 4*cm, 2.5*cm, 3*cm, 5.5*cm])
-                defect_table.setStyle(TableStyle([
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 9),
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-                    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('LEFTPADDING', (0, 0), (-1, -1), 6),
-                    ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-                    ('TOPPADDING', (0, 0), (-1, -1), 6),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                ]))
-                story.append(defect_table)
-                story.append(Spacer(1, 20))
-            
-            # Rechtliche Hinweise
-            story.append(Paragraph("7. RECHTLICHE HINWEISE", heading_style))
-            
-            legal_text = """
-            <b>Gewährleistung:</b><br/>
-            Mit der Abnahme beginnt die Gewährleistungszeit gemäß BGB. Die Gewährleistungszeit beträgt bei Bauwerken 5 Jahre, 
-            bei beweglichen Sachen 2 Jahre ab Abnahme.<br/><br/>
-            
-            <b>Mängel:</b><br/>
-            Offensichtliche Mängel, die bei der Abnahme nicht gerügt wurden, können später nicht mehr geltend gemacht werden. 
-            Versteckte Mängel können innerhalb der Gewährleistungszeit gerügt werden.<br/><br/>
-            
-            <b>Beweislast:</b><br/>
-            Nach der Abnahme liegt die Beweislast für Mängel beim Auftraggeber.
-            """
-            
-            story.append(Paragraph(legal_text, normal_style))
-            story.append(Spacer(1, 30))
-            
-            # Unterschriften
-            story.append(Paragraph("8. UNTERSCHRIFTEN", heading_style))
-            
-            signature_data = [
-                ['', '', ''],
-                ['Datum, Ort', 'Bauträger/Auftraggeber', 'Dienstleister/Auftragnehmer'],
-                ['', '', ''],
-                ['', '', ''],
-                [f"{datetime.now().strftime('%d.%m.%Y')}, {acceptance.project.address if acceptance.project and hasattr(acceptance.project, 'address') else 'BuildWise'}", 
-                 f"{acceptance.contractor.first_name} {acceptance.contractor.last_name}" if acceptance.contractor else '',
-                 f"{acceptance.service_provider.first_name} {acceptance.service_provider.last_name}" if acceptance.service_provider else '']
-            ]
-            
-            signature_table = Table(signature_data, colWidths=[5*cm, 5.5*cm, 5.5*cm])
-            signature_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Bold'),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('LINEABOVE', (1, 3), (1, 3), 1, colors.black),
-                ('LINEABOVE', (2, 3), (2, 3), 1, colors.black),
-                ('TOPPADDING', (0, 0), (-1, -1), 6),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ]))
-            story.append(signature_table)
-            
-            # Footer
-            story.append(Spacer(1, 30))
-            footer_style = ParagraphStyle(
-                'Footer',
-                parent=styles['Normal'],
-                fontSize=8,
-                alignment=TA_CENTER,
-                textColor=colors.grey
-            )
-            story.append(Paragraph(f"Erstellt am {datetime.now().strftime('%d.%m.%Y %H:%M')} mit BuildWise", footer_style))
-            
-            # PDF generieren
-            doc.build(story)
+            spec = normalize_spec("acceptance_protocol", PDFService.acceptance_protocol_data(acceptance))
+            await pdf_renderer.render_to(spec, filepath)
             
             print(f"[SUCCESS] PDF-Abnahmeprotokoll erstellt: {filepath}")
             return filepath
@@ -307,14 +146,14 @@ class PDFService:
 
 
     @staticmethod
-    def generate_defect_report(acceptance: Acceptance) -> Optional[str]:
+    async def generate_defect_report(acceptance: Acceptance) -> Optional[str]:
         """Generiere separaten Mängelbericht als PDF"""
         if not acceptance.defects or len(acceptance.defects) == 0:
             return None
             
         try:
             # Erstelle Verzeichnis falls nicht vorhanden (projektbasiert, wenn bekannt)
-            project_id = data.get('project_id') if isinstance(data, dict) else None
+            project_id = acceptance.project_id
             pdf_dir = f"storage/acceptances/project_{project_id}" if project_id else "storage/acceptances"
             os.makedirs(pdf_dir, exist_ok=True)
             
@@ -323,84 +162,294 @@ class PDFService:
             filename = f"maengelbericht_{acceptance.id}_{timestamp}.pdf"
             filepath = os.path.join(pdf_dir, filename)
             
-            # PDF-Dokument erstellen
-            doc = SimpleDocTemplate(
-                filepath,
-                pagesize=A4,
-                rightMargin=2*cm,
-                leftMargin=2*cm,
-                topMargin=2*cm,
-                bottomMargin=2*cm
-            )
-            
-            # Styles
-            styles = getSampleStyleSheet()
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=18,
-                spaceAfter=30,
-                alignment=TA_CENTER
-            )
-            
-            # Story sammeln
-            story = []
-            
-            # Titel
-            story.append(Paragraph("MÄNGELBERICHT", title_style))
-            story.append(Spacer(1, 12))
-            
-            # Projekt-Info
-            story.append(Paragraph(f"<b>Projekt:</b> {acceptance.project.title if acceptance.project else 'N/A'}", styles['Normal']))
-            story.append(Paragraph(f"<b>Gewerk:</b> {acceptance.milestone.title if acceptance.milestone else 'N/A'}", styles['Normal']))
-            story.append(Paragraph(f"<b>Abnahme-Nr.:</b> A-{acceptance.id}", styles['Normal']))
-            story.append(Paragraph(f"<b>Datum:</b> {datetime.now().strftime('%d.%m.%Y')}", styles['Normal']))
-            story.append(Spacer(1, 20))
-            
-            # Mängel-Tabelle
-            defect_data = [['Nr.', 'Titel', 'Schweregrad', 'Ort/Raum', 'Beschreibung', 'Status']]
-            
-            for i, defect in enumerate(acceptance.defects, 1):
-                severity_text = {
-                    'MINOR': 'Geringfügig',
-                    'MAJOR': 'Erheblich',
-                    'CRITICAL': 'Kritisch'
-                }.get(defect.severity.value if defect.severity else 'MINOR', 'Geringfügig')
-                
-                status_text = 'Behoben' if defect.resolved else 'Offen'
-                location = f"{defect.location or ''} {defect.room or ''}".strip() or 'N/A'
-                
-                defect_data.append([
-                    str(i),
-                    defect.title or 'N/A',
-                    severity_text,
-                    location,
-                    defect.description or 'N/A',
-                    status_text
-                ])
-            
-            defect_table = Table(defect_data, colWidths=[1*cm, 3.5*cm, 2*cm, 2.5*cm, 5*cm, 2*cm])
-            defect_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('TOPPADDING', (0, 0), (-1, -1), 4),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-            ]))
-            story.append(defect_table)
-            
-            # PDF generieren
-            doc.build(story)
+            spec = normalize_spec("defect_report", PDFService.defect_report_data(acceptance))
+            await pdf_renderer.render_to(spec, filepath)
             
             print(f"[SUCCESS] Mängelbericht erstellt: {filepath}")
             return filepath
             
         except Exception as e:
             print(f"[ERROR] Fehler bei Mängelbericht-Generierung: {e}")
-            return None
\ No newline at end of file
+            return None
+
+
+def _severity_text(defect: AcceptanceDefect) -> str:
+    return {
+        'MINOR': 'Geringfügig',
+        'MAJOR': 'Erheblich',
+        'CRITICAL': 'Kritisch'
+    }.get(defect.severity.value if defect.severity else 'MINOR', 'Geringfügig')
+
+
+def _document_time(acceptance: Acceptance) -> datetime:
+    return acceptance.completed_at or acceptance.updated_at or datetime.now()
+
+
+# ---------------------------------------------------------------------------
+# Renderer für den PDF-Prozess-Pool (siehe pdf_render_service.TEMPLATES)
+# ---------------------------------------------------------------------------
+
+def render_acceptance_protocol(data: dict, filepath: str):
+    """Abnahmeprotokoll aus PDFService.acceptance_protocol_data"""
+    # PDF-Dokument erstellen
+    doc = SimpleDocTemplate(
+        filepath,
+        pagesize=A4,
+        rightMargin=2*cm,
+        leftMargin=2*cm,
+        topMargin=2*cm,
+        bottomMargin=2*cm
+    )
+    
+    # Styles
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=30,
+        alignment=TA_CENTER
+    )
+    
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceAfter=12,
+        spaceBefore=20
+    )
+    
+    normal_style = styles['Normal']
+    normal_style.fontSize = 10
+    normal_style.spaceAfter = 6
+    
+    # Story (Inhalt) sammeln
+    story = []
+    
+    # Titel
+    story.append(Paragraph("ABNAHMEPROTOKOLL", title_style))
+    story.append(Spacer(1, 12))
+    
+    # Projekt-Informationen
+    story.append(Paragraph("1. PROJEKT-INFORMATIONEN", heading_style))
+    
+    project_table = Table(data['project_rows'], colWidths=[4*cm, 12*cm])
+    project_table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 0),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+        ('TOPPADDING', (0, 0), (-1, -1), 3),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+    ]))
+    story.append(project_table)
+    story.append(Spacer(1, 20))
+    
+    # Teilnehmer
+    story.append(Paragraph("2. TEILNEHMER", heading_style))
+    
+    participants_table = Table(data['participant_rows'], colWidths=[4*cm, 12*cm])
+    participants_table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 0),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+        ('TOPPADDING', (0, 0), (-1, -1), 3),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+    ]))
+    story.append(participants_table)
+    story.append(Spacer(1, 20))
+    
+    # Abnahme-Details
+    story.append(Paragraph("3. ABNAHME-DETAILS", heading_style))
+    
+    details_table = Table(data['detail_rows'], colWidths=[4*cm, 12*cm])
+    details_table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 0),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+        ('TOPPADDING', (0, 0), (-1, -1), 3),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+    ]))
+    story.append(details_table)
+    story.append(Spacer(1, 20))
+    
+    # Bewertung
+    rating_data = data['rating_rows']
+    if rating_data:
+        story.append(Paragraph("4. BEWERTUNG", heading_style))
+        
+        rating_table = Table(rating_data, colWidths=[4*cm, 12*cm])
+        rating_table.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 0),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+            ('TOPPADDING', (0, 0), (-1, -1), 3),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+        ]))
+        story.append(rating_table)
+        story.append(Spacer(1, 20))
+    
+    # Notizen
+    if data['acceptance_notes'] or data['contractor_notes']:
+        story.append(Paragraph("5. NOTIZEN UND BEMERKUNGEN", heading_style))
+        
+        if data['acceptance_notes']:
+            story.append(Paragraph("<b>Allgemeine Notizen:</b>", normal_style))
+            story.append(Paragraph(data['acceptance_notes'], normal_style))
+            story.append(Spacer(1, 10))
+        
+        if data['contractor_notes']:
+            story.append(Paragraph("<b>Notizen des Bauträgers:</b>", normal_style))
+            story.append(Paragraph(data['contractor_notes'], normal_style))
+            story.append(Spacer(1, 20))
+    
+    # Mängel
+    if data['defect_rows']:
+        story.append(Paragraph("6. MÄNGELLISTE", heading_style))
+        
+        defect_data = [['Nr.', 'Titel', 'Schweregrad', 'Ort', 'Beschreibung']] + data['defect_rows']
+        
+        defect_table = Table(defect_data, colWidths=[1*cm, 4*cm, 2.5*cm, 3*cm, 5.5*cm])
+        defect_table.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('LEFTPADDING', (0, 0), (-1, -1), 6),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ]))
+        story.append(defect_table)
+        story.append(Spacer(1, 20))
+    
+    # Rechtliche Hinweise
+    story.append(Paragraph("7. RECHTLICHE HINWEISE", heading_style))
+    
+    legal_text = """
+    <b>Gewährleistung:</b><br/>
+    Mit der Abnahme beginnt die Gewährleistungszeit gemäß BGB. Die Gewährleistungszeit beträgt bei Bauwerken 5 Jahre, 
+    bei beweglichen Sachen 2 Jahre ab Abnahme.<br/><br/>
+    
+    <b>Mängel:</b><br/>
+    Offensichtliche Mängel, die bei der Abnahme nicht gerügt wurden, können später nicht mehr geltend gemacht werden. 
+    Versteckte Mängel können innerhalb der Gewährleistungszeit gerügt werden.<br/><br/>
+    
+    <b>Beweislast:</b><br/>
+    Nach der Abnahme liegt die Beweislast für Mängel beim Auftraggeber.
+    """
+    
+    story.append(Paragraph(legal_text, normal_style))
+    story.append(Spacer(1, 30))
+    
+    # Unterschriften
+    story.append(Paragraph("8. UNTERSCHRIFTEN", heading_style))
+    
+    signature_data = [
+        ['', '', ''],
+        ['Datum, Ort', 'Bauträger/Auftraggeber', 'Dienstleister/Auftragnehmer'],
+        ['', '', ''],
+        ['', '', ''],
+        [f"{data['document_date']}, {data['place']}", data['contractor_name'], data['service_provider_name']]
+    ]
+    
+    signature_table = Table(signature_data, colWidths=[5*cm, 5.5*cm, 5.5*cm])
+    signature_table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Bold'),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LINEABOVE', (1, 3), (1, 3), 1, colors.black),
+        ('LINEABOVE', (2, 3), (2, 3), 1, colors.black),
+        ('TOPPADDING', (0, 0), (-1, -1), 6),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ]))
+    story.append(signature_table)
+    
+    # Footer
+    story.append(Spacer(1, 30))
+    footer_style = ParagraphStyle(
+        'Footer',
+        parent=styles['Normal'],
+        fontSize=8,
+        alignment=TA_CENTER,
+        textColor=colors.grey
+    )
+    story.append(Paragraph(f"Erstellt am {data['document_timestamp']} mit BuildWise", footer_style))
+    
+    # PDF generieren
+    doc.build(story)
+
+
+def render_defect_report(data: dict, filepath: str):
+    """Mängelbericht aus PDFService.defect_report_data"""
+    # PDF-Dokument erstellen
+    doc = SimpleDocTemplate(
+        filepath,
+        pagesize=A4,
+        rightMargin=2*cm,
+        leftMargin=2*cm,
+        topMargin=2*cm,
+        bottomMargin=2*cm
+    )
+    
+    # Styles
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=30,
+        alignment=TA_CENTER
+    )
+    
+    # Story sammeln
+    story = []
+    
+    # Titel
+    story.append(Paragraph("MÄNGELBERICHT", title_style))
+    story.append(Spacer(1, 12))
+    
+    # Projekt-Info
+    story.append(Paragraph(f"<b>Projekt:</b> {data['project_title']}", styles['Normal']))
+    story.append(Paragraph(f"<b>Gewerk:</b> {data['milestone_title']}", styles['Normal']))
+    story.append(Paragraph(f"<b>Abnahme-Nr.:</b> A-{data['acceptance_id']}", styles['Normal']))
+    story.append(Paragraph(f"<b>Datum:</b> {data['document_date']}", styles['Normal']))
+    story.append(Spacer(1, 20))
+    
+    # Mängel-Tabelle
+    defect_data = [['Nr.', 'Titel', 'Schweregrad', 'Ort/Raum', 'Beschreibung', 'Status']] + data['defect_rows']
+    
+    defect_table = Table(defect_data, colWidths=[1*cm, 3.5*cm, 2*cm, 2.5*cm, 5*cm, 2*cm])
+    defect_table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('LEFTPADDING', (0, 0), (-1, -1), 4),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+        ('TOPPADDING', (0, 0), (-1, -1), 4),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+    ]))
+    story.append(defect_table)
+    
+    # PDF generieren
+    doc.build(story)
@@ -12,6 +12,7 @@ from ..schemas.quote import QuoteCreate, QuoteUpdate, QuoteRead
 from ..core.exceptions import QuoteNotFoundException, InvalidQuoteStatusException
 from ..services.cost_position_service import get_cost_position_by_quote_id
 from ..services.notification_service import NotificationService
+from ..services.domain_events import record_quote_accepted
 
 
 async def _ensure_quote_notification_robust(db: AsyncSession, quote) -> bool:
@@ -301,11 +302,20 @@ async def submit_quote(db: AsyncSession, quote_id: int) -> Quote | None:
 
 
 async def accept_quote(db: AsyncSession, quote_id: int) -> Quote | None:
-    """Akzeptiert ein Angebot und erstellt Kostenposition sowie BuildWise Gebühr"""
+    """
+    Akzeptiert ein Angebot und gibt die Kontaktdaten frei
+
+    Statusänderung und QuoteAccepted-Event werden in einer Transaktion
+    committet. Kostenposition, BuildWise-Gebühr, Credits, Benachrichtigung und
+    Kommunikationszugriff erzeugen die Handler in services/domain_events.py
+    im Hintergrund (mit Wiederholung bei Fehlern).
+    """
     quote = await get_quote_by_id(db, quote_id)
     if not quote:
         return None
     
+    now = datetime.utcnow()
+    
     # Setze alle anderen Angebote für das gleiche Gewerk auf "rejected"
     if quote.milestone_id is not None:
         await db.execute(
@@ -319,7 +329,7 @@ async def accept_quote(db: AsyncSession, quote_id: int) -> Quote | None:
             )
             .values(
                 status=QuoteStatus.REJECTED,
-                updated_at=datetime.utcnow()
+                updated_at=now
             )
         )
     
@@ -329,244 +339,14 @@ async def accept_quote(db: AsyncSession, quote_id: int) -> Quote | None:
         .where(Quote.id == quote_id)
         .values(
             status=QuoteStatus.ACCEPTED,
-            accepted_at=datetime.utcnow(),
+            accepted_at=now,
             contact_released=True,
-            contact_released_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
+            contact_released_at=now,
+            updated_at=now
         )
     )
     
-    # [SUCCESS] WICHTIG: Erstelle Kostenposition für Finanzen-Übersicht auf Startseite
-    # Diese Kostenposition erscheint beim Bauträger im Abschnitt "Finanzen"
-    cost_position = await create_cost_position_from_quote(db, quote)
-    
-    # [SUCCESS] BUILDWISE GEBÜHR: Erstelle automatisch eine Vermittlungsgebühr (4.7%)
-    # Diese wird in /buildwise-fees angezeigt und ist 30 Tage nach Angebotsannahme fällig
-    buildwise_fee_created = False
-    try:
-        from ..services.buildwise_fee_service import BuildWiseFeeService
-        from ..core.config import settings, get_fee_percentage
-        
-        print(f"\n{'='*80}")
-        print(f"[QuoteService] ERSTELLE BUILDWISE GEBUEHR FÜR QUOTE {quote.id}")
-        print(f"{'='*80}")
-        print(f"   Quote ID: {quote.id}")
-        print(f"   Quote Amount: {quote.total_amount} {quote.currency}")
-        print(f"   Service Provider ID: {quote.service_provider_id}")
-        print(f"   Project ID: {quote.project_id}")
-        print(f"   Milestone ID: {quote.milestone_id}")
-        print(f"   Environment Mode: {getattr(settings, 'environment_mode', 'production')}")
-        print(f"   Fee Percentage: {get_fee_percentage()}%")
-        
-        # Verwende nach Möglichkeit die echte CostPosition-ID, sonst Fee ohne FK referenzieren
-        cost_position_id = getattr(cost_position, "id", None)
-        print(f"   Cost Position ID: {cost_position_id if cost_position_id else 'keine (Fee ohne FK-Referenz)'}")
-        
-        # Erstelle BuildWise Gebühr mit Retry-Logik
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                print(f"\n[QuoteService] Versuch {attempt + 1}/{max_retries}...")
-                
-                buildwise_fee = await BuildWiseFeeService.create_fee_from_quote(
-                    db=db,
-                    quote_id=quote.id,
-                    cost_position_id=cost_position_id,
-                    fee_percentage=None  # Verwende automatisch den aktuellen Modus (4.7% in Production, 0% in Beta)
-                )
-                
-                print(f"\n{'='*80}")
-                print(f"[QuoteService] ERFOLG: BUILDWISE GEBUEHR ERSTELLT!")
-                print(f"{'='*80}")
-                print(f"   Fee ID: {buildwise_fee.id}")
-                print(f"   Rechnungsnummer: {buildwise_fee.invoice_number}")
-                print(f"   Nettobetrag: {buildwise_fee.fee_amount} {buildwise_fee.currency}")
-                print(f"   Bruttobetrag (inkl. MwSt): {buildwise_fee.gross_amount} {buildwise_fee.currency}")
-                print(f"   Provisionssatz: {buildwise_fee.fee_percentage}%")
-                print(f"   Rechnungsdatum: {buildwise_fee.invoice_date}")
-                print(f"   Faelligkeitsdatum: {buildwise_fee.due_date}")
-                print(f"   Status: {buildwise_fee.status}")
-                print(f"{'='*80}\n")
-                
-                buildwise_fee_created = True
-                break  # Erfolgreich erstellt, verlasse Retry-Schleife
-                
-            except ValueError as ve:
-                error_msg = str(ve)
-                if "bereits" in error_msg.lower() or "existiert" in error_msg.lower():
-                    # Gebühr existiert bereits - das ist OK
-                    print(f"[QuoteService] INFO: BuildWise Gebuehr existiert bereits für Quote {quote.id}")
-                    buildwise_fee_created = True
-                    break
-                elif "Pydantic" in error_msg or "validation" in error_msg.lower():
-                    # Validierungsfehler - dies ist ein Programmierfehler
-                    print(f"[QuoteService] FEHLER: Pydantic-Validierungsfehler bei Gebuehr-Erstellung:")
-                    print(f"   {error_msg}")
-                    print(f"   Dies deutet auf einen Rundungsfehler oder ungueltige Daten hin")
-                    if attempt < max_retries - 1:
-                        print(f"[QuoteService] Versuche erneut...")
-                        continue
-                    else:
-                        print(f"[QuoteService] KRITISCH: Gebuehr konnte nach {max_retries} Versuchen nicht erstellt werden")
-                        raise ve
-                elif attempt < max_retries - 1:
-                    print(f"[QuoteService] Versuch {attempt + 1} fehlgeschlagen: {ve}")
-                    print(f"[QuoteService] Versuche erneut...")
-                    continue
-                else:
-                    print(f"[QuoteService] FEHLER: Alle {max_retries} Versuche fehlgeschlagen")
-                    raise ve
-                    
-            except Exception as e:
-                print(f"[QuoteService] FEHLER bei Versuch {attempt + 1}: {type(e).__name__}: {e}")
-                if attempt < max_retries - 1:
-                    print(f"[QuoteService] Versuche erneut...")
-                    import traceback
-                    traceback.print_exc()
-                    continue
-                else:
-                    print(f"[QuoteService] KRITISCH: Alle {max_retries} Versuche fehlgeschlagen")
-                    raise e
-        
-    except ValueError as ve:
-        # ValueError bedeutet, dass die Gebühr bereits existiert oder ein Validierungsfehler vorliegt
-        print(f"\n[QuoteService] WARNUNG: BuildWise Gebuehr konnte nicht erstellt werden")
-        print(f"   Fehlertyp: ValueError")
-        print(f"   Fehlermeldung: {ve}")
-        print(f"   Das Angebot wurde dennoch akzeptiert")
-        import traceback
-        traceback.print_exc()
-        
-    except Exception as e:
-        print(f"\n[QuoteService] FEHLER: Unerwarteter Fehler beim Erstellen der BuildWise Gebuehr")
-        print(f"   Fehlertyp: {type(e).__name__}")
-        print(f"   Fehlermeldung: {e}")
-        print(f"   Das Angebot wurde dennoch akzeptiert")
-        import traceback
-        traceback.print_exc()
-        # Fehler beim Erstellen der Gebühr sollte nicht die Quote-Akzeptierung blockieren
-        
-    # Logging für Monitoring
-    if buildwise_fee_created:
-        print(f"\n[QuoteService] ERFOLG: BuildWise-Rechnungsstellung erfolgreich abgeschlossen fuer Quote {quote.id}")
-    else:
-        print(f"\n[QuoteService] ACHTUNG: BuildWise-Rechnungsstellung fuer Quote {quote.id} fehlgeschlagen")
-        print(f"   Manueller Eingriff erforderlich!")
-        print(f"   Verwenden Sie: python create_buildwise_fee_manually.py")
-    
-    # Credit-Zuordnung für Bauträger - ERWEITERT FÜR BESICHTIGUNGSSYSTEM
-    try:
-        from ..services.credit_service import CreditService
-        from ..models.credit_event import CreditEventType
-        from ..models.user import UserRole
-        from ..models import Project
-        from ..models.inspection import Inspection, InspectionInvitation
-        from ..models.user import User
-        
-        # Hole Projekt-Owner (Bauträger)
-        project_result = await db.execute(
-            select(Project).where(Project.id == quote.project_id)
-        )
-        project = project_result.scalar_one_or_none()
-        
-        # Hole die Owner-ID - verwende direkt den Foreign Key statt lazy-loaded relationship
-        owner_id = project.owner_id
-        
-        if project and owner_id:
-            # Prüfe ob dieses Angebot aus einem Besichtigungsprozess stammt
-            inspection_result = await db.execute(
-                select(Inspection)
-                .join(InspectionInvitation, InspectionInvitation.inspection_id == Inspection.id)
-                .where(
-                    and_(
-                        Inspection.milestone_id == quote.milestone_id,
-                        InspectionInvitation.quote_id == quote.id
-                    )
-                )
-            )
-            inspection = inspection_result.scalar_one_or_none()
-            
-            # Vergebe erhöhte Credits wenn Besichtigungsprozess durchlaufen wurde
-            if inspection:
-                # BONUS-CREDITS für vollständigen Besichtigungsprozess!
-                await CreditService.reward_inspection_quote_acceptance(
-                    db=db,
-                    user_id=owner_id,
-                    quote_id=quote.id,
-                    inspection_id=inspection.id
-                )
-            else:
-                # Standard-Credits für normale Angebotsakzeptanz
-                await CreditService.add_credits_for_activity(
-                    db=db,
-                    user_id=owner_id,
-                    event_type=CreditEventType.QUOTE_ACCEPTED,
-                    description=f"Angebot akzeptiert: {quote.title}",
-                    related_entity_type="quote",
-                    related_entity_id=quote.id
-                )
-        
-        # Zusätzliche Credit-Zuordnung (Legacy) ohne Lazy-Relationship
-        if project and owner_id:
-            try:
-                owner_result = await db.execute(select(User).where(User.id == owner_id))
-                owner = owner_result.scalar_one_or_none()
-                if owner and owner.user_role == UserRole.BAUTRAEGER:
-                    await CreditService.add_credits_for_activity(
-                        db=db,
-                        user_id=owner.id,
-                        event_type=CreditEventType.QUOTE_ACCEPTED,
-                        description=f"Angebot akzeptiert: {quote.title}",
-                        related_entity_type="quote",
-                        related_entity_id=quote.id
-                    )
-                    print(f"Credits fuer Bautraeger {owner.id} hinzugefuegt: Angebot akzeptiert")
-                else:
-                    print(f"Projekt-Owner {owner_id} ist kein Bautraeger oder nicht gefunden, keine Credits hinzugefuegt")
-            except Exception as credit_error:
-                print(f"Fehler bei zusaetzlicher Credit-Zuordnung: {credit_error}")
-                
-    except Exception as e:
-        print(f"Fehler bei Credit-Zuordnung: {e}")
-        # Fehler bei Credit-Zuordnung sollte nicht die Quote-Akzeptierung blockieren
-    
-    # Erstelle Benachrichtigung für den Dienstleister
-    try:
-        from ..services.notification_service import NotificationService
-        from ..models import Milestone
-        from ..schemas.notification import NotificationCreate
-        from ..models.notification import NotificationType, NotificationPriority
-        
-        # Hole Milestone-Informationen für die Benachrichtigung
-        milestone_result = await db.execute(
-            select(Milestone).where(Milestone.id == quote.milestone_id)
-        )
-        milestone = milestone_result.scalar_one_or_none()
-        
-        if milestone:
-            notification_data = NotificationCreate(
-                recipient_id=quote.service_provider_id or quote.user_id,
-                type=NotificationType.QUOTE_ACCEPTED,
-                title='Angebot angenommen',
-                message=f'Ihr Angebot für "{milestone.title}" wurde vom Bauträger angenommen. Sie können nun mit der Ausführung beginnen.',
-                priority=NotificationPriority.HIGH,
-                related_quote_id=quote.id,
-                related_project_id=quote.project_id,
-                related_milestone_id=quote.milestone_id
-            )
-            
-            notification = await NotificationService.create_notification(
-                db=db,
-                notification_data=notification_data
-            )
-            
-            print(f"Benachrichtigung fuer Dienstleister {quote.service_provider_id or quote.user_id} erstellt: Angebot {quote.id} angenommen")
-        else:
-            print(f"Milestone {quote.milestone_id} nicht gefunden - Benachrichtigung uebersprungen")
-            
-    except Exception as e:
-        print(f"Fehler beim Erstellen der Benachrichtigung: {e}")
-        # Fehler bei Benachrichtigung sollte nicht die Quote-Akzeptierung blockieren
+    record_quote_accepted(db, quote)
     
     await db.commit()
     await db.refresh(quote)
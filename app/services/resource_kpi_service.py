@@ -0,0 +1,505 @@
+"""
+Ressourcen-KPIs per SQL und tägliche KPI-Momentaufnahmen
+
+- Kennzahlen werden gruppiert in der Datenbank berechnet (Personentage,
+  Antwortzeiten: Datumsarithmetik per SQL), statt alle Ressourcen und
+  Zuweisungen eines Dienstleisters zu laden
+- Der nächtliche Job schreibt je Dienstleister eine Zeile in
+  resource_kpi_snapshots (Aktivität des Vortags und aktueller Bestand) und
+  holt dabei ausgefallene Tage nach; Monatstrends und Verläufe lesen diese
+  Zeilen, nur die noch nicht erfassten Tage und der statusabhängige Umsatz
+  werden live berechnet
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Date, Integer, and_, case, cast, delete, extract, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.database import AsyncSessionLocal, IS_POSTGRESQL
+from ..models.resource import (
+    AllocationStatus, Resource, ResourceAllocation, ResourceKPISnapshot, ResourceStatus
+)
+
+logger = logging.getLogger(__name__)
+
+_BOOKED_STATUSES = (ResourceStatus.ALLOCATED, ResourceStatus.COMPLETED)
+
+# Aktivitätsspalten einer Momentaufnahme
+_ACTIVITY_DEFAULTS = {
+    "resources_created": 0, "person_days_created": 0, "revenue_created": 0.0,
+    "allocations_created": 0, "offers_submitted": 0, "response_hours_total": 0.0, "response_count": 0
+}
+
+
+# ---------------------------------------------------------------------------
+# SQL-Ausdrücke
+# ---------------------------------------------------------------------------
+
+def _whole_days(start, end):
+    """Ganze Tage zwischen zwei Zeitpunkten, wie (end - start).days in Python"""
+    if IS_POSTGRESQL:
+        return func.floor(extract("epoch", end - start) / 86400)
+    # SQLite: floor() nur mit Mathe-Erweiterung, daher abschneiden und korrigieren
+    days = func.julianday(end) - func.julianday(start)
+    truncated = cast(days, Integer)
+    return truncated - case((days < truncated, 1), else_=0)
+
+
+def _hours_between(start, end):
+    if IS_POSTGRESQL:
+        return extract("epoch", end - start) / 3600
+    return (func.julianday(end) - func.julianday(start)) * 24
+
+
+def _day(column):
+    """Kalendertag eines Zeitstempels (zum Gruppieren)"""
+    return cast(column, Date) if IS_POSTGRESQL else func.date(column)
+
+
+def _as_date(value) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+_PERSON_DAYS = (_whole_days(Resource.start_date, Resource.end_date) + 1) * Resource.person_count
+_REVENUE = case(
+    (Resource.hourly_rate != 0, Resource.hourly_rate * func.coalesce(Resource.total_hours, 0)),
+    else_=0
+)
+_BOOKED = Resource.status.in_(_BOOKED_STATUSES)
+
+
+def _float(value) -> float:
+    return float(value or 0)
+
+
+def _value(totals: Dict[ResourceStatus, Dict[str, Any]], status: ResourceStatus, field: str):
+    return totals.get(status, {}).get(field, 0)
+
+
+# ---------------------------------------------------------------------------
+# Abfragen
+# ---------------------------------------------------------------------------
+
+async def _status_totals(db: AsyncSession, *conditions) -> Dict[ResourceStatus, Dict[str, Any]]:
+    """Anzahl, Personentage, Umsatz und Stundensätze je Status (eine Abfrage)"""
+    result = await db.execute(
+        select(
+            Resource.status,
+            func.count(Resource.id).label("count"),
+            func.coalesce(func.sum(_PERSON_DAYS), 0).label("person_days"),
+            func.coalesce(func.sum(_REVENUE), 0).label("revenue"),
+            func.coalesce(func.sum(case((Resource.hourly_rate != 0, Resource.hourly_rate), else_=0)), 0).label("rate_sum"),
+            func.count(case((Resource.hourly_rate != 0, 1))).label("rate_count")
+        )
+        .where(*conditions)
+        .group_by(Resource.status)
+    )
+    return {
+        row.status: {
+            "count": row.count,
+            "person_days": int(row.person_days),
+            "revenue": _float(row.revenue),
+            "rate_sum": _float(row.rate_sum),
+            "rate_count": row.rate_count
+        }
+        for row in result
+    }
+
+
+def _summarize(totals: Dict[ResourceStatus, Dict[str, Any]]) -> Dict[str, Any]:
+    rate_count = sum(row["rate_count"] for row in totals.values())
+    return {
+        "count": {status: _value(totals, status, "count") for status in ResourceStatus},
+        "person_days": {status: _value(totals, status, "person_days") for status in ResourceStatus},
+        "revenue": sum(_value(totals, status, "revenue") for status in _BOOKED_STATUSES),
+        "average_hourly_rate": (
+            sum(row["rate_sum"] for row in totals.values()) / rate_count if rate_count else None
+        )
+    }
+
+
+async def _activity(db: AsyncSession, start: datetime, end: datetime,
+                    provider_id: Optional[int] = None) -> Dict[Tuple[int, date], Dict[str, Any]]:
+    """Aktivität je Dienstleister und Tag im Zeitraum [start, end)"""
+    activity: Dict[Tuple[int, date], Dict[str, Any]] = defaultdict(lambda: dict(_ACTIVITY_DEFAULTS))
+    provider_filter = [Resource.service_provider_id == provider_id] if provider_id is not None else []
+
+    day = _day(Resource.created_at)
+    resources = await db.execute(
+        select(
+            Resource.service_provider_id, day.label("day"),
+            func.count(Resource.id).label("count"),
+            func.coalesce(func.sum(_PERSON_DAYS), 0).label("person_days"),
+            func.coalesce(func.sum(case((_BOOKED, _REVENUE), else_=0)), 0).label("revenue")
+        )
+        .where(Resource.created_at >= start, Resource.created_at < end, *provider_filter)
+        .group_by(Resource.service_provider_id, day)
+    )
+    for row in resources:
+        entry = activity[(row.service_provider_id, _as_date(row.day))]
+        entry["resources_created"] = row.count
+        entry["person_days_created"] = int(row.person_days)
+        entry["revenue_created"] = _float(row.revenue)
+
+    day = _day(ResourceAllocation.created_at)
+    allocations = await db.execute(
+        select(Resource.service_provider_id, day.label("day"), func.count(ResourceAllocation.id).label("count"))
+        .join(Resource, ResourceAllocation.resource_id == Resource.id)
+        .where(ResourceAllocation.created_at >= start, ResourceAllocation.created_at < end, *provider_filter)
+        .group_by(Resource.service_provider_id, day)
+    )
+    for row in allocations:
+        activity[(row.service_provider_id, _as_date(row.day))]["allocations_created"] = row.count
+
+    day = _day(ResourceAllocation.offer_submitted_at)
+    response_hours = _hours_between(ResourceAllocation.invitation_sent_at, ResourceAllocation.offer_submitted_at)
+    offers = await db.execute(
+        select(
+            Resource.service_provider_id, day.label("day"),
+            func.count(ResourceAllocation.id).label("count"),
+            func.coalesce(func.sum(case(
+                (ResourceAllocation.invitation_sent_at.is_not(None), response_hours), else_=0
+            )), 0).label("response_hours"),
+            func.count(ResourceAllocation.invitation_sent_at).label("response_count")
+        )
+        .join(Resource, ResourceAllocation.resource_id == Resource.id)
+        .where(ResourceAllocation.offer_submitted_at >= start, ResourceAllocation.offer_submitted_at < end,
+               *provider_filter)
+        .group_by(Resource.service_provider_id, day)
+    )
+    for row in offers:
+        entry = activity[(row.service_provider_id, _as_date(row.day))]
+        entry["offers_submitted"] = row.count
+        entry["response_hours_total"] = _float(row.response_hours)
+        entry["response_count"] = row.response_count
+
+    return activity
+
+
+def _month_keys(start: datetime, end: datetime) -> List[str]:
+    keys = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        keys.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return keys
+
+
+class ResourceKPIService:
+    """KPIs des Ressourcenmanagements eines Dienstleisters"""
+
+    @staticmethod
+    async def get_kpis(db: AsyncSession, provider_id: int, period_start: datetime, period_end: datetime) -> Dict[str, Any]:
+        """KPIs der im Zeitraum angelegten Ressourcen"""
+        summary = _summarize(await _status_totals(
+            db,
+            Resource.service_provider_id == provider_id,
+            Resource.created_at >= period_start,
+            Resource.created_at <= period_end
+        ))
+        days = summary["person_days"]
+        days_available = days[ResourceStatus.AVAILABLE]
+        days_allocated = days[ResourceStatus.ALLOCATED]
+        days_completed = days[ResourceStatus.COMPLETED]
+        days_total = days_available + days_allocated + days_completed
+
+        return {
+            "service_provider_id": provider_id,
+            "calculation_date": datetime.now(),
+            "total_resources_available": summary["count"][ResourceStatus.AVAILABLE],
+            "total_resources_allocated": summary["count"][ResourceStatus.ALLOCATED],
+            "total_resources_completed": summary["count"][ResourceStatus.COMPLETED],
+            "total_person_days_available": days_available,
+            "total_person_days_allocated": days_allocated,
+            "total_person_days_completed": days_completed,
+            "utilization_rate": (days_allocated + days_completed) / days_total * 100 if days_total > 0 else 0,
+            "average_hourly_rate": summary["average_hourly_rate"],
+            "total_revenue": summary["revenue"],
+            "period_start": period_start,
+            "period_end": period_end
+        }
+
+    @staticmethod
+    async def get_statistics(db: AsyncSession, provider_id: int) -> Dict[str, Any]:
+        """Anzahl der Ressourcen nach Status und Kategorie"""
+        status_result = await db.execute(
+            select(Resource.status, func.count(Resource.id).label("count"))
+            .where(Resource.service_provider_id == provider_id)
+            .group_by(Resource.status)
+        )
+        by_status = {status.value: 0 for status in ResourceStatus}
+        for row in status_result:
+            by_status[row.status.value] = row.count
+
+        category_result = await db.execute(
+            select(Resource.category, func.count(Resource.id).label("count"))
+            .where(Resource.service_provider_id == provider_id)
+            .group_by(Resource.category)
+        )
+
+        return {
+            "total_resources": sum(by_status.values()),
+            "by_status": by_status,
+            "by_category": {row.category: row.count for row in category_result},
+            "provider_id": provider_id
+        }
+
+    @staticmethod
+    async def get_detailed_kpis(db: AsyncSession, provider_id: int, period_start: datetime,
+                                period_end: datetime) -> Dict[str, Any]:
+        """KPI-Dashboard: Überblick, Kategorien, Orte und Monatstrends"""
+        own_resources = Resource.service_provider_id == provider_id
+
+        summary = _summarize(await _status_totals(db, own_resources))
+        total_person_days = sum(summary["person_days"].values())
+        allocated_person_days = sum(summary["person_days"][status] for status in _BOOKED_STATUSES)
+        utilization_rate = (allocated_person_days / total_person_days * 100) if total_person_days > 0 else 0
+
+        # Angebotsquote und Antwortzeit (Stunden) über alle Zuweisungen
+        response_hours = _hours_between(ResourceAllocation.invitation_sent_at, ResourceAllocation.offer_submitted_at)
+        allocations = (await db.execute(
+            select(
+                func.count(ResourceAllocation.id).label("total"),
+                func.count(case((ResourceAllocation.allocation_status == AllocationStatus.OFFER_SUBMITTED, 1))).label("submitted"),
+                func.avg(case((and_(
+                    ResourceAllocation.invitation_sent_at.is_not(None),
+                    ResourceAllocation.offer_submitted_at.is_not(None)
+                ), response_hours))).label("response_hours")
+            )
+            .join(Resource, ResourceAllocation.resource_id == Resource.id)
+            .where(own_resources)
+        )).one()
+        offer_rate = (allocations.submitted / allocations.total * 100) if allocations.total else 0
+
+        category_result = await db.execute(
+            select(
+                Resource.category,
+                func.count(Resource.id).label("total"),
+                func.count(case((_BOOKED, 1))).label("allocated"),
+                func.coalesce(func.sum(case((_BOOKED, _REVENUE), else_=0)), 0).label("revenue"),
+                func.coalesce(func.sum(_PERSON_DAYS), 0).label("person_days")
+            )
+            .where(own_resources)
+            .group_by(Resource.category)
+        )
+        category_performance = {
+            row.category: {
+                'total': row.total,
+                'allocated': row.allocated,
+                'revenue': _float(row.revenue),
+                'person_days': int(row.person_days)
+            }
+            for row in category_result
+        }
+
+        geographic_distribution: Dict[str, int] = {}
+        city_result = await db.execute(
+            select(Resource.address_city, func.count(Resource.id).label("count"))
+            .where(own_resources)
+            .group_by(Resource.address_city)
+        )
+        for row in city_result:
+            city = row.address_city or 'Unbekannt'
+            geographic_distribution[city] = geographic_distribution.get(city, 0) + row.count
+
+        return {
+            "overview": {
+                "total_resources": sum(summary["count"].values()),
+                "available_resources": summary["count"][ResourceStatus.AVAILABLE],
+                "allocated_resources": summary["count"][ResourceStatus.ALLOCATED],
+                "completed_resources": summary["count"][ResourceStatus.COMPLETED],
+                "total_person_days": total_person_days,
+                "allocated_person_days": allocated_person_days,
+                "utilization_rate": round(utilization_rate, 2),
+                "average_hourly_rate": round(summary["average_hourly_rate"] or 0, 2),
+                "total_revenue": round(summary["revenue"], 2),
+                "offer_rate": round(offer_rate, 2),
+                "average_response_time": round(_float(allocations.response_hours), 2)
+            },
+            "category_performance": category_performance,
+            "geographic_distribution": geographic_distribution,
+            "monthly_trends": await ResourceKPIService.get_monthly_trends(db, provider_id, period_start, period_end),
+            "period": {
+                "start": period_start.isoformat(),
+                "end": period_end.isoformat()
+            },
+            "provider_id": provider_id
+        }
+
+    @staticmethod
+    async def get_monthly_trends(db: AsyncSession, provider_id: int, period_start: datetime,
+                                 period_end: datetime) -> Dict[str, Dict[str, Any]]:
+        """
+        Angelegte Ressourcen, Zuweisungen und Umsatz je Monat
+
+        Anzahlen der Tage mit Momentaufnahme kommen aus resource_kpi_snapshots,
+        die Tage danach (in der Regel nur heute) werden live berechnet. Der
+        Umsatz wird immer live berechnet: er hängt vom aktuellen Status ab (eine
+        später gebuchte Ressource zählt im Monat ihrer Anlage), revenue_created
+        der Momentaufnahmen hält dagegen den Stand der jeweiligen Nacht fest.
+        """
+        trends = {
+            key: {'resources_created': 0, 'allocations_created': 0, 'revenue': 0}
+            for key in _month_keys(period_start, period_end)
+        }
+        first_day = period_start.date().replace(day=1)
+
+        year = extract("year", ResourceKPISnapshot.snapshot_date)
+        month = extract("month", ResourceKPISnapshot.snapshot_date)
+        snapshot_filter = [
+            ResourceKPISnapshot.service_provider_id == provider_id,
+            ResourceKPISnapshot.snapshot_date >= first_day,
+            ResourceKPISnapshot.snapshot_date <= period_end.date()
+        ]
+        snapshot_result = await db.execute(
+            select(
+                year.label("year"), month.label("month"),
+                func.sum(ResourceKPISnapshot.resources_created).label("resources_created"),
+                func.sum(ResourceKPISnapshot.allocations_created).label("allocations_created")
+            )
+            .where(*snapshot_filter)
+            .group_by(year, month)
+        )
+        for row in snapshot_result:
+            key = f"{int(row.year):04d}-{int(row.month):02d}"
+            if key in trends:
+                trends[key]['resources_created'] += int(row.resources_created or 0)
+                trends[key]['allocations_created'] += int(row.allocations_created or 0)
+
+        created_year = extract("year", Resource.created_at)
+        created_month = extract("month", Resource.created_at)
+        revenue_result = await db.execute(
+            select(
+                created_year.label("year"), created_month.label("month"),
+                func.coalesce(func.sum(case((_BOOKED, _REVENUE), else_=0)), 0).label("revenue")
+            )
+            .where(
+                Resource.service_provider_id == provider_id,
+                Resource.created_at >= datetime.combine(first_day, time.min),
+                Resource.created_at < datetime.combine(period_end.date() + timedelta(days=1), time.min)
+            )
+            .group_by(created_year, created_month)
+        )
+        for row in revenue_result:
+            key = f"{int(row.year):04d}-{int(row.month):02d}"
+            if key in trends:
+                trends[key]['revenue'] += _float(row.revenue)
+
+        covered_until = (await db.execute(
+            select(func.max(ResourceKPISnapshot.snapshot_date)).where(*snapshot_filter)
+        )).scalar()
+        live_from = _as_date(covered_until) + timedelta(days=1) if covered_until else first_day
+        live_end = period_end.date() + timedelta(days=1)
+        if live_from < live_end:
+            live = await _activity(
+                db, datetime.combine(live_from, time.min), datetime.combine(live_end, time.min), provider_id
+            )
+            for (_, day), entry in live.items():
+                key = day.strftime('%Y-%m')
+                if key in trends:
+                    trends[key]['resources_created'] += entry["resources_created"]
+                    trends[key]['allocations_created'] += entry["allocations_created"]
+
+        return trends
+
+    @staticmethod
+    async def get_history(db: AsyncSession, provider_id: int, start: date, end: date) -> List[Dict[str, Any]]:
+        """Tägliche Momentaufnahmen im Zeitraum (für Verlaufsdiagramme)"""
+        result = await db.execute(
+            select(ResourceKPISnapshot)
+            .where(
+                ResourceKPISnapshot.service_provider_id == provider_id,
+                ResourceKPISnapshot.snapshot_date >= start,
+                ResourceKPISnapshot.snapshot_date <= end
+            )
+            .order_by(ResourceKPISnapshot.snapshot_date)
+        )
+        columns = [column.name for column in ResourceKPISnapshot.__table__.columns
+                   if column.name not in ("id", "service_provider_id", "created_at")]
+        return [{name: getattr(snapshot, name) for name in columns} for snapshot in result.scalars()]
+
+
+# ---------------------------------------------------------------------------
+# Momentaufnahmen
+# ---------------------------------------------------------------------------
+
+async def materialize_snapshots(db: AsyncSession, start: date, end: date, with_state: bool = False) -> int:
+    """
+    Schreibt die Momentaufnahmen der Tage [start, end] neu (Commit durch den Aufrufer)
+
+    `with_state` ergänzt den Tag `end` um den aktuellen Bestand aller
+    Dienstleister mit Ressourcen (nur für den gerade abgeschlossenen Tag sinnvoll).
+    """
+    activity = await _activity(
+        db, datetime.combine(start, time.min), datetime.combine(end + timedelta(days=1), time.min)
+    )
+    rows: Dict[Tuple[int, date], Dict[str, Any]] = dict(activity)
+
+    if with_state:
+        state: Dict[int, Dict[ResourceStatus, Dict[str, Any]]] = defaultdict(dict)
+        result = await db.execute(
+            select(
+                Resource.service_provider_id, Resource.status,
+                func.count(Resource.id).label("count"),
+                func.coalesce(func.sum(_PERSON_DAYS), 0).label("person_days"),
+                func.coalesce(func.sum(_REVENUE), 0).label("revenue")
+            )
+            .group_by(Resource.service_provider_id, Resource.status)
+        )
+        for row in result:
+            state[row.service_provider_id][row.status] = {
+                "count": row.count, "person_days": int(row.person_days), "revenue": _float(row.revenue)
+            }
+        for provider_id, totals in state.items():
+            days_available = _value(totals, ResourceStatus.AVAILABLE, "person_days")
+            days_booked = sum(_value(totals, status, "person_days") for status in _BOOKED_STATUSES)
+            row = rows.setdefault((provider_id, end), dict(_ACTIVITY_DEFAULTS))
+            row.update({
+                "resources_available": _value(totals, ResourceStatus.AVAILABLE, "count"),
+                "resources_allocated": _value(totals, ResourceStatus.ALLOCATED, "count"),
+                "resources_completed": _value(totals, ResourceStatus.COMPLETED, "count"),
+                "person_days_available": days_available,
+                "person_days_allocated": _value(totals, ResourceStatus.ALLOCATED, "person_days"),
+                "person_days_completed": _value(totals, ResourceStatus.COMPLETED, "person_days"),
+                "utilization_rate": (
+                    days_booked / (days_available + days_booked) * 100 if days_available + days_booked > 0 else 0
+                ),
+                "total_revenue": sum(_value(totals, status, "revenue") for status in _BOOKED_STATUSES)
+            })
+
+    await db.execute(
+        delete(ResourceKPISnapshot).where(
+            ResourceKPISnapshot.snapshot_date >= start,
+            ResourceKPISnapshot.snapshot_date <= end
+        )
+    )
+    if rows:
+        await db.execute(insert(ResourceKPISnapshot), [
+            {"service_provider_id": provider_id, "snapshot_date": day, **values}
+            for (provider_id, day), values in rows.items()
+        ])
+    return len(rows)
+
+
+async def snapshot_resource_kpis(snapshot_date: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Momentaufnahme des Vortags für alle Dienstleister (nächtlicher Job)
+
+    Ausgefallene Läufe werden nachgeholt: die Aktivität aller Tage seit der
+    letzten Momentaufnahme wird mitgeschrieben, der Bestand nur für den Vortag.
+    """
+    async with AsyncSessionLocal() as db:
+        if snapshot_date is None:
+            snapshot_date = date.today() - timedelta(days=1)
+            last_snapshot = (await db.execute(select(func.max(ResourceKPISnapshot.snapshot_date)))).scalar()
+            start = min(_as_date(last_snapshot) + timedelta(days=1), snapshot_date) if last_snapshot else snapshot_date
+        else:
+            start = snapshot_date
+        rows = await materialize_snapshots(db, start, snapshot_date, with_state=True)
+        await db.commit()
+    logger.info(f"Ressourcen-KPIs: {rows} Momentaufnahmen für {start} bis {snapshot_date} geschrieben")
+    return {"start_date": start.isoformat(), "snapshot_date": snapshot_date.isoformat(), "rows": rows}
@@ -0,0 +1,247 @@
+"""
+Aufbewahrungsfristen (Retention) für schnell wachsende Tabellen
+
+- Pro Tabelle eine Richtlinie (Zeitspalte, Frist, Zusatzbedingung, Archivierung)
+- Gelöscht wird in kleinen Batches über Primärschlüssel-Bereiche, jeder Batch
+  in einer eigenen kurzen Transaktion mit Pause dazwischen (keine Lock-Stürme)
+- Optional werden die gelöschten Zeilen vorher als JSONL.gz archiviert
+- Gelöschte/archivierte Zeilen werden pro Richtlinie als Metriken mitgezählt
+"""
+
+import asyncio
+import enum
+import gzip
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import delete, select
+
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal
+from ..models.audit_log import AuditLog
+from ..models.credit_event import CreditEvent
+from ..models.document import DocumentAccessLog
+from ..models.notification import Notification
+from ..models.security_counter import SecurityCounter
+from .notification_stats_cache import invalidate_notification_stats
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetentionPolicy:
+    """Aufbewahrungsrichtlinie für eine Tabelle"""
+    name: str
+    model: Any
+    timestamp_column: str
+    retention_days: int
+    archive: bool = False
+    # Zusätzliche Bedingung (z.B. nur quittierte Benachrichtigungen)
+    condition: Optional[Callable[[], Any]] = None
+    # Wird nach dem Löschen aufgerufen (z.B. Caches verwerfen)
+    on_deleted: Optional[Callable[[], None]] = None
+
+
+def get_retention_policies() -> List[RetentionPolicy]:
+    """Richtlinien gemäß aktueller Konfiguration"""
+    return [
+        RetentionPolicy(
+            name="notifications",
+            model=Notification,
+            timestamp_column="created_at",
+            retention_days=settings.notification_retention_days,
+            condition=lambda: Notification.is_acknowledged == True,
+            on_deleted=invalidate_notification_stats
+        ),
+        RetentionPolicy(
+            name="audit_logs",
+            model=AuditLog,
+            timestamp_column="created_at",
+            retention_days=settings.audit_log_retention_days,
+            archive=True
+        ),
+        RetentionPolicy(
+            name="credit_events",
+            model=CreditEvent,
+            timestamp_column="created_at",
+            retention_days=settings.credit_event_retention_days,
+            archive=True
+        ),
+        RetentionPolicy(
+            name="document_access_log",
+            model=DocumentAccessLog,
+            timestamp_column="accessed_at",
+            retention_days=settings.document_access_log_retention_days
+        ),
+        RetentionPolicy(
+            name="security_counters",
+            model=SecurityCounter,
+            timestamp_column="bucket_start",
+            retention_days=settings.security_counter_retention_days
+        ),
+    ]
+
+
+# Metriken pro Richtlinie (seit Prozessstart)
+retention_metrics: Dict[str, Dict[str, Any]] = {}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.hex()
+    return str(value)
+
+
+def _write_archive(path: Path, rows: List[Dict[str, Any]]):
+    """Hängt Zeilen an eine JSONL.gz-Datei an (blockierend, läuft im Thread)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(path, "at", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, default=_json_default, ensure_ascii=False))
+            f.write("\n")
+
+
+class RetentionService:
+    """Service für das Löschen und Archivieren abgelaufener Zeilen"""
+
+    @staticmethod
+    async def purge(
+        policy: RetentionPolicy,
+        batch_size: Optional[int] = None,
+        batch_sleep: Optional[float] = None,
+        archive: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """
+        Löscht abgelaufene Zeilen einer Richtlinie in Batches
+
+        Args:
+            policy: Aufbewahrungsrichtlinie
+            batch_size: Zeilen pro Transaktion (Standard aus den Einstellungen)
+            batch_sleep: Pause zwischen Batches in Sekunden
+            archive: Archivierung erzwingen/abschalten (Standard: Richtlinie + Einstellungen)
+
+        Returns:
+            Ergebnis mit gelöschten/archivierten Zeilen und Laufzeit
+        """
+        batch_size = batch_size or settings.retention_batch_size
+        if batch_sleep is None:
+            batch_sleep = settings.retention_batch_sleep_seconds
+        if archive is None:
+            archive = policy.archive and settings.retention_archive_enabled
+
+        table = policy.model.__table__
+        pk = table.c.id
+        cutoff = datetime.utcnow() - timedelta(days=policy.retention_days)
+        conditions = [table.c[policy.timestamp_column] < cutoff]
+        if policy.condition is not None:
+            conditions.append(policy.condition())
+
+        archive_path = None
+        if archive:
+            stamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+            archive_path = Path(settings.retention_archive_dir) / policy.name / f"{policy.name}_{stamp}.jsonl.gz"
+
+        started = time.monotonic()
+        deleted = 0
+        batches = 0
+        error = None
+
+        try:
+            while True:
+                async with AsyncSessionLocal() as db:
+                    result = await db.execute(
+                        select(pk).where(*conditions).order_by(pk).limit(batch_size)
+                    )
+                    ids = result.scalars().all()
+                    if not ids:
+                        break
+
+                    # Bereich über den Primärschlüssel statt langer IN-Listen
+                    stmt = delete(table).where(pk.between(ids[0], ids[-1]), *conditions)
+                    if archive_path is not None:
+                        result = await db.execute(stmt.returning(*table.c))
+                        rows = [dict(row) for row in result.mappings().all()]
+                        # Erst archivieren, dann committen: schlägt das Schreiben
+                        # fehl, bleiben die Zeilen erhalten
+                        await asyncio.to_thread(_write_archive, archive_path, rows)
+                        count = len(rows)
+                    else:
+                        result = await db.execute(stmt)
+                        count = result.rowcount
+                    await db.commit()
+
+                deleted += count
+                batches += 1
+                if len(ids) < batch_size:
+                    break
+                if batch_sleep > 0:
+                    await asyncio.sleep(batch_sleep)
+        except Exception as e:
+            error = str(e)
+            logger.error(f"Fehler bei Retention '{policy.name}': {e}")
+        finally:
+            if deleted and policy.on_deleted is not None:
+                policy.on_deleted()
+
+        duration = time.monotonic() - started
+        metrics = retention_metrics.setdefault(
+            policy.name, {"total_deleted": 0, "total_archived": 0, "runs": 0}
+        )
+        metrics["total_deleted"] += deleted
+        if archive_path is not None:
+            metrics["total_archived"] += deleted
+        metrics["runs"] += 1
+        metrics["last_run_at"] = datetime.utcnow().isoformat()
+        metrics["last_deleted"] = deleted
+        metrics["last_batches"] = batches
+        metrics["last_duration_seconds"] = round(duration, 3)
+        metrics["last_error"] = error
+        if archive_path is not None and deleted:
+            metrics["last_archive_file"] = str(archive_path)
+
+        logger.info(
+            f"Retention '{policy.name}': {deleted} Zeilen in {batches} Batches gelöscht "
+            f"({duration:.1f}s, Frist {policy.retention_days} Tage)"
+        )
+        return {
+            "policy": policy.name,
+            "deleted": deleted,
+            "archived": deleted if archive_path is not None else 0,
+            "batches": batches,
+            "duration_seconds": round(duration, 3),
+            "error": error
+        }
+
+    @staticmethod
+    async def run_all() -> List[Dict[str, Any]]:
+        """Führt alle Richtlinien nacheinander aus (Scheduler)"""
+        results = []
+        for policy in get_retention_policies():
+            results.append(await RetentionService.purge(policy))
+        return results
+
+    @staticmethod
+    def get_metrics() -> Dict[str, Any]:
+        """Retention-Metriken für Monitoring"""
+        return {
+            "policies": {
+                policy.name: {
+                    "retention_days": policy.retention_days,
+                    "archive": policy.archive and settings.retention_archive_enabled,
+                    **retention_metrics.get(policy.name, {})
+                }
+                for policy in get_retention_policies()
+            }
+        }
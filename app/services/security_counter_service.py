@@ -0,0 +1,146 @@
+"""
+Sliding-Window-Zähler für Rate-Limiting und Kontosperren
+
+- Pro (identifier, action, Zeit-Bucket) eine Zeile, atomar per Upsert erhöht
+  (ON CONFLICT DO UPDATE) - korrekt auch bei mehreren Workern
+- Ein Fenster ist die Summe der Buckets im Zeitraum (O(Buckets), indiziert)
+- In-Memory-Front: überschrittene Limits werden lokal gemerkt, sodass
+  wiederholte Versuche (z.B. Brute-Force) ohne Datenbankabfrage abgewiesen werden
+"""
+
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import delete, func, select
+
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal, IS_POSTGRESQL
+from ..models.security_counter import SecurityCounter
+
+if IS_POSTGRESQL:
+    from sqlalchemy.dialects.postgresql import insert
+else:
+    from sqlalchemy.dialects.sqlite import insert
+
+# Zeitstempel sind naive UTC-Werte (wie datetime.utcnow())
+_EPOCH = datetime(1970, 1, 1)
+
+
+class SecurityCounterStore:
+    """Bucket-basierte Zähler mit lokalem Cache für aktive Sperren"""
+
+    def __init__(self, bucket_seconds: int, window_seconds: int, block_cache_seconds: int, max_entries: int = 10000):
+        self.bucket_seconds = bucket_seconds
+        self.window_seconds = window_seconds
+        self.block_cache_seconds = block_cache_seconds
+        self.max_entries = max_entries
+        # (identifier, action, max_attempts) -> gesperrt bis (monotonic)
+        self._blocked: "OrderedDict[Tuple[str, str, int], float]" = OrderedDict()
+
+    def _bucket_start(self, now: datetime) -> datetime:
+        seconds = int((now - _EPOCH).total_seconds()) // self.bucket_seconds * self.bucket_seconds
+        return _EPOCH + timedelta(seconds=seconds)
+
+    def _window_conditions(self, identifier: str, action: str, now: datetime, window_seconds: int):
+        # Der älteste Bucket zählt voll mit, auch wenn er nur teilweise im Fenster liegt
+        since = now - timedelta(seconds=window_seconds + self.bucket_seconds)
+        return (
+            SecurityCounter.identifier == identifier,
+            SecurityCounter.action == action,
+            SecurityCounter.bucket_start > since
+        )
+
+    async def increment(self, identifier: str, action: str, amount: int = 1) -> int:
+        """
+        Erhöht den Zähler atomar und gibt die Summe im Fenster zurück
+        """
+        now = datetime.utcnow()
+        stmt = insert(SecurityCounter).values(
+            identifier=identifier,
+            action=action,
+            bucket_start=self._bucket_start(now),
+            count=amount
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["identifier", "action", "bucket_start"],
+            set_={"count": SecurityCounter.count + stmt.excluded.count}
+        )
+        async with AsyncSessionLocal() as db:
+            await db.execute(stmt)
+            result = await db.execute(
+                select(func.coalesce(func.sum(SecurityCounter.count), 0))
+                .where(*self._window_conditions(identifier, action, now, self.window_seconds))
+            )
+            await db.commit()
+            return int(result.scalar())
+
+    async def count(self, identifier: str, action: str, window_seconds: Optional[int] = None) -> int:
+        """Summe der Ereignisse im Fenster"""
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(func.coalesce(func.sum(SecurityCounter.count), 0))
+                .where(*self._window_conditions(identifier, action, now, window_seconds or self.window_seconds))
+            )
+            return int(result.scalar())
+
+    async def is_blocked(self, identifier: str, action: str, max_attempts: int, window_seconds: Optional[int] = None) -> bool:
+        """Prüft, ob im Fenster mindestens max_attempts Ereignisse gezählt wurden"""
+        key = (identifier, action, max_attempts)
+        blocked_until = self._blocked.get(key)
+        if blocked_until is not None:
+            if blocked_until > time.monotonic():
+                return True
+            del self._blocked[key]
+
+        window_seconds = window_seconds or self.window_seconds
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(SecurityCounter.bucket_start, SecurityCounter.count)
+                .where(*self._window_conditions(identifier, action, now, window_seconds))
+                .order_by(SecurityCounter.bucket_start)
+            )
+            buckets = result.all()
+
+        total = sum(count for _, count in buckets)
+        if total < max_attempts:
+            return False
+
+        # Zeitpunkt bestimmen, ab dem genug alte Buckets aus dem Fenster gefallen sind
+        expires = now + timedelta(seconds=window_seconds)
+        for bucket_start, count in buckets:
+            total -= count
+            if total < max_attempts:
+                expires = bucket_start + timedelta(seconds=window_seconds + self.bucket_seconds)
+                break
+        remaining = max(0.0, (expires - now).total_seconds())
+
+        # Nur begrenzt cachen, damit ein Reset auf einem anderen Worker zeitnah greift
+        self._blocked[key] = time.monotonic() + min(remaining, self.block_cache_seconds)
+        self._blocked.move_to_end(key)
+        while len(self._blocked) > self.max_entries:
+            self._blocked.popitem(last=False)
+        return True
+
+    async def reset(self, identifier: str, action: str):
+        """Löscht alle Buckets eines Zählers (z.B. nach erfolgreichem Login)"""
+        for key in [k for k in self._blocked if k[0] == identifier and k[1] == action]:
+            del self._blocked[key]
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                delete(SecurityCounter).where(
+                    SecurityCounter.identifier == identifier,
+                    SecurityCounter.action == action
+                )
+            )
+            await db.commit()
+
+
+security_counters = SecurityCounterStore(
+    bucket_seconds=settings.security_counter_bucket_seconds,
+    window_seconds=settings.security_counter_window_minutes * 60,
+    block_cache_seconds=settings.security_counter_block_cache_seconds
+)
@@ -2,7 +2,7 @@ import pyotp
 import qrcode
 import io
 import base64
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional, List, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
@@ -12,7 +12,11 @@ import hashlib
 from ..core.config import settings
 from ..models.user import User
 from ..models.audit_log import AuditAction, AuditLog
-from ..core.security import get_password_hash
+from ..core.security import get_password_hash, run_in_crypto_executor
+from .audit_log_writer import audit_log_writer
+from .security_counter_service import security_counters
+
+FAILED_LOGIN_ACTION = "failed_login"
 
 
 class SecurityService:
@@ -40,7 +44,7 @@ class SecurityService:
     
     @staticmethod
     async def create_audit_log(
-        db: AsyncSession,
+        db: Optional[AsyncSession],
         user_id: Optional[int],
         action: AuditAction,
         description: str,
@@ -49,41 +53,52 @@ class SecurityService:
         ip_address: Optional[str] = None,
         processing_purpose: Optional[str] = None,
         legal_basis: Optional[str] = None,
-        risk_level: Optional[str] = None
+        risk_level: Optional[str] = None,
+        requires_review: bool = False,
+        sync: bool = False
     ):
-        """Erstellt einen Audit-Log-Eintrag"""
-        
-        audit_log = AuditLog(
-            user_id=user_id,
-            action=action,
-            description=description,
-            resource_type=resource_type,
-            resource_id=resource_id,
-            ip_address=SecurityService.anonymize_ip_address(ip_address) if ip_address else None,
-            processing_purpose=processing_purpose,
-            legal_basis=legal_basis,
-            risk_level=risk_level
+        """
+        Erstellt einen Audit-Log-Eintrag
+        
+        Der Eintrag wird über den Audit-Log-Writer gepuffert geschrieben; die
+        Session des Aufrufers (db) wird dabei weder verwendet noch committet.
+        Mit sync=True wird der Eintrag sofort über eine eigene Verbindung geschrieben.
+        """
+        
+        await audit_log_writer.submit(
+            {
+                "user_id": user_id,
+                "action": action,
+                "description": description,
+                "resource_type": resource_type,
+                "resource_id": resource_id,
+                "ip_address": SecurityService.anonymize_ip_address(ip_address) if ip_address else None,
+                "processing_purpose": processing_purpose,
+                "legal_basis": legal_basis,
+                "risk_level": risk_level,
+                "requires_review": requires_review,
+                # Zeitpunkt des Ereignisses, nicht des (verzögerten) Inserts
+                "created_at": datetime.now(timezone.utc)
+            },
+            sync=sync
         )
-        
-        db.add(audit_log)
-        await db.commit()
+    
+    @staticmethod
+    def rate_limit_identifier(ip_address: str) -> str:
+        """Pseudonymisierter Zähler-Schlüssel für eine IP-Adresse"""
+        return "ip:" + hashlib.sha256(ip_address.encode()).hexdigest()[:32]
     
     @staticmethod
     async def check_rate_limit(db: AsyncSession, identifier: str, action: str, max_attempts: int = 5) -> bool:
-        """Prüft Rate-Limiting für Aktionen"""
+        """Prüft Rate-Limiting für Aktionen (True = weitere Versuche erlaubt)"""
         
-        # Prüfe aktuelle Versuche in den letzten 15 Minuten
-        cutoff_time = datetime.utcnow() - timedelta(minutes=15)
-        
-        stmt = select(AuditLog).where(
-            AuditLog.description.contains(action),
-            AuditLog.ip_address == identifier,
-            AuditLog.created_at > cutoff_time
-        )
-        result = await db.execute(stmt)
-        recent_attempts = result.scalars().all()
-        
-        return len(recent_attempts) < max_attempts
+        # Sliding-Window über die security_counters (Fenster: security_counter_window_minutes)
+        return not await security_counters.is_blocked(identifier, action, max_attempts)
+    
+    @staticmethod
+    async def record_attempt(identifier: str, action: str) -> int:
+        """Zählt einen Versuch und gibt die Anzahl im aktuellen Fenster zurück"""
+        return await security_counters.increment(identifier, action)
     
     @staticmethod
     async def lock_account(db: AsyncSession, user_id: int, duration_minutes: int = 30) -> bool:
@@ -97,6 +112,7 @@ class SecurityService:
         )
         await db.execute(stmt)
         await db.commit()
+        await security_counters.reset(f"user:{user_id}", FAILED_LOGIN_ACTION)
         
         # Audit-Log
         await SecurityService.create_audit_log(
@@ -118,6 +134,7 @@ class SecurityService:
         )
         await db.execute(stmt)
         await db.commit()
+        await security_counters.reset(f"user:{user_id}", FAILED_LOGIN_ACTION)
         
         # Audit-Log
         await SecurityService.create_audit_log(
@@ -132,14 +149,9 @@ class SecurityService:
     async def increment_failed_login(db: AsyncSession, user_id: int) -> bool:
         """Erhöht die Anzahl fehlgeschlagener Login-Versuche"""
         
-        stmt = select(User).where(User.id == user_id)
-        result = await db.execute(stmt)
-        user = result.scalar_one_or_none()
-        
-        if not user:
-            return False
-        
-        new_attempts = user.failed_login_attempts + 1
+        # Atomarer Zähler statt Lesen/Schreiben der User-Zeile, damit parallele
+        # Versuche auf mehreren Workern nicht verloren gehen
+        new_attempts = await security_counters.increment(f"user:{user_id}", FAILED_LOGIN_ACTION)
         
         # Prüfe ob Konto gesperrt werden soll
         if new_attempts >= settings.max_login_attempts:
@@ -163,6 +175,7 @@ class SecurityService:
         )
         await db.execute(stmt)
         await db.commit()
+        await security_counters.reset(f"user:{user_id}", FAILED_LOGIN_ACTION)
         
         return True
     
@@ -225,7 +238,6 @@ class SecurityService:
     @staticmethod
     def hash_password(password: str) -> str:
         """Hasht ein Passwort"""
-        from ..core.security import get_password_hash
         return get_password_hash(password)
     
     @staticmethod
@@ -234,6 +246,18 @@ class SecurityService:
         from ..core.security import verify_password
         return verify_password(plain_password, hashed_password)
     
+    @staticmethod
+    async def hash_password_async(password: str) -> str:
+        """Hasht ein Passwort im Krypto-Thread-Pool"""
+        from ..core.security import hash_password_async
+        return await hash_password_async(password)
+    
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        """Überprüft ein Passwort im Krypto-Thread-Pool"""
+        from ..core.security import verify_password_async
+        return await verify_password_async(plain_password, hashed_password)
+    
     @staticmethod
     def is_account_locked(lock_until: datetime) -> bool:
         """Prüft ob ein Account gesperrt ist"""
@@ -280,7 +304,7 @@ class SecurityService:
         backup_codes = SecurityService.generate_backup_codes()
         
         # QR-Code generieren
-        qr_code = SecurityService.generate_mfa_qr_code(secret, user.email)
+        qr_code = await run_in_crypto_executor(SecurityService.generate_mfa_qr_code, secret, user.email)
         
         # Backup-Codes hashen
         hashed_backup_codes = [hashlib.sha256(code.encode()).hexdigest() for code in backup_codes]
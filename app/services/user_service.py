@@ -3,10 +3,11 @@ from sqlalchemy import select, update
 from typing import Optional, List
 from datetime import datetime, date
 
+from ..core.config import settings
 from ..models import User, UserType
 from ..models.user import UserStatus
 from ..models.audit_log import AuditAction
-from ..services.security_service import SecurityService
+from ..services.security_service import SecurityService, FAILED_LOGIN_ACTION
 from ..schemas.user import UserCreate, UserUpdate
 
 
@@ -27,7 +28,7 @@ async def create_user(db: AsyncSession, user_in: UserCreate) -> User:
         raise ValueError(f"Passwort erfüllt nicht die Sicherheitsanforderungen: {', '.join(password_validation['errors'])}")
     
     # Passwort hashen
-    hashed_password = SecurityService.hash_password(user_in.password)
+    hashed_password = await SecurityService.hash_password_async(user_in.password)
     
     # DSGVO: Standard-Datenaufbewahrung (2 Jahre)
     data_retention_until = date.today().replace(year=date.today().year + 2)
@@ -66,8 +67,24 @@ async def create_user(db: AsyncSession, user_in: UserCreate) -> User:
 
 
 async def authenticate_user(db: AsyncSession, email: str, password: str, ip_address: str = None) -> User | None:
+    # Rate-Limiting pro IP (Fehlversuche im Zählerfenster, unabhängig vom Konto)
+    ip_key = SecurityService.rate_limit_identifier(ip_address) if ip_address else None
+    if ip_key and not await SecurityService.check_rate_limit(
+        db, ip_key, FAILED_LOGIN_ACTION, settings.max_login_attempts_per_ip
+    ):
+        await SecurityService.create_audit_log(
+            db, None, AuditAction.SUSPICIOUS_ACTIVITY,
+            f"Login-Rate-Limit überschritten: {email}",
+            resource_type="user",
+            ip_address=ip_address,
+            risk_level="high"
+        )
+        return None
+    
     user = await get_user_by_email(db, email)
     if not user:
+        if ip_key:
+            await SecurityService.record_attempt(ip_key, FAILED_LOGIN_ACTION)
         return None
     
     # Prüfe ob Account gesperrt ist
@@ -86,12 +103,14 @@ async def authenticate_user(db: AsyncSession, email: str, password: str, ip_addr
     
     # Passwort überprüfen
     hashed_password = getattr(user, 'hashed_password', '')
-    if not SecurityService.verify_password(password, str(hashed_password)):
+    if not await SecurityService.verify_password_async(password, str(hashed_password)):
         # Fehlgeschlagene Anmeldung behandeln
         user_id = getattr(user, 'id', None)
         failed_attempts = getattr(user, 'failed_login_attempts', 0)
         if user_id:
             await SecurityService.handle_failed_login(db, user, ip_address or "")
+        if ip_key:
+            await SecurityService.record_attempt(ip_key, FAILED_LOGIN_ACTION)
         return None
     
     # Erfolgreiche Anmeldung
@@ -180,7 +199,7 @@ async def change_password(db: AsyncSession, user_id: int, current_password: str,
         return False
     
     hashed_password = getattr(user, 'hashed_password', '')
-    if not SecurityService.verify_password(current_password, str(hashed_password)):
+    if not await SecurityService.verify_password_async(current_password, str(hashed_password)):
         return False
     
     # Neue Passwort-Stärke validieren
@@ -189,7 +208,7 @@ async def change_password(db: AsyncSession, user_id: int, current_password: str,
         raise ValueError(f"Neues Passwort erfüllt nicht die Sicherheitsanforderungen: {', '.join(password_validation['errors'])}")
     
     # Neues Passwort hashen
-    hashed_new_password = SecurityService.hash_password(new_password)
+    hashed_new_password = await SecurityService.hash_password_async(new_password)
     
     await db.execute(
         update(User)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Login-Sturm und Latenz anderer Endpunkte
+Startet 50 gleichzeitige Logins (bcrypt-Verifikation) und misst währenddessen
+die Antwortzeit eines leichten Endpunkts (/ping), einmal mit bcrypt direkt im
+Handler und einmal über den Krypto-Thread-Pool. Mit dem Pool soll die p99 von
+/ping nahe am Leerlauf-Wert bleiben.
+
+Aufruf: python benchmark_crypto_executor.py [anzahl_logins]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from fastapi import FastAPI
+
+from app.core.security import get_password_hash, verify_password, verify_password_async
+
+PASSWORD = "Sicheres-Passwort-123!"
+HASHED = get_password_hash(PASSWORD)
+
+app = FastAPI()
+
+
+@app.post("/login-sync")
+async def login_sync():
+    return {"ok": verify_password(PASSWORD, HASHED)}
+
+
+@app.post("/login-async")
+async def login_async():
+    return {"ok": await verify_password_async(PASSWORD, HASHED)}
+
+
+@app.get("/ping")
+async def ping():
+    return {"pong": True}
+
+
+PING_INTERVAL = 0.01
+
+
+async def measure_pings(client: httpx.AsyncClient, stop: asyncio.Event) -> list:
+    """
+    Ruft /ping alle 10 ms auf und sammelt Latenzen in Millisekunden
+
+    Gemessen wird ab dem geplanten Zeitpunkt, nicht ab dem tatsächlichen
+    Senden: ist der Event-Loop blockiert, zählt die Wartezeit mit.
+    """
+    latencies = []
+    due = time.perf_counter()
+    while not stop.is_set():
+        await client.get("/ping")
+        now = time.perf_counter()
+        latencies.append((now - due) * 1000)
+        # Verpasste Zeitpunkte nachholen (jeder hätte so lange gewartet)
+        due += PING_INTERVAL
+        while due < now:
+            latencies.append((now - due) * 1000)
+            due += PING_INTERVAL
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+    return latencies
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def run_scenario(client: httpx.AsyncClient, login_path: str, logins: int):
+    stop = asyncio.Event()
+    pinger = asyncio.create_task(measure_pings(client, stop))
+    await asyncio.sleep(0.2)
+
+    started = time.perf_counter()
+    if login_path:
+        await asyncio.gather(*[client.post(login_path) for _ in range(logins)])
+    else:
+        await asyncio.sleep(1.0)
+    duration = time.perf_counter() - started
+
+    # Noch einen Zyklus messen, damit während einer Blockade fällige Pings zählen
+    await asyncio.sleep(0.2)
+    stop.set()
+    latencies = await pinger
+    return duration, latencies
+
+
+async def main(logins: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{'Szenario':<22} {'Logins (s)':>11} {'/ping p50':>10} {'/ping p99':>10} {'/ping max':>10}")
+        print("-" * 67)
+        for name, path in [("Leerlauf", None), ("bcrypt im Handler", "/login-sync"), ("Krypto-Thread-Pool", "/login-async")]:
+            duration, latencies = await run_scenario(client, path, logins)
+            print(
+                f"{name:<22} {duration if path else 0:>11.2f} "
+                f"{statistics.median(latencies):>8.1f}ms {percentile(latencies, 0.99):>8.1f}ms "
+                f"{max(latencies):>8.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    print(f"Benchmark: {logins} gleichzeitige Logins")
+    print("=" * 67)
+    asyncio.run(main(logins))
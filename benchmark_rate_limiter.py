@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Rate-Limiter (GCRA, In-Memory-Backend)
+Misst die Kosten pro Anfrage bei steigender Anzahl unterschiedlicher Clients.
+Die Zeit pro Anfrage soll unabhängig von der Client-Anzahl konstant bleiben.
+
+Aufruf: python benchmark_rate_limiter.py [anfragen_pro_lauf]
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.rate_limiter import MemoryRateLimitBackend, RateLimiter
+
+CLIENT_COUNTS = [100, 1_000, 10_000, 100_000]
+
+
+def bench_backend(clients: int, requests: int) -> float:
+    """Synchrone Backend-Aufrufe, Nanosekunden pro Anfrage"""
+    backend = MemoryRateLimitBackend()
+    keys = [f"login:ip:10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(clients)]
+    # Alle Clients einmal anlegen, damit die Messung den gefüllten Zustand sieht
+    for key in keys:
+        backend.hit(key, 600, 60)
+    sequence = [random.choice(keys) for _ in range(requests)]
+
+    started = time.perf_counter()
+    for key in sequence:
+        backend.hit(key, 600, 60)
+    elapsed = time.perf_counter() - started
+    return elapsed / requests * 1e9
+
+
+async def bench_limiter(clients: int, requests: int) -> float:
+    """Async-Pfad wie in der FastAPI-Dependency, Nanosekunden pro Anfrage"""
+    limiter = RateLimiter()
+    keys = [f"login:user:{i}" for i in range(clients)]
+    for key in keys:
+        await limiter.hit(key, 600, 60)
+    sequence = [random.choice(keys) for _ in range(requests)]
+
+    started = time.perf_counter()
+    for key in sequence:
+        await limiter.hit(key, 600, 60)
+    elapsed = time.perf_counter() - started
+    return elapsed / requests * 1e9
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    random.seed(42)
+
+    print("Benchmark: Rate-Limiter (GCRA, In-Memory)")
+    print("=" * 60)
+    print(f"{'Clients':>10} {'Backend ns/Anfrage':>20} {'Async ns/Anfrage':>20}")
+    for clients in CLIENT_COUNTS:
+        backend_ns = bench_backend(clients, requests)
+        limiter_ns = asyncio.run(bench_limiter(clients, requests))
+        print(f"{clients:>10,} {backend_ns:>20,.0f} {limiter_ns:>20,.0f}")
+    print("=" * 60)
@@ -76,8 +76,12 @@ class EnvironmentManager:
         """Speichert die Konfiguration."""
         try:
             config["last_updated"] = datetime.now().isoformat()
-            with open(self.config_file, "w", encoding="utf-8") as f:
+            # Erst temporär schreiben, dann ersetzen: laufende Server lesen nie
+            # eine halb geschriebene Datei (sie übernehmen Änderungen per mtime)
+            tmp_file = self.config_file.with_name(self.config_file.name + ".tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
                 json.dump(config, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_file, self.config_file)
             return True
         except Exception as e:
             print(f"❌ Fehler beim Speichern der Konfiguration: {e}")
@@ -0,0 +1,125 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core import database
+from app.core.background_tasks import BackgroundTaskManager, TaskStatus
+from app.core.config import settings
+from app.models.background_job import BackgroundJob
+
+failures = {"flaky": 0}
+
+
+async def add(a, b):
+    return a + b
+
+
+async def flaky():
+    if failures["flaky"]:
+        failures["flaky"] -= 1
+        raise RuntimeError("boom")
+    return "ok"
+
+
+@pytest_asyncio.fixture
+async def sessions(monkeypatch, tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test_background_tasks.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(BackgroundJob.__table__.create)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    monkeypatch.setattr(database, "AsyncSessionLocal", session_factory)
+    yield session_factory
+    await engine.dispose()
+
+
+def _manager(worker_id: str = "worker-a") -> BackgroundTaskManager:
+    manager = BackgroundTaskManager(max_concurrent_tasks=1)
+    manager.worker_id = worker_id
+    manager._semaphore = asyncio.Semaphore(1)
+    return manager
+
+
+async def _run(manager: BackgroundTaskManager, job):
+    # _execute releases the slot the dispatch loop acquired before claiming
+    await manager._semaphore.acquire()
+    await manager._execute(job)
+
+
+async def _job(sessions, task_id: str) -> BackgroundJob:
+    async with sessions() as db:
+        return (await db.execute(select(BackgroundJob).where(BackgroundJob.task_id == task_id))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_claim_and_complete(sessions):
+    manager = _manager()
+    task_id = await manager.enqueue(add, (2, 3))
+
+    job = await manager._claim_next()
+    assert job["task_id"] == task_id
+    assert await manager._claim_next() is None
+
+    await _run(manager, job)
+    stored = await _job(sessions, task_id)
+    assert stored.status == "completed"
+    assert stored.attempts == 1
+    assert stored.locked_by is None
+    assert json.loads(stored.result) == 5
+    assert stored.expires_at is not None
+
+
+@pytest.mark.asyncio
+async def test_failed_job_is_retried(sessions, monkeypatch):
+    monkeypatch.setattr(settings, "background_jobs_retry_base_seconds", 0)
+    monkeypatch.setitem(failures, "flaky", 1)
+    manager = _manager()
+    task_id = await manager.enqueue(flaky, max_attempts=2)
+
+    await _run(manager, await manager._claim_next())
+    stored = await _job(sessions, task_id)
+    assert stored.status == "pending"
+    assert stored.attempts == 1
+    assert "boom" in stored.error
+
+    await _run(manager, await manager._claim_next())
+    stored = await _job(sessions, task_id)
+    assert stored.status == "completed"
+    assert stored.attempts == 2
+    assert json.loads(stored.result) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_stale_job_is_requeued(sessions, monkeypatch):
+    monkeypatch.setattr(settings, "background_jobs_stale_seconds", 60)
+    crashed = _manager("worker-crashed")
+    manager = _manager()
+    task_id = await manager.enqueue(add, (1, 1))
+    job = await crashed._claim_next()
+
+    # A fresh claim of another worker is left alone
+    assert await manager._requeue_stale_jobs() == 0
+
+    async with sessions() as db:
+        await db.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.task_id == task_id)
+            .values(started_at=datetime.utcnow() - timedelta(seconds=600))
+        )
+        await db.commit()
+    assert await manager._requeue_stale_jobs() == 1
+    stored = await _job(sessions, task_id)
+    assert stored.status == "pending"
+    assert stored.locked_by is None
+
+    await _run(manager, await manager._claim_next())
+    # The crashed worker's late result no longer applies
+    await crashed._finish(job, TaskStatus.FAILED, error="late")
+    stored = await _job(sessions, task_id)
+    assert stored.status == "completed"
+    assert stored.attempts == 2
+    assert json.loads(stored.result) == 2
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core import database
+from app.core.cache import cache_result, cache_service
+
+
+@pytest.mark.asyncio
+async def test_stale_refresh_does_not_use_request_session(monkeypatch, tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test_cache.db'}", poolclass=AsyncAdaptedQueuePool)
+    sessions = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    monkeypatch.setattr(database, "AsyncSessionLocal", sessions)
+    monkeypatch.setattr(cache_service, "enabled", True)
+
+    async def get_db():
+        async with sessions() as session:
+            yield session
+
+    used = []
+
+    # ttl=0: every hit is stale and starts a background refresh
+    @cache_result(ttl=0, stale_ttl=60)
+    async def answer(db: AsyncSession, value: int):
+        used.append(db)
+        return (await db.execute(text("SELECT :value"), {"value": value})).scalar()
+
+    request_sessions = []
+    try:
+        for _ in range(2):
+            async for db in get_db():
+                request_sessions.append(db)
+                assert await answer(db, 42) == 42
+        # The refresh runs after the second request closed its session
+        await asyncio.gather(*cache_service._inflight.values())
+
+        assert len(used) == 2
+        assert not any(db in request_sessions for db in used)
+        assert engine.pool.checkedout() == 0
+    finally:
+        await answer.invalidate(request_sessions[0], 42)
+        await engine.dispose()
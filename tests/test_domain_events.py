@@ -0,0 +1,73 @@
+import asyncio
+import datetime
+
+import pytest
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core import database
+from app.core.outbox import OutboxDispatcher
+from app.models import Base, Milestone, Notification, OutboxEvent, Project, Quote, QuoteStatus, User, UserRole
+from app.models.notification import NotificationType
+from app.models.project import ProjectType
+from app.services.domain_events import record_milestone_completed
+
+
+@pytest.mark.asyncio
+async def test_redelivered_milestone_completed_counts_once(monkeypatch, tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test_domain_events.db'}")
+    sessions = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    monkeypatch.setattr(database, "AsyncSessionLocal", sessions)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with sessions() as db:
+        await db.execute(insert(User), [
+            {"id": 1, "email": "bt@example.com", "hashed_password": "x", "first_name": "B",
+             "last_name": "T", "user_role": UserRole.BAUTRAEGER},
+            {"id": 2, "email": "dl@example.com", "hashed_password": "x", "first_name": "D",
+             "last_name": "L", "user_role": UserRole.DIENSTLEISTER, "completed_offers_count": 0}
+        ])
+        db.add(Project(id=1, owner_id=1, name="P", project_type=ProjectType.NEW_BUILD))
+        await db.flush()
+        milestone = Milestone(id=1, project_id=1, title="Malerarbeiten", created_by=1,
+                              planned_date=datetime.date.today(), accepted_by=2)
+        db.add(milestone)
+        await db.flush()
+        db.add(Quote(id=1, project_id=1, milestone_id=1, service_provider_id=2, title="Q",
+                     total_amount=1000, status=QuoteStatus.ACCEPTED))
+        record_milestone_completed(db, milestone)
+        await db.commit()
+
+    dispatcher = OutboxDispatcher()
+    dispatcher._wakeup = asyncio.Event()
+
+    async def deliver(locked_by=None):
+        async with sessions() as db:
+            await db.execute(update(OutboxEvent).values(status="pending", locked_by=None))
+            await db.commit()
+        [row] = await dispatcher._claim_batch(10)
+        if locked_by:
+            # Ein anderer Worker hat das Event als verwaist übernommen
+            async with sessions() as db:
+                await db.execute(update(OutboxEvent).values(locked_by=locked_by))
+                await db.commit()
+        await dispatcher._deliver(row)
+
+    async def state():
+        async with sessions() as db:
+            count = (await db.execute(select(User.completed_offers_count).where(User.id == 2))).scalar_one()
+            notifications = (await db.execute(
+                select(func.count(Notification.id)).where(Notification.type == NotificationType.MILESTONE_COMPLETED)
+            )).scalar_one()
+        return count, notifications
+
+    try:
+        await deliver(locked_by="other-worker")
+        assert (await state())[0] == 0
+
+        await deliver()
+        await deliver()
+        assert await state() == (1, 1)
+    finally:
+        await engine.dispose()
@@ -0,0 +1,89 @@
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.models import Base, CostPosition, Expense, Invoice, Project, ProjectFinanceRollup
+from app.models.invoice import InvoiceStatus, InvoiceType
+from app.models.project import ProjectType
+from app.services import finance_rollup_service
+from app.services.finance_rollup_service import _aggregate_queries, _group_key
+
+
+@pytest_asyncio.fixture
+async def sessions(monkeypatch, tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test_finance_rollup.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    monkeypatch.setattr(finance_rollup_service, "AsyncSessionLocal", session_factory)
+    yield session_factory
+    await engine.dispose()
+
+
+async def _assert_rollup_matches(db, *project_ids):
+    """Rollup-Zeilen entsprechen einer frischen Aggregation der Quelldaten"""
+    table = ProjectFinanceRollup.__table__
+    expected = {_group_key(row) for row in (await db.execute(union_all(*_aggregate_queries(project_ids)))).all()}
+    current = {
+        _group_key(row)
+        for row in (await db.execute(select(table).where(table.c.project_id.in_(project_ids)))).all()
+    }
+    assert current == expected
+    return current
+
+
+def _invoice(project_id: int, number: str, amount: float, status: InvoiceStatus) -> Invoice:
+    return Invoice(
+        project_id=project_id, milestone_id=1, service_provider_id=1, created_by=1,
+        invoice_number=number, invoice_date=datetime(2026, 9, 15), due_date=datetime(2026, 10, 15),
+        total_amount=amount, status=status, type=InvoiceType.MANUAL
+    )
+
+
+@pytest.mark.asyncio
+async def test_rollup_follows_invoice_and_expense_changes(sessions):
+    async with sessions() as db:
+        project = Project(name="A", project_type=ProjectType.NEW_BUILD)
+        other = Project(name="B", project_type=ProjectType.NEW_BUILD)
+        db.add_all([project, other])
+        await db.commit()
+
+        invoice = _invoice(project.id, "R-1", 300, InvoiceStatus.SENT)
+        db.add(invoice)
+        await db.flush()
+        db.add_all([
+            CostPosition(title="c", description="Malerarbeiten", amount=200, project_id=project.id, invoice_id=invoice.id),
+            Expense(title="x", amount=100, category="material", project_id=project.id,
+                    date=datetime(2026, 9, 3), construction_phase="rohbau"),
+            Expense(title="y", amount=50, category="material", project_id=project.id, date=datetime(2026, 9, 20)),
+            Expense(title="z", amount=30, category="labor", project_id=project.id, date=datetime(2026, 10, 1)),
+        ])
+        await db.commit()
+        rows = await _assert_rollup_matches(db, project.id)
+        assert ("invoice", "", "SENT", 2026, 9, 1, 300.0, 0.0) in rows
+
+        # ORM-Änderungen: Rechnung bezahlt, Ausgabe in ein anderes Projekt verschoben
+        invoice.status = InvoiceStatus.PAID
+        moved = (await db.execute(select(Expense).where(Expense.title == "z"))).scalar_one()
+        moved.amount = 40
+        moved.project_id = other.id
+        await db.commit()
+        rows = await _assert_rollup_matches(db, project.id)
+        # Kostenposition einer bezahlten Rechnung zählt als bezahlt
+        assert [row[-1] for row in rows if row[0] == "cost_position"] == [200.0]
+        assert await _assert_rollup_matches(db, other.id)
+
+        # Bulk-UPDATE und -DELETE
+        await db.execute(update(Expense).where(Expense.category == "material").values(amount=10))
+        await db.execute(update(Invoice).where(Invoice.id == invoice.id).values(total_amount=350))
+        await db.commit()
+        await _assert_rollup_matches(db, project.id)
+
+        await db.execute(delete(Expense).where(Expense.title == "x"))
+        await db.commit()
+        await _assert_rollup_matches(db, project.id, other.id)
+
+    assert (await finance_rollup_service.reconcile_finance_rollups())["repaired"] == 0